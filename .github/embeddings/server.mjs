@@ -14,13 +14,26 @@
 //   mean pooling silently produces worse vectors — measurably worse retrieval
 //   from a server that looks like it is working.
 //
-//   Inputs are embedded one at a time regardless of how many the caller sends.
-//   Attention cost grows with batch x tokens^2: a batch of 8 at the 2048-token
-//   cap peaks around 24 GB, where one at a time stays near 4.5 GB and fits a
-//   runner. Throughput is unchanged either way since the model is already
-//   using every core.
+//   Memory is bounded by batch shape, not by how many inputs the caller
+//   sends. Attention cost grows with batch x tokens^2: a batch of 8 at the
+//   2048-token cap peaks around 24 GB, where one input at the cap stays near
+//   4.5 GB and fits a runner. So inputs are sorted by token length and packed
+//   into micro-batches whose padded shape stays within what one input at the
+//   cap costs — long inputs still run alone, while titles and doc chunks run
+//   dozens at a time instead of paying a full forward pass each. Batches run
+//   one at a time across requests, or two concurrent requests would double
+//   the peak.
+//
+//   Batching must not change the vectors. Padding is masked, but a quantized
+//   model may pick activation scales per tensor — across the whole padded
+//   batch — and the index's compatibility key (idOf) does not say how a
+//   vector was computed, so batched vectors would mix silently with ones
+//   embedded alone. At startup the server embeds a few probe texts alone and
+//   as one padded batch, and serves every input alone unless each batched
+//   vector matches its single one to EMBED_BATCH_MIN_COSINE.
 //
 //   node server.mjs [port]
+//   node server.mjs --resolve <embedModel>   (prints the model it would serve)
 
 import { createServer } from "node:http";
 import { AutoModel, AutoTokenizer, env } from "@huggingface/transformers";
@@ -28,10 +41,52 @@ import { AutoModel, AutoTokenizer, env } from "@huggingface/transformers";
 // Pinned to a revision SHA, not a tag: a tag is mutable, and a model that
 // changes underneath us would silently alter every vector while the index
 // header still reported the same model string.
-const MODEL = "onnx-community/Qwen3-Embedding-0.6B-ONNX";
-const MODEL_REVISION = "c25a394dd583836952667c12f008335071b3f43d";
-const MODEL_DTYPE = "q8";
+//
+// Every model this server can load; the first is the default. To migrate,
+// put the new model first and keep the old one listed: jobs that answer
+// queries ask for the model their live index was built with (EMBED_MODEL_ID),
+// while the nightly build also runs the default and fills a shadow index with
+// it. The old entry can go once the bot has cut the indexes over.
+const MODELS = [
+	{
+		model: "onnx-community/Qwen3-Embedding-0.6B-ONNX",
+		revision: "c25a394dd583836952667c12f008335071b3f43d",
+		dtype: "q8",
+	},
+];
 const MAX_TOKENS = 2048; // covers the bot's MAX_POST_EMBED_CHARS of 6000
+// Micro-batch limits: padded attention (batch x longest^2) and padded tokens
+// (batch x longest), the latter for the activations that grow linearly.
+const ATTENTION_BUDGET = Number(process.env.EMBED_ATTENTION_BUDGET ?? MAX_TOKENS * MAX_TOKENS);
+const BATCH_TOKENS = Number(process.env.EMBED_BATCH_TOKENS ?? 4 * MAX_TOKENS);
+// Batch-vs-single cosine every probe must reach for batching to be used.
+const BATCH_MIN_COSINE = Number(process.env.EMBED_BATCH_MIN_COSINE ?? 0.999);
+// Different lengths, so the probe batch is padded as real batches are.
+const PROBE_TEXTS = [
+	"Spotify login fails",
+	"Sonos speakers drop out of the group after a few minutes of playback.",
+	"After updating to the latest release the server no longer starts. The log shows a " +
+		"traceback in the provider setup and then the web interface stays unreachable " +
+		"until the add-on is restarted, which only helps for a short while.",
+	"Queue is cleared when I switch players",
+];
+
+// The identifier the bot records in the index header. It carries the revision
+// and dtype because the index's `model` field is a compatibility key: anything
+// that would change the vectors has to change this string, or a stale index is
+// silently accepted.
+const idOf = (m) => `${m.model}@${m.revision.slice(0, 12)}@${m.dtype}`;
+const pick = (id) => MODELS.find((m) => idOf(m) === id) ?? MODELS[0];
+
+if (process.argv[2] === "--resolve") {
+	console.log(idOf(pick(process.argv[3])));
+	process.exit(0);
+}
+
+const chosen = pick(process.env.EMBED_MODEL_ID);
+const MODEL = chosen.model;
+const MODEL_REVISION = chosen.revision;
+const MODEL_DTYPE = chosen.dtype;
 
 const port = Number(process.argv[2] ?? process.env.PORT ?? 11435);
 
@@ -48,25 +103,142 @@ const model = await AutoModel.from_pretrained(MODEL, {
 	dtype: MODEL_DTYPE,
 });
 
-/** The final non-padding position, L2-normalised. */
-function poolLast(hidden, mask, dims) {
-	const [, seq, width] = dims;
+const stats = {
+	startedAt: Date.now(),
+	requests: 0,
+	inputs: 0,
+	batches: 0,
+	largestBatch: 0,
+	tokens: 0,
+	paddedTokens: 0,
+	embedSeconds: 0,
+	// Set by the startup self-check below.
+	batching: false,
+	batchMinCosine: null,
+};
+
+/** Row `b`'s final non-padding position, L2-normalised. */
+function poolLast(hidden, mask, b, seq, width) {
 	let last = 0;
-	for (let s = 0; s < seq; s++) if (Number(mask[s]) === 1) last = s;
-	const row = Array.from(hidden.slice(last * width, last * width + width), Number);
+	for (let s = 0; s < seq; s++) if (Number(mask[b * seq + s]) === 1) last = s;
+	const start = (b * seq + last) * width;
+	const row = Array.from(hidden.slice(start, start + width), Number);
 	const norm = Math.hypot(...row) || 1;
 	return row.map((x) => x / norm);
 }
 
-async function embedOne(text) {
-	const encoded = await tokenizer([text], {
+async function tokenCount(text) {
+	const { input_ids } = await tokenizer(text, { truncation: true, max_length: MAX_TOKENS });
+	return input_ids.dims.at(-1);
+}
+
+/** Input indices grouped shortest first, each group within both budgets. */
+function plan(lengths) {
+	const order = lengths.map((_, i) => i).sort((a, b) => lengths[a] - lengths[b]);
+	if (!stats.batching) return order.map((i) => [i]);
+	const batches = [];
+	let current = [];
+	for (const i of order) {
+		// Sorted ascending, so the input being added is the group's longest.
+		const size = current.length + 1;
+		const longest = lengths[i];
+		if (
+			current.length &&
+			(size * longest > BATCH_TOKENS || size * longest * longest > ATTENTION_BUDGET)
+		) {
+			batches.push(current);
+			current = [];
+		}
+		current.push(i);
+	}
+	if (current.length) batches.push(current);
+	return batches;
+}
+
+let running = Promise.resolve();
+
+/** Run `fn` after every batch queued before it, across all requests. */
+function serially(fn) {
+	const result = running.then(fn);
+	running = result.catch(() => {});
+	return result;
+}
+
+async function embedBatch(texts) {
+	const started = performance.now();
+	const encoded = await tokenizer(texts, {
 		padding: true,
 		truncation: true,
 		max_length: MAX_TOKENS,
 	});
 	const output = await model(encoded);
 	const hidden = output.last_hidden_state;
-	return poolLast(hidden.data, encoded.attention_mask.data, hidden.dims);
+	const [batch, seq, width] = hidden.dims;
+	const mask = encoded.attention_mask.data;
+	stats.batches += 1;
+	stats.largestBatch = Math.max(stats.largestBatch, batch);
+	stats.paddedTokens += batch * seq;
+	for (const m of mask) stats.tokens += Number(m);
+	stats.embedSeconds += (performance.now() - started) / 1000;
+	return Array.from({ length: batch }, (_, b) => poolLast(hidden.data, mask, b, seq, width));
+}
+
+const dot = (a, b) => a.reduce((sum, x, i) => sum + x * b[i], 0);
+
+/** Enable batching only if it reproduces the batch-of-one vectors. */
+async function selfCheck() {
+	const alone = [];
+	for (const text of PROBE_TEXTS) alone.push((await embedBatch([text]))[0]);
+	const batched = await embedBatch(PROBE_TEXTS);
+	// Both vectors are unit length, so the dot product is the cosine.
+	const cosine = Math.min(...alone.map((v, i) => dot(v, batched[i])));
+	stats.batchMinCosine = cosine;
+	stats.batching = cosine >= BATCH_MIN_COSINE;
+	console.log(
+		`batch self-check: min cosine ${cosine.toFixed(6)} ` +
+			(stats.batching
+				? "— batching enabled"
+				: `< ${BATCH_MIN_COSINE} — serving every input alone`),
+	);
+	// The probes are not traffic.
+	Object.assign(stats, {
+		batches: 0,
+		largestBatch: 0,
+		tokens: 0,
+		paddedTokens: 0,
+		embedSeconds: 0,
+	});
+}
+
+async function embedAll(texts) {
+	const lengths = [];
+	for (const text of texts) lengths.push(await tokenCount(text));
+	const vectors = new Array(texts.length);
+	for (const group of plan(lengths)) {
+		const result = await serially(() => embedBatch(group.map((i) => texts[i])));
+		group.forEach((i, k) => {
+			vectors[i] = result[k];
+		});
+	}
+	stats.requests += 1;
+	stats.inputs += texts.length;
+	return vectors;
+}
+
+function metrics() {
+	const seconds = stats.embedSeconds || Number.EPSILON;
+	return {
+		...stats,
+		uptimeSeconds: (Date.now() - stats.startedAt) / 1000,
+		inputsPerSecond: stats.inputs / seconds,
+		tokensPerSecond: stats.tokens / seconds,
+		// Share of the computed positions that were padding, not input.
+		paddingRatio: stats.paddedTokens ? 1 - stats.tokens / stats.paddedTokens : 0,
+		rssBytes: process.memoryUsage().rss,
+		peakRssBytes: process.resourceUsage().maxRSS * 1024,
+		attentionBudget: ATTENTION_BUDGET,
+		batchTokens: BATCH_TOKENS,
+	};
 }
 
 function send(res, status, body) {
@@ -85,13 +257,14 @@ const server = createServer((req, res) => {
 			model: MODEL,
 			revision: MODEL_REVISION,
 			dtype: MODEL_DTYPE,
-			// The identifier the bot records in the index header. It carries the
-			// revision and dtype because the index's `model` field is a
-			// compatibility key: anything that would change the vectors has to
-			// change this string, or a stale index is silently accepted.
-			embedModel: `${MODEL}@${MODEL_REVISION.slice(0, 12)}@${MODEL_DTYPE}`,
+			embedModel: idOf(chosen),
+			batching: stats.batching,
+			batchMinCosine: stats.batchMinCosine,
 		});
 	}
+	if (req.method === "GET" && req.url === "/metrics") {
+		return send(res, 200, metrics());
+	}
 	if (req.method !== "POST" || !req.url.endsWith("/embeddings")) {
 		return send(res, 404, { error: { message: "not found" } });
 	}
@@ -103,14 +276,12 @@ const server = createServer((req, res) => {
 		try {
 			const body = JSON.parse(raw || "{}");
 			const inputs = Array.isArray(body.input) ? body.input : [body.input];
-			const data = [];
-			for (const [index, text] of inputs.entries()) {
-				data.push({
-					object: "embedding",
-					index,
-					embedding: await embedOne(String(text ?? "")),
-				});
-			}
+			const vectors = await embedAll(inputs.map((text) => String(text ?? "")));
+			const data = vectors.map((embedding, index) => ({
+				object: "embedding",
+				index,
+				embedding,
+			}));
 			// `dimensions` is deliberately not honoured: this serves the model's
 			// native width. The bot records the width it observes rather than the
 			// one it asked for, so an unhonoured request cannot produce a header
@@ -122,6 +293,8 @@ const server = createServer((req, res) => {
 	});
 });
 
+await selfCheck();
+
 server.listen(port, "127.0.0.1", () => {
 	console.log(`embeddings server listening on http://127.0.0.1:${port}`);
 });
@@ -17,44 +17,64 @@ Required env: ``GITHUB_TOKEN``. Issue subcommands also read ``ISSUE_NUMBER``
 
 from __future__ import annotations
 
+import importlib
 import json
 import os
+import sqlite3
 import sys
+import time
+from dataclasses import asdict, replace
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
-
-from . import (
-    ai,
-    analyze,
-    code_context,
-    code_trace,
-    comment,
-    config,
-    embeddings,
-    lifecycle,
-    logscan,
-    rag,
-    template,
-)
-from .attachments import (
-    download_capped,
-    download_log_windowed,
-    find_diagnostics_url,
-    find_log_urls,
-    has_media_attachment,
-)
-from .diagnostics import try_parse
+from typing import TYPE_CHECKING, Any
+
+# Only what every command needs is imported here. The triage, index and
+# benchmark pipelines import their modules where they are used, so the
+# per-comment `respond` and the scheduled `sweep` do not pay for the models,
+# retrieval and attachment code at startup; `__getattr__` below keeps
+# `ma_triage.__main__.rag` and friends working for callers that reach in.
+from . import config, lifecycle, metrics
 from .gh import GitHubClient, error, log, summary
-from .models import TriageResult
-from .providers import (
-    detect_reported_provider_labels,
-    filter_existing_labels,
-    resolve_maintainers,
-    resolve_provider_doc,
+
+if TYPE_CHECKING:
+    from . import cassette, reuse
+    from .cache import DiskCache
+    from .mirror import Mirror
+    from .models import AIResult, Diagnostics, DocChunk, Finding, RagResult, TriageResult
+
+_LAZY_MODULES = frozenset(
+    {
+        "ai",
+        "analyze",
+        "attachments",
+        "cassette",
+        "code_context",
+        "code_trace",
+        "comment",
+        "diagnostics",
+        "embeddings",
+        "judge_cache",
+        "judge_gate",
+        "logscan",
+        "mirror",
+        "providers",
+        "rag",
+        "retrieval_bench",
+        "reuse",
+        "scale_bench",
+        "similar",
+        "stages",
+        "template",
+    }
 )
 
 
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_MODULES:
+        return importlib.import_module(f"{__package__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def _env(name: str, default: str = "") -> str:
     return os.environ.get(name, default)
 
@@ -86,13 +106,19 @@ def build_result(
     token: str,
     labels: set[str] | list[str] | None = None,
     number: int = 0,
+    prior_state: dict[str, Any] | None = None,
 ) -> TriageResult:
     """Run the full read-only analysis pipeline and return a TriageResult.
 
     ``labels`` are the issue's current labels, used to pick the form kind.
     ``number`` is the issue number (used only to exclude the post itself from
-    related-post detection).
+    related-post detection). ``prior_state`` is the previous run's sticky state,
+    whose recorded stage outputs are reused where their inputs are unchanged.
     """
+    from . import analyze, reuse, stages, template
+    from .attachments import has_media_attachment
+    from .models import TriageResult
+    from .providers import detect_reported_provider_labels, resolve_provider_doc
     kind = template.form_kind(labels)
     if kind == "translation":
         # Translation contributions are not bug reports — never triage them.
@@ -110,12 +136,9 @@ def build_result(
         return result
 
     # --- main server bug form ------------------------------------------------
+    previous = reuse.Previous(prior_state, reuse.text_sketch(title, body))
+    result.stages = reuse.record()
     result.install_method = template.extract_install_method(body)
-    _load_diagnostics_or_log(gh, body, result)
-
-    findings = list(result.findings)
-    labels_to_add: set[str] = set(result.labels_to_add)
-    maintainers: set[str] = set()
 
     # A title-level provider mention wins over incidental comparisons in the
     # body. Diagnostics describe the whole installation and must never drive
@@ -127,21 +150,93 @@ def build_result(
         )[: config.MAX_REPORTED_PROVIDERS]
     )
     result.reported_providers = reported_providers
-    labels_to_add |= reported_providers
-    for provider in sorted(reported_providers, key=str.lower):
-        provider_doc = resolve_provider_doc(gh, provider)
-        if provider_doc is not None:
-            result.provider_docs.append(provider_doc)
+    providers = sorted(reported_providers, key=str.lower)
+
+    def provider_docs(done: dict[str, Any]) -> None:
+        docs = [done[f"provider:{p}"] for p in providers]
+        result.provider_docs = [doc for doc in docs if doc is not None]
+
+    def rag_stage(done: dict[str, Any]) -> None:
+        # Retrieve docs, pinned notices and provider-matched reports *before*
+        # Tier-1 so the root-cause assessment sees the evidence rendered to
+        # the user.
+        result.rag = _rag_stage(
+            gh, previous, result, title=title, body=body, number=number, token=token
+        )
+
+    def assess_stage(done: dict[str, Any]) -> AIResult | None:
+        if not (result.is_actionable and result.diagnostics is not None):
+            return None
+        _, a_labels, _ = done["analyze"]
+        return _assess_stage(
+            gh,
+            previous,
+            result,
+            title=title,
+            body=body,
+            token=token,
+            candidate_labels=sorted(set(result.labels_to_add) | reported_providers | a_labels),
+            context=done["code_context"],
+        )
+
+    # Each stage writes its own fields of `result` (or returns its output);
+    # everything is merged below, in a fixed order, once all have finished.
+    pipeline = [
+        stages.Stage("diagnostics", lambda _: _load_diagnostics_or_log(gh, body, result)),
+        *(
+            stages.Stage(f"provider:{p}", lambda _, p=p: resolve_provider_doc(gh, p))
+            for p in providers
+        ),
+        stages.Stage("provider_docs", provider_docs, tuple(f"provider:{p}" for p in providers)),
+        stages.Stage("analyze", lambda _: _analyze_stage(gh, result), ("diagnostics",)),
+        stages.Stage("rag", rag_stage, ("provider_docs",)),
+        stages.Stage(
+            "code_context",
+            lambda _: _prefetch_code_context(gh, previous, result, title=title, body=body),
+            ("diagnostics",),
+        ),
+        stages.Stage(
+            "assess", assess_stage, ("analyze", "rag", "code_context", "provider_docs")
+        ),
+    ]
+    outputs, timings = stages.execute(pipeline, workers=config.STAGE_WORKERS)
+    result.stage_timings = timings.durations()
+    log(f"Stage timings: {timings.describe(pipeline)}")
 
+    findings = list(result.findings)
+    labels_to_add: set[str] = set(result.labels_to_add) | reported_providers
     install_finding = analyze.install_method_finding(result.install_method)
     if install_finding is not None:
         findings.append(install_finding)
+    a_findings, a_labels, maintainers = outputs["analyze"]
+    findings.extend(a_findings)
+    labels_to_add |= a_labels
+    ai_result = outputs["assess"]
+    if ai_result is not None:
+        result.ai = ai_result
+        labels_to_add.update(ai_result.suggested_labels)
+
+    findings.sort(key=lambda f: f.sort_key)
+    result.findings = findings
+    result.labels_to_add = labels_to_add
+    result.maintainers_to_ping = maintainers
+    return result
 
+
+def _analyze_stage(
+    gh: GitHubClient, result: TriageResult
+) -> tuple[list[Finding], set[str], set[str]]:
+    """Diagnostics/version findings, labels and maintainers to ping."""
+    from . import analyze
+    from .providers import resolve_maintainers
+    findings: list[Finding] = []
+    labels: set[str] = set()
+    maintainers: set[str] = set()
     if result.is_actionable and result.diagnostics is not None:
         diag = result.diagnostics
         a_findings, a_labels = analyze.analyze(diag, gh)
         findings.extend(a_findings)
-        labels_to_add |= a_labels
+        labels |= a_labels
 
         # Log-sourced reports rarely carry a version banner; fall back to the
         # value the reporter typed into the form.
@@ -150,94 +245,236 @@ def build_result(
                 result.reported_version, gh
             )
             findings.extend(v_findings)
-            labels_to_add |= v_labels
+            labels |= v_labels
 
         # Ping conservatively: one clearly reported provider on an actionable
         # report. Never ping maintainers for incidental census/error providers.
-        if len(reported_providers) == 1:
-            provider = next(iter(reported_providers))
+        if len(result.reported_providers) == 1:
+            provider = next(iter(result.reported_providers))
             maintainers.update(resolve_maintainers(gh, provider))
 
     elif result.reported_version:
         # No attachment we could parse — still nudge on an outdated version.
         v_findings, v_labels = analyze.version_findings(result.reported_version, gh)
         findings.extend(v_findings)
-        labels_to_add |= v_labels
+        labels |= v_labels
+    return findings, labels, maintainers
+
+
+def _rag_stage(
+    gh: GitHubClient,
+    previous: reuse.Previous,
+    result: TriageResult,
+    *,
+    title: str,
+    body: str,
+    number: int,
+    token: str,
+) -> RagResult | None:
+    """``rag.answer``, or the previous run's output when its inputs match."""
+    from . import embeddings, rag, reuse, similar
+    key = None
+    if config.AI_ENABLED and config.RAG_ENABLED:
+        index = reuse.index_commit(gh)
+        if index is not None:
+            key = reuse.digest(
+                "rag",
+                number,
+                sorted(result.reported_providers),
+                [doc.url for doc in result.provider_docs],
+                index,
+                config.EMBED_MODEL,
+                config.EMBED_DIM,
+                config.ANSWER_MODEL,
+                config.ANSWER_HI,
+                config.ANSWER_LO,
+            )
+    hit, out = previous.get("rag", key)
+    if hit:
+        try:
+            cites = isinstance(out, dict) and (out.get("cited") or out.get("hits"))
+            reused = reuse.load_rag(
+                out,
+                chunks=embeddings.load_docs_chunks(gh) if cites else [],
+                pinned=similar.find_pinned(gh, result.reported_providers),
+            )
+        except ValueError as exc:
+            log(f"Recorded RAG output unusable; re-running: {exc}")
+        else:
+            log("RAG inputs unchanged; reusing the recorded output")
+            previous.carry(result.stages, "rag")
+            return reused
 
-    # Retrieve docs, pinned notices and provider-matched reports *before* Tier-1
-    # so the root-cause assessment sees the same evidence rendered to the user.
-    result.rag = rag.answer(
+    degraded: list[str] = []
+    rag_result = rag.answer(
         gh,
         title=title,
         body=body,
         number=number,
         token=token,
-        provider_labels=reported_providers,
+        provider_labels=result.reported_providers,
         provider_docs=result.provider_docs,
+        degraded=degraded,
     )
+    # A fallback is worth retrying next time, not keeping.
+    if not degraded:
+        reuse.put(result.stages, "rag", key, reuse.dump_rag(rag_result), previous.sketch)
+    return rag_result
 
-    if result.is_actionable and result.diagnostics is not None:
-        context = ""
-        if config.AI_ENABLED:
-            try:
-                context = code_context.build(
-                    gh,
-                    title=title,
-                    body=body,
-                    diagnostics=result.diagnostics,
-                    provider_labels=reported_providers,
-                    version=(
-                        result.diagnostics.system.version
-                        or result.reported_version
-                    ),
-                )
-            except Exception as exc:  # noqa: BLE001 — optional evidence only
-                log(f"Server-code evidence skipped: {exc}")
-        ai_result = ai.assess(
-            result.diagnostics,
-            title,
-            body,
-            token=token,
-            candidate_labels=sorted(labels_to_add),
-            rag_result=result.rag,
-            provider_docs=result.provider_docs,
-            code_context=context,
+
+def _assess_stage(
+    gh: GitHubClient,
+    previous: reuse.Previous,
+    result: TriageResult,
+    *,
+    title: str,
+    body: str,
+    token: str,
+    candidate_labels: list[str],
+    context: str | None = None,
+) -> AIResult | None:
+    """Code evidence + ``ai.assess``, or the previous run's assessment.
+
+    ``context`` is code evidence already gathered (see
+    :func:`_prefetch_code_context`); ``None`` gathers it here when needed.
+    """
+    from . import ai, reuse
+    from .attachments import find_diagnostics_url, find_log_urls
+    from .diagnostics import dump_diagnostics
+    diag = result.diagnostics
+    assert diag is not None
+    key = None
+    if config.AI_ENABLED:
+        key = reuse.digest(
+            "ai",
+            dump_diagnostics(diag),
+            [find_diagnostics_url(body), *find_log_urls(body)],
+            candidate_labels,
+            reuse.dump_rag(result.rag),
+            [asdict(doc) for doc in result.provider_docs],
+            result.reported_version,
+            config.AI_MODEL,
+            "copilot-cli" if config.AI_CLI_TOKEN else config.AI_ENDPOINT,
+            config.SERVER_REF,
         )
-        if ai_result is not None:
-            result.ai = ai_result
-            labels_to_add.update(ai_result.suggested_labels)
+    hit, out = previous.get("ai", key)
+    if hit:
+        try:
+            reused = reuse.load_ai(out)
+        except ValueError as exc:
+            log(f"Recorded assessment unusable; re-running: {exc}")
+        else:
+            log("Assessment inputs unchanged; reusing the recorded assessment")
+            previous.carry(result.stages, "ai")
+            return reused
+
+    if context is None:
+        context = _code_context(gh, result, title=title, body=body)
+    ai_result = ai.assess(
+        diag,
+        title,
+        body,
+        token=token,
+        candidate_labels=candidate_labels,
+        rag_result=result.rag,
+        provider_docs=result.provider_docs,
+        code_context=context,
+    )
+    if ai_result is not None:
+        reuse.put(result.stages, "ai", key, reuse.dump_ai(ai_result), previous.sketch)
+    return ai_result
 
-    findings.sort(key=lambda f: f.sort_key)
-    result.findings = findings
-    result.labels_to_add = labels_to_add
-    result.maintainers_to_ping = maintainers
-    return result
+
+def _code_context(gh: GitHubClient, result: TriageResult, *, title: str, body: str) -> str:
+    """Server-code evidence for the assessment (``""`` when unavailable)."""
+    from . import code_context
+    diag = result.diagnostics
+    if not config.AI_ENABLED or diag is None:
+        return ""
+    try:
+        return code_context.build(
+            gh,
+            title=title,
+            body=body,
+            diagnostics=diag,
+            provider_labels=result.reported_providers,
+            version=diag.system.version or result.reported_version,
+        )
+    except Exception as exc:  # noqa: BLE001 — optional evidence only
+        log(f"Server-code evidence skipped: {exc}")
+        return ""
+
+
+def _prefetch_code_context(
+    gh: GitHubClient,
+    previous: reuse.Previous,
+    result: TriageResult,
+    *,
+    title: str,
+    body: str,
+) -> str | None:
+    """Code evidence gathered alongside the docs answer, when it will be used.
+
+    Whether the assessment is reused depends on the docs answer, which is not
+    known yet. When the last run recorded an assessment that may be reused, the
+    fetch waits for that decision instead (``None``); otherwise it is certain
+    to be needed and runs now.
+    """
+    if not (config.AI_ENABLED and result.is_actionable) or previous.recorded("ai"):
+        return None
+    return _code_context(gh, result, title=title, body=body)
 
 
 def _load_diagnostics_or_log(
     gh: GitHubClient, body: str, result: TriageResult
 ) -> None:
     """Populate diagnostics from an attached JSON report, else a raw log."""
+    from . import logscan
+    from .attachments import (
+        DownloadFailed,
+        download_log_windowed,
+        find_diagnostics_url,
+        find_log_urls,
+        probe,
+        stream_capped,
+    )
+    from .diagnostics import InvalidDiagnostics, parse_diagnostics
+    cache = _attachment_cache()
     url = find_diagnostics_url(body)
     if url:
-        raw = download_capped(url)
-        if raw is None:
-            result.diagnostics_invalid = True
-            return
-        diag = try_parse(raw)
+        validator = probe(url) if cache.enabled else None
+        hit, diag = _cached_attachment(cache, url, validator)
+        if not hit:
+            # Parse while downloading: a hostile report fails at its first
+            # offending byte instead of after the whole transfer.
+            try:
+                diag = parse_diagnostics(stream_capped(url))
+            except DownloadFailed:
+                result.diagnostics_invalid = True  # already logged
+                return
+            except InvalidDiagnostics as exc:
+                log(f"Diagnostics invalid: {exc}")
+                diag = None
+            _store_attachment(cache, url, validator, diag)
         if diag is None:
             result.diagnostics_invalid = True
-        else:
-            result.has_diagnostics = True
-            result.diagnostics = diag
+            return
+        result.has_diagnostics = True
+        result.diagnostics = diag
         return
 
     log_urls = find_log_urls(body)
     if config.SCAN_LOGS and log_urls:
-        text = download_log_windowed(log_urls[0])
-        if text:
+        validator = probe(log_urls[0]) if cache.enabled else None
+        hit, diag = _cached_attachment(cache, log_urls[0], validator)
+        if not hit:
+            text = download_log_windowed(log_urls[0])
+            diag = logscan.scan_log(text) if text else None
+            if diag is not None:
+                _store_attachment(cache, log_urls[0], validator, diag)
+        if diag is not None:
             result.has_diagnostics = True
-            result.diagnostics = logscan.scan_log(text)
+            result.diagnostics = diag
         else:
             result.diagnostics_invalid = True
         return
@@ -246,12 +483,74 @@ def _load_diagnostics_or_log(
     result.missing_attachment = True
 
 
+# Bumped whenever a parser change makes earlier cached results stale. The
+# workflow's cache key also moves with the triage code, so this is a backstop.
+_ATTACHMENT_CACHE_SCHEMA = 1
+
+
+def _attachment_cache() -> DiskCache:
+    from .cache import DiskCache
+    return DiskCache(
+        config.ATTACHMENT_CACHE_DIR,
+        ttl_seconds=config.ATTACHMENT_CACHE_DAYS * 86400,
+        max_bytes=config.ATTACHMENT_CACHE_MAX_BYTES,
+    )
+
+
+def _cached_attachment(
+    cache: DiskCache, url: str, validator: str | None
+) -> tuple[bool, Diagnostics | None]:
+    """``(hit, diagnostics)`` for an attachment unchanged since it was parsed.
+
+    A hit with ``None`` diagnostics is an attachment already known to be
+    invalid. Only a matching validator (ETag / Content-Length) counts.
+    """
+    from .diagnostics import InvalidDiagnostics, load_diagnostics
+    if validator is None:
+        return False, None
+    entry = cache.get(f"attachment:{_ATTACHMENT_CACHE_SCHEMA}:{url}")
+    if not isinstance(entry, dict) or entry.get("validator") != validator:
+        return False, None
+    stored = entry.get("diagnostics")
+    if stored is None:
+        log(f"Attachment unchanged and known invalid; skipping download: {url}")
+        return True, None
+    try:
+        diag = load_diagnostics(stored)
+    except InvalidDiagnostics as exc:
+        log(f"Ignoring cached parse of {url}: {exc}")
+        return False, None
+    log(f"Attachment unchanged; reusing its cached parse: {url}")
+    return True, diag
+
+
+def _store_attachment(
+    cache: DiskCache, url: str, validator: str | None, diag: Diagnostics | None
+) -> None:
+    # Only content-determined outcomes are stored: a parse, or a report that is
+    # invalid as uploaded. Download failures may be transient and are retried.
+    from .diagnostics import dump_diagnostics
+    if validator is None:
+        return
+    cache.put(
+        f"attachment:{_ATTACHMENT_CACHE_SCHEMA}:{url}",
+        {
+            "validator": validator,
+            "diagnostics": dump_diagnostics(diag) if diag is not None else None,
+        },
+    )
+
+
 # --------------------------------------------------------------------------- #
 # Mutations
 # --------------------------------------------------------------------------- #
-def _resolve_labels(gh: GitHubClient, result: TriageResult) -> list[str]:
+def _resolve_labels(
+    gh: GitHubClient, result: TriageResult, existing: set[str] | None = None
+) -> list[str]:
     """Intersect suggested labels with labels that actually exist in the repo."""
-    existing = gh.list_labels()
+    from .providers import filter_existing_labels
+    if existing is None:
+        existing = gh.list_labels()
     keep = filter_existing_labels(result.labels_to_add, existing)
 
     # Response-state labels (only apply if present in the repo). A pending user
@@ -280,21 +579,29 @@ def apply_triage(
     number: int,
     issue: dict[str, Any],
     result: TriageResult,
+    *,
+    snapshot: lifecycle.IssueSnapshot | None = None,
 ) -> None:
-    """Apply labels and (when there's something useful to say) the sticky comment."""
-    labels = _resolve_labels(gh, result)
-    if labels:
-        gh.add_labels(number, labels)
+    """Apply labels and (when there's something useful to say) the sticky comment.
+
+    ``snapshot`` is the run's read of the issue; its comments and repo labels
+    are reused instead of listed again.
+    """
+    from . import comment
+    labels = _resolve_labels(gh, result, snapshot.repo_labels if snapshot else None)
 
     # Keep the two response-state labels mutually exclusive: if this pass set one,
     # drop the opposite when the issue still carries it (e.g. on re-triage of an
     # issue whose state has since flipped).
     state_pair = {config.LABEL_NEEDS_ATTENTION, config.LABEL_WAITING_FOR_USER}
     applied_state = state_pair & set(labels)
-    if applied_state:
-        current = set(lifecycle.issue_labels(issue))
-        for stale in (state_pair & current) - applied_state:
-            gh.remove_label(number, stale)
+    lifecycle.apply_labels(
+        gh,
+        number,
+        lifecycle.issue_labels(issue),
+        add=labels,
+        remove=state_pair - applied_state if applied_state else (),
+    )
 
     if result.should_comment or (result.rag is not None and result.rag.has_output):
         state = {
@@ -318,11 +625,19 @@ def apply_triage(
                 "suppressed": result.rag.suppressed,
                 "judge_conf": result.rag.judge_confidence,
                 "judge_answered": result.rag.judge_answered,
+                "judge_cached": result.rag.judge_cached,
+                "gate": result.rag.judge_gate,
                 "scores": [p.score for p in result.rag.related_posts],
                 "sources": [p.source for p in result.rag.related_posts],
             }
+            if result.rag.judge_entry is not None:
+                state["judge"] = result.rag.judge_entry
+        if result.stages:
+            state["stages"] = result.stages
         body = comment.build_body(result)
-        comment.upsert(gh, number, body, state)
+        comment.upsert(
+            gh, number, body, state, comments=snapshot.comments if snapshot else None
+        )
     else:
         summary(
             f"#{number}: nothing actionable to post (form={result.form_kind}); "
@@ -334,20 +649,36 @@ def apply_triage(
 # Subcommands
 # --------------------------------------------------------------------------- #
 def cmd_triage(gh: GitHubClient, token: str) -> int:
+    from . import comment
     number = int(_env("ISSUE_NUMBER"))
 
-    issue = gh.get_issue(number)
+    snapshot = lifecycle.snapshot(gh, number)
+    issue = snapshot.issue
     # On a manual workflow_dispatch there is no issue event payload, so fall back
     # to the values fetched from the API.
     title = _env("ISSUE_TITLE") or issue.get("title") or ""
     body = _env("ISSUE_BODY") or issue.get("body") or ""
-    labels = lifecycle.issue_labels(issue)
+    labels = snapshot.labels
     if config.LABEL_HOLD in labels or config.LABEL_SKIP in labels:
         summary(f"#{number}: skipped (hold/skip label present).")
         return 0
 
     summary(f"## Triage of #{number}\n")
-    result = build_result(gh, title, body, token=token, labels=labels, number=number)
+    # A manual dispatch exists to re-triage after a change, so it recomputes.
+    prior_state = (
+        comment.sticky_state(snapshot.comments)
+        if _env("GITHUB_EVENT_NAME") != "workflow_dispatch"
+        else None
+    )
+    result = build_result(
+        gh,
+        title,
+        body,
+        token=token,
+        labels=labels,
+        number=number,
+        prior_state=prior_state,
+    )
     if result.skip:
         summary(f"#{number}: skipped ({result.form_kind} form — not triaged).")
         return 0
@@ -358,10 +689,26 @@ def cmd_triage(gh: GitHubClient, token: str) -> int:
         f" · findings: {len(result.findings)} · ai: {result.ai is not None}"
         f" · comment: {result.should_comment}"
     )
-    apply_triage(gh, number, issue, result)
+    _judge_summary(result.rag)
+    apply_triage(gh, number, issue, result, snapshot=snapshot)
     return 0
 
 
+def _judge_summary(rag_result: RagResult | None) -> None:
+    """One summary line on the docs judge, when its cache or gate is in use."""
+    if rag_result is None:
+        return
+    if rag_result.judge_skipped:
+        p = (rag_result.judge_gate or {}).get("p")
+        summary(f"- docs judge: skipped by the gate (p={p}; 1 chat call saved)")
+    elif not config.JUDGE_CACHE_ENABLED:
+        return
+    elif rag_result.judge_cached:
+        summary("- docs judge: cached verdict reused (1 chat call saved)")
+    elif rag_result.judge_confidence is not None:
+        summary("- docs judge: no cached verdict close enough; called the judge")
+
+
 def _diag_status(result: TriageResult) -> str:
     if result.is_actionable and result.diagnostics is not None:
         return f"valid ({result.diagnostics.source})"
@@ -410,6 +757,8 @@ def cmd_trace() -> int:
     Always exits 0: tracing is an optimisation, and a trace that fails must
     leave triage to run on its deterministic selection rather than block it.
     """
+    from . import code_trace
+    from .attachments import find_diagnostics_url
     destination = config.CODE_TRACE_PATHS_FILE
     if not destination:
         log("TRIAGE_TRACED_PATHS is required to record traced paths")
@@ -458,17 +807,84 @@ def cmd_respond(gh: GitHubClient) -> int:
 
 def cmd_sweep(gh: GitHubClient) -> int:
     summary("## Scheduled triage sweep\n")
-    lifecycle.sweep(gh)
+    # The checkpoint lives on the index branch, which the issues token cannot
+    # write; the workflow passes the built-in token for that alone.
+    index_token = _env("INDEX_TOKEN")
+    store = GitHubClient(index_token, repo=gh.repo) if index_token else None
+    local = _synced_mirror(gh)
+    try:
+        lifecycle.sweep(gh, store=store, mirror=local)
+    finally:
+        if local is not None:
+            local.close()
     return 0
 
 
+def _synced_mirror(gh: GitHubClient) -> Mirror | None:
+    """The local mirror, brought up to date, or ``None`` to use the API.
+
+    ``None`` also when the file cannot be opened, or the sync failed or was
+    cut short: a partial mirror would silently drop the posts it has not
+    reached yet.
+    """
+    if not config.MIRROR_PATH:
+        return None
+    from .mirror import Mirror
+    try:
+        local = Mirror(config.MIRROR_PATH)
+    except (sqlite3.Error, OSError) as exc:
+        log(f"Mirror unavailable: {exc}")
+        summary("- mirror: unavailable; reading from the API this run")
+        return None
+    try:
+        current = local.sync(gh)
+    except Exception as exc:  # noqa: BLE001 — the API is always there to fall back on
+        log(f"Mirror sync failed: {exc}")
+        current = False
+    if not current:
+        summary("- mirror: not current yet; reading from the API this run")
+        local.close()
+        return None
+    return local
+
+
 # --------------------------------------------------------------------------- #
 # RAG index build (Phase 2)
 # --------------------------------------------------------------------------- #
-def _build_docs_index(gh: GitHubClient, token: str) -> bool:
+def _report_deferred(name: str, deferred: int, unit: str, *, embedded: int) -> bool:
+    """Report inputs left for the next run. False when the run made no progress.
+
+    A deferral is how a large backfill converges, not a failure — unless the
+    budget is spent before a single batch lands, in which case no number of
+    runs will finish it.
+    """
+    if not deferred:
+        return True
+    if not embedded:
+        error(
+            f"{name}: no progress — the index build budget was spent before any of "
+            f"{deferred} {unit} were embedded. Raise TRIAGE_INDEX_BUILD_BUDGET_SECONDS."
+        )
+        return False
+    summary(
+        f"- {name}: {deferred} {unit} deferred to the next run "
+        "(index build budget spent); this run's vectors are committed"
+    )
+    return True
+
+
+def _build_docs_index(
+    gh: GitHubClient,
+    token: str,
+    deadline: float | None = None,
+    chunks: list[DocChunk] | None = None,
+) -> bool:
     """Build and persist the docs index. False when it could not be built."""
+    from . import embeddings
     prev = embeddings.load_index(gh, config.DOCS_INDEX_PATH)
-    index, changed = embeddings.build_docs_index(gh, token=token, previous=prev)
+    index, changed = embeddings.build_docs_index(
+        gh, token=token, chunks=chunks, previous=prev, deadline=deadline
+    )
     if index is None:
         error(
             "docs: build FAILED — the embeddings provider returned no vectors. "
@@ -476,19 +892,28 @@ def _build_docs_index(gh: GitHubClient, token: str) -> bool:
         )
         return False
     count = len(index.get("chunks", []))
+    deferred = int(index.get("deferred", 0))
+    embedded = int(index.get("embedded", 0))
     if not changed:
         summary(f"- docs: unchanged ({count} chunks); no commit")
-        return True
+        return _report_deferred("docs", deferred, "chunks", embedded=embedded)
     embeddings.save_index(
         gh, config.DOCS_INDEX_PATH, index, message=f"Update docs index ({count} chunks)"
     )
     summary(f"- docs: {count} chunks indexed")
-    return True
+    return _report_deferred("docs", deferred, "chunks", embedded=embedded)
 
 
-def _collect_posts(gh: GitHubClient) -> list[dict[str, Any]]:
+def _collect_posts(gh: GitHubClient, local: Mirror | None = None) -> list[dict[str, Any]]:
+    from .providers import detect_reported_provider_labels
+    if local is not None:
+        issues = local.issues(limit=config.INDEX_MAX_POSTS)
+        discussions = local.discussions(limit=config.INDEX_MAX_POSTS)
+    else:
+        issues = gh.list_recent_issues(limit=config.INDEX_MAX_POSTS)
+        discussions = gh.list_discussions(limit=config.INDEX_MAX_POSTS)
     posts: list[dict[str, Any]] = []
-    for issue in gh.list_recent_issues(limit=config.INDEX_MAX_POSTS):
+    for issue in issues:
         title = issue.get("title") or ""
         body = issue.get("body") or ""
         posts.append(
@@ -503,7 +928,7 @@ def _collect_posts(gh: GitHubClient) -> list[dict[str, Any]]:
                 "updated_at": issue.get("updated_at"),
             }
         )
-    for disc in gh.list_discussions(limit=config.INDEX_MAX_POSTS):
+    for disc in discussions:
         category = ((disc.get("category") or {}).get("name") or "").lower()
         if category in config.DISCUSSION_EXCLUDE_CATEGORIES:
             # e.g. translation-category discussions: not useful as related posts.
@@ -526,41 +951,201 @@ def _collect_posts(gh: GitHubClient) -> list[dict[str, Any]]:
     return posts
 
 
-def _build_posts_index(gh: GitHubClient, token: str) -> bool:
+def _posts_corpus(gh: GitHubClient) -> list[dict[str, Any]]:
+    local = _synced_mirror(gh)
+    try:
+        return _collect_posts(gh, local)
+    finally:
+        if local is not None:
+            local.close()
+
+
+def _build_posts_index(
+    gh: GitHubClient, token: str, deadline: float | None = None
+) -> bool:
     """Build and persist the posts index. False when vectors are missing.
 
     The index is committed either way. A post can only lack a vector because
     the provider refused one, so a shortfall is the failure signal — but the
     records themselves are still worth writing, since everything that ranks on
-    text rather than vectors keeps working from them.
+    text rather than vectors keeps working from them. Posts the run did not
+    reach before ``deadline`` are not a shortfall: they are reported, and the
+    next run resumes from the committed index.
     """
-    prev = embeddings.load_index(gh, config.POSTS_INDEX_PATH)
-    posts = _collect_posts(gh)
+    from . import embeddings
+    # Flush the append queue first: the build would index those posts anyway,
+    # but only folding them removes their queue files.
+    _coalesce(gh, token)
+    # Appends keep landing while the build runs; the commit is based on this
+    # head, and what they add in the meantime is merged in on a conflict.
+    base = gh.get_ref_sha(config.INDEX_BRANCH)
+    prev = embeddings.load_index(gh, config.POSTS_INDEX_PATH, ref=base)
+    posts = _posts_corpus(gh)
     index, changed = embeddings.build_posts_index(
-        gh, posts, token=token, previous=prev
+        gh, posts, token=token, previous=prev, deadline=deadline
     )
     count = len(index.get("posts", []))
     vectors = int(index.get("vectors", 0))
+    deferred = int(index.get("deferred", 0))
+    embedded = int(index.get("embedded", 0))
     if changed:
         embeddings.save_index(
             gh,
             config.POSTS_INDEX_PATH,
             index,
             message=f"Update posts index ({count} posts)",
+            base=base,
+            rebase=lambda fresh: embeddings.merge_appended(index, fresh, prev),
         )
         summary(f"- posts: {count} posts indexed ({vectors} with vectors)")
     else:
         summary(f"- posts: unchanged ({count} posts); no commit")
-    if vectors < count:
+    progressed = _report_deferred("posts", deferred, "posts", embedded=embedded)
+    missing = count - vectors - deferred
+    if missing > 0:
         error(
-            f"posts: build INCOMPLETE — {count - vectors} of {count} posts have "
+            f"posts: build INCOMPLETE — {missing} of {count} posts have "
             "no vector because the embeddings provider returned none. Their text "
             "is indexed, but dense duplicate detection cannot see them."
         )
         return False
+    return progressed
+
+
+def _build_shadow(
+    gh: GitHubClient,
+    token: str,
+    target: str,
+    deadline: float | None,
+    chunks: list[DocChunk] | None,
+) -> bool:
+    """Advance the shadow indexes of a model migration; cut over once complete.
+
+    The shadow copies are the live corpus embedded with the shadow model,
+    resumed from their own checkpoint each run under whatever budget the live
+    builds left. Only a full build (``all``) cuts over, so the docs and posts
+    indexes always change models together. False when the shadow endpoint
+    returned no vectors at all.
+    """
+
+    from . import embeddings
+    docs_path = embeddings.shadow_path(config.DOCS_INDEX_PATH)
+    posts_path = embeddings.shadow_path(config.POSTS_INDEX_PATH)
+    # Posts appended to the live index after this head are carried over at
+    # cutover (vectorless); the corpus is read after it so none fall between.
+    base = gh.get_ref_sha(config.INDEX_BRANCH)
+    live_posts = embeddings.load_index(gh, config.POSTS_INDEX_PATH, ref=base)
+    docs_index = embeddings.load_index(gh, docs_path, ref=base)
+    posts_index = embeddings.load_index(gh, posts_path, ref=base)
+    posts = _posts_corpus(gh) if target in ("posts", "all") else []
+    ok = True
+    changed: dict[str, dict[str, Any]] = {}
+    with embeddings.shadow_model():
+        model = config.EMBED_MODEL
+        if target in ("docs", "all"):
+            built, docs_changed = embeddings.build_docs_index(
+                gh,
+                token=token,
+                # Copies: the live build wrote its own model's vectors into these.
+                chunks=[replace(c, embedding=[]) for c in chunks or []],
+                previous=docs_index,
+                deadline=deadline,
+            )
+            if built is None:
+                error(f"shadow: docs build FAILED — {model} returned no vectors")
+                ok = False
+            else:
+                docs_index = built
+                if docs_changed:
+                    changed[docs_path] = built
+        if target in ("posts", "all"):
+            posts_index, posts_changed = embeddings.build_posts_index(
+                gh, posts, token=token, previous=posts_index, deadline=deadline
+            )
+            if posts_changed:
+                changed[posts_path] = posts_index
+    docs_have, docs_total = embeddings.coverage(docs_index)
+    posts_have, posts_total = embeddings.coverage(posts_index)
+    if (
+        ok
+        and target == "all"
+        and docs_total
+        and posts_total
+        and docs_have == docs_total
+        and posts_have == posts_total
+    ):
+        embeddings.cutover(gh, docs_index, posts_index, live_posts=live_posts, base=base)
+        summary(f"- shadow: complete; the live indexes now use {model}")
+        return True
+    for path, index in changed.items():
+        embeddings.save_index(gh, path, index, message=f"Update {path} ({model})")
+    summary(
+        f"- shadow ({model}): {docs_have}/{docs_total} chunks and "
+        f"{posts_have}/{posts_total} posts embedded; cuts over at 100%"
+    )
+    return ok
+
+
+def _harvest_judge_cache(gh: GitHubClient) -> bool:
+    """Fold recent judge verdicts into the judge cache. False on failure."""
+    from . import embeddings, judge_cache
+    chunks = embeddings.load_docs_chunks(gh)
+    try:
+        index, changed, stats = judge_cache.harvest(gh, chunks)
+    except Exception as exc:  # noqa: BLE001 — reported, then fails the build
+        error(f"judge cache: harvest FAILED: {exc}")
+        return False
+    count = len(index["entries"])
+    if stats["lookups"]:
+        rate = stats["hits"] / stats["lookups"]
+        summary(
+            f"- judge cache: {stats['hits']} of {stats['lookups']} judge lookups "
+            f"since the last harvest were cache hits ({rate:.0%}; "
+            f"{stats['hits']} chat calls saved)"
+        )
+    if changed:
+        embeddings.save_index(
+            gh,
+            config.JUDGE_CACHE_PATH,
+            index,
+            message=f"Update judge cache ({count} verdicts)",
+        )
+        summary(f"- judge cache: {count} verdicts ({stats['added']} harvested)")
+    else:
+        summary(f"- judge cache: unchanged ({count} verdicts); no commit")
     return True
 
 
+def _coalesce(gh: GitHubClient, token: str) -> int:
+    """Fold the append queue into the posts index; how many lack a vector."""
+    from . import embeddings
+    with metrics.span("index coalesce"):
+        folded, missing = embeddings.coalesce_pending(gh, token=token)
+    if folded:
+        summary(f"- queue: {folded} queued post(s) folded into the posts index")
+    if missing:
+        # As for a single append: the posts are in with their text, and the
+        # provider outage is annotated rather than failing the job.
+        error(
+            f"queue: {missing} of {folded} post(s) folded in without a vector — "
+            "the embeddings provider returned none. They are not visible to dense "
+            "duplicate detection until the next successful index build."
+        )
+    return missing
+
+
+def cmd_index_coalesce(gh: GitHubClient, token: str) -> int:
+    """Fold every queued append into the posts index in one batch and commit.
+
+    Runs debounced after appends (each new post restarts the wait), so a burst
+    of new issues costs one embedding batch and one commit instead of one of
+    each per post. Exits 0 on a provider outage, like a single append.
+    """
+    summary("## RAG posts-index queue\n")
+    _coalesce(gh, token)
+    return 0
+
+
 def cmd_index(gh: GitHubClient, token: str, target: str = "all") -> int:
     """
     Build the requested indexes. Non-zero when any of them could not be built.
@@ -579,22 +1164,95 @@ def cmd_index(gh: GitHubClient, token: str, target: str = "all") -> int:
     "simplify" this into skipping the commit when the run fails.
     """
     summary(f"## RAG index build ({target})\n")
-    if target not in ("docs", "posts", "all"):
-        log(f"unknown index target: {target} (use docs|posts|all)")
+    if target not in ("docs", "posts", "judge", "all"):
+        log(f"unknown index target: {target} (use docs|posts|judge|all)")
         return 2
+    # One budget for the whole run: what the docs build spends, the posts build
+    # does not get. Either stops starting batches once it is spent and commits
+    # what it has, so a backfill too large for one job converges over several.
+    deadline = (
+        time.monotonic() + config.INDEX_BUILD_BUDGET
+        if config.INDEX_BUILD_BUDGET > 0
+        else None
+    )
+    from . import embeddings
+    shadow = target != "judge" and embeddings.shadow_active()
+    # Fetched once when both models index it; each build embeds its own copy.
+    chunks = (
+        embeddings.docs.build_chunks(gh) if shadow and target in ("docs", "all") else None
+    )
     built = True
     if target in ("docs", "all"):
-        built &= _build_docs_index(gh, token)
+        with metrics.span("index docs"):
+            built &= _build_docs_index(gh, token, deadline, chunks)
     if target in ("posts", "all"):
-        built &= _build_posts_index(gh, token)
+        with metrics.span("index posts"):
+            built &= _build_posts_index(gh, token, deadline)
+    # After the live builds: they serve until cutover, so they get the budget first.
+    if shadow:
+        with metrics.span("index shadow"):
+            built &= _build_shadow(gh, token, target, deadline, chunks)
+    # After the docs build, so verdicts citing changed sections are dropped.
+    if target == "judge" or (target == "all" and config.JUDGE_CACHE_ENABLED):
+        with metrics.span("index judge"):
+            built &= _harvest_judge_cache(gh)
     if not built:
         error(f"RAG index build ({target}) did not produce an index.")
         return 1
     return 0
 
 
+def _rate(value: float | None) -> str:
+    return "n/a" if value is None else f"{value:.0%}"
+
+
+def cmd_train_gate(gh: GitHubClient) -> int:
+    """Train the judge gate from recorded runs; ship it if it validates.
+
+    Not shipping is not a failure: with too little data, or a model that
+    misses the held-out precision bar, the previous gate (if any) stays.
+    """
+    from . import embeddings, judge_gate
+    summary("## Judge gate training\n")
+    if not config.BOT_LOGIN:
+        # Without the App's login there is no telling its stickies from forgeries.
+        error("TRIAGE_BOT_LOGIN is unset; cannot read training data")
+        return 1
+    data, live = judge_gate.samples(gh)
+    if live["skipped"] or live["explored"]:
+        live_precision = (
+            live["explored_low"] / live["explored"] if live["explored"] else None
+        )
+        summary(
+            f"- live: {live['skipped']} judge calls skipped; "
+            f"{live['explored_low']} of {live['explored']} explored would-skip "
+            f"calls ended LOW (precision {_rate(live_precision)})"
+        )
+    model, report = judge_gate.train(data)
+    held_out = report.get("held_out")
+    if held_out:
+        summary(
+            f"- held out: {held_out['skipped']} of {held_out['n']} runs skipped at "
+            f"p < {report['threshold']:.3f} · precision {_rate(held_out['precision'])}"
+            f" · recall {_rate(held_out['recall'])}"
+        )
+    if model is None:
+        summary(f"- not shipped ({report['samples']} runs): {report['reason']}")
+        return 0
+    embeddings.save_index(
+        gh,
+        config.JUDGE_GATE_PATH,
+        model,
+        message=f"Update judge gate ({report['samples']} runs)",
+    )
+    summary(f"- shipped {config.JUDGE_GATE_PATH} ({report['samples']} runs)")
+    return 0
+
+
 def cmd_index_append(gh: GitHubClient, token: str) -> int:
-    """Embed a single new issue and upsert it into the posts index."""
+    """Queue a new issue for the posts index (or embed and upsert it now)."""
+    from . import embeddings
+    from .providers import detect_reported_provider_labels
     number = int(_env("ISSUE_NUMBER"))
     summary(f"## RAG posts-index append for #{number}\n")
     issue = gh.get_issue(number)
@@ -613,7 +1271,13 @@ def cmd_index_append(gh: GitHubClient, token: str) -> int:
         "state": issue.get("state"),
         "updated_at": issue.get("updated_at"),
     }
-    index, embedded = embeddings.append_post(gh, post, token=token)
+    if config.APPEND_QUEUE:
+        embeddings.queue_post(gh, post, message=f"Queue issue #{number} for posts index")
+        summary(f"#{number}: queued; `index-coalesce` folds it into the posts index.")
+        return 0
+    index, embedded = embeddings.save_post(
+        gh, post, token=token, message=f"Append issue #{number} to posts index"
+    )
     if not embedded:
         # Annotate but exit 0 on purpose: this runs inside per-issue triage, and
         # failing here would mark every incoming issue's workflow red for a
@@ -625,12 +1289,6 @@ def cmd_index_append(gh: GitHubClient, token: str) -> int:
             "returned none. It is not visible to dense duplicate detection "
             "until the next successful index build."
         )
-    embeddings.save_index(
-        gh,
-        config.POSTS_INDEX_PATH,
-        index,
-        message=f"Append issue #{number} to posts index",
-    )
     summary(f"#{number}: appended ({len(index.get('posts', []))} posts total).")
     return 0
 
@@ -646,6 +1304,8 @@ def cmd_discussion(gh: GitHubClient, token: str) -> int:
     used for issues (HIGH = answer + sources, MEDIUM = doc links, plus related
     past posts). Stays silent on LOW confidence with nothing related to show.
     """
+    from . import comment, rag
+    from .providers import detect_reported_provider_labels, resolve_provider_doc
     number = int(_env("DISCUSSION_NUMBER"))
     if not (config.AI_ENABLED and config.RAG_ENABLED and config.DISCUSSIONS_ENABLED):
         summary(f"discussion #{number}: skipped (discussion triage disabled).")
@@ -699,6 +1359,7 @@ def cmd_discussion(gh: GitHubClient, token: str) -> int:
         f"- tier: {rag_result.tier} · docs: {rag_result.has_docs_output}"
         f" · related: {len(rag_result.related_posts)}"
     )
+    _judge_summary(rag_result)
     state = {
         "v": 1,
         "last_run": _now_iso(),
@@ -711,10 +1372,14 @@ def cmd_discussion(gh: GitHubClient, token: str) -> int:
             "suppressed": rag_result.suppressed,
             "judge_conf": rag_result.judge_confidence,
             "judge_answered": rag_result.judge_answered,
+            "judge_cached": rag_result.judge_cached,
+            "gate": rag_result.judge_gate,
             "scores": [p.score for p in rag_result.related_posts],
             "sources": [p.source for p in rag_result.related_posts],
         },
     }
+    if rag_result.judge_entry is not None:
+        state["judge"] = rag_result.judge_entry
     comment.upsert_discussion(
         gh,
         disc["id"],
@@ -726,7 +1391,9 @@ def cmd_discussion(gh: GitHubClient, token: str) -> int:
 
 
 def cmd_discussion_append(gh: GitHubClient, token: str) -> int:
-    """Embed a single new discussion and upsert it into the posts index."""
+    """Queue a new discussion for the posts index (or embed and upsert it now)."""
+    from . import embeddings
+    from .providers import detect_reported_provider_labels
     number = int(_env("DISCUSSION_NUMBER"))
     if not (config.AI_ENABLED and config.RAG_ENABLED and config.DISCUSSIONS_ENABLED):
         summary(f"discussion #{number}: skipped (discussion triage disabled).")
@@ -752,7 +1419,13 @@ def cmd_discussion_append(gh: GitHubClient, token: str) -> int:
         "state": "open",
         "updated_at": _now_iso(),
     }
-    index, embedded = embeddings.append_post(gh, post, token=token)
+    if config.APPEND_QUEUE:
+        embeddings.queue_post(gh, post, message=f"Queue discussion #{number} for posts index")
+        summary(f"#{number}: queued; `index-coalesce` folds it into the posts index.")
+        return 0
+    index, embedded = embeddings.save_post(
+        gh, post, token=token, message=f"Append discussion #{number} to posts index"
+    )
     if not embedded:
         # Annotate but exit 0 on purpose: this runs inside per-issue triage, and
         # failing here would mark every incoming issue's workflow red for a
@@ -764,32 +1437,170 @@ def cmd_discussion_append(gh: GitHubClient, token: str) -> int:
             "returned none. It is not visible to dense duplicate detection "
             "until the next successful index build."
         )
-    embeddings.save_index(
-        gh,
-        config.POSTS_INDEX_PATH,
-        index,
-        message=f"Append discussion #{number} to posts index",
-    )
     summary(f"#{number}: appended ({len(index.get('posts', []))} posts total).")
     return 0
 
 
+def cmd_bench(directory: str, *, repeat: int = 3) -> int:
+    """Time the pipeline over every cassette in ``directory``, offline.
+
+    Each cassette replays the command it was recorded from: ``triage`` times
+    :func:`build_result`, ``index`` times :func:`cmd_index`, ``sweep`` times
+    :func:`lifecycle.sweep`. Runs are dry-run whatever the cassette recorded,
+    and a request the cassette cannot answer fails as it would offline — the
+    ``misses`` column says when a run took a path the recording did not.
+    """
+    from . import cassette
+    paths = sorted(Path(directory).glob("*.json")) if directory else []
+    if not paths:
+        log("usage: python -m ma_triage bench <cassette-dir> [repeat]")
+        return 2
+    summary(f"## Bench ({len(paths)} cassette(s), {repeat} run(s) each)\n")
+    rows = []
+    for path in paths:
+        try:
+            tape = cassette.Cassette.load(path)
+        except cassette.CassetteError as exc:
+            log(str(exc))
+            continue
+        if tape.command not in cassette.BENCH_COMMANDS:
+            log(f"{path.name}: cannot bench a {tape.command or '?'} run")
+            continue
+        gh = GitHubClient("replay", repo=tape.repo, dry_run=True)
+        seconds: list[float] = []
+        for _ in range(max(repeat, 1)):
+            with cassette.replaying(tape, latency=config.REPLAY_LATENCY) as player:
+                start = time.perf_counter()
+                try:
+                    _bench_run(gh, tape)
+                except Exception as exc:  # noqa: BLE001 — one bad cassette must not end the bench
+                    log(f"{path.name}: run failed: {exc!r}")
+                seconds.append(time.perf_counter() - start)
+        rows.append(cassette.describe(path.name, tape, seconds, player))
+    if not rows:
+        return 1
+    summary(cassette.render(rows))
+    return 0
+
+
+def _bench_run(gh: GitHubClient, tape: cassette.Cassette) -> None:
+    """Replay the timed core of the command ``tape`` was recorded from."""
+    if tape.command == "index":
+        cmd_index(gh, "replay", tape.argv[1] if len(tape.argv) > 1 else "all")
+    elif tape.command == "sweep":
+        lifecycle.sweep(gh)
+    else:
+        number = int(tape.inputs.get("ISSUE_NUMBER") or 0)
+        issue = gh.get_issue(number)
+        build_result(
+            gh,
+            tape.inputs.get("ISSUE_TITLE") or issue.get("title") or "",
+            tape.inputs.get("ISSUE_BODY") or issue.get("body") or "",
+            token="replay",
+            labels=lifecycle.issue_labels(issue),
+            number=number,
+        )
+
+
+def cmd_bench_retrieval(gh: GitHubClient, token: str, path: str, *, k: int = 6) -> int:
+    """Score every retrieval engine on an evaluation set, against the live indexes."""
+    from . import embeddings, retrieval_bench
+    try:
+        doc_cases, dup_cases = retrieval_bench.load_eval(path)
+    except retrieval_bench.EvalFormatError as exc:
+        error(str(exc))
+        return 2
+    cases = doc_cases + dup_cases
+    vectors = embeddings.embed_texts(
+        [case.text[: config.MAX_POST_EMBED_CHARS] for case in cases], token=token
+    )
+    retrieval_bench.attach_vectors(cases, vectors)
+    missing = sum(case.vec is None for case in cases)
+    if missing:
+        log(f"{missing} of {len(cases)} queries have no vector; dense engines miss them")
+
+    summary(f"## Retrieval benchmark ({Path(path).name}, k={k})\n")
+    if doc_cases:
+        chunks = embeddings.load_docs_chunks(gh)
+        results = retrieval_bench.run(retrieval_bench.DOC_ENGINES, doc_cases, chunks, k=k)
+        summary(retrieval_bench.render(f"Docs ({len(chunks)} chunks)", results, k=k))
+    if dup_cases:
+        posts = embeddings.load_posts(gh)
+        results = retrieval_bench.run(retrieval_bench.DUP_ENGINES, dup_cases, posts, k=k)
+        summary(retrieval_bench.render(f"Duplicates ({len(posts)} posts)", results, k=k))
+    return 0
+
+
+def cmd_mine_eval(gh: GitHubClient, out: str) -> int:
+    """Write an evaluation set mined from the repository (see retrieval_bench)."""
+    from . import retrieval_bench
+    data = retrieval_bench.mine(gh)
+    Path(out).write_text(json.dumps(data, indent=1, ensure_ascii=False), encoding="utf-8")
+    summary(
+        f"Mined {len(data['docs'])} docs question(s) and "
+        f"{len(data['duplicates'])} duplicate(s) into {out}"
+    )
+    if not data["docs"]:
+        error(
+            f"mine-eval: no judged docs questions in the last {config.EVAL_MINE_DAYS} days — "
+            "are RAG and the triage App's stickies (TRIAGE_BOT_LOGIN) set up? "
+            "Raise TRIAGE_EVAL_MINE_DAYS to look further back."
+        )
+        return 1
+    return 0
+
+
+def cmd_bench_scale(sizes: list[int]) -> int:
+    """Measure the index build and query paths on synthetic corpora of ``sizes``."""
+    from . import scale_bench
+    sizes = sorted(set(sizes)) or [1000, 3000, 10000]
+    summary(f"## Scale benchmark (dim {scale_bench.dim()}; latencies p50 / p95)\n")
+    rows = []
+    for n in sizes:
+        with metrics.span(f"scale {n}"):
+            rows.append(scale_bench.measure(n))
+        log(f"bench-scale: {n} posts measured")
+    summary(scale_bench.render(rows))
+    if config.METRICS_FILE:
+        # Alongside the run metrics, for plotting the curves.
+        Path(config.METRICS_FILE).with_suffix(".scale.json").write_text(
+            json.dumps(rows, indent=1), encoding="utf-8"
+        )
+    return 0
+
+
 def main(argv: list[str] | None = None) -> int:
     argv = argv if argv is not None else sys.argv[1:]
     if not argv:
         log(
             "usage: python -m ma_triage "
-            "{triage|trace|respond|sweep|index|index-append|"
-            "discussion|discussion-append}"
+            "{triage|trace|respond|sweep|index|index-append|index-coalesce|train-gate|"
+            "discussion|discussion-append|bench|bench-retrieval|bench-scale|mine-eval}"
         )
         return 2
     command = argv[0]
+    try:
+        if config.RECORD_CASSETTE and command != "bench":
+            from . import cassette
+            with cassette.recording(config.RECORD_CASSETTE, command=command, argv=argv):
+                return _dispatch(command, argv)
+        return _dispatch(command, argv)
+    finally:
+        metrics.flush(command)
+
 
+def _dispatch(command: str, argv: list[str]) -> int:
     # Tracing reads a local checkout and writes a local file. Dispatched before
     # the client is built because it needs no API access, and a job that needs
     # no token should not be handed one.
     if command == "trace":
         return cmd_trace()
+    # Benchmarks run on recorded or synthetic traffic: no network, no token.
+    if command == "bench":
+        repeat = int(argv[2]) if len(argv) > 2 else 3
+        return cmd_bench(argv[1] if len(argv) > 1 else "", repeat=repeat)
+    if command == "bench-scale":
+        return cmd_bench_scale([int(n) for n in argv[1:]])
 
     token = os.environ.get("GITHUB_TOKEN", "")
     if not token:
@@ -814,6 +1625,18 @@ def main(argv: list[str] | None = None) -> int:
         return cmd_index(gh, models_token, target)
     if command == "index-append":
         return cmd_index_append(gh, models_token)
+    if command == "index-coalesce":
+        return cmd_index_coalesce(gh, models_token)
+    if command == "train-gate":
+        return cmd_train_gate(gh)
+    if command in ("bench-retrieval", "mine-eval") and len(argv) < 2:
+        log(f"usage: python -m ma_triage {command} <file>")
+        return 2
+    if command == "bench-retrieval":
+        k = int(argv[2]) if len(argv) > 2 else config.DOCS_TOP_K
+        return cmd_bench_retrieval(gh, models_token, argv[1], k=k)
+    if command == "mine-eval":
+        return cmd_mine_eval(gh, argv[1])
     if command == "discussion":
         return cmd_discussion(gh, models_token)
     if command == "discussion-append":
@@ -14,12 +14,14 @@ This tier is entirely optional and defensive:
 
 from __future__ import annotations
 
+import hashlib
 import json
 from typing import Any
 
 import requests
 
-from . import config, copilot
+from . import config, copilot, metrics
+from .cache import DiskCache
 from .models import (
     AIResult,
     Diagnostics,
@@ -445,6 +447,30 @@ def _prompt_from(payload: dict[str, Any]) -> str:
     return "\n\n".join(part for part in parts if part)
 
 
+def _normalized(content: Any) -> str:
+    text = str(content).replace("\r\n", "\n").strip()
+    return "\n".join(line.rstrip() for line in text.split("\n"))
+
+
+def _cache_key(payload: dict[str, Any]) -> str:
+    """Content address of a request: backend, options and normalized messages.
+
+    Line endings and trailing whitespace never change what a model is asked, so
+    they do not change the key either. The key is a hash, so the cache holds no
+    copy of the prompt (which carries issue text).
+    """
+    backend = "copilot-cli" if config.AI_CLI_TOKEN else config.AI_ENDPOINT
+    options = {key: value for key, value in payload.items() if key != "messages"}
+    messages = [
+        [str(m.get("role", "")), _normalized(m.get("content", ""))]
+        for m in payload.get("messages", [])
+    ]
+    blob = json.dumps(
+        [backend, options, messages], sort_keys=True, separators=(",", ":")
+    )
+    return "chat:" + hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
 def _chat(payload: dict[str, Any], *, token: str, what: str) -> dict[str, Any] | None:
     """One chat completion, decoded to the object the caller asked the model for.
 
@@ -453,7 +479,34 @@ def _chat(payload: dict[str, Any], *, token: str, what: str) -> dict[str, Any] |
     breaking triage. ``what`` names the caller in that message, because a
     silent or mislabelled failure here is what hid a dead provider behind a
     green build for sixteen days.
+
+    With ``TRIAGE_AI_CACHE_DIR`` set, a byte-identical request (after
+    normalization) is answered from disk; only decoded successes are stored.
     """
+    cache = DiskCache(
+        config.AI_CACHE_DIR,
+        ttl_seconds=config.AI_CACHE_DAYS * 86400,
+        max_bytes=config.AI_CACHE_MAX_BYTES,
+    )
+    if not cache.enabled:
+        return _complete(payload, token=token, what=what)
+    key = _cache_key(payload)
+    cached = cache.get(key)
+    if isinstance(cached, dict):
+        print(f"{what}: reusing a cached response")
+        metrics.count("chat cache hits")
+        return cached
+    data = _complete(payload, token=token, what=what)
+    if data is not None:
+        cache.put(key, data)
+    return data
+
+
+def _complete(
+    payload: dict[str, Any], *, token: str, what: str
+) -> dict[str, Any] | None:
+    """The uncached request behind :func:`_chat`, over the configured backend."""
+    metrics.count("chat calls")
     if config.AI_CLI_TOKEN:
         content = copilot.run(_prompt_from(payload), what=what)
         if content is None:
@@ -475,10 +528,13 @@ def _chat(payload: dict[str, Any], *, token: str, what: str) -> dict[str, Any] |
             json=payload,
             timeout=60,
         )
+        metrics.http("POST", config.AI_ENDPOINT, len(resp.content))
         if resp.status_code >= 400:
             print(f"{what} skipped: HTTP {resp.status_code}: {resp.text[:200]}")
             return None
-        content = resp.json()["choices"][0]["message"]["content"]
+        body = resp.json()
+        metrics.usage("chat", body)
+        content = body["choices"][0]["message"]["content"]
         data = json.loads(_strip_fence(content))
         return data if isinstance(data, dict) else None
     except Exception as exc:  # noqa: BLE001 — never let AI break triage
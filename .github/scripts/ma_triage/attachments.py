@@ -5,6 +5,10 @@ All issue content is untrusted. We therefore:
 * enforce a hard byte cap while streaming (never trust ``Content-Length``),
 * never execute, import or otherwise interpret the downloaded bytes.
 
+Compressed uploads (``.gz``, ``.zip``, ``.zst``) are decoded as a stream with a
+separate cap on the decoded size and a decoded/compressed ratio guard, so a
+small archive can neither exhaust memory nor burn the job's CPU.
+
 Two attachment shapes matter:
 * **uploaded files** — ``…/user-attachments/files/<id>/<name>`` (and the legacy
   ``…/<owner>/<repo>/files/<id>/<name>``). These carry a filename, so we use the
@@ -16,11 +20,16 @@ Two attachment shapes matter:
 
 from __future__ import annotations
 
+import gzip
+import io
 import re
+import zipfile
+from collections import deque
+from collections.abc import Iterable, Iterator
 
 import requests
 
-from . import config
+from . import config, metrics
 from .gh import log
 
 # Allowlisted "uploaded file" URL shapes (these have a filename we can inspect):
@@ -48,12 +57,16 @@ _MEDIA_PATTERNS = (_RE_ASSET, _RE_USER_IMAGE)
 # Our diagnostics report: music-assistant-diagnostics-*.json / .md. We also
 # accept any *.json upload (the 2.9.6 endpoint can produce a plain
 # "diagnostics.json"), and treat the human-readable .md variant as diagnostics.
+# Either may arrive gzip/zstd-compressed ("….json.gz").
 _RE_DIAGNOSTICS_NAME = re.compile(
-    r"music-assistant-diagnostics-[\w\-]*\.(json|md)$", re.IGNORECASE
+    r"music-assistant-diagnostics-[\w\-]*\.(json|md)(\.(gz|zst))?$", re.IGNORECASE
 )
-_RE_JSON_NAME = re.compile(r"\.json$", re.IGNORECASE)
-# Anything that looks like a log file.
-_RE_LOG_NAME = re.compile(r"\.(log|txt)$", re.IGNORECASE)
+_RE_JSON_NAME = re.compile(r"\.json(\.(gz|zst))?$", re.IGNORECASE)
+# Anything that looks like a log file, plain or compressed. A bare archive
+# ("logs.zip", "home-assistant.gz") is treated as a log: a compressed
+# diagnostics report keeps its ".json" inner extension and is matched above.
+_RE_LOG_NAME = re.compile(r"\.(log|txt)(\.(gz|zst))?$|\.(gz|zip|zst)$", re.IGNORECASE)
+_RE_COMPRESSED_NAME = re.compile(r"\.(gz|zip|zst)$", re.IGNORECASE)
 # Media file extensions (screenshots/recordings sometimes arrive as files).
 _RE_MEDIA_NAME = re.compile(
     r"\.(png|jpe?g|gif|webp|bmp|heic|mp4|mov|webm|mkv)$", re.IGNORECASE
@@ -117,9 +130,12 @@ def find_diagnostics_url(body: str | None) -> str | None:
 
 
 def find_log_urls(body: str | None) -> list[str]:
-    """Uploaded files that look like plain log files."""
+    """Uploaded files that look like log files (plain or compressed)."""
     return [
-        url for url in extract_file_urls(body) if _RE_LOG_NAME.search(_filename(url))
+        url
+        for url in extract_file_urls(body)
+        if _RE_LOG_NAME.search(_filename(url))
+        and not _RE_JSON_NAME.search(_filename(url))
     ]
 
 
@@ -144,16 +160,81 @@ def is_allowlisted(url: str) -> bool:
     )
 
 
-def download_capped(url: str, *, max_bytes: int = config.MAX_DOWNLOAD_BYTES) -> bytes | None:
-    """Stream-download an allowlisted URL, aborting past ``max_bytes``.
+_RE_CONTENT_RANGE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+)")
 
-    Returns the raw bytes, or ``None`` on any problem (blocked host, too large,
-    network error). The caller must treat the bytes as untrusted data.
+
+def probe(url: str) -> str | None:
+    """A validator for the attachment's current content, or ``None``.
+
+    Sends a one-byte ranged ``GET`` and combines ``ETag`` with the total size
+    (from ``Content-Range``, or ``Content-Length`` when the range is ignored);
+    an attachment whose validator is unchanged since a previous run has the
+    same bytes, so their parse can be reused. Not ``HEAD``: uploads redirect to
+    object-storage URLs presigned for ``GET`` only, which refuse it. ``None``
+    (nothing to validate with, or any error) means "do not cache".
     """
     if not is_allowlisted(url):
-        log(f"Refusing to download non-allowlisted URL: {url}")
         return None
+    try:
+        # Streamed, so a server that ignores the range is never read past its
+        # headers.
+        with requests.get(
+            url,
+            stream=True,
+            timeout=15,
+            headers={"User-Agent": "ma-triage-bot", "Range": "bytes=0-0"},
+        ) as resp:
+            metrics.http("GET", url)
+            status, headers = resp.status_code, resp.headers
+    except requests.RequestException as exc:
+        log(f"Probe failed for {url}: {exc}")
+        return None
+    if status == 206:
+        match = _RE_CONTENT_RANGE.search(headers.get("Content-Range") or "")
+        length = match.group(3) if match else ""
+    elif status == 200:
+        length = headers.get("Content-Length") or ""
+    else:
+        return None
+    etag = headers.get("ETag") or ""
+    if not etag and not length:
+        return None
+    return f"{etag}|{length}"
+
+
+_CHUNK = 64 * 1024
+_TRUNCATED = "\n\n... [log truncated by triage bot] ...\n\n"
+
+
+def _body(resp: requests.Response, url: str) -> Iterator[bytes]:
+    """A streamed response's chunks, counted in the run metrics as they arrive."""
+    metrics.http("GET", url)
+    return metrics.downloaded("GET", url, resp.iter_content(chunk_size=_CHUNK))
+
+
+class DownloadFailed(Exception):
+    """An attachment could not be fetched within the safety caps (already logged)."""
+
 
+def stream_capped(
+    url: str,
+    *,
+    max_bytes: int = config.MAX_DOWNLOAD_BYTES,
+    max_decompressed: int = config.MAX_DECOMPRESSED_BYTES,
+) -> Iterator[bytes]:
+    """Yield an allowlisted attachment's bytes as they arrive, under the caps.
+
+    A compressed upload is yielded decoded. Any problem (blocked host, too
+    large, ratio guard, network error) is logged and raised as
+    :class:`DownloadFailed` — possibly after some chunks were already yielded,
+    so a consumer parsing on the fly must discard its partial result. The
+    bytes are untrusted data.
+    """
+    if not is_allowlisted(url):
+        log(f"Refusing to download non-allowlisted URL: {url}")
+        raise DownloadFailed(url)
+
+    kind = _compression(url)
     try:
         with requests.get(
             url,
@@ -166,16 +247,52 @@ def download_capped(url: str, *, max_bytes: int = config.MAX_DOWNLOAD_BYTES) ->
             declared = resp.headers.get("Content-Length")
             if declared and declared.isdigit() and int(declared) > max_bytes:
                 log(f"Attachment too large (declared {declared} bytes): {url}")
-                return None
-            chunks = bytearray()
-            for chunk in resp.iter_content(chunk_size=64 * 1024):
-                chunks.extend(chunk)
-                if len(chunks) > max_bytes:
-                    log(f"Attachment exceeded {max_bytes} bytes while streaming: {url}")
-                    return None
-            return bytes(chunks)
+                raise DownloadFailed(url)
+            if kind is None:
+                total = 0
+                for chunk in _body(resp, url):
+                    total += len(chunk)
+                    if total > max_bytes:
+                        log(f"Attachment exceeded {max_bytes} bytes while streaming: {url}")
+                        raise DownloadFailed(url)
+                    yield chunk
+                return
+            decoded = 0
+            try:
+                for block in _decoded_chunks(
+                    _body(resp, url), kind, max_bytes=max_bytes
+                ):
+                    decoded += len(block)
+                    if decoded > max_decompressed:
+                        log(f"Attachment exceeded {max_decompressed} decoded bytes: {url}")
+                        raise DownloadFailed(url)
+                    yield block
+            except (_Rejected, _StopDecoding) as exc:
+                log(f"Rejected compressed attachment ({exc}): {url}")
+                raise DownloadFailed(url) from exc
     except requests.RequestException as exc:
         log(f"Failed to download {url}: {exc}")
+        raise DownloadFailed(url) from exc
+
+
+def download_capped(
+    url: str,
+    *,
+    max_bytes: int = config.MAX_DOWNLOAD_BYTES,
+    max_decompressed: int = config.MAX_DECOMPRESSED_BYTES,
+) -> bytes | None:
+    """Stream-download an allowlisted URL, aborting past ``max_bytes``.
+
+    Returns the raw bytes, or ``None`` on any problem (blocked host, too large,
+    network error). A compressed upload is returned decoded, and is rejected
+    when the decoded stream passes ``max_decompressed`` or the ratio guard. The
+    caller must treat the bytes as untrusted data.
+    """
+    try:
+        return b"".join(
+            stream_capped(url, max_bytes=max_bytes, max_decompressed=max_decompressed)
+        )
+    except DownloadFailed:
         return None
 
 
@@ -192,11 +309,19 @@ def download_log_windowed(
     request for the last ``tail_bytes`` (captures the most recent errors). Ranges
     are best-effort — if unsupported we just return the head. Decoded as UTF-8
     with replacement; the caller must still redact before echoing anything.
+
+    A compressed log cannot be sampled by byte range, so it is streamed through
+    the decoder instead: the head window grows to the decoded cap and the tail
+    window is kept as a rolling buffer while the rest of the stream drains.
     """
     if not is_allowlisted(url):
         log(f"Refusing to download non-allowlisted URL: {url}")
         return None
 
+    kind = _compression(url)
+    if kind is not None:
+        return _download_compressed_log(url, kind, tail_bytes=tail_bytes)
+
     head = bytearray()
     truncated = False
     try:
@@ -204,7 +329,7 @@ def download_log_windowed(
             url, stream=True, timeout=30, headers={"User-Agent": "ma-triage-bot"}
         ) as resp:
             resp.raise_for_status()
-            for chunk in resp.iter_content(chunk_size=64 * 1024):
+            for chunk in _body(resp, url):
                 head.extend(chunk)
                 if len(head) >= head_bytes:
                     truncated = True
@@ -217,16 +342,36 @@ def download_log_windowed(
     if not truncated:
         return text
 
-    tail_text = _fetch_tail(url, tail_bytes)
-    if tail_text:
-        return f"{text}\n\n... [log truncated by triage bot] ...\n\n{tail_text}"
-    return text
-
-
-def _fetch_tail(url: str, tail_bytes: int) -> str | None:
+    tail, total = _fetch_range(url, f"-{tail_bytes}", tail_bytes)
+    if not tail:
+        return text
+    runs: list[tuple[int, bytes]] = []
+    if config.LOG_SAMPLING and total is not None:
+        runs = _sample_middle(url, start=head_bytes, end=total - len(tail))
+    if len(runs) == 1 and runs[0][0] == head_bytes and (
+        head_bytes + len(runs[0][1]) == total - len(tail)
+    ):
+        # The middle fitted the budget: this is the whole log.
+        whole = bytes(head[:head_bytes]) + runs[0][1] + tail
+        return whole.decode("utf-8", errors="replace")
+    pieces = [text]
+    pieces += [_whole_lines(data).decode("utf-8", errors="replace") for _, data in runs]
+    pieces.append(tail.decode("utf-8", errors="replace"))
+    return _TRUNCATED.join(piece for piece in pieces if piece)
+
+
+def _fetch_range(
+    url: str, byte_range: str, max_bytes: int
+) -> tuple[bytes | None, int | None]:
+    """Fetch one ``Range: bytes=<byte_range>`` window of an allowlisted URL.
+
+    Returns ``(data, total_size)``; the total comes from ``Content-Range`` and
+    is ``None`` when the server does not report it. Ranges are best-effort: a
+    server that ignores them (200 instead of 206) yields ``(None, None)``.
+    """
     # Stream the response so that, if the server ignores the Range request and
-    # returns the whole file (200 instead of 206), we never buffer more than
-    # ~tail_bytes into memory (avoids OOM on a huge log).
+    # returns the whole file, we never buffer more than ~max_bytes into memory
+    # (avoids OOM on a huge log).
     try:
         with requests.get(
             url,
@@ -234,17 +379,312 @@ def _fetch_tail(url: str, tail_bytes: int) -> str | None:
             timeout=30,
             headers={
                 "User-Agent": "ma-triage-bot",
-                "Range": f"bytes=-{tail_bytes}",
+                "Range": f"bytes={byte_range}",
             },
         ) as resp:
             if resp.status_code != 206:  # server ignored the Range request
-                return None
+                metrics.http("GET", url)
+                return None, None
+            match = _RE_CONTENT_RANGE.search(resp.headers.get("Content-Range") or "")
+            total = int(match.group(3)) if match else None
             buf = bytearray()
-            for chunk in resp.iter_content(chunk_size=64 * 1024):
+            for chunk in _body(resp, url):
                 buf.extend(chunk)
-                if len(buf) >= tail_bytes:
+                if len(buf) >= max_bytes:
                     break
-            return bytes(buf[:tail_bytes]).decode("utf-8", errors="replace")
+            return bytes(buf[:max_bytes]), total
     except requests.RequestException as exc:
-        log(f"Tail fetch failed for {url}: {exc}")
+        log(f"Range fetch ({byte_range}) failed for {url}: {exc}")
+        return None, None
+
+
+# Lines worth zooming in on: traceback headers and frames, ERROR/CRITICAL
+# records and bare exception lines ("KeyError: 'x'"). Frames count so that a
+# window cut mid-traceback keeps being widened until the exception line.
+_RE_LOG_SIGNAL = re.compile(
+    rb"Traceback \(most recent call last\)|^\s+File \"[^\"\n]*\", line \d+"
+    rb"|\b(?:ERROR|CRITICAL)\b|^[A-Za-z_][\w.]*(?:Error|Exception)\b",
+    re.MULTILINE,
+)
+
+
+def _signal_density(data: bytes) -> float:
+    """Signal lines per KB of a sampled window."""
+    return len(_RE_LOG_SIGNAL.findall(data)) / max(len(data) / 1024, 1.0)
+
+
+def _whole_lines(data: bytes) -> bytes:
+    """Drop the partial first/last line a byte-range window cuts through."""
+    first = data.find(b"\n")
+    last = data.rfind(b"\n")
+    if first == -1 or first == last:
+        return data
+    return data[first + 1 : last + 1]
+
+
+def _sample_middle(
+    url: str,
+    *,
+    start: int,
+    end: int,
+    budget: int = config.LOG_SAMPLE_BUDGET_BYTES,
+    window: int = config.LOG_SAMPLE_WINDOW_BYTES,
+    probes: int = config.LOG_SAMPLE_PROBES,
+) -> list[tuple[int, bytes]]:
+    """Range-sample the unread middle ``[start, end)`` of a log under ``budget``.
+
+    A middle that fits the budget is fetched whole. Otherwise ``probes`` evenly
+    spaced windows are read first; the remaining budget then repeatedly widens
+    the densest window (in traceback/ERROR lines per KB) into its unread
+    neighbourhood — forward first, since a traceback ends in the exception line.
+    Windows without any signal are never widened, so a quiet log costs only the
+    probes. Returns contiguous ``(offset, bytes)`` runs sorted by offset.
+    """
+    if end <= start or budget <= 0 or window <= 0:
+        return []
+    if end - start <= budget:
+        data, _ = _fetch_range(url, f"{start}-{end - 1}", end - start)
+        return [(start, data)] if data else []
+
+    # offset -> (bytes, density); every fetched window is disjoint.
+    windows: dict[int, tuple[bytes, float]] = {}
+    spent = 0
+
+    def fetch(offset: int, size: int) -> bool:
+        nonlocal spent
+        data, _ = _fetch_range(url, f"{offset}-{offset + size - 1}", size)
+        if not data:
+            return False
+        windows[offset] = (data, _signal_density(data))
+        spent += len(data)
+        return True
+
+    count = max(1, min(probes, budget // window))
+    stride = (end - start) / count
+    for i in range(count):
+        offset = max(start, min(int(start + stride * (i + 0.5)) - window // 2, end - window))
+        if not fetch(offset, window):
+            return []  # ranges stopped working; keep the head + tail only
+
+    while spent < budget:
+        spans = sorted(
+            (offset, offset + len(data), density)
+            for offset, (data, density) in windows.items()
+        )
+        # (density, offset, size) of the unread bytes next to the densest window.
+        best: tuple[float, int, int] | None = None
+        for i, (lo, hi, density) in enumerate(spans):
+            if density <= 0 or (best is not None and density <= best[0]):
+                continue
+            after = spans[i + 1][0] if i + 1 < len(spans) else end
+            before = spans[i - 1][1] if i > 0 else start
+            size = min(window, budget - spent)
+            if after > hi:
+                best = (density, hi, min(size, after - hi))
+            elif lo > before:
+                size = min(size, lo - before)
+                best = (density, lo - size, size)
+        if best is None:
+            break
+        _, offset, size = best
+        if not fetch(offset, size):
+            break
+
+    runs: list[tuple[int, bytes]] = []
+    for offset in sorted(windows):
+        data = windows[offset][0]
+        if runs and runs[-1][0] + len(runs[-1][1]) == offset:
+            runs[-1] = (runs[-1][0], runs[-1][1] + data)
+        else:
+            runs.append((offset, data))
+    return runs
+
+
+# --------------------------------------------------------------------------- #
+# Compressed attachments
+# --------------------------------------------------------------------------- #
+class _Rejected(Exception):
+    """A compressed attachment broke a cap; the message says which."""
+
+
+class _StopDecoding(Exception):
+    """The decoded stream hit a cap that ends decoding but keeps the output."""
+
+
+def _compression(url: str) -> str | None:
+    match = _RE_COMPRESSED_NAME.search(_filename(url))
+    return match.group(1).lower() if match else None
+
+
+class _ChunkReader(io.RawIOBase):
+    """Read-only file view over response chunks with a hard compressed-byte cap.
+
+    Decoders pull from this as they need input, so the compressed transfer is
+    never buffered whole (except for ``.zip``, whose central directory sits at
+    the end of the archive and needs a seekable file).
+    """
+
+    def __init__(self, chunks: Iterable[bytes], max_bytes: int) -> None:
+        self._chunks = iter(chunks)
+        self._pending = b""
+        self._max_bytes = max_bytes
+        self.consumed = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self.consumed += len(chunk)
+            if self.consumed > self._max_bytes:
+                raise _Rejected(f"compressed size exceeded {self._max_bytes} bytes")
+            self._pending = chunk
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def _open_zstd(fileobj):
+    """A zstd decoding reader, or ``None`` when no zstd codec is installed."""
+    try:
+        from compression import zstd  # Python 3.14+ standard library
+    except ImportError:
+        pass
+    else:
+        return zstd.ZstdFile(fileobj)
+    try:
+        import zstandard
+    except ImportError:
         return None
+    return zstandard.ZstdDecompressor().stream_reader(fileobj)
+
+
+def _pick_zip_member(archive: zipfile.ZipFile) -> zipfile.ZipInfo | None:
+    # Prefer something that looks like a log; otherwise the largest file.
+    files = [info for info in archive.infolist() if not info.is_dir()]
+    logs = [info for info in files if _RE_LOG_NAME.search(info.filename)]
+    pool = logs or files
+    return max(pool, key=lambda info: info.file_size) if pool else None
+
+
+def _decoded_chunks(
+    chunks: Iterable[bytes],
+    kind: str,
+    *,
+    max_bytes: int,
+    max_ratio: int = config.MAX_COMPRESSION_RATIO,
+) -> Iterator[bytes]:
+    """Yield decoded blocks of a compressed stream, enforcing the ratio guard.
+
+    Raises :class:`_Rejected` on a broken cap or an unreadable archive, and
+    :class:`_StopDecoding` once the decoded/compressed ratio passes
+    ``max_ratio`` (the caller decides whether partial output is still useful).
+    """
+    reader = _ChunkReader(chunks, max_bytes)
+    try:
+        # Zip members declare their own compressed size; streams are measured
+        # by what the decoder has pulled so far.
+        member_size: int | None = None
+        if kind == "zip":
+            archive = zipfile.ZipFile(io.BytesIO(reader.read()))
+            member = _pick_zip_member(archive)
+            if member is None:
+                raise _Rejected("empty zip archive")
+            stream = archive.open(member)
+            member_size = member.compress_size
+        elif kind == "gz":
+            stream = gzip.GzipFile(fileobj=reader)
+        else:
+            stream = _open_zstd(reader)
+            if stream is None:
+                raise _Rejected("no zstd decoder installed")
+
+        decoded = 0
+        while True:
+            block = stream.read(_CHUNK)
+            if not block:
+                return
+            decoded += len(block)
+            yield block
+            compressed = member_size if member_size is not None else reader.consumed
+            # The floor keeps a small-but-legitimate archive (one highly
+            # repetitive block) from tripping the guard on its first read.
+            if decoded > max_ratio * max(compressed, _CHUNK):
+                raise _StopDecoding(f"decoded/compressed ratio exceeded {max_ratio}")
+    except (_Rejected, _StopDecoding, requests.RequestException):
+        raise
+    except Exception as exc:  # noqa: BLE001 — a corrupt archive is untrusted input
+        raise _Rejected(f"unreadable {kind} archive: {exc}") from exc
+
+
+def _download_compressed_log(
+    url: str,
+    kind: str,
+    *,
+    max_bytes: int = config.MAX_DOWNLOAD_BYTES,
+    max_decoded: int = config.MAX_DECOMPRESSED_BYTES,
+    head_bytes: int | None = None,
+    tail_bytes: int = config.MAX_LOG_TAIL_BYTES,
+) -> str | None:
+    """Decode a compressed log into a head window plus a rolling tail window.
+
+    At most ``max_decoded`` bytes are decoded in all; the head (by default
+    whatever of that budget the tail does not need) and the tail both come out
+    of it, so decoding stops there rather than running on to reach the end.
+    """
+    if head_bytes is None:
+        head_bytes = max(0, max_decoded - tail_bytes)
+    head = bytearray()
+    tail: deque[bytes] = deque()
+    tail_size = 0
+    decoded = 0
+    truncated = False
+    try:
+        with requests.get(
+            url, stream=True, timeout=30, headers={"User-Agent": "ma-triage-bot"}
+        ) as resp:
+            resp.raise_for_status()
+            blocks = _decoded_chunks(
+                _body(resp, url), kind, max_bytes=max_bytes
+            )
+            for block in blocks:
+                if decoded + len(block) > max_decoded:
+                    block = block[: max_decoded - decoded]
+                    truncated = True
+                decoded += len(block)
+                room = head_bytes - len(head)
+                if room > 0:
+                    head.extend(block[:room])
+                    block = block[room:]
+                if block:
+                    tail.append(block)
+                    tail_size += len(block)
+                    while tail_size - len(tail[0]) >= tail_bytes:
+                        tail_size -= len(tail.popleft())
+                if truncated:
+                    log(f"Stopped decoding compressed log at {max_decoded} bytes: {url}")
+                    break
+    except _StopDecoding as exc:
+        # Whatever decoded before the guard tripped is still a real log.
+        log(f"Stopped decoding compressed log ({exc}): {url}")
+        truncated = True
+    except _Rejected as exc:
+        log(f"Rejected compressed log ({exc}): {url}")
+        return None
+    except requests.RequestException as exc:
+        log(f"Failed to download log {url}: {exc}")
+        return None
+
+    text = bytes(head).decode("utf-8", errors="replace")
+    rest = b"".join(tail)
+    # The marker goes where bytes were left out: between head and tail when
+    # the tail window rolled, and after both when decoding stopped early.
+    if len(head) + len(rest) < decoded or len(rest) > tail_bytes:
+        text += _TRUNCATED
+        rest = rest[-tail_bytes:]
+    text += rest.decode("utf-8", errors="replace")
+    return f"{text}{_TRUNCATED}" if truncated else text
@@ -0,0 +1,114 @@
+"""Small on-disk JSON cache, persisted between workflow runs by ``actions/cache``.
+
+Each entry is one JSON file named after a hash of its key, holding the key
+itself (so a hash collision reads as a miss), the time it was stored and the
+value. Reads refresh the file's mtime, so size-bounded eviction drops the least
+recently *used* entries first; entries older than the TTL are misses and are
+removed on the next prune.
+
+The cache is an optimisation only: every filesystem or decoding problem is
+logged and treated as a miss, and a :class:`DiskCache` without a directory is a
+no-op, which is how callers keep it disabled by default.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any
+
+from .gh import log
+
+
+class DiskCache:
+    """A directory of JSON entries bounded by age and total size."""
+
+    def __init__(
+        self, directory: str | Path | None, *, ttl_seconds: float, max_bytes: int
+    ) -> None:
+        self.directory = Path(directory) if directory else None
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def _path(self, key: str) -> Path:
+        assert self.directory is not None
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}.json"
+
+    def get(self, key: str) -> Any | None:
+        """The stored value for ``key``, or ``None`` on a miss."""
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError) as exc:
+            log(f"Cache entry unreadable, ignoring ({exc}): {path.name}")
+            self.misses += 1
+            return None
+        if not isinstance(entry, dict) or entry.get("key") != key:
+            self.misses += 1
+            return None
+        expired = time.time() - float(entry.get("stored_at", 0)) > self.ttl_seconds
+        try:
+            if expired:
+                path.unlink(missing_ok=True)
+            else:
+                os.utime(path)
+        except OSError:
+            pass
+        if expired:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry.get("value")
+
+    def put(self, key: str, value: Any) -> None:
+        """Store ``value`` (JSON-serialisable) under ``key``, then prune."""
+        if self.directory is None:
+            return
+        path = self._path(key)
+        entry = {"key": key, "stored_at": time.time(), "value": value}
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(entry, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp, path)
+        except (OSError, TypeError, ValueError) as exc:
+            log(f"Could not write cache entry ({exc}): {path.name}")
+            return
+        self.prune()
+
+    def prune(self) -> None:
+        """Drop expired entries, then the least recently used past ``max_bytes``."""
+        if self.directory is None:
+            return
+        now = time.time()
+        entries: list[tuple[float, int, Path]] = []
+        try:
+            for path in self.directory.glob("*.json"):
+                stat = path.stat()
+                if now - stat.st_mtime > self.ttl_seconds:
+                    path.unlink(missing_ok=True)
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+        except OSError as exc:
+            log(f"Cache prune failed: {exc}")
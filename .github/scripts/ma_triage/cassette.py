@@ -0,0 +1,300 @@
+"""Record a run's HTTP traffic to a cassette; replay it offline for benchmarks.
+
+Setting ``TRIAGE_RECORD_CASSETTE`` to a path makes any subcommand record every
+HTTP exchange it makes — GitHub REST and GraphQL, attachment downloads,
+embeddings, chat — together with how long each one took, and write them to that
+file when the command ends. Everything goes through ``requests.Session.request``
+(``requests.get``/``post``/``head`` open a session internally), so that one
+method is the whole seam: no client needs to know it is being recorded.
+
+``python -m ma_triage bench <dir>`` replays each cassette in ``<dir>`` with no
+network: requests are answered from the cassette after sleeping the recorded
+latency (scaled by ``TRIAGE_REPLAY_LATENCY``; ``0`` measures CPU time alone),
+and the command's core — ``build_result`` for a triage, ``cmd_index`` for an
+index build, ``sweep`` for the cadence — is timed over a few repetitions. A
+change to stage scheduling, caching or parsing can then be measured against the
+same traffic before it ships.
+
+What a cassette does *not* hold: request headers (the ``Authorization`` token
+never reaches the file), and anything outside HTTP — a chat answered by the
+Copilot CLI runs a subprocess, so record and bench without ``COPILOT_GITHUB_TOKEN``.
+Recording reads each response body in full, including downloads that are
+otherwise streamed under a size cap; record runs you chose, not arbitrary ones.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import os
+import statistics
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from . import config
+from .gh import log
+
+_SCHEMA = 1
+# Response headers the pipeline reads; the rest is noise in a cassette.
+_KEEP_HEADERS = (
+    "Content-Type",
+    "Content-Range",
+    "Accept-Ranges",
+    "ETag",
+    "Last-Modified",
+    "Link",
+    "Location",
+    "Retry-After",
+)
+# Environment the bench needs to rebuild a command's inputs. Credentials are
+# deliberately absent.
+INPUT_ENV = (
+    "ISSUE_NUMBER",
+    "ISSUE_TITLE",
+    "ISSUE_BODY",
+    "GITHUB_EVENT_NAME",
+    "REPOSITORY",
+)
+BENCH_COMMANDS = ("triage", "index", "sweep")
+
+
+class CassetteError(RuntimeError):
+    """A cassette file that cannot be used."""
+
+
+class CassetteMiss(requests.ConnectionError):
+    """A replayed request the cassette has no answer for.
+
+    A ``ConnectionError`` so the pipeline degrades exactly as it would offline.
+    """
+
+
+def _key(method: str, url: str, kwargs: dict[str, Any]) -> str:
+    """What identifies a request: method, full URL, range and body digest."""
+    full = requests.Request(method.upper(), url, params=kwargs.get("params")).prepare().url
+    headers = kwargs.get("headers") or {}
+    byte_range = next((v for k, v in headers.items() if k.lower() == "range"), "")
+    if kwargs.get("json") is not None:
+        body = json.dumps(kwargs["json"], sort_keys=True, ensure_ascii=False).encode()
+    else:
+        data = kwargs.get("data")
+        body = data.encode() if isinstance(data, str) else data if isinstance(data, bytes) else b""
+    digest = hashlib.sha256(body).hexdigest()[:16] if body else ""
+    return f"{method.upper()} {full} {byte_range} {digest}".rstrip()
+
+
+# --------------------------------------------------------------------------- #
+# Recording
+# --------------------------------------------------------------------------- #
+class Cassette:
+    """The exchanges of one run, in the order they were made."""
+
+    def __init__(
+        self,
+        *,
+        command: str,
+        argv: list[str] | None = None,
+        inputs: dict[str, str] | None = None,
+        repo: str = "",
+        interactions: list[dict[str, Any]] | None = None,
+    ) -> None:
+        self.command = command
+        self.argv = list(argv or [command])
+        self.inputs = dict(inputs or {})
+        self.repo = repo or config.SUPPORT_REPO
+        self.interactions = list(interactions or [])
+        self._lock = threading.Lock()
+
+    def add(
+        self, key: str, resp: requests.Response, body: bytes, elapsed: float
+    ) -> None:
+        headers = {h: resp.headers[h] for h in _KEEP_HEADERS if h in resp.headers}
+        with self._lock:
+            self.interactions.append(
+                {
+                    "key": key,
+                    "status": resp.status_code,
+                    "headers": headers,
+                    "body": base64.b64encode(body).decode("ascii"),
+                    "elapsed": round(elapsed, 4),
+                }
+            )
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "schema": _SCHEMA,
+            "command": self.command,
+            "argv": self.argv,
+            "repo": self.repo,
+            "inputs": self.inputs,
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "interactions": self.interactions,
+        }
+
+    def save(self, path: str | Path) -> None:
+        Path(path).write_text(json.dumps(self.to_json(), indent=1), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: str | Path) -> Cassette:
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            raise CassetteError(f"{path}: unreadable cassette: {exc}") from exc
+        if not isinstance(data, dict) or data.get("schema") != _SCHEMA:
+            raise CassetteError(f"{path}: not a schema {_SCHEMA} cassette")
+        interactions = data.get("interactions")
+        if not isinstance(interactions, list):
+            raise CassetteError(f"{path}: no interactions")
+        return cls(
+            command=str(data.get("command") or ""),
+            argv=[str(a) for a in data.get("argv") or []],
+            inputs={str(k): str(v) for k, v in (data.get("inputs") or {}).items()},
+            repo=str(data.get("repo") or ""),
+            interactions=[i for i in interactions if isinstance(i, dict)],
+        )
+
+
+@contextmanager
+def recording(
+    path: str | Path, *, command: str, argv: list[str] | None = None
+) -> Iterator[Cassette]:
+    """Record every HTTP exchange made inside the block to ``path``."""
+    tape = Cassette(
+        command=command,
+        argv=argv,
+        inputs={name: os.environ[name] for name in INPUT_ENV if name in os.environ},
+        repo=os.environ.get("REPOSITORY", config.SUPPORT_REPO),
+    )
+    original = requests.Session.request
+
+    def request(session: requests.Session, method: str, url: str, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        resp = original(session, method, url, **kwargs)
+        # Reading a streamed body here leaves it on the response, where
+        # `iter_content` serves it from memory to the caller.
+        body = resp.content
+        tape.add(_key(method, url, kwargs), resp, body, time.perf_counter() - start)
+        return resp
+
+    requests.Session.request = request  # type: ignore[method-assign]
+    try:
+        yield tape
+    finally:
+        requests.Session.request = original  # type: ignore[method-assign]
+        try:
+            tape.save(path)
+            log(f"Recorded {len(tape.interactions)} HTTP exchange(s) to {path}")
+        except OSError as exc:
+            log(f"Could not write cassette {path}: {exc}")
+
+
+# --------------------------------------------------------------------------- #
+# Replay
+# --------------------------------------------------------------------------- #
+class Player:
+    """Answers requests from a cassette, in recorded order per request key.
+
+    A key recorded several times (a paginated list re-read, a retried call) is
+    answered in order; once exhausted its last answer repeats, since a faster
+    pipeline may legitimately ask again.
+    """
+
+    def __init__(self, tape: Cassette, *, latency: float = 1.0) -> None:
+        self.latency = latency
+        self.misses: list[str] = []
+        self.served = 0
+        self._queues: dict[str, list[dict[str, Any]]] = {}
+        self._last: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        for interaction in tape.interactions:
+            self._queues.setdefault(str(interaction.get("key")), []).append(interaction)
+
+    def _next(self, key: str) -> dict[str, Any] | None:
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue:
+                self._last[key] = queue.pop(0)
+            found = self._last.get(key)
+            if found is None:
+                self.misses.append(key)
+            else:
+                self.served += 1
+            return found
+
+    def respond(self, method: str, url: str, kwargs: dict[str, Any]) -> requests.Response:
+        key = _key(method, url, kwargs)
+        found = self._next(key)
+        if found is None:
+            raise CassetteMiss(f"not in cassette: {key}")
+        if self.latency > 0:
+            time.sleep(float(found.get("elapsed") or 0.0) * self.latency)
+        resp = requests.Response()
+        resp.status_code = int(found.get("status") or 200)
+        resp.headers = CaseInsensitiveDict(found.get("headers") or {})
+        resp._content = base64.b64decode(found.get("body") or "")
+        resp._content_consumed = True  # iter_content serves `_content`
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp.url = key.split(" ", 2)[1]
+        resp.reason = ""
+        return resp
+
+
+@contextmanager
+def replaying(tape: Cassette, *, latency: float = 1.0) -> Iterator[Player]:
+    """Serve every HTTP request made inside the block from ``tape``."""
+    player = Player(tape, latency=latency)
+    original = requests.Session.request
+
+    def request(session: requests.Session, method: str, url: str, **kwargs: Any) -> Any:
+        return player.respond(method, url, kwargs)
+
+    requests.Session.request = request  # type: ignore[method-assign]
+    try:
+        yield player
+    finally:
+        requests.Session.request = original  # type: ignore[method-assign]
+
+
+# --------------------------------------------------------------------------- #
+# Bench report
+# --------------------------------------------------------------------------- #
+def describe(name: str, tape: Cassette, seconds: list[float], player: Player) -> dict[str, Any]:
+    """One bench row: the cassette, its command and the timings of its runs."""
+    recorded = sum(float(i.get("elapsed") or 0.0) for i in tape.interactions)
+    return {
+        "cassette": name,
+        "command": tape.command,
+        "runs": len(seconds),
+        "median": round(statistics.median(seconds), 3) if seconds else None,
+        "best": round(min(seconds), 3) if seconds else None,
+        "recorded_http": len(tape.interactions),
+        "recorded_http_seconds": round(recorded, 3),
+        "served": player.served,
+        "misses": len(player.misses),
+    }
+
+
+def render(rows: list[dict[str, Any]]) -> str:
+    """Markdown table of bench rows."""
+    lines = [
+        "| cassette | command | runs | median | best | HTTP (recorded s) | misses |",
+        "|---|---|---:|---:|---:|---:|---:|",
+    ]
+    for row in rows:
+        median = f"{row['median']:.2f}s" if row["median"] is not None else "-"
+        best = f"{row['best']:.2f}s" if row["best"] is not None else "-"
+        lines.append(
+            f"| {row['cassette']} | {row['command']} | {row['runs']} | {median} | {best}"
+            f" | {row['recorded_http']} ({row['recorded_http_seconds']:.2f}s)"
+            f" | {row['misses']} |"
+        )
+    return "\n".join(lines)
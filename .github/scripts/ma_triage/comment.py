@@ -7,7 +7,9 @@ external state store.
 
 All diagnostics-derived text routed through here is already sanitized by the
 callers (see :mod:`ma_triage.sanitize`); this module additionally never
-interpolates untrusted values into the state block.
+interpolates untrusted values into the state block unescaped. The stage outputs
+recorded there for reuse (see :mod:`ma_triage.reuse`) are JSON-encoded with
+``<``/``>`` escaped, and are only ever read back from the bot's own sticky.
 """
 
 from __future__ import annotations
@@ -66,6 +68,12 @@ def find_sticky(comments: list[dict[str, Any]]) -> dict[str, Any] | None:
     return None
 
 
+def sticky_state(comments: list[dict[str, Any]]) -> dict[str, Any]:
+    """State embedded in the current App's sticky comment (``{}`` if none)."""
+    existing = _owned_sticky(comments)
+    return parse_state(existing.get("body")) if existing else {}
+
+
 def _author_login(comment: dict[str, Any]) -> str:
     actor = comment.get("user") or comment.get("author") or {}
     return str(actor.get("login") or "").lower() if isinstance(actor, dict) else ""
@@ -79,6 +87,27 @@ def _owned_sticky(comments: list[dict[str, Any]]) -> dict[str, Any] | None:
     return find_sticky([comment for comment in comments if _author_login(comment) == login])
 
 
+def is_app_sticky(comment: dict[str, Any]) -> bool:
+    """Whether ``comment`` is a sticky written by the current App.
+
+    Stricter than :func:`_owned_sticky`: with ``BOT_LOGIN`` unset nothing
+    qualifies. Used where stickies are read across the whole repository and
+    their state is replayed onto other posts, so a forged one must never count.
+    """
+    actor = comment.get("user") or {}
+    if not config.BOT_LOGIN or not isinstance(actor, dict) or actor.get("type") != "Bot":
+        return False
+    if _author_login(comment) != config.BOT_LOGIN.lower():
+        return False
+    return config.STICKY_MARKER in (comment.get("body") or "")
+
+
+def issue_number(comment: dict[str, Any]) -> int | None:
+    """Issue number of a REST issue comment (from its ``issue_url``)."""
+    tail = str(comment.get("issue_url") or "").rsplit("/", 1)[-1]
+    return int(tail) if tail.isdigit() else None
+
+
 def _legacy_sticky(comments: list[dict[str, Any]]) -> dict[str, Any] | None:
     logins = {login.lower() for login in config.LEGACY_BOT_LOGINS}
     return find_sticky(
@@ -200,7 +200,25 @@ LOCK_AFTER_CLOSED_DAYS = 14  # lock closed threads after this many inactive days
 # --------------------------------------------------------------------------- #
 MAX_DOWNLOAD_BYTES = 5 * 1024 * 1024  # 5 MB hard cap for any attachment
 MAX_LOG_TAIL_BYTES = 512 * 1024  # for oversized logs, also grab the last ~512 KB
+# Compressed (.gz/.zip/.zst) uploads are capped twice: the transfer by
+# MAX_DOWNLOAD_BYTES, the decoded stream by MAX_DECOMPRESSED_BYTES — no more is
+# ever decoded, and a compressed log's head and tail windows both come out of
+# it. The redacting log scanner runs at roughly 0.7 s per decoded MB, so the
+# decoded cap bounds the scan and the decoding work as much as memory. A
+# decoded/compressed ratio above MAX_COMPRESSION_RATIO stops decoding earlier
+# still (zip-bomb guard).
+MAX_DECOMPRESSED_BYTES = 25 * 1024 * 1024
+MAX_COMPRESSION_RATIO = 100
+# Oversized plain logs: between the head and tail windows, up to
+# LOG_SAMPLE_BUDGET_BYTES of the middle is fetched with HTTP Range requests of
+# LOG_SAMPLE_WINDOW_BYTES each — LOG_SAMPLE_PROBES evenly spaced probes first,
+# then the remainder widens the probes densest in tracebacks / ERROR lines.
+LOG_SAMPLE_BUDGET_BYTES = 1024 * 1024
+LOG_SAMPLE_WINDOW_BYTES = 64 * 1024
+LOG_SAMPLE_PROBES = 7
 MAX_JSON_DEPTH = 40  # reject absurdly nested JSON (billion-laughs style)
+MAX_JSON_KEYS = 100_000  # total object keys in one diagnostics report
+MAX_JSON_STRING_CHARS = 256 * 1024  # any single JSON string (tracebacks included)
 MAX_STRING_ECHO = 500  # max chars of any diagnostics-derived string echoed back
 MAX_EXCEPTIONS_SHOWN = 5  # top-N exception fingerprints surfaced in the comment
 MAX_PROVIDERS_SHOWN = 20  # cap provider lists in the comment
@@ -269,6 +287,37 @@ AI_ENABLED = _flag("TRIAGE_AI_ENABLED", False)
 # MA versions older than the diagnostics feature). The log is redacted before any
 # of it is echoed (see logscan.py / sanitize.py).
 SCAN_LOGS = _flag("TRIAGE_SCAN_LOGS", True)
+# Range-sample the middle of an oversized log (see LOG_SAMPLE_* above). Off
+# falls back to the fixed head + tail windows.
+LOG_SAMPLING = _flag("TRIAGE_LOG_SAMPLING", True)
+# Parsed-attachment cache (see cache.py). The triage workflow restores this
+# directory with actions/cache, so an issue edit that leaves the attachments
+# alone skips their download and parse/scan; an attachment is reused only while
+# its ETag / Content-Length are unchanged. Empty disables the cache.
+ATTACHMENT_CACHE_DIR = _env_str("TRIAGE_ATTACHMENT_CACHE_DIR", "")
+ATTACHMENT_CACHE_DAYS = _env_int("TRIAGE_ATTACHMENT_CACHE_DAYS", 30)
+ATTACHMENT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Re-triage reuse (see reuse.py): an edit reuses the previous run's RAG and
+# Tier-1 output when their structured inputs are unchanged and the issue text
+# differs by at most this many distinct tokens (a corrected word counts twice:
+# the old spelling and the new). A manual re-triage always recomputes.
+REUSE_STAGES = _flag("TRIAGE_REUSE_STAGES", True)
+REUSE_MAX_CHANGED_TOKENS = _env_int("TRIAGE_REUSE_MAX_CHANGED_TOKENS", 4)
+# Threads running independent pipeline stages (downloads, provider manifests,
+# docs answer, code evidence) concurrently; 1 runs them one after another.
+STAGE_WORKERS = _env_int("TRIAGE_STAGE_WORKERS", 4)
+# Where to write the run's timings and resource counters as JSON (see
+# metrics.py); the workflows upload it as an artifact. Empty: summary only.
+METRICS_FILE = _env_str("TRIAGE_METRICS_FILE", "")
+# Record the run's HTTP exchanges to this cassette file (see cassette.py), for
+# `python -m ma_triage bench` to replay offline. Empty: not recording.
+RECORD_CASSETTE = _env_str("TRIAGE_RECORD_CASSETTE", "")
+# Multiplier on recorded latencies when a bench replays a cassette; 0 replays
+# instantly, so only CPU time is measured.
+REPLAY_LATENCY = _env_float("TRIAGE_REPLAY_LATENCY", 1.0)
+# How far back `python -m ma_triage mine-eval` reads comments for its
+# evaluation set (see retrieval_bench.py).
+EVAL_MINE_DAYS = _env_int("TRIAGE_EVAL_MINE_DAYS", 365)
 AI_MODEL = _env_str("TRIAGE_AI_MODEL", "openai/gpt-4o-mini")
 AI_ENDPOINT = _env_str("TRIAGE_AI_ENDPOINT", "https://models.github.ai/inference/chat/completions")
 # Set by the workflow when GitHub Copilot is available. Its presence selects the
@@ -281,6 +330,12 @@ AI_CLI_TOKEN = os.environ.get("COPILOT_GITHUB_TOKEN", "")
 # retries, so it is slower to answer than an endpoint that either responds or
 # does not.
 AI_CLI_TIMEOUT = _env_int("TRIAGE_AI_CLI_TIMEOUT", 180)
+# Chat response cache (see ai._chat / cache.py), keyed by backend and the
+# normalized payload. Off unless a directory is configured: a cached verdict is
+# replayed onto a live issue, so only point this somewhere a maintainer chose to.
+AI_CACHE_DIR = _env_str("TRIAGE_AI_CACHE_DIR", "")
+AI_CACHE_DAYS = _env_int("TRIAGE_AI_CACHE_DAYS", 7)
+AI_CACHE_MAX_BYTES = 16 * 1024 * 1024
 
 # --------------------------------------------------------------------------- #
 # RAG layer (Phase 2) — docs-grounded answers + similar-post detection
@@ -359,6 +414,73 @@ INDEX_BRANCH = _env_str("TRIAGE_INDEX_BRANCH", "triage-index")
 DOCS_INDEX_PATH = "docs.json"
 POSTS_INDEX_PATH = "posts.json"
 SUPPRESS_INDEX_PATH = "suppress.json"
+# New issues/discussions are queued as one small file each under PENDING_PREFIX
+# on the index branch, and `index-coalesce` (a debounced job after each append,
+# and the nightly build) folds the whole queue into posts.json with one
+# embedding batch and one commit. Off: every append embeds and commits alone.
+APPEND_QUEUE = _flag("TRIAGE_APPEND_QUEUE", True)
+PENDING_PREFIX = "pending/"
+# Index commits never force the branch: a writer that finds it moved re-reads
+# the file, re-applies its change and retries, up to this many attempts with
+# exponential backoff (plus jitter, so a burst of appends does not retry in
+# lockstep) capped at INDEX_COMMIT_BACKOFF_MAX seconds.
+INDEX_COMMIT_ATTEMPTS = _env_int("TRIAGE_INDEX_COMMIT_ATTEMPTS", 6)
+INDEX_COMMIT_BACKOFF_MAX = _env_float("TRIAGE_INDEX_COMMIT_BACKOFF_MAX", 20.0)
+# Wall-clock seconds `index` may spend before it stops starting embedding
+# batches and commits what it has; the inputs it did not reach are written
+# without a vector, and the next run resumes from them (vectors already in the
+# index are reused by content SHA). 0: no budget. Leave the job timeout room
+# for the batch in flight and the commit.
+INDEX_BUILD_BUDGET = _env_float("TRIAGE_INDEX_BUILD_BUDGET_SECONDS", 0.0)
+# Embedding-model migration. While a second endpoint serves a model other than
+# the one the live indexes were built with, `index` also fills SHADOW_PREFIX
+# copies of docs.json and posts.json with it, under the same budget, and cuts
+# over — both files in one commit — once every chunk and post has a vector.
+# The live indexes keep serving until then. Empty: no migration in progress.
+SHADOW_EMBED_MODEL = _env_str("TRIAGE_SHADOW_EMBED_MODEL", "")
+SHADOW_EMBED_ENDPOINT = _env_str("TRIAGE_SHADOW_EMBED_ENDPOINT", "")
+SHADOW_EMBED_DIM = _env_int("TRIAGE_SHADOW_EMBED_DIM", 0)
+SHADOW_EMBED_BATCH = _env_int("TRIAGE_SHADOW_EMBED_BATCH", 16)
+SHADOW_EMBED_TIMEOUT = _env_float("TRIAGE_SHADOW_EMBED_TIMEOUT", 240.0)
+SHADOW_PREFIX = "shadow/"
+# Local SQLite mirror of issues, discussions and comments (see mirror.py),
+# persisted by actions/cache and synced incrementally; the index build and the
+# sweep read it instead of listing everything. Empty: disabled. One sync lists
+# at most MIRROR_SYNC_MAX records per kind and resumes on the next run.
+MIRROR_PATH = _env_str("TRIAGE_MIRROR_PATH", "")
+MIRROR_SYNC_MAX = _env_int("TRIAGE_MIRROR_SYNC_MAX", 20000)
+# The sweep checkpoints each waiting issue's last reporter activity on the index
+# branch, keyed by the issue's updatedAt, so an issue nobody touched since the
+# last sweep needs no comment read. Due reminders/closes run this many at once.
+SWEEP_CHECKPOINT_PATH = "sweep.json"
+SWEEP_CHECKPOINT = _flag("TRIAGE_SWEEP_CHECKPOINT", True)
+SWEEP_WORKERS = _env_int("TRIAGE_SWEEP_WORKERS", 4)
+# Semantic cache of docs-judge verdicts (see judge_cache.py). Triage records
+# each fresh verdict in the sticky state; the nightly index build harvests them
+# here, and a later question whose embedding is within MIN_COSINE of a cached
+# one — with overlapping retrieved sections — reuses the verdict instead of a
+# judge call. Off by default: a reused answer was written for another post.
+JUDGE_CACHE_ENABLED = _flag("TRIAGE_JUDGE_CACHE", False)
+JUDGE_CACHE_PATH = "judge_cache.json"
+JUDGE_CACHE_MIN_COSINE = _env_float("TRIAGE_JUDGE_CACHE_MIN_COSINE", 0.95)
+# Jaccard overlap of retrieved section ids; every cited section must also be
+# among the current hits, unchanged.
+JUDGE_CACHE_MIN_OVERLAP = _env_float("TRIAGE_JUDGE_CACHE_MIN_OVERLAP", 0.6)
+JUDGE_CACHE_MAX_ENTRIES = 500
+# Learned gate in front of the docs judge (see judge_gate.py): a logistic model
+# over retrieval-strength features, trained nightly by `train-gate` from the
+# features and verdicts recorded in stickies, that skips judge calls predicted
+# to end LOW. Off by default; features are recorded either way.
+JUDGE_GATE_ENABLED = _flag("TRIAGE_JUDGE_GATE", False)
+JUDGE_GATE_PATH = "judge_gate.json"
+# Share of skipped calls that must have been LOW, on the training split (to
+# pick the threshold) and on the held-out split (to ship the model at all).
+JUDGE_GATE_MIN_PRECISION = _env_float("TRIAGE_JUDGE_GATE_MIN_PRECISION", 0.95)
+JUDGE_GATE_MIN_SAMPLES = 200
+JUDGE_GATE_WINDOW_DAYS = 180
+JUDGE_GATE_MAX_COMMENTS = 5000
+# Every Nth issue the gate would skip is judged anyway (0 = never).
+JUDGE_GATE_EXPLORE_EVERY = _env_int("TRIAGE_JUDGE_GATE_EXPLORE_EVERY", 10)
 
 # GitHub Models — embeddings + judge/answer chat (both OpenAI-compatible, served
 # from models.github.ai with the default token + ``models: read`` permission).
@@ -368,6 +490,9 @@ EMBED_MODEL = _env_str("TRIAGE_EMBED_MODEL", "openai/text-embedding-3-small")
 EMBED_DIM = _env_int("TRIAGE_EMBED_DIM", 512)
 EMBED_ENDPOINT = _env_str("TRIAGE_EMBED_ENDPOINT", "https://models.github.ai/inference/embeddings")
 EMBED_BATCH = _env_int("TRIAGE_EMBED_BATCH", 64)
+# Seconds per embeddings request. A local server on a CI runner may take far
+# longer than a hosted API for a batch of long inputs.
+EMBED_TIMEOUT = _env_float("TRIAGE_EMBED_TIMEOUT", 60.0)
 ANSWER_MODEL = _env_str("TRIAGE_ANSWER_MODEL", "openai/gpt-4o")
 
 # Confidence-tier thresholds for the doc-answer judge (0-1). See rag.tier().
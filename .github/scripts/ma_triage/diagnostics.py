@@ -2,16 +2,20 @@
 
 The file is produced (and sanitized) server-side, but we still treat it as
 untrusted: a reporter could attach a hand-crafted file. Parsing is therefore
-defensive — depth guarded, structurally validated, and tolerant of missing keys.
+defensive — streamed, limit-checked while reading, structurally validated, and
+tolerant of missing keys. Only the sections the bot uses are ever materialized;
+the rest of the document is validated and discarded as it streams past.
 """
 
 from __future__ import annotations
 
-import json
+import dataclasses
+from collections.abc import Callable, Iterable
 from typing import Any
 
 from . import config
 from .gh import log
+from .jsonstream import JSONStreamError, StreamReader
 from .models import Diagnostics, ExceptionEntry, ProviderEntry, SystemInfo
 
 
@@ -19,70 +23,70 @@ class InvalidDiagnostics(ValueError):
     """Raised when the payload is not a usable diagnostics report."""
 
 
-def _max_depth(obj: Any, limit: int, depth: int = 0) -> int:
-    """Return the nesting depth of ``obj``, short-circuiting past ``limit``."""
-    if depth > limit:
-        raise InvalidDiagnostics("JSON nesting too deep")
-    if isinstance(obj, dict):
-        return max((_max_depth(v, limit, depth + 1) for v in obj.values()), default=depth)
-    if isinstance(obj, list):
-        return max((_max_depth(v, limit, depth + 1) for v in obj), default=depth)
-    return depth
-
-
-def parse_diagnostics(raw: bytes | str) -> Diagnostics:
-    """Parse raw bytes/str into a :class:`Diagnostics`, or raise InvalidDiagnostics."""
-    if isinstance(raw, bytes):
-        try:
-            raw = raw.decode("utf-8")
-        except UnicodeDecodeError as exc:
-            raise InvalidDiagnostics(f"not valid UTF-8: {exc}") from exc
-
+# Keys read from each section; anything else is skipped unbuilt.
+_SYSTEM_KEYS = frozenset({
+    "version", "python_version", "platform", "machine", "hass_addon",
+    "safe_mode", "uptime_seconds", "memory", "data_dir_disk",
+})
+_PROVIDER_KEYS = frozenset({
+    "domain", "instance_id", "type", "enabled", "loaded", "available", "last_error",
+})
+_EXCEPTION_KEYS = frozenset({
+    "type", "fingerprint", "count", "first_seen", "last_seen", "logger", "level",
+    "origin", "message", "traceback",
+})
+_INSTALL_DICTS = ("players", "library", "core_config_non_default")
+
+
+def parse_diagnostics(raw: bytes | str | Iterable[bytes]) -> Diagnostics:
+    """Parse a report into a :class:`Diagnostics`, or raise InvalidDiagnostics.
+
+    ``raw`` is the whole payload or an iterable of byte chunks (e.g.
+    :func:`attachments.stream_capped`), so parsing overlaps the download and
+    stops at the first byte that breaks a limit.
+    """
+    chunks = [raw] if isinstance(raw, (bytes, str)) else raw
+    reader = StreamReader(
+        chunks,
+        max_depth=config.MAX_JSON_DEPTH,
+        max_keys=config.MAX_JSON_KEYS,
+        max_string=config.MAX_JSON_STRING_CHARS,
+    )
     try:
-        data = json.loads(raw)
-    except json.JSONDecodeError as exc:
+        top = _read_top_level(reader)
+        # Trailing garbage is still a malformed report.
+        reader.finish()
+    except JSONStreamError as exc:
         raise InvalidDiagnostics(f"not valid JSON: {exc}") from exc
 
-    if not isinstance(data, dict):
-        raise InvalidDiagnostics("top-level JSON is not an object")
-
-    _max_depth(data, config.MAX_JSON_DEPTH)
-
-    schema_version = data.get("schema_version")
+    schema_version = top.get("schema_version")
     if not isinstance(schema_version, int):
         raise InvalidDiagnostics("missing or invalid schema_version")
 
     # A valid report must at least carry a system block.
-    system_raw = data.get("system")
+    system_raw = top.get("system")
     if not isinstance(system_raw, dict):
         raise InvalidDiagnostics("missing system section")
 
-    system = _parse_system(system_raw)
-    install = data.get("install") if isinstance(data.get("install"), dict) else {}
-    providers = _parse_providers(install.get("providers"))
-    players = install.get("players") if isinstance(install.get("players"), dict) else {}
-    library = install.get("library") if isinstance(install.get("library"), dict) else {}
-    core_cfg = (
-        install.get("core_config_non_default")
-        if isinstance(install.get("core_config_non_default"), dict)
-        else {}
-    )
-    exceptions = _parse_exceptions(data.get("exceptions"))
-
+    install = top.get("install", {})
+    providers = install.get("providers", [])
+    exceptions = top.get("exceptions", [])
+    # Most frequent first.
+    exceptions.sort(key=lambda e: e.count, reverse=True)
     return Diagnostics(
         schema_version=schema_version,
-        generated_at=_str_or_none(data.get("generated_at")),
-        system=system,
+        generated_at=_str_or_none(top.get("generated_at")),
+        system=_parse_system(system_raw),
         providers=providers,
-        players=players,
-        library=library,
-        core_config_non_default=core_cfg,
+        players=install.get("players", {}),
+        library=install.get("library", {}),
+        core_config_non_default=install.get("core_config_non_default", {}),
         exceptions=exceptions,
-        has_log_tail=bool(data.get("log_tail")),
+        has_log_tail=top.get("log_tail", False),
     )
 
 
-def try_parse(raw: bytes | str) -> Diagnostics | None:
+def try_parse(raw: bytes | str | Iterable[bytes]) -> Diagnostics | None:
     """Convenience wrapper: parse or return ``None`` (logging the reason)."""
     try:
         return parse_diagnostics(raw)
@@ -91,6 +95,100 @@ def try_parse(raw: bytes | str) -> Diagnostics | None:
         return None
 
 
+def dump_diagnostics(diag: Diagnostics) -> dict[str, Any]:
+    """Plain-JSON form of a parsed report (stored by the attachment cache)."""
+    return dataclasses.asdict(diag)
+
+
+def load_diagnostics(data: dict[str, Any]) -> Diagnostics:
+    """Inverse of :func:`dump_diagnostics`; raises InvalidDiagnostics on a bad shape."""
+    try:
+        fields = dict(data)
+        fields["system"] = SystemInfo(**fields["system"])
+        fields["providers"] = [ProviderEntry(**item) for item in fields["providers"]]
+        fields["exceptions"] = [ExceptionEntry(**item) for item in fields["exceptions"]]
+        return Diagnostics(**fields)
+    except (KeyError, TypeError) as exc:
+        raise InvalidDiagnostics(f"unreadable stored diagnostics: {exc}") from exc
+
+
+# --------------------------------------------------------------------------- #
+# Streaming section readers
+# --------------------------------------------------------------------------- #
+def _read_top_level(reader: StreamReader) -> dict[str, Any]:
+    """Read the top-level object, building only the sections we use.
+
+    Returns ``schema_version`` / ``generated_at`` / ``system`` as read, and
+    ``install`` / ``exceptions`` / ``log_tail`` already converted. A repeated key
+    wins over earlier occurrences, as with ``json.loads``.
+    """
+    if not reader.start_object():
+        raise InvalidDiagnostics("top-level JSON is not an object")
+    top: dict[str, Any] = {}
+    for key in reader.keys():
+        if key in ("schema_version", "generated_at"):
+            top[key] = reader.read_value()
+        elif key == "system":
+            top[key] = _pick(reader, _SYSTEM_KEYS)
+        elif key == "install":
+            top[key] = _read_install(reader)
+        elif key == "exceptions":
+            top[key] = _read_list(reader, _EXCEPTION_KEYS, _exception_entry)
+        elif key == "log_tail":
+            top[key] = reader.skip_value()
+        else:
+            reader.skip_value()
+    return top
+
+
+def _pick(reader: StreamReader, wanted: frozenset[str]) -> dict[str, Any] | None:
+    """Build the ``wanted`` keys of an object; ``None`` for a non-object."""
+    if not reader.start_object():
+        reader.skip_value()
+        return None
+    picked: dict[str, Any] = {}
+    for key in reader.keys():
+        if key in wanted:
+            picked[key] = reader.read_value()
+        else:
+            reader.skip_value()
+    return picked
+
+
+def _read_list(
+    reader: StreamReader,
+    wanted: frozenset[str],
+    convert: Callable[[dict[str, Any]], Any],
+) -> list[Any]:
+    """Convert each object element of an array, one element at a time."""
+    if not reader.start_array():
+        reader.skip_value()
+        return []
+    out: list[Any] = []
+    for _ in reader.items():
+        picked = _pick(reader, wanted)
+        entry = convert(picked) if picked is not None else None
+        if entry is not None:
+            out.append(entry)
+    return out
+
+
+def _read_install(reader: StreamReader) -> dict[str, Any]:
+    if not reader.start_object():
+        reader.skip_value()
+        return {}
+    install: dict[str, Any] = {}
+    for key in reader.keys():
+        if key == "providers":
+            install[key] = _read_list(reader, _PROVIDER_KEYS, _provider_entry)
+        elif key in _INSTALL_DICTS:
+            value = reader.read_value()
+            install[key] = value if isinstance(value, dict) else {}
+        else:
+            reader.skip_value()
+    return install
+
+
 # --------------------------------------------------------------------------- #
 # Section parsers
 # --------------------------------------------------------------------------- #
@@ -108,54 +206,34 @@ def _parse_system(raw: dict[str, Any]) -> SystemInfo:
     )
 
 
-def _parse_providers(raw: Any) -> list[ProviderEntry]:
-    if not isinstance(raw, list):
-        return []
-    providers: list[ProviderEntry] = []
-    for item in raw:
-        if not isinstance(item, dict):
-            continue
-        domain = _str_or_none(item.get("domain"))
-        if not domain:
-            continue
-        providers.append(
-            ProviderEntry(
-                domain=domain,
-                instance_id=_str_or_none(item.get("instance_id")) or "",
-                type=_str_or_none(item.get("type")) or "",
-                enabled=bool(item.get("enabled", False)),
-                loaded=bool(item.get("loaded", False)),
-                available=bool(item.get("available", False)),
-                last_error=_str_or_none(item.get("last_error")),
-            )
-        )
-    return providers
-
-
-def _parse_exceptions(raw: Any) -> list[ExceptionEntry]:
-    if not isinstance(raw, list):
-        return []
-    exceptions: list[ExceptionEntry] = []
-    for item in raw:
-        if not isinstance(item, dict):
-            continue
-        exceptions.append(
-            ExceptionEntry(
-                exc_type=_str_or_none(item.get("type")) or "Exception",
-                fingerprint=_str_or_none(item.get("fingerprint")) or "",
-                count=item.get("count") if isinstance(item.get("count"), int) else 1,
-                first_seen=_str_or_none(item.get("first_seen")),
-                last_seen=_str_or_none(item.get("last_seen")),
-                logger=_str_or_none(item.get("logger")),
-                level=_str_or_none(item.get("level")),
-                origin=_str_or_none(item.get("origin")),
-                message=_str_or_none(item.get("message")),
-                traceback=_str_or_none(item.get("traceback")),
-            )
-        )
-    # Most frequent first.
-    exceptions.sort(key=lambda e: e.count, reverse=True)
-    return exceptions
+def _provider_entry(item: dict[str, Any]) -> ProviderEntry | None:
+    domain = _str_or_none(item.get("domain"))
+    if not domain:
+        return None
+    return ProviderEntry(
+        domain=domain,
+        instance_id=_str_or_none(item.get("instance_id")) or "",
+        type=_str_or_none(item.get("type")) or "",
+        enabled=bool(item.get("enabled", False)),
+        loaded=bool(item.get("loaded", False)),
+        available=bool(item.get("available", False)),
+        last_error=_str_or_none(item.get("last_error")),
+    )
+
+
+def _exception_entry(item: dict[str, Any]) -> ExceptionEntry:
+    return ExceptionEntry(
+        exc_type=_str_or_none(item.get("type")) or "Exception",
+        fingerprint=_str_or_none(item.get("fingerprint")) or "",
+        count=item.get("count") if isinstance(item.get("count"), int) else 1,
+        first_seen=_str_or_none(item.get("first_seen")),
+        last_seen=_str_or_none(item.get("last_seen")),
+        logger=_str_or_none(item.get("logger")),
+        level=_str_or_none(item.get("level")),
+        origin=_str_or_none(item.get("origin")),
+        message=_str_or_none(item.get("message")),
+        traceback=_str_or_none(item.get("traceback")),
+    )
 
 
 # --------------------------------------------------------------------------- #
@@ -18,20 +18,29 @@ Everything here is **defensive and cost-aware**:
 * ``dim`` records the width the vectors actually have, not the width that was
   requested, because a provider is free to ignore the ``dimensions`` parameter,
 * the indexes are plain JSON persisted on the orphan ``triage-index`` branch and
-  read back at runtime through :meth:`GitHubClient.get_raw_file`.
+  read back at runtime through :meth:`GitHubClient.get_raw_file`; every commit
+  is a compare-and-swap on the branch, and a writer that loses the race
+  re-applies its change to the winner's file (:func:`save_index`),
+* a change of embedding model is built into shadow copies of the indexes
+  across runs while the old ones keep serving, and cut over in one commit once
+  the copies are complete (:func:`cutover`).
 """
 
 from __future__ import annotations
 
 import hashlib
 import json
+import random
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from typing import Any
 
 import requests
 
-from . import config, docs
-from .gh import GitHubClient, log
+from . import config, docs, fastjson, metrics
+from .gh import HEAD, GitHubClient, RefConflict, log
 from .models import DocChunk
 from .retrieval import decode_vec, encode_vec
 
@@ -67,11 +76,16 @@ def _request_embeddings(inputs: list[str], token: str) -> list[list[float]]:
     if config.EMBED_DIM > 0:
         payload["dimensions"] = config.EMBED_DIM
     resp = requests.post(
-        config.EMBED_ENDPOINT, headers=_headers(token), json=payload, timeout=60
+        config.EMBED_ENDPOINT, headers=_headers(token), json=payload,
+        timeout=config.EMBED_TIMEOUT,
     )
+    metrics.http("POST", config.EMBED_ENDPOINT, len(resp.content))
+    metrics.count("embedding inputs", len(inputs))
     if resp.status_code >= 400:
         raise requests.HTTPError(f"HTTP {resp.status_code}: {resp.text[:200]}")
-    data = resp.json()["data"]
+    body = resp.json()
+    metrics.usage("embedding", body)
+    data = body["data"]
     # The API preserves input order, but sort by index to be safe.
     ordered = sorted(data, key=lambda d: d.get("index", 0))
     return [list(item["embedding"]) for item in ordered]
@@ -108,6 +122,30 @@ def embed_texts(texts: list[str], *, token: str) -> list[list[float] | None]:
     return vectors
 
 
+def embed_within(
+    texts: list[str], *, token: str, deadline: float | None
+) -> list[list[float] | None]:
+    """:func:`embed_texts`, but no batch is started after ``deadline``.
+
+    ``deadline`` is a :func:`time.monotonic` value; ``None`` means no limit.
+    The result covers a prefix of ``texts`` — one entry per input that was
+    reached, ``None`` where the provider returned no vector — and the caller
+    treats the inputs past its end as deferred to the next run.
+    """
+    if deadline is None:
+        return embed_texts(texts, token=token)
+    vectors: list[list[float] | None] = []
+    batch = max(1, config.EMBED_BATCH)
+    for start in range(0, len(texts), batch):
+        if time.monotonic() >= deadline:
+            deferred = len(texts) - start
+            log(f"Index build budget spent; {deferred} of {len(texts)} inputs deferred")
+            metrics.count("embedding inputs deferred", deferred)
+            break
+        vectors.extend(embed_texts(texts[start : start + batch], token=token))
+    return vectors
+
+
 def embed_text(text: str, *, token: str) -> list[float] | None:
     """Embed a single text; ``None`` on failure."""
     result = embed_texts([text[: config.MAX_POST_EMBED_CHARS]], token=token)
@@ -123,16 +161,25 @@ def _chunk_embed_input(chunk: DocChunk) -> str:
 # Index (de)serialisation
 # --------------------------------------------------------------------------- #
 def _dumps(index: dict[str, Any]) -> str:
-    return json.dumps(index, separators=(",", ":"), sort_keys=True)
+    # Byte-identical to `json.dumps(..., sort_keys=True)` with or without
+    # orjson, so a rebuilt index only diffs where its content changed.
+    return fastjson.dumps_sorted(index)
+
 
+def load_index(
+    gh: GitHubClient, path: str, *, ref: str | None = None
+) -> dict[str, Any] | None:
+    """Read + parse a JSON index from the index branch; ``None`` if absent/bad.
 
-def load_index(gh: GitHubClient, path: str) -> dict[str, Any] | None:
-    """Read + parse a JSON index from the index branch; ``None`` if absent/bad."""
-    raw = gh.get_raw_file(gh.repo, path, ref=config.INDEX_BRANCH)
+    ``ref`` pins the read to one commit of the branch. A writer passes the
+    commit it will build on: the raw host caches a branch name for minutes, a
+    commit SHA never changes.
+    """
+    raw = gh.get_raw_file(gh.repo, path, ref=ref or config.INDEX_BRANCH)
     if not raw:
         return None
     try:
-        data = json.loads(raw)
+        data = fastjson.loads(raw)
     except json.JSONDecodeError as exc:
         log(f"Index {path} is not valid JSON: {exc}")
         return None
@@ -281,6 +328,7 @@ def build_docs_index(
     token: str,
     chunks: list[DocChunk] | None = None,
     previous: dict[str, Any] | None = None,
+    deadline: float | None = None,
 ) -> tuple[dict[str, Any] | None, bool]:
     """Build the docs index, reusing cached embeddings by content SHA.
 
@@ -289,6 +337,11 @@ def build_docs_index(
     ``changed`` is ``False`` when the corpus is byte-for-byte identical to
     ``previous`` (nothing to re-embed, no added/removed chunks) — the caller then
     skips the commit.
+
+    Chunks not reached by ``deadline`` are written without a vector and counted
+    in ``index["deferred"]``: the index is the checkpoint, and the next build
+    embeds only what it still lacks. ``index["embedded"]`` counts the vectors
+    this build computed, which is what tells a deferring run it progressed.
     """
     if chunks is None:
         chunks = docs.build_chunks(gh)
@@ -312,25 +365,39 @@ def build_docs_index(
         else:
             to_embed.append(i)
 
+    deferred = embedded = 0
     if to_embed:
-        vectors = embed_texts(
-            [_chunk_embed_input(chunks[i]) for i in to_embed], token=token
+        vectors = embed_within(
+            [_chunk_embed_input(chunks[i]) for i in to_embed],
+            token=token,
+            deadline=deadline,
         )
-        if not any(vector is not None for vector in vectors):
+        # Only what was attempted can have failed; a run whose budget ran out
+        # before its first batch still writes the chunks it has.
+        if vectors and not any(vector is not None for vector in vectors):
             return None, False
+        deferred = len(to_embed) - len(vectors)
         for i, vector in zip(to_embed, vectors):
             if vector is not None:
                 chunks[i].embedding = vector
+                embedded += 1
 
     new_ids = {c.id for c in chunks}
     changed = bool(to_embed) or new_ids != set(prev_by_id)
 
+    records = [_chunk_to_dict(c) for c in chunks]
+    if changed and previous and previous.get("chunks") == records:
+        # Nothing was reached before the deadline: same as the last checkpoint.
+        changed = False
+
     index = {
         "schema": _SCHEMA,
         "model": config.EMBED_MODEL,
         "dim": next((len(c.embedding) for c in chunks if c.embedding), 0),
         "built_at": _now_iso(),
-        "chunks": [_chunk_to_dict(c) for c in chunks],
+        "chunks": records,
+        "deferred": deferred,
+        "embedded": embedded,
     }
     return index, changed
 
@@ -429,12 +496,17 @@ def build_posts_index(
     *,
     token: str,
     previous: dict[str, Any] | None = None,
+    deadline: float | None = None,
 ) -> tuple[dict[str, Any], bool]:
     """Build the posts index from ``{kind,number,title,body,url,state,...}`` dicts.
 
     Always returns an index. A provider outage costs individual records their
     vectors, not the whole build — ``index["vectors"]`` reports how many
     records carry one, which is what tells the caller the run fell short.
+    Posts not reached by ``deadline`` are written the same way and counted in
+    ``index["deferred"]``, so a backfill too large for one run resumes from
+    the committed index on the next; ``index["embedded"]`` counts the vectors
+    this build computed.
     """
     prev_by_key: dict[tuple[str, int], dict[str, Any]] = {}
     if (
@@ -483,6 +555,7 @@ def build_posts_index(
                 ]
             )
 
+    vectors: list[list[float] | None] = []
     if to_embed:
         # A dead provider costs this run its *new* vectors, not the index. Every
         # post whose text is unchanged keeps the vector cached above, and the
@@ -490,7 +563,7 @@ def build_posts_index(
         # vector keeps working. `cmd_index` reports the shortfall and still
         # exits non-zero; leaving no index at all is what left duplicate
         # detection with nothing to fall back on.
-        vectors = embed_texts(embed_targets, token=token)
+        vectors = embed_within(embed_targets, token=token, deadline=deadline)
         for i, post in enumerate(to_embed):
             records.append(_post_record(post, vectors[i] if i < len(vectors) else None))
 
@@ -509,12 +582,66 @@ def build_posts_index(
     index = _empty_posts_index()
     index["posts"] = records
     index["vectors"] = sum(1 for r in records if r.get("embedding"))
+    index["deferred"] = len(to_embed) - len(vectors)
+    index["embedded"] = sum(1 for vector in vectors if vector is not None)
     index["dim"] = _observed_dim(records)
     return index, changed
 
 
+def _post_key(post: dict[str, Any]) -> tuple[str, int]:
+    return post.get("kind", "issue"), int(post.get("number", 0))
+
+
+def upsert_posts(
+    previous: dict[str, Any] | None, records: list[dict[str, Any]]
+) -> dict[str, Any]:
+    """``previous`` with ``records`` inserted or replaced, sorted and trimmed.
+
+    A vectorless record keeps the vector ``previous`` holds for the same text
+    (see :func:`append_post`). Pure, so a writer that lost a commit race can
+    apply the same records again to the winner's index.
+
+    An index built with another model — a shadow index cut over after this
+    writer's embedding server started — keeps its header, and the records go
+    in without their vectors, which are from the wrong space; the next build
+    embeds them.
+    """
+    previous_posts = [
+        p for p in (previous or {}).get("posts", []) or [] if isinstance(p, dict)
+    ]
+    foreign = bool(previous_posts) and previous.get("model") != config.EMBED_MODEL
+    by_key = {_post_key(p): p for p in previous_posts}
+    incoming: dict[tuple[str, int], dict[str, Any]] = {}
+    for record in records:
+        key = _post_key(record)
+        cached = by_key.get(key)
+        if foreign:
+            record = {k: v for k, v in record.items() if k != "embedding"}
+        if not record.get("embedding") and reusable_vector(cached, record["sha"]):
+            record = {**record, "embedding": cached["embedding"]}
+        incoming[key] = record
+
+    kept = [p for p in previous_posts if _post_key(p) not in incoming]
+    kept.extend(incoming.values())
+    kept.sort(key=lambda r: int(r.get("number", 0)), reverse=True)
+    kept = trim_by_kind(kept)
+    index = _empty_posts_index()
+    if foreign:
+        index["model"] = previous.get("model")
+    index["posts"] = kept
+    index["vectors"] = sum(1 for r in kept if r.get("embedding"))
+    index["dim"] = _observed_dim(kept)
+    return index
+
+
+def _embedded(index: dict[str, Any], key: tuple[str, int]) -> bool:
+    return any(
+        _post_key(p) == key and p.get("embedding") for p in index.get("posts", [])
+    )
+
+
 def append_post(
-    gh: GitHubClient, post: dict[str, Any], *, token: str
+    gh: GitHubClient, post: dict[str, Any], *, token: str, ref: str | None = None
 ) -> tuple[dict[str, Any], bool]:
     """Embed a single new post and upsert it into the posts index.
 
@@ -528,44 +655,332 @@ def append_post(
     record — a post edited during a provider outage would otherwise lose a good
     vector it could not get back until the next successful build.
     """
-    previous = load_index(gh, config.POSTS_INDEX_PATH) or _empty_posts_index()
+    previous = load_index(gh, config.POSTS_INDEX_PATH, ref=ref)
     vector = embed_text(
         f"{post.get('title', '')}\n\n{post.get('body', '')}", token=token
     )
-    previous_posts = [
-        p for p in previous.get("posts", []) or [] if isinstance(p, dict)
-    ]
     record = _post_record(post, vector)
-    key = (record["kind"], record["number"])
-    if vector is None:
-        cached = next(
-            (
-                p
-                for p in previous_posts
-                if (p.get("kind", "issue"), int(p.get("number", 0))) == key
-            ),
-            None,
-        )
-        if reusable_vector(cached, record["sha"]):
-            record["embedding"] = cached["embedding"]
+    index = upsert_posts(previous, [record])
+    return index, _embedded(index, _post_key(record))
+
+
+def save_post(
+    gh: GitHubClient, post: dict[str, Any], *, token: str, message: str
+) -> tuple[dict[str, Any], bool]:
+    """Embed, upsert and commit one post, safe against concurrent appends.
+
+    The record is embedded once; if another writer commits first, it is
+    upserted again into that writer's index rather than re-embedded.
+    """
+    base = gh.get_ref_sha(config.INDEX_BRANCH)
+    previous = load_index(gh, config.POSTS_INDEX_PATH, ref=base)
+    vector = embed_text(
+        f"{post.get('title', '')}\n\n{post.get('body', '')}", token=token
+    )
+    record = _post_record(post, vector)
+    index = upsert_posts(previous, [record])
+    index = save_index(
+        gh,
+        config.POSTS_INDEX_PATH,
+        index,
+        message=message,
+        base=base,
+        rebase=lambda fresh: upsert_posts(fresh, [record]),
+    )
+    return index, _embedded(index, _post_key(record))
+
 
-    kept = [
+def merge_appended(
+    built: dict[str, Any],
+    fresh: dict[str, Any] | None,
+    previous: dict[str, Any] | None,
+) -> dict[str, Any]:
+    """``built`` plus the posts appended to ``fresh`` since ``previous``.
+
+    The rebase for a full posts build that lost its commit race to an append:
+    the build's own records win, and only what it never saw — keys absent from
+    the ``previous`` index it started from — is carried over, so a post the
+    build dropped on purpose is not resurrected.
+    """
+    seen = {_post_key(p) for p in (previous or {}).get("posts", []) or []}
+    seen |= {_post_key(p) for p in built.get("posts", [])}
+    records = list(built.get("posts", []))
+    records += [
         p
-        for p in previous_posts
-        if (p.get("kind", "issue"), int(p.get("number", 0))) != key
+        for p in (fresh or {}).get("posts", []) or []
+        if isinstance(p, dict) and _post_key(p) not in seen
     ]
-    kept.append(record)
-    kept.sort(key=lambda r: int(r.get("number", 0)), reverse=True)
-    kept = trim_by_kind(kept)
-    index = _empty_posts_index()
-    index["posts"] = kept
-    index["vectors"] = sum(1 for r in kept if r.get("embedding"))
-    index["dim"] = _observed_dim(kept)
-    return index, bool(record.get("embedding"))
+    records.sort(key=lambda r: int(r.get("number", 0)), reverse=True)
+    records = trim_by_kind(records)
+    index = dict(built)
+    index["posts"] = records
+    index["vectors"] = sum(1 for r in records if r.get("embedding"))
+    index["dim"] = _observed_dim(records)
+    return index
+
+
+def pending_path(post: dict[str, Any]) -> str:
+    kind, number = _post_key(post)
+    return f"{config.PENDING_PREFIX}{kind}-{number}.json"
+
+
+def queue_post(gh: GitHubClient, post: dict[str, Any], *, message: str) -> None:
+    """Queue a new post for :func:`coalesce_pending`: one small file, no vector.
+
+    The commit touches only the post's own path, so concurrent appends never
+    contend for content; a moved branch is simply retried on the new head.
+    """
+    commit_index_files(gh, {pending_path(post): _dumps(post)}, message=message)
+
+
+def _paths_under(gh: GitHubClient, ref: str | None, prefix: str) -> list[str]:
+    if not ref:
+        return []
+    return sorted(
+        str(entry["path"])
+        for entry in gh.get_tree(gh.repo, ref)
+        if entry.get("type") == "blob" and str(entry.get("path", "")).startswith(prefix)
+    )
+
+
+def _pending_paths(gh: GitHubClient, ref: str | None) -> list[str]:
+    return _paths_under(gh, ref, config.PENDING_PREFIX)
+
+
+def coalesce_pending(gh: GitHubClient, *, token: str) -> tuple[int, int]:
+    """Fold every queued post into the posts index: one batch, one commit.
+
+    Returns how many posts were folded in and how many of those have no
+    vector. The queue files go in the same commit that adds their posts, so a
+    post is never off the queue without being in the index; one queued after
+    this read its base stays queued for the next run. A post whose text the
+    index already has a vector for (the nightly build got there first) is not
+    embedded again.
+    """
+    base = gh.get_ref_sha(config.INDEX_BRANCH)
+    paths = _pending_paths(gh, base)
+    if not paths:
+        return 0, 0
+    previous = load_index(gh, config.POSTS_INDEX_PATH, ref=base)
+    posts: list[dict[str, Any]] = []
+    for path in paths:
+        raw = gh.get_raw_file(gh.repo, path, ref=base)
+        try:
+            post = fastjson.loads(raw) if raw else None
+        except json.JSONDecodeError:
+            post = None
+        if isinstance(post, dict):
+            posts.append(post)
+        else:
+            log(f"{path}: unreadable queued post; dropping it")
+
+    cached = {
+        _post_key(p): p
+        for p in (previous or {}).get("posts", []) or []
+        if isinstance(p, dict)
+    }
+    records: list[dict[str, Any]] = []
+    to_embed: list[dict[str, Any]] = []
+    for post in posts:
+        record = _post_record(post, None)
+        if reusable_vector(cached.get(_post_key(record)), record["sha"]):
+            records.append(record)  # `upsert_posts` restores the cached vector
+        else:
+            to_embed.append(post)
+    if to_embed:
+        vectors = embed_texts(
+            [
+                f"{post.get('title', '')}\n\n{post.get('body', '')}"[
+                    : config.MAX_POST_EMBED_CHARS
+                ]
+                for post in to_embed
+            ],
+            token=token,
+        )
+        records += [
+            _post_record(post, vectors[i] if i < len(vectors) else None)
+            for i, post in enumerate(to_embed)
+        ]
+    metrics.count("queued posts folded", len(records))
+
+    written: dict[str, Any] = {}
+
+    def files(index_before: dict[str, Any] | None, present: set[str]) -> dict[str, str | None]:
+        nonlocal written
+        written = upsert_posts(index_before, records)
+        return {
+            config.POSTS_INDEX_PATH: _dumps(written),
+            **{path: None for path in paths if path in present},
+        }
+
+    commit_index_files(
+        gh,
+        files(previous, set(paths)),
+        message=f"Fold {len(paths)} queued post(s) into posts index",
+        base=base,
+        # Another coalesce may have folded (and deleted) some of these first:
+        # upserting again is harmless, deleting a missing path is not.
+        rebase=lambda head: files(
+            load_index(gh, config.POSTS_INDEX_PATH, ref=head),
+            set(_pending_paths(gh, head)),
+        ),
+    )
+    # Counted in the index that was committed, which after a rebase is the one
+    # derived from the new head, not from `previous`.
+    return len(records), sum(not _embedded(written, _post_key(r)) for r in records)
+
+
+def commit_index_files(
+    gh: GitHubClient,
+    files: dict[str, str | None],
+    *,
+    message: str,
+    base: str | None = HEAD,
+    rebase: Callable[[str | None], dict[str, str | None]] | None = None,
+) -> None:
+    """Commit ``files`` to the index branch, retrying when another write wins.
+
+    ``base`` is the branch commit ``files`` were derived from; the default is
+    for content that does not depend on what it replaces. When another writer
+    moves the branch first the commit is retried on the new head, with
+    jittered exponential backoff, and ``rebase`` — given that head — re-derives
+    the files first, so the other write is merged rather than overwritten.
+    """
+    attempt = 1
+    while True:
+        try:
+            gh.commit_files(config.INDEX_BRANCH, files, message, base=base)
+            return
+        except RefConflict as exc:
+            metrics.count("index commit conflicts")
+            if attempt >= config.INDEX_COMMIT_ATTEMPTS:
+                raise
+            delay = min(config.INDEX_COMMIT_BACKOFF_MAX, 2.0 ** (attempt - 1))
+            delay *= random.uniform(0.5, 1.0)
+            log(f"{sorted(files)}: {exc}; retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+            if rebase is not None:
+                base = gh.get_ref_sha(config.INDEX_BRANCH)
+                files = rebase(base)
 
 
 def save_index(
-    gh: GitHubClient, path: str, index: dict[str, Any], *, message: str
-) -> Any:
-    """Persist a JSON index to the orphan index branch (dry-run aware)."""
-    return gh.commit_files(config.INDEX_BRANCH, {path: _dumps(index)}, message)
+    gh: GitHubClient,
+    path: str,
+    index: dict[str, Any],
+    *,
+    message: str,
+    base: str | None = HEAD,
+    rebase: Callable[[dict[str, Any] | None], dict[str, Any]] | None = None,
+) -> dict[str, Any]:
+    """Persist a JSON index to the orphan index branch (dry-run aware).
+
+    A compare-and-swap commit (:func:`commit_index_files`); ``rebase`` gets
+    the new head's copy of the index. Returns the index that was written.
+    """
+    written = index
+
+    def again(head: str | None) -> dict[str, str | None]:
+        nonlocal written
+        written = rebase(load_index(gh, path, ref=head))
+        return {path: _dumps(written)}
+
+    commit_index_files(
+        gh,
+        {path: _dumps(index)},
+        message=message,
+        base=base,
+        rebase=again if rebase is not None else None,
+    )
+    return written
+
+
+# --------------------------------------------------------------------------- #
+# Model migration (shadow indexes)
+# --------------------------------------------------------------------------- #
+def shadow_active() -> bool:
+    """Whether a second endpoint serves a model the live indexes do not use."""
+    return bool(
+        config.SHADOW_EMBED_MODEL
+        and config.SHADOW_EMBED_ENDPOINT
+        and config.SHADOW_EMBED_MODEL != config.EMBED_MODEL
+    )
+
+
+def shadow_path(path: str) -> str:
+    return f"{config.SHADOW_PREFIX}{path}"
+
+
+@contextmanager
+def shadow_model() -> Iterator[None]:
+    """Point the client, the builders and the loaders at the shadow model.
+
+    Everything in this module reads ``config.EMBED_*`` when called, so the
+    builders need no second code path: inside this block they build, and check
+    cached vectors against, the shadow model instead of the live one.
+    """
+    names = ("EMBED_MODEL", "EMBED_ENDPOINT", "EMBED_DIM", "EMBED_BATCH", "EMBED_TIMEOUT")
+    saved = {name: getattr(config, name) for name in names}
+    for name in names:
+        setattr(config, name, getattr(config, f"SHADOW_{name}"))
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(config, name, value)
+
+
+def coverage(index: dict[str, Any] | None) -> tuple[int, int]:
+    """``(records with a vector, records)`` of a docs or posts index."""
+    index = index or {}
+    records = index.get("chunks") if "chunks" in index else index.get("posts")
+    records = [r for r in records or [] if isinstance(r, dict)]
+    return sum(1 for r in records if r.get("embedding")), len(records)
+
+
+def _without_vectors(index: dict[str, Any] | None) -> dict[str, Any] | None:
+    if not index:
+        return index
+    posts = [
+        {k: v for k, v in p.items() if k != "embedding"}
+        for p in index.get("posts", []) or []
+        if isinstance(p, dict)
+    ]
+    return {**index, "posts": posts}
+
+
+def cutover(
+    gh: GitHubClient,
+    docs_index: dict[str, Any],
+    posts_index: dict[str, Any],
+    *,
+    live_posts: dict[str, Any] | None,
+    base: str | None,
+) -> None:
+    """Replace the live indexes with complete shadow ones, in one commit.
+
+    Both files change together, so no reader pairs a docs index from one model
+    with a posts index from the other, and the shadow copies are removed in the
+    same commit. Posts appended to the live index after ``base`` (which
+    ``live_posts`` was read at) are carried over without their vectors — those
+    are the old model's — and the next build embeds them.
+    """
+    shadow = {shadow_path(config.DOCS_INDEX_PATH), shadow_path(config.POSTS_INDEX_PATH)}
+
+    def files(head: str | None, fresh: dict[str, Any] | None) -> dict[str, str | None]:
+        posts = merge_appended(posts_index, _without_vectors(fresh), live_posts)
+        present = [p for p in _paths_under(gh, head, config.SHADOW_PREFIX) if p in shadow]
+        return {
+            config.DOCS_INDEX_PATH: _dumps(docs_index),
+            config.POSTS_INDEX_PATH: _dumps(posts),
+            **{path: None for path in present},
+        }
+
+    commit_index_files(
+        gh,
+        files(base, live_posts),
+        message=f"Cut indexes over to {posts_index.get('model')}",
+        base=base,
+        rebase=lambda head: files(head, load_index(gh, config.POSTS_INDEX_PATH, ref=head)),
+    )
@@ -0,0 +1,122 @@
+"""JSON for the index files: ``orjson`` when installed, stdlib otherwise.
+
+The posts and docs indexes are several megabytes each, parsed on every triage
+run and re-serialised on every build, and the stdlib codec is most of that
+time. ``orjson`` is several times faster in both directions, but it is an
+optional speed-up, never a dependency: without it everything here is plain
+:mod:`json`.
+
+The output must not depend on which codec wrote it — the index is committed
+to git, and a file rewritten byte-for-byte differently would show as a change
+on every build. :func:`dumps_sorted` is therefore byte-identical to
+``json.dumps(obj, separators=(",", ":"), sort_keys=True)``: non-ASCII (and
+DEL) is escaped the way the stdlib escapes it, and a document ``orjson`` would
+render differently — a float the stdlib writes with an exponent, a NaN, an
+integer past 64 bits, a non-string key, a lone surrogate, a type ``json``
+would reject — is handed to the stdlib whole. The check is one pass over the
+values, which costs far less than the encoding it replaces.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import re
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is used without it
+    orjson = None  # type: ignore[assignment]
+
+# What `json.dumps(ensure_ascii=True)` escapes that orjson writes raw.
+_UNESCAPED = re.compile("[\x7f-\U0010ffff]")
+
+
+def _escape(match: re.Match[str]) -> str:
+    code = ord(match.group())
+    if code < 0x10000:
+        return f"\\u{code:04x}"
+    code -= 0x10000
+    return f"\\u{0xD800 | (code >> 10):04x}\\u{0xDC00 | (code & 0x3FF):04x}"
+
+
+def _same_as_stdlib(obj: Any) -> bool:
+    """Whether orjson renders ``obj`` exactly as the stdlib would."""
+    stack = [obj]
+    while stack:
+        value = stack.pop()
+        kind = type(value)
+        if kind is str or kind is bool or value is None:
+            continue
+        if kind is int:
+            if not -(2**63) <= value < 2**64:
+                return False
+        elif kind is float:
+            # Python's repr switches to exponent notation outside [1e-4, 1e16);
+            # orjson does not, and neither has a NaN/Infinity both agree on.
+            magnitude = abs(value)
+            if not math.isfinite(value) or (magnitude and not 1e-4 <= magnitude < 1e16):
+                return False
+        elif kind is dict:
+            if any(type(key) is not str for key in value):
+                return False
+            stack.extend(value.values())
+        elif kind is list or kind is tuple:
+            stack.extend(value)
+        else:
+            return False
+    return True
+
+
+def _may_have_rounded(obj: Any) -> bool:
+    """Whether orjson's parse holds a float that may have been a huge integer.
+
+    orjson reads integers past 64 bits as floats instead of failing; the stdlib
+    keeps them exact. Any float that large is reparsed to be sure.
+    """
+    stack = [obj]
+    while stack:
+        value = stack.pop()
+        kind = type(value)
+        if kind is float:
+            if abs(value) >= 2**63:
+                return True
+        elif kind is dict:
+            stack.extend(value.values())
+        elif kind is list:
+            stack.extend(value)
+    return False
+
+
+def dumps_sorted(obj: Any) -> str:
+    """``json.dumps(obj, separators=(",", ":"), sort_keys=True)``, faster."""
+    if orjson is not None and _same_as_stdlib(obj):
+        try:
+            raw = orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+        except orjson.JSONEncodeError:  # lone surrogates, very deep nesting
+            pass
+        else:
+            text = raw.decode("utf-8")
+            if raw.isascii() and b"\x7f" not in raw:
+                return text
+            return _UNESCAPED.sub(_escape, text)
+    return json.dumps(obj, separators=(",", ":"), sort_keys=True)
+
+
+def loads(raw: str | bytes) -> Any:
+    """Parse JSON; raises :class:`json.JSONDecodeError` like :func:`json.loads`.
+
+    Input orjson refuses but the stdlib accepts (``NaN``, a lone surrogate
+    escape) is retried with the stdlib, as is a parse where an integer may have
+    been rounded to a float, so no file parses differently than it did before.
+    """
+    if orjson is not None:
+        try:
+            data = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass
+        else:
+            if not _may_have_rounded(data):
+                return data
+    return json.loads(raw)
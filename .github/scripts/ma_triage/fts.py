@@ -0,0 +1,213 @@
+"""SQLite FTS5 lexical index over posts, for related-post lookups.
+
+When there is no readable posts index, :func:`similar.find_related` used to
+fall back to GitHub's ``/search/issues``: 30 requests a minute shared with
+everything else on the token, no way to scope a query to a provider, and no
+score. This is the local replacement — an FTS5 table over post titles and
+bodies, ranked by ``bm25()`` with the title weighted over the body (the same
+3:1 :func:`similar.related_from_lexical` uses), and a provider table beside it
+so a provider filter is part of the query rather than a pass over the results.
+
+It lives in the :class:`~ma_triage.mirror.Mirror` file, kept current by each
+sync, so a run that has the mirror never needs the search endpoint.
+:meth:`LexicalIndex.from_posts` builds the same thing in memory from
+``posts.json`` records, which is how the scale bench measures it.
+
+Ranking is per-column BM25 summed with weights — not the BM25F of
+:func:`retrieval.bm25f_scores`, which normalises fields before saturating — so
+results are close to, not identical with, the in-Python lexical path. Scores
+are not returned: like every lexical result, a hit carries ``score=0.0`` and
+``source="lexical"`` and only ever renders collapsed.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+from typing import Any
+
+from . import config
+from .gh import log
+from .models import RelatedPost
+from .retrieval import tokenize
+
+# Title over body, as in `similar.related_from_lexical`.
+TITLE_WEIGHT = 3.0
+BODY_WEIGHT = 1.0
+# A long report is mostly log noise past its first few dozen distinct words,
+# and every extra OR term widens the candidate set FTS5 has to rank.
+MAX_QUERY_TERMS = 48
+
+DDL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+    title, body, tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS posts_fts_meta(
+    doc INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    title TEXT,
+    url TEXT,
+    state TEXT,
+    excerpt TEXT,
+    UNIQUE(kind, number)
+);
+CREATE TABLE IF NOT EXISTS posts_fts_providers(
+    key TEXT NOT NULL,
+    doc INTEGER NOT NULL,
+    PRIMARY KEY(key, doc)
+) WITHOUT ROWID;
+"""
+
+
+def match_query(title: str, body: str) -> str:
+    """An FTS5 ``MATCH`` expression: the report's distinct words, OR-ed.
+
+    Each term is quoted, so nothing in an (untrusted) report is read as FTS5
+    syntax. Underscore-joined identifiers contribute their parts only: the
+    tokenizer splits on ``_``, so the whole would just be those parts again.
+    """
+    terms: list[str] = []
+    for token in tokenize(f"{title}\n\n{body}"):
+        if "_" in token or token in terms:
+            continue
+        terms.append(token)
+        if len(terms) >= MAX_QUERY_TERMS:
+            break
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
+class LexicalIndex:
+    """FTS5 posts table plus provider keys, in a caller-owned connection."""
+
+    def __init__(self, conn: sqlite3.Connection, *, create: bool = True) -> None:
+        self.conn = conn
+        if create:
+            conn.executescript(DDL)
+
+    @classmethod
+    def from_posts(cls, posts: list[dict[str, Any]]) -> LexicalIndex:
+        """An in-memory index over ``posts.json``-shaped records."""
+        index = cls(sqlite3.connect(":memory:"))
+        index.add(posts)
+        index.conn.commit()
+        return index
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def add(self, posts: list[dict[str, Any]]) -> None:
+        """Insert or replace posts; the caller commits.
+
+        Each takes ``kind``, ``number``, ``title``, ``body`` (or ``excerpt``),
+        ``url``, ``state`` and ``providers``.
+        """
+        for post in posts:
+            kind = post.get("kind", "issue")
+            number = int(post.get("number", 0))
+            self.discard(kind, number)
+            body = str(post.get("body") or post.get("excerpt") or "")
+            cur = self.conn.execute(
+                "INSERT INTO posts_fts_meta(kind, number, title, url, state, excerpt)"
+                " VALUES (?,?,?,?,?,?)",
+                (
+                    kind,
+                    number,
+                    str(post.get("title") or ""),
+                    str(post.get("url") or ""),
+                    post.get("state"),
+                    body[: config.RELATED_EXCERPT_CHARS],
+                ),
+            )
+            doc = cur.lastrowid
+            self.conn.execute(
+                "INSERT INTO posts_fts(rowid, title, body) VALUES (?,?,?)",
+                (doc, str(post.get("title") or ""), body),
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO posts_fts_providers VALUES (?,?)",
+                [
+                    (key, doc)
+                    for key in {str(p).strip().lower() for p in post.get("providers") or []}
+                    if key
+                ],
+            )
+
+    def discard(self, kind: str, number: int) -> None:
+        row = self.conn.execute(
+            "SELECT doc FROM posts_fts_meta WHERE kind = ? AND number = ?", (kind, number)
+        ).fetchone()
+        if row is None:
+            return
+        doc = row[0]
+        self.conn.execute("DELETE FROM posts_fts WHERE rowid = ?", (doc,))
+        self.conn.execute("DELETE FROM posts_fts_providers WHERE doc = ?", (doc,))
+        self.conn.execute("DELETE FROM posts_fts_meta WHERE doc = ?", (doc,))
+
+    def search(
+        self,
+        title: str,
+        body: str,
+        *,
+        exclude_number: int,
+        exclude_kind: str = "issue",
+        provider_keys: set[str] | None = None,
+        k: int,
+    ) -> list[RelatedPost]:
+        """The ``k`` best bm25 matches, optionally limited to ``provider_keys``."""
+        query = match_query(title, body)
+        if not query:
+            return []
+        sql = (
+            "SELECT m.kind, m.number, m.title, m.url, m.state, m.excerpt"
+            " FROM posts_fts JOIN posts_fts_meta m ON m.doc = posts_fts.rowid"
+            " WHERE posts_fts MATCH ? AND NOT (m.kind = ? AND m.number = ?)"
+        )
+        params: list[Any] = [query, exclude_kind, exclude_number]
+        if provider_keys:
+            keys = sorted(provider_keys)
+            sql += (
+                " AND m.doc IN (SELECT doc FROM posts_fts_providers"
+                f" WHERE key IN ({','.join('?' * len(keys))}))"
+            )
+            params += keys
+        sql += f" ORDER BY bm25(posts_fts, {TITLE_WEIGHT}, {BODY_WEIGHT}) LIMIT ?"
+        params.append(k)
+        try:
+            rows = self.conn.execute(sql, params).fetchall()
+        except sqlite3.Error as exc:
+            log(f"Lexical index query failed: {exc}")
+            return []
+        return [
+            RelatedPost(
+                kind=kind,
+                number=int(number),
+                title=str(post_title or ""),
+                url=str(url or ""),
+                score=0.0,
+                state=state,
+                excerpt=str(excerpt or ""),
+                source="lexical",
+            )
+            for kind, number, post_title, url, state, excerpt in rows
+        ]
+
+
+def from_mirror() -> LexicalIndex | None:
+    """The mirror's lexical index, opened read-only, or ``None``.
+
+    Per-event runs only read it: they neither sync the mirror nor wait for it
+    to be current, since a day-old index still finds most related posts. Any
+    failure to open it is logged and means "no local index".
+    """
+    path = Path(config.MIRROR_PATH) if config.MIRROR_PATH else None
+    if path is None or not path.is_file():
+        return None
+    conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        conn.execute("SELECT 1 FROM posts_fts_meta LIMIT 1").fetchall()
+    except sqlite3.Error as exc:
+        log(f"Mirror lexical index unavailable: {exc}")
+        conn.close()
+        return None
+    return LexicalIndex(conn, create=False)
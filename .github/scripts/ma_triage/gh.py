@@ -16,12 +16,20 @@ from typing import Any
 
 import requests
 
-from . import config
+from . import config, metrics
 
 API_ROOT = "https://api.github.com"
 GRAPHQL_URL = "https://api.github.com/graphql"
 RAW_ROOT = "https://raw.githubusercontent.com"
 
+# `commit_files(base=HEAD)`: build on whatever the branch points at when the
+# commit is made, for content that does not depend on what it replaces.
+HEAD = "HEAD"
+
+
+class RefConflict(Exception):
+    """The branch moved after the commit a write was based on."""
+
 
 def log(msg: str) -> None:
     """Print to stderr so it shows up in the Actions log immediately."""
@@ -51,6 +59,31 @@ def error(msg: str) -> None:
     summary(f"::error::{msg}")
 
 
+def _rest_actor(author: Any) -> dict[str, Any]:
+    """A GraphQL ``author`` as the REST ``user`` object.
+
+    GraphQL drops the ``[bot]`` suffix REST puts on App logins; it is restored
+    so login comparisons (``BOT_LOGIN``, the legacy logins) work on either.
+    """
+    if not isinstance(author, dict):
+        return {}
+    login = str(author.get("login") or "")
+    if author.get("__typename") == "Bot":
+        return {"login": login if login.endswith("[bot]") else f"{login}[bot]", "type": "Bot"}
+    return {"login": login, "type": "User"}
+
+
+def _rest_comment(node: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "id": node.get("databaseId"),
+        "node_id": node.get("id"),
+        "body": node.get("body") or "",
+        "created_at": node.get("createdAt"),
+        "author_association": node.get("authorAssociation"),
+        "user": _rest_actor(node.get("author")),
+    }
+
+
 class GitHubClient:
     """Minimal GitHub API wrapper with retries and dry-run support."""
 
@@ -87,6 +120,7 @@ class GitHubClient:
                 resp = self._session.request(
                     method, url, timeout=self.timeout, **kwargs
                 )
+                metrics.http(method, url, len(resp.content))
                 # Retry on transient server errors / secondary rate limits.
                 if resp.status_code in (429, 500, 502, 503, 504):
                     raise requests.HTTPError(f"{resp.status_code}", response=resp)
@@ -151,6 +185,29 @@ class GitHubClient:
             page += 1
         return comments
 
+    def list_repo_comments(
+        self, *, since: str | None = None, limit: int = 1000
+    ) -> list[dict[str, Any]]:
+        """Issue comments across the repo updated at/after ``since``, oldest first."""
+        comments: list[dict[str, Any]] = []
+        params: dict[str, Any] = {"per_page": 100, "sort": "updated", "direction": "asc"}
+        if since:
+            params["since"] = since
+        page = 1
+        while len(comments) < limit:
+            batch = self._rest(
+                "GET",
+                f"/repos/{self.repo}/issues/comments",
+                params={**params, "page": page},
+            )
+            if not batch:
+                break
+            comments.extend(batch)
+            if len(batch) < 100:
+                break
+            page += 1
+        return comments[:limit]
+
     def list_events(self, number: int) -> list[dict[str, Any]]:
         return self._rest(
             "GET",
@@ -181,6 +238,15 @@ class GitHubClient:
             page += 1
         return names
 
+    def list_issue_labels(self, number: int) -> set[str]:
+        """Label names currently on one issue."""
+        batch = self._rest(
+            "GET",
+            f"/repos/{self.repo}/issues/{number}/labels",
+            params={"per_page": 100},
+        )
+        return {lbl["name"] for lbl in batch or [] if isinstance(lbl, dict)}
+
     def list_issues_with_label(self, label: str, *, state: str = "open") -> list[dict[str, Any]]:
         issues: list[dict[str, Any]] = []
         page = 1
@@ -259,22 +325,33 @@ class GitHubClient:
         return None
 
     def list_recent_issues(
-        self, *, state: str = "all", limit: int = 500
+        self,
+        *,
+        state: str = "all",
+        limit: int = 500,
+        since: str | None = None,
+        oldest_first: bool = False,
     ) -> list[dict[str, Any]]:
-        """Recent issues (newest-updated first), excluding pull requests."""
+        """Recent issues (newest-updated first), excluding pull requests.
+
+        ``since`` keeps only issues updated at/after it; ``oldest_first``
+        reverses the order, so a capped listing can resume where it stopped.
+        """
         out: list[dict[str, Any]] = []
+        params: dict[str, Any] = {
+            "state": state,
+            "per_page": 100,
+            "sort": "updated",
+            "direction": "asc" if oldest_first else "desc",
+        }
+        if since:
+            params["since"] = since
         page = 1
         while len(out) < limit:
             batch = self._rest(
                 "GET",
                 f"/repos/{self.repo}/issues",
-                params={
-                    "state": state,
-                    "per_page": 100,
-                    "page": page,
-                    "sort": "updated",
-                    "direction": "desc",
-                },
+                params={**params, "page": page},
             )
             if not batch:
                 break
@@ -289,8 +366,179 @@ class GitHubClient:
             page += 1
         return out
 
-    def list_discussions(self, *, limit: int = 500) -> list[dict[str, Any]]:
-        """Recent discussions via GraphQL (empty list if disabled/unavailable)."""
+    def get_issue_snapshot(self, number: int) -> dict[str, Any] | None:
+        """Issue, its comments and the repo's label names in one GraphQL query.
+
+        Triage otherwise reads the same issue three ways over REST (the issue,
+        every page of its comments, every page of the repo's labels). The
+        result is REST-shaped — ``{issue, comments, labels}`` with the issue and
+        comments carrying the REST field names the rest of the bot reads — so
+        callers need not know which API produced it. A connection with more
+        than one page falls back to the REST listing for that part. Returns
+        ``None`` when the query fails or the number is not an issue (e.g. a
+        pull request), so callers fall back to REST entirely.
+        """
+        owner, name = self.repo.split("/", 1)
+        query = """
+        query($o:String!,$n:String!,$num:Int!){
+          repository(owner:$o,name:$n){
+            labels(first:100){ pageInfo{ hasNextPage } nodes{ name } }
+            issue(number:$num){
+              number title body state createdAt
+              author { __typename login }
+              labels(first:100){ nodes{ name } }
+              comments(first:100){
+                pageInfo{ hasNextPage }
+                nodes{
+                  databaseId id body createdAt authorAssociation
+                  author { __typename login }
+                }
+              }
+            }
+          }
+        }
+        """
+        try:
+            data = self.graphql(query, {"o": owner, "n": name, "num": number})
+        except Exception as exc:  # noqa: BLE001
+            log(f"Issue #{number} snapshot failed: {exc}")
+            return None
+        repo = (data.get("data") or {}).get("repository") or {}
+        node = repo.get("issue")
+        if not isinstance(node, dict):
+            return None
+
+        block = node.get("comments") or {}
+        if (block.get("pageInfo") or {}).get("hasNextPage"):
+            comments = self.list_comments(number)
+        else:
+            comments = [_rest_comment(c) for c in block.get("nodes") or [] if isinstance(c, dict)]
+        repo_labels = repo.get("labels") or {}
+        if (repo_labels.get("pageInfo") or {}).get("hasNextPage"):
+            labels = self.list_labels()
+        else:
+            labels = {n["name"] for n in repo_labels.get("nodes") or [] if isinstance(n, dict)}
+        return {
+            "issue": {
+                "number": node.get("number"),
+                "title": node.get("title") or "",
+                "body": node.get("body") or "",
+                "state": str(node.get("state") or "").lower(),
+                "created_at": node.get("createdAt"),
+                "user": _rest_actor(node.get("author")),
+                "labels": [
+                    {"name": n["name"]}
+                    for n in (node.get("labels") or {}).get("nodes") or []
+                    if isinstance(n, dict)
+                ],
+            },
+            "comments": comments,
+            "labels": labels,
+        }
+
+    def list_labelled_issues(self, label: str) -> list[dict[str, Any]] | None:
+        """Open issues carrying ``label``, REST-shaped, via paged GraphQL.
+
+        Each issue also has ``updated_at``, which the sweep compares against its
+        checkpoint. Comments are not included: :meth:`get_recent_comments`
+        fetches them for just the issues that need them. ``None`` when the
+        query fails, so the caller can list over REST instead.
+        """
+        owner, name = self.repo.split("/", 1)
+        query = """
+        query($o:String!,$n:String!,$l:[String!],$c:String){
+          repository(owner:$o,name:$n){
+            issues(first:100, after:$c, labels:$l, states:OPEN){
+              pageInfo{ hasNextPage endCursor }
+              nodes{
+                number title createdAt updatedAt
+                author { __typename login }
+                labels(first:50){ nodes{ name } }
+              }
+            }
+          }
+        }
+        """
+        out: list[dict[str, Any]] = []
+        cursor: str | None = None
+        while True:
+            try:
+                data = self.graphql(query, {"o": owner, "n": name, "l": [label], "c": cursor})
+            except Exception as exc:  # noqa: BLE001
+                log(f"Labelled issue listing failed: {exc}")
+                return None
+            repo = (data.get("data") or {}).get("repository")
+            if not isinstance(repo, dict):
+                return None
+            block = repo.get("issues") or {}
+            for node in block.get("nodes") or []:
+                if not isinstance(node, dict):
+                    continue
+                out.append(
+                    {
+                        "number": node.get("number"),
+                        "title": node.get("title") or "",
+                        "created_at": node.get("createdAt"),
+                        "updated_at": node.get("updatedAt"),
+                        "user": _rest_actor(node.get("author")),
+                        "labels": [
+                            {"name": n["name"]}
+                            for n in (node.get("labels") or {}).get("nodes") or []
+                            if isinstance(n, dict)
+                        ],
+                    }
+                )
+            page_info = block.get("pageInfo") or {}
+            if not page_info.get("hasNextPage"):
+                return out
+            cursor = page_info.get("endCursor")
+
+    def get_recent_comments(
+        self, numbers: list[int], *, last: int = 50, batch: int = 25
+    ) -> dict[int, dict[str, Any]]:
+        """The last ``last`` comments of many issues, ``batch`` issues per query.
+
+        Returns ``{number: {"comments": [...], "total": n}}`` with REST-shaped
+        comments, oldest first; ``total`` counts every comment, so a caller can
+        tell when older ones were left out. An issue whose batch failed is
+        missing from the result.
+        """
+        owner, name = self.repo.split("/", 1)
+        fields = (
+            "comments(last:%d){ totalCount nodes{ databaseId id body createdAt"
+            " authorAssociation author { __typename login } } }" % last
+        )
+        out: dict[int, dict[str, Any]] = {}
+        for start in range(0, len(numbers), batch):
+            chunk = [int(n) for n in numbers[start : start + batch]]
+            aliases = " ".join(f"i{n}: issue(number:{n}){{ {fields} }}" for n in chunk)
+            query = f"query($o:String!,$n:String!){{ repository(owner:$o,name:$n){{ {aliases} }} }}"
+            try:
+                data = self.graphql(query, {"o": owner, "n": name})
+            except Exception as exc:  # noqa: BLE001
+                log(f"Comment batch failed: {exc}")
+                continue
+            repo = (data.get("data") or {}).get("repository") or {}
+            for n in chunk:
+                block = (repo.get(f"i{n}") or {}).get("comments")
+                if not isinstance(block, dict):
+                    continue
+                out[n] = {
+                    "comments": [
+                        _rest_comment(c) for c in block.get("nodes") or [] if isinstance(c, dict)
+                    ],
+                    "total": int(block.get("totalCount") or 0),
+                }
+        return out
+
+    def list_discussions(
+        self, *, limit: int = 500, since: str | None = None
+    ) -> list[dict[str, Any]]:
+        """Recent discussions via GraphQL (empty list if disabled/unavailable).
+
+        Newest-updated first; with ``since``, paging stops at the first
+        discussion updated before it.
+        """
         owner, name = self.repo.split("/", 1)
         query = """
         query($o:String!,$n:String!,$c:String){
@@ -298,7 +546,10 @@ class GitHubClient:
             discussions(first:100, after:$c,
               orderBy:{field:UPDATED_AT, direction:DESC}){
               pageInfo{ hasNextPage endCursor }
-              nodes{ number title body url updatedAt closed category { name } }
+              nodes{
+                number title body url createdAt updatedAt closed
+                author { __typename login } category { name }
+              }
             }
           }
         }
@@ -313,10 +564,11 @@ class GitHubClient:
                 break
             repo = (data.get("data") or {}).get("repository") or {}
             disc = repo.get("discussions") or {}
-            nodes = disc.get("nodes") or []
-            out.extend(n for n in nodes if isinstance(n, dict))
+            nodes = [n for n in disc.get("nodes") or [] if isinstance(n, dict)]
+            fresh = [n for n in nodes if not since or (n.get("updatedAt") or "") >= since]
+            out.extend(fresh)
             page_info = disc.get("pageInfo") or {}
-            if not page_info.get("hasNextPage") or not nodes:
+            if not page_info.get("hasNextPage") or not nodes or len(fresh) < len(nodes):
                 break
             cursor = page_info.get("endCursor")
         return out[:limit]
@@ -467,6 +719,17 @@ class GitHubClient:
 
         return self._mutate(f"remove label '{label}' from #{number}", _do)
 
+    def set_labels(self, number: int, labels: list[str]) -> Any:
+        """Replace the issue's labels with exactly ``labels`` (one request)."""
+        return self._mutate(
+            f"set labels of #{number} to {labels}",
+            lambda: self._rest(
+                "PUT",
+                f"/repos/{self.repo}/issues/{number}/labels",
+                json={"labels": labels},
+            ),
+        )
+
     def add_assignees(self, number: int, assignees: list[str]) -> Any:
         if not assignees:
             return None
@@ -539,23 +802,31 @@ class GitHubClient:
     def commit_files(
         self,
         branch: str,
-        files: dict[str, str],
+        files: dict[str, str | None],
         message: str,
         *,
         repo: str | None = None,
+        base: str | None = HEAD,
     ) -> Any:
         """Commit text files to ``branch`` via the Git Data API (dry-run aware).
 
         Creates the branch as a root (orphan) commit if it does not yet exist.
         Used to persist the RAG indexes on the ``triage-index`` branch without
-        touching ``main``. Returns the new commit SHA, or ``None`` in dry-run.
+        touching ``main``. A ``None`` content deletes that path. Returns the new
+        commit SHA, or ``None`` in dry-run.
+
+        The ref update is never forced. ``base`` is the commit ``files`` were
+        derived from — ``None`` for a branch that did not exist yet, or
+        :data:`HEAD` for the branch's head at commit time — and
+        :class:`RefConflict` is raised when the branch has moved past it, so a
+        concurrent writer's commit is never silently replaced.
         """
         repo = repo or self.repo
         if not files:
             return None
 
         def _do() -> Any:
-            base_sha = self.get_ref_sha(branch, repo=repo)
+            base_sha = self.get_ref_sha(branch, repo=repo) if base == HEAD else base
             base_tree: str | None = None
             parents: list[str] = []
             if base_sha:
@@ -566,6 +837,8 @@ class GitHubClient:
                 parents = [base_sha]
             tree_items = [
                 {"path": path, "mode": "100644", "type": "blob", "content": content}
+                if content is not None
+                else {"path": path, "mode": "100644", "type": "blob", "sha": None}
                 for path, content in files.items()
             ]
             tree_body: dict[str, Any] = {"tree": tree_items}
@@ -579,18 +852,26 @@ class GitHubClient:
                 json={"message": message, "tree": new_tree_sha, "parents": parents},
             )
             new_commit_sha = commit_obj["sha"]
-            if base_sha:
-                self._rest(
-                    "PATCH",
-                    f"/repos/{repo}/git/refs/heads/{branch}",
-                    json={"sha": new_commit_sha, "force": True},
-                )
-            else:
-                self._rest(
-                    "POST",
-                    f"/repos/{repo}/git/refs",
-                    json={"ref": f"refs/heads/{branch}", "sha": new_commit_sha},
-                )
+            try:
+                if base_sha:
+                    # Fast-forward only: GitHub answers 422 when the head is no
+                    # longer an ancestor of the new commit.
+                    self._rest(
+                        "PATCH",
+                        f"/repos/{repo}/git/refs/heads/{branch}",
+                        json={"sha": new_commit_sha, "force": False},
+                    )
+                else:
+                    # 422 here is "Reference already exists".
+                    self._rest(
+                        "POST",
+                        f"/repos/{repo}/git/refs",
+                        json={"ref": f"refs/heads/{branch}", "sha": new_commit_sha},
+                    )
+            except requests.HTTPError as exc:
+                if exc.response is not None and exc.response.status_code == 422:
+                    raise RefConflict(f"{repo}@{branch} moved past {base_sha}") from exc
+                raise
             return new_commit_sha
 
         return self._mutate(
@@ -0,0 +1,308 @@
+"""Incremental pull parser for untrusted JSON attachments.
+
+``json.loads`` has to hold the whole document — and the caller then needs a
+second, recursive walk — before a hostile file can be rejected.
+:class:`StreamReader` instead decodes text chunk by chunk while the caller pulls
+object keys and array elements one at a time, enforcing nesting depth, total
+key count and string length as it reads. An oversized or malicious payload
+therefore fails at the first offending token, and memory stays bounded by the
+values the caller actually asks for.
+
+For each value the caller decides to either :meth:`~StreamReader.read_value`
+it (built with the C ``json`` decoder once its extent is known), walk into it
+(:meth:`~StreamReader.start_object` / :meth:`~StreamReader.start_array`), or
+:meth:`~StreamReader.skip_value` it. Skipped subtrees are tokenized and checked
+as strictly as walked ones — matched brackets, keys, separators, scalars — but
+nothing in them is built, which keeps the bulk of a report the bot does not use
+cheap to read past without letting a malformed document through.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from collections.abc import Iterable, Iterator
+from json.decoder import JSONDecodeError, scanstring
+from typing import Any
+
+_WS = re.compile(r"[ \t\n\r]*")
+_CLOSE = {"{": "}", "[": "]"}
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(\.\d+)?([eE][-+]?\d+)?")
+_LITERALS = (("true", True), ("false", False), ("null", None))
+# Longest number token accepted. The lexer also keeps this much look-ahead
+# buffered so a number or literal is never split across two chunks.
+_MAX_NUMBER_CHARS = 100
+_LOOKAHEAD = 128
+
+
+class JSONStreamError(ValueError):
+    """Malformed JSON, invalid UTF-8, or a broken size limit."""
+
+
+class StreamReader:
+    """Pull parser over an iterable of ``bytes``/``str`` chunks.
+
+    ``max_depth`` counts open containers, ``max_keys`` object keys across the
+    whole document (walked or skipped), and ``max_string`` the decoded length
+    of any single string, key or value.
+    """
+
+    def __init__(
+        self,
+        chunks: Iterable[bytes | str],
+        *,
+        max_depth: int,
+        max_keys: int,
+        max_string: int,
+    ) -> None:
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._max_depth = max_depth
+        self._max_keys = max_keys
+        self._max_string = max_string
+        self._buf = ""
+        self._pos = 0
+        # Start of a container being scanned; the buffer is kept from here.
+        self._mark: int | None = None
+        self._eof = False
+        self._depth = 0
+        self._keys = 0
+
+    # ------------------------------------------------------------------ #
+    # Buffer
+    # ------------------------------------------------------------------ #
+    def _fill(self) -> bool:
+        """Append the next chunk to the buffer; ``False`` at end of input."""
+        if self._eof:
+            return False
+        chunk = next(self._chunks, None)
+        try:
+            if chunk is None:
+                text = self._decoder.decode(b"", final=True)
+                self._eof = True
+            elif isinstance(chunk, str):
+                text = chunk
+            else:
+                text = self._decoder.decode(chunk)
+        except UnicodeDecodeError as exc:
+            raise JSONStreamError(f"not valid UTF-8: {exc}") from exc
+        keep = self._pos if self._mark is None else self._mark
+        self._buf = self._buf[keep:] + text
+        self._pos -= keep
+        if self._mark is not None:
+            self._mark = 0
+        return True
+
+    def _peek(self) -> str | None:
+        """Next non-whitespace character (not consumed), ``None`` at the end."""
+        while True:
+            self._pos = _WS.match(self._buf, self._pos).end()
+            if len(self._buf) - self._pos >= _LOOKAHEAD or (
+                self._eof and self._pos < len(self._buf)
+            ):
+                return self._buf[self._pos]
+            if not self._fill():
+                return None
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise JSONStreamError(f"expected {char!r} at offset {self._pos}")
+        self._pos += 1
+
+    def _string(self) -> str:
+        """Decode the string starting at the current ``"``."""
+        while True:
+            try:
+                value, end = scanstring(self._buf, self._pos + 1, True)
+            except JSONDecodeError as exc:
+                # Every character costs at most six escaped bytes, so a longer
+                # unterminated run can never fit the limit.
+                if len(self._buf) - self._pos > self._max_string * 6 + 2:
+                    raise JSONStreamError("string too long") from exc
+                if not self._fill():
+                    raise JSONStreamError(f"invalid string: {exc.msg}") from exc
+                continue
+            if len(value) > self._max_string:
+                raise JSONStreamError("string too long")
+            self._pos = end
+            return value
+
+    def _scalar(self) -> Any:
+        match = _NUMBER.match(self._buf, self._pos)
+        if match:
+            text = match.group(0)
+            if len(text) > _MAX_NUMBER_CHARS:
+                raise JSONStreamError("number too long")
+            self._pos = match.end()
+            return float(text) if match.group(1) or match.group(2) else int(text)
+        for word, value in _LITERALS:
+            if self._buf.startswith(word, self._pos):
+                self._pos += len(word)
+                return value
+        raise JSONStreamError(
+            f"unexpected character {self._buf[self._pos]!r} at offset {self._pos}"
+        )
+
+    def _open(self) -> None:
+        if self._depth >= self._max_depth:
+            raise JSONStreamError("JSON nesting too deep")
+        self._depth += 1
+        self._pos += 1
+
+    def _scan_container(self) -> tuple[int, int]:
+        """Find the extent of the container at the current position.
+
+        Validates the container's grammar and enforces the depth, key and string
+        limits without building anything; the buffer is retained from the
+        opening bracket so the caller can slice it. Returns ``(start, end)``
+        offsets into the buffer.
+        """
+        self._mark = self._pos
+        stack: list[str] = []
+        # "value", "key", "colon", "next" (',' or a close) or "open" (just
+        # opened: a close, or the first key/element).
+        expect = "value"
+        try:
+            while True:
+                char = self._peek()
+                if char is None:
+                    raise JSONStreamError("unexpected end of document")
+                if char in "}]" and expect in ("next", "open"):
+                    if char != _CLOSE[stack[-1]]:
+                        raise JSONStreamError(f"mismatched {char!r} at offset {self._pos}")
+                    stack.pop()
+                    self._pos += 1
+                    self._depth -= 1
+                    if not stack:
+                        return self._mark, self._pos
+                    expect = "next"
+                elif expect == "next":
+                    if char != ",":
+                        raise JSONStreamError(f"expected ',' at offset {self._pos}")
+                    self._pos += 1
+                    expect = "key" if stack[-1] == "{" else "value"
+                elif expect == "colon":
+                    self._expect(":")
+                    expect = "value"
+                elif expect == "key" or (expect == "open" and stack[-1] == "{"):
+                    if char != '"':
+                        raise JSONStreamError(f"expected an object key at offset {self._pos}")
+                    self._string()
+                    self._keys += 1
+                    if self._keys > self._max_keys:
+                        raise JSONStreamError(f"more than {self._max_keys} object keys")
+                    expect = "colon"
+                elif char in "{[":
+                    self._open()
+                    stack.append(char)
+                    expect = "open"
+                else:
+                    if char == '"':
+                        self._string()
+                    else:
+                        self._scalar()
+                    expect = "next"
+        finally:
+            self._mark = None
+
+    # ------------------------------------------------------------------ #
+    # Caller API
+    # ------------------------------------------------------------------ #
+    def start_object(self) -> bool:
+        """Enter the next value if it is an object (then iterate :meth:`keys`)."""
+        if self._peek() != "{":
+            return False
+        self._open()
+        return True
+
+    def start_array(self) -> bool:
+        """Enter the next value if it is an array (then iterate :meth:`items`)."""
+        if self._peek() != "[":
+            return False
+        self._open()
+        return True
+
+    def keys(self) -> Iterator[str]:
+        """Keys of the object just entered.
+
+        The caller must consume each key's value (read, skip or walk it) before
+        asking for the next key.
+        """
+        first = True
+        while True:
+            char = self._peek()
+            if char == "}" and first:
+                break
+            if not first:
+                if char == "}":
+                    break
+                if char != ",":
+                    raise JSONStreamError(f"expected ',' or '}}' at offset {self._pos}")
+                self._pos += 1
+                char = self._peek()
+            if char != '"':
+                raise JSONStreamError(f"expected an object key at offset {self._pos}")
+            key = self._string()
+            self._keys += 1
+            if self._keys > self._max_keys:
+                raise JSONStreamError(f"more than {self._max_keys} object keys")
+            self._expect(":")
+            first = False
+            yield key
+        self._pos += 1
+        self._depth -= 1
+
+    def items(self) -> Iterator[None]:
+        """One step per element of the array just entered.
+
+        The caller must consume the element (read, skip or walk it) before
+        advancing.
+        """
+        first = True
+        while True:
+            char = self._peek()
+            if char == "]":
+                break
+            if not first:
+                if char != ",":
+                    raise JSONStreamError(f"expected ',' or ']' at offset {self._pos}")
+                self._pos += 1
+            first = False
+            yield
+        self._pos += 1
+        self._depth -= 1
+
+    def read_value(self) -> Any:
+        """Build the next value into Python objects."""
+        char = self._peek()
+        if char is None:
+            raise JSONStreamError("unexpected end of document")
+        if char == '"':
+            return self._string()
+        if char not in "{[":
+            return self._scalar()
+        start, end = self._scan_container()
+        try:
+            # Limits were checked by the scan; depth is bounded, so the C
+            # decoder's recursion is too.
+            return json.loads(self._buf[start:end])
+        except JSONDecodeError as exc:
+            raise JSONStreamError(f"not valid JSON: {exc}") from exc
+
+    def skip_value(self) -> bool:
+        """Consume the next value without building it; return its truthiness."""
+        char = self._peek()
+        if char is None:
+            raise JSONStreamError("unexpected end of document")
+        if char == '"':
+            return bool(self._string())
+        if char not in "{[":
+            return bool(self._scalar())
+        start, end = self._scan_container()
+        return bool(self._buf[start + 1 : end - 1].strip())
+
+    def finish(self) -> None:
+        """Require that only whitespace follows the top-level value."""
+        if self._peek() is not None:
+            raise JSONStreamError(f"extra data at offset {self._pos}")
@@ -0,0 +1,174 @@
+"""Semantic cache of docs-judge verdicts, kept on the ``triage-index`` branch.
+
+Support questions repeat: the same provider login failure, the same player that
+does not show up. When a new question embeds within a tight cosine radius of
+one the judge already answered, *and* retrieval returns mostly the same
+unchanged doc sections, the earlier :class:`DocAnswer` is reused instead of
+paying another judge call.
+
+Triage jobs cannot write the index branch, so each fresh verdict travels in the
+issue's sticky state (:func:`entry`) and the nightly index build collects them
+(:func:`harvest`). Only the bot's own stickies are read: a cached answer is
+replayed onto other people's issues, so a comment anyone could forge must never
+become one. Entries are dropped once a cited section changes or disappears.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Any
+
+from . import comment, config
+from .embeddings import dim_matches, load_index
+from .gh import GitHubClient, log
+from .models import DocAnswer, DocChunk, DocHit
+from .retrieval import VectorFormatError, cosine, decode_vec, encode_vec
+
+_SCHEMA = 1
+
+
+def entry(
+    query_vec: list[float], doc_hits: list[DocHit], answer: DocAnswer
+) -> dict[str, Any]:
+    """The record of a fresh verdict, embedded in the sticky state for harvest."""
+    return {
+        "vec": encode_vec(query_vec),
+        "hits": [[hit.chunk.id, hit.chunk.sha] for hit in doc_hits],
+        "answer": asdict(answer),
+    }
+
+
+def load(gh: GitHubClient) -> list[dict[str, Any]]:
+    """Cached entries usable with the current models, or ``[]``."""
+    index = load_index(gh, config.JUDGE_CACHE_PATH)
+    if not index:
+        return []
+    if (
+        index.get("schema") != _SCHEMA
+        or index.get("model") != config.EMBED_MODEL
+        or index.get("answer_model") != config.ANSWER_MODEL
+        or not dim_matches(index)
+    ):
+        log("Judge cache schema/model mismatch; ignoring cache")
+        return []
+    entries = index.get("entries")
+    return [e for e in entries if isinstance(e, dict)] if isinstance(entries, list) else []
+
+
+def lookup(
+    query_vec: list[float], doc_hits: list[DocHit], entries: list[dict[str, Any]]
+) -> DocAnswer | None:
+    """The closest cached verdict that still fits this retrieval, if any."""
+    current = {hit.chunk.id: hit.chunk.sha for hit in doc_hits}
+    best: tuple[float, DocAnswer] | None = None
+    for cached in entries:
+        try:
+            vec = decode_vec(cached.get("vec"))
+            hits = {str(cid): str(sha) for cid, sha in cached.get("hits") or []}
+            answer = DocAnswer(**cached["answer"])
+        except (KeyError, TypeError, ValueError, VectorFormatError):
+            continue
+        score = cosine(query_vec, vec)
+        if score < config.JUDGE_CACHE_MIN_COSINE or (best and score <= best[0]):
+            continue
+        # The cited sections must be retrieved now, with the text they had.
+        if any(current.get(cid) != hits.get(cid) for cid in answer.cited_sections):
+            continue
+        overlap = len(current.keys() & hits.keys()) / len(current.keys() | hits.keys())
+        if overlap < config.JUDGE_CACHE_MIN_OVERLAP:
+            continue
+        best = (score, answer)
+    return best[1] if best else None
+
+
+# --------------------------------------------------------------------------- #
+# Nightly harvest (index build)
+# --------------------------------------------------------------------------- #
+def harvest(
+    gh: GitHubClient, chunks: list[DocChunk]
+) -> tuple[dict[str, Any], bool, dict[str, int]]:
+    """Fold verdicts from stickies updated since the last harvest into the cache.
+
+    Returns ``(index, changed, stats)``; ``stats`` counts the judge lookups in
+    the harvested runs (``lookups``, ``hits``) and the entries ``added``.
+    """
+    previous = load_index(gh, config.JUDGE_CACHE_PATH) or {}
+    entries = load(gh) if previous else []
+    if config.BOT_LOGIN:
+        comments = gh.list_repo_comments(since=previous.get("harvested_at"))
+    else:
+        # Without the App's login there is no telling its stickies from forgeries.
+        log("TRIAGE_BOT_LOGIN is unset; not harvesting judge verdicts")
+        comments = []
+
+    stats = {"lookups": 0, "hits": 0, "added": 0}
+    by_number = {e.get("number"): e for e in entries}
+    for c in comments:
+        number = comment.issue_number(c)
+        if number is None or not comment.is_app_sticky(c):
+            continue
+        state = comment.parse_state(c.get("body"))
+        rag_state = state.get("rag") if isinstance(state.get("rag"), dict) else {}
+        if rag_state.get("judge_cached"):
+            stats["lookups"] += 1
+            stats["hits"] += 1
+        elif rag_state.get("judge_conf") is not None:
+            stats["lookups"] += 1
+        record = _valid_record(state.get("judge"))
+        if record is None:
+            continue
+        by_number[number] = {
+            "number": number,
+            "at": c.get("updated_at") or "",
+            **record,
+        }
+        stats["added"] += 1
+
+    # Keep only entries whose sections are still in the docs index, unchanged.
+    current = {chunk.id: chunk.sha for chunk in chunks}
+    kept = [
+        e
+        for e in by_number.values()
+        if e.get("hits")
+        and all(
+            isinstance(pair, list) and len(pair) == 2 and current.get(pair[0]) == pair[1]
+            for pair in e["hits"]
+        )
+    ]
+    kept.sort(key=lambda e: str(e.get("at") or ""), reverse=True)
+    kept = kept[: config.JUDGE_CACHE_MAX_ENTRIES]
+    index = {
+        "schema": _SCHEMA,
+        "model": config.EMBED_MODEL,
+        "answer_model": config.ANSWER_MODEL,
+        "dim": len(decode_vec(kept[0]["vec"])) if kept else config.EMBED_DIM,
+        # Oldest first, so a scan cut short by its limit resumes where it
+        # stopped. `since` is inclusive: the last comment is simply re-read.
+        "harvested_at": (
+            comments[-1].get("updated_at") if comments else previous.get("harvested_at")
+        )
+        or datetime.now(timezone.utc).isoformat(),
+        "entries": kept,
+    }
+    # A scan that found nothing new still moves `harvested_at` forward, so the
+    # next run does not page through the same comments again.
+    changed = kept != entries or index["harvested_at"] != previous.get("harvested_at")
+    return index, changed, stats
+
+
+def _valid_record(record: Any) -> dict[str, Any] | None:
+    """``record`` if it is a well-formed :func:`entry`, else ``None``."""
+    if not isinstance(record, dict):
+        return None
+    try:
+        vec = decode_vec(record.get("vec"))
+        DocAnswer(**record["answer"])
+    except (KeyError, TypeError, ValueError, VectorFormatError):
+        return None
+    hits = record.get("hits")
+    if not vec or not isinstance(hits, list):
+        return None
+    if config.EMBED_DIM > 0 and len(vec) != config.EMBED_DIM:
+        return None
+    return {"vec": record["vec"], "hits": hits, "answer": record["answer"]}
@@ -0,0 +1,299 @@
+"""Learned gate in front of the docs judge.
+
+Most judge calls end LOW: retrieval found *something*, but nothing that answers
+the question. How decisive retrieval was — the best dense score and its margin,
+how far the BM25 leader is ahead, whether both legs agree on the top chunk —
+predicts that outcome well, so a small logistic model over those features
+skips the calls whose verdict is near-certain to be discarded. A skipped call
+is treated as a LOW verdict; related posts are unaffected.
+
+Training (``python -m ma_triage train-gate``, nightly) reads the features and
+verdicts every run records in its sticky state, fits the model on four fifths
+of the issues and picks the skip threshold on them so that at least
+``JUDGE_GATE_MIN_PRECISION`` of skipped calls were LOW. The precision and
+recall of skipping are then measured on the held-out fifth, and the weights are
+committed to ``judge_gate.json`` on the index branch only when that precision
+holds. Two features are cosines in the embedding model's space, so each run's
+features are stamped with ``EMBED_MODEL``: training reads only the current
+model's runs, and a gate trained under another model is not loaded.
+
+A skipped call has no verdict to learn from, so the gate would otherwise only
+ever be retrained on calls it let through. Every
+``JUDGE_GATE_EXPLORE_EVERY``-th issue it would skip is judged anyway; those
+runs keep the training data honest and give the live precision reported by
+the next training run.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from . import comment, config
+from .embeddings import load_index
+from .gh import GitHubClient, log
+from .models import DocHit
+from .retrieval import cosine, tokenize
+
+_SCHEMA = 1
+FEATURES = (
+    "dense_top",
+    "dense_margin",
+    "bm25_top",
+    "bm25_lead",
+    "rrf_margin",
+    "agree",
+    "provider_match",
+    "query_len",
+)
+
+
+# --------------------------------------------------------------------------- #
+# Features
+# --------------------------------------------------------------------------- #
+def features(
+    query_vec: list[float],
+    query_text: str,
+    doc_hits: list[DocHit],
+    stats: dict[str, float],
+    *,
+    provider_match: bool,
+) -> dict[str, float]:
+    """Retrieval-strength features of one run (``stats`` from ``retrieve_docs``)."""
+    dense = sorted((cosine(query_vec, hit.chunk.embedding) for hit in doc_hits), reverse=True)
+    dense += [0.0, 0.0]
+    bm25_top = stats.get("bm25_top", 0.0)
+    bm25_second = stats.get("bm25_second", 0.0)
+    values = {
+        "dense_top": dense[0],
+        "dense_margin": dense[0] - dense[1],
+        "bm25_top": math.log1p(bm25_top),
+        "bm25_lead": (bm25_top - bm25_second) / bm25_top if bm25_top > 0 else 0.0,
+        # In rank units: 1.0 is the gap between ranks 1 and 2 of a single leg.
+        "rrf_margin": (stats.get("rrf_top", 0.0) - stats.get("rrf_second", 0.0))
+        * config.RRF_K**2,
+        "agree": stats.get("agree", 0.0),
+        "provider_match": float(provider_match),
+        "query_len": math.log1p(len(tokenize(query_text))),
+    }
+    return {name: round(value, 4) for name, value in values.items()}
+
+
+# --------------------------------------------------------------------------- #
+# Model
+# --------------------------------------------------------------------------- #
+class Gate:
+    """A trained logistic gate: skip the judge below ``threshold``."""
+
+    def __init__(self, model: dict[str, Any]) -> None:
+        self.weights = [float(model["weights"][name]) for name in FEATURES]
+        self.mean = [float(model["mean"][name]) for name in FEATURES]
+        self.scale = [float(model["scale"][name]) or 1.0 for name in FEATURES]
+        self.bias = float(model["bias"])
+        self.threshold = float(model["threshold"])
+
+    def probability(self, feats: dict[str, float]) -> float:
+        """Predicted probability that the judge answers (MEDIUM or better)."""
+        z = self.bias + sum(
+            w * (float(feats.get(name, 0.0)) - m) / s
+            for name, w, m, s in zip(FEATURES, self.weights, self.mean, self.scale)
+        )
+        return _sigmoid(z)
+
+    def should_skip(self, feats: dict[str, float]) -> bool:
+        return self.probability(feats) < self.threshold
+
+
+def _sigmoid(z: float) -> float:
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    e = math.exp(z)
+    return e / (1.0 + e)
+
+
+def load(gh: GitHubClient) -> Gate | None:
+    """The shipped gate, or ``None`` when absent or trained for another setup."""
+    model = load_index(gh, config.JUDGE_GATE_PATH)
+    if not model:
+        return None
+    if (
+        model.get("schema") != _SCHEMA
+        or model.get("answer_model") != config.ANSWER_MODEL
+        or model.get("model") != config.EMBED_MODEL
+        or tuple(model.get("features") or ()) != FEATURES
+    ):
+        log("Judge gate schema/model mismatch; not gating")
+        return None
+    try:
+        return Gate(model)
+    except (KeyError, TypeError, ValueError) as exc:
+        log(f"Judge gate unreadable; not gating: {exc!r}")
+        return None
+
+
+def explore(number: int) -> bool:
+    """Whether a call the gate would skip is judged anyway on this issue."""
+    every = config.JUDGE_GATE_EXPLORE_EVERY
+    return every > 0 and number % every == 0
+
+
+# --------------------------------------------------------------------------- #
+# Training
+# --------------------------------------------------------------------------- #
+def samples(gh: GitHubClient) -> tuple[list[tuple[int, dict[str, float], bool]], dict[str, int]]:
+    """Labelled runs from the App's own stickies, plus live gate counts.
+
+    A sample is ``(issue, features, useful)``; ``useful`` means the judge
+    answered at MEDIUM or better. Live counts: ``skipped`` runs, and how many
+    of the ``explored`` ones (would-skip, judged anyway) ended ``explored_low``.
+    """
+    since = datetime.now(timezone.utc) - timedelta(days=config.JUDGE_GATE_WINDOW_DAYS)
+    comments = gh.list_repo_comments(
+        since=since.isoformat(), limit=config.JUDGE_GATE_MAX_COMMENTS
+    )
+    out: list[tuple[int, dict[str, float], bool]] = []
+    live = {"skipped": 0, "explored": 0, "explored_low": 0}
+    for c in comments:
+        number = comment.issue_number(c)
+        if number is None or not comment.is_app_sticky(c):
+            continue
+        rag_state = comment.parse_state(c.get("body")).get("rag")
+        gate = rag_state.get("gate") if isinstance(rag_state, dict) else None
+        if not isinstance(gate, dict) or not isinstance(gate.get("f"), dict):
+            continue
+        if gate.get("m") != config.EMBED_MODEL:
+            continue  # features from another embedding model's score distribution
+        if gate.get("skip"):
+            live["skipped"] += 1
+            continue
+        conf, answered = rag_state.get("judge_conf"), rag_state.get("judge_answered")
+        if not isinstance(conf, (int, float)) or answered is None:
+            continue
+        try:
+            feats = {name: float(gate["f"][name]) for name in FEATURES}
+        except (KeyError, TypeError, ValueError):
+            continue
+        useful = bool(answered) and conf >= config.ANSWER_LO
+        if gate.get("explore"):
+            live["explored"] += 1
+            live["explored_low"] += not useful
+        out.append((number, feats, useful))
+    return out, live
+
+
+def _held_out(number: int) -> bool:
+    return hashlib.sha256(str(number).encode()).digest()[0] % 5 == 0
+
+
+def fit(
+    rows: list[dict[str, float]],
+    labels: list[bool],
+    *,
+    epochs: int = 400,
+    rate: float = 0.5,
+    l2: float = 1e-3,
+) -> dict[str, Any]:
+    """L2-regularised logistic regression by batch gradient descent.
+
+    Features are standardised first; the returned model carries the ``mean``
+    and ``scale`` it was fitted with.
+    """
+    n = len(rows)
+    mean = {f: sum(r[f] for r in rows) / n for f in FEATURES}
+    scale = {
+        f: math.sqrt(sum((r[f] - mean[f]) ** 2 for r in rows) / n) or 1.0
+        for f in FEATURES
+    }
+    xs = [[(r[f] - mean[f]) / scale[f] for f in FEATURES] for r in rows]
+    ys = [1.0 if label else 0.0 for label in labels]
+    weights = [0.0] * len(FEATURES)
+    bias = 0.0
+    for _ in range(epochs):
+        grad = [0.0] * len(FEATURES)
+        grad_bias = 0.0
+        for x, y in zip(xs, ys):
+            err = _sigmoid(bias + sum(w * v for w, v in zip(weights, x))) - y
+            grad_bias += err
+            for j, v in enumerate(x):
+                grad[j] += err * v
+        weights = [w - rate * (g / n + l2 * w) for w, g in zip(weights, grad)]
+        bias -= rate * grad_bias / n
+    return {
+        "weights": dict(zip(FEATURES, weights)),
+        "bias": bias,
+        "mean": mean,
+        "scale": scale,
+    }
+
+
+def choose_threshold(probs: list[float], labels: list[bool], min_precision: float) -> float:
+    """Highest skip threshold whose skipped set is LOW at ``min_precision``.
+
+    ``0.0`` (never skip) when no threshold qualifies.
+    """
+    ranked = sorted(zip(probs, labels))
+    best = 0.0
+    low = 0
+    for i, (prob, useful) in enumerate(ranked):
+        low += not useful
+        # Ties must land on the same side of the threshold.
+        if i + 1 < len(ranked) and ranked[i + 1][0] == prob:
+            continue
+        if low / (i + 1) >= min_precision:
+            upper = ranked[i + 1][0] if i + 1 < len(ranked) else 1.0
+            best = (prob + upper) / 2
+    return best
+
+
+def evaluate(gate: Gate, rows: list[dict[str, float]], labels: list[bool]) -> dict[str, Any]:
+    """Precision and recall of *skipping* (a skip is right when the run was LOW)."""
+    skipped = [useful for feats, useful in zip(rows, labels) if gate.should_skip(feats)]
+    low_total = sum(not useful for useful in labels)
+    low_skipped = sum(not useful for useful in skipped)
+    return {
+        "n": len(labels),
+        "skipped": len(skipped),
+        "precision": low_skipped / len(skipped) if skipped else None,
+        "recall": low_skipped / low_total if low_total else None,
+    }
+
+
+def train(
+    data: list[tuple[int, dict[str, float], bool]],
+) -> tuple[dict[str, Any] | None, dict[str, Any]]:
+    """Fit and validate a gate. ``(model, report)``; ``model`` is ``None``
+    when there is too little data or the held-out precision misses the bar.
+    """
+    report: dict[str, Any] = {"samples": len(data)}
+    if len(data) < config.JUDGE_GATE_MIN_SAMPLES:
+        report["reason"] = f"fewer than {config.JUDGE_GATE_MIN_SAMPLES} labelled runs"
+        return None, report
+    train_set = [(f, y) for n, f, y in data if not _held_out(n)]
+    test_set = [(f, y) for n, f, y in data if _held_out(n)]
+    rows, labels = [f for f, _ in train_set], [y for _, y in train_set]
+    if len(set(labels)) < 2 or not test_set:
+        report["reason"] = "training data has a single outcome"
+        return None, report
+
+    model = fit(rows, labels)
+    gate = Gate({**model, "threshold": 0.0})
+    model["threshold"] = choose_threshold(
+        [gate.probability(f) for f in rows], labels, config.JUDGE_GATE_MIN_PRECISION
+    )
+    gate.threshold = model["threshold"]
+    held_out = evaluate(gate, [f for f, _ in test_set], [y for _, y in test_set])
+    report.update(threshold=model["threshold"], held_out=held_out)
+    if held_out["precision"] is None or held_out["precision"] < config.JUDGE_GATE_MIN_PRECISION:
+        report["reason"] = "held-out precision below the bar"
+        return None, report
+    model.update(
+        schema=_SCHEMA,
+        answer_model=config.ANSWER_MODEL,
+        model=config.EMBED_MODEL,
+        features=list(FEATURES),
+        trained_at=datetime.now(timezone.utc).isoformat(),
+        held_out=held_out,
+    )
+    return model, report
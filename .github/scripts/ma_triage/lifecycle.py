@@ -6,18 +6,27 @@ Two entry points:
   when the reporter replies.
 * :func:`sweep` — a scheduled pass over ``waiting-for-user`` issues that sends a
   gentle reminder (3d), a close warning (7d) and finally auto-closes (14d) based
-  on days since the reporter was last active.
+  on days since the reporter was last active. Issues are listed in pages over
+  GraphQL; each one's last activity is checkpointed on the index branch, so
+  only issues updated since the previous sweep have their comments read.
 
 All mutations go through the dry-run-aware :class:`GitHubClient`.
 """
 
 from __future__ import annotations
 
+import json
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from . import config
-from .gh import GitHubClient, summary
+from . import config, metrics
+from .gh import GitHubClient, log, summary
+
+if TYPE_CHECKING:
+    from .mirror import Mirror
 
 # Author associations that we treat as "a maintainer / team member replied".
 _MAINTAINER_ASSOCIATIONS = frozenset({"OWNER", "MEMBER", "COLLABORATOR"})
@@ -75,6 +84,77 @@ def last_user_activity(issue: dict[str, Any], comments: list[dict[str, Any]]) ->
     return latest
 
 
+# --------------------------------------------------------------------------- #
+# Label writes
+# --------------------------------------------------------------------------- #
+def apply_labels(
+    gh: GitHubClient,
+    number: int,
+    current: set[str],
+    *,
+    add: Iterable[str] = (),
+    remove: Iterable[str] = (),
+) -> None:
+    """Move an issue from ``current`` to ``current | add - remove`` in one write.
+
+    A pure addition is one additive POST and a single removal one DELETE —
+    neither can touch a label it does not name. Anything else is one replace
+    (PUT) of the whole set, so nobody watching the issue sees the half-applied
+    states separate calls used to leave. The replace is computed against a
+    fresh read of the issue's labels rather than ``current``, which may be
+    minutes old by now: a label a human added or removed meanwhile is kept as
+    they left it, and only the labels named here change.
+    """
+    add = set(add) - current
+    remove = (set(remove) & current) - add
+    if not add and not remove:
+        return
+    if not remove:
+        gh.add_labels(number, sorted(add))
+        return
+    if not add and len(remove) == 1:
+        gh.remove_label(number, next(iter(remove)))
+        return
+    fresh = gh.list_issue_labels(number)
+    gh.set_labels(number, sorted((fresh | add) - remove))
+
+
+# --------------------------------------------------------------------------- #
+# Issue snapshot
+# --------------------------------------------------------------------------- #
+@dataclass
+class IssueSnapshot:
+    """One read of an issue, shared by every step of a run that needs it.
+
+    ``repo_labels`` is ``None`` when the snapshot came from the REST fallback,
+    which leaves the label listing to the one caller that needs it.
+    """
+
+    issue: dict[str, Any]
+    comments: list[dict[str, Any]]
+    repo_labels: set[str] | None = None
+
+    @property
+    def labels(self) -> set[str]:
+        return issue_labels(self.issue)
+
+    @property
+    def last_user_activity(self) -> str | None:
+        return last_user_activity(self.issue, self.comments)
+
+
+def snapshot(gh: GitHubClient, number: int) -> IssueSnapshot:
+    """The issue, its comments and (usually) the repo labels, in one round trip.
+
+    Falls back to the REST reads when the GraphQL query is unavailable.
+    """
+    with metrics.span("issue snapshot"):
+        found = gh.get_issue_snapshot(number)
+        if found is not None:
+            return IssueSnapshot(found["issue"], found["comments"], found["labels"])
+        return IssueSnapshot(gh.get_issue(number), gh.list_comments(number))
+
+
 # --------------------------------------------------------------------------- #
 # Comment-driven state transitions
 # --------------------------------------------------------------------------- #
@@ -97,22 +177,27 @@ def on_comment(
 
     if is_reporter:
         # The reporter responded → back into the maintainers' court.
-        for lbl in (
-            config.LABEL_WAITING_FOR_USER,
-            config.LABEL_REMINDED_1,
-            config.LABEL_REMINDED_2,
-            config.LABEL_STALE,
-        ):
-            if lbl in labels:
-                gh.remove_label(number, lbl)
-        if config.LABEL_NEEDS_ATTENTION not in labels:
-            gh.add_labels(number, [config.LABEL_NEEDS_ATTENTION])
+        apply_labels(
+            gh,
+            number,
+            labels,
+            add=[config.LABEL_NEEDS_ATTENTION],
+            remove=[
+                config.LABEL_WAITING_FOR_USER,
+                config.LABEL_REMINDED_1,
+                config.LABEL_REMINDED_2,
+                config.LABEL_STALE,
+            ],
+        )
     elif author_association in _MAINTAINER_ASSOCIATIONS:
         # A maintainer replied → typically now waiting on the reporter.
-        if config.LABEL_NEEDS_ATTENTION in labels:
-            gh.remove_label(number, config.LABEL_NEEDS_ATTENTION)
-        if config.LABEL_WAITING_FOR_USER not in labels:
-            gh.add_labels(number, [config.LABEL_WAITING_FOR_USER])
+        apply_labels(
+            gh,
+            number,
+            labels,
+            add=[config.LABEL_WAITING_FOR_USER],
+            remove=[config.LABEL_NEEDS_ATTENTION],
+        )
 
 
 # --------------------------------------------------------------------------- #
@@ -122,9 +207,14 @@ def _post_reminder(gh: GitHubClient, number: int, message: str) -> None:
     gh.create_comment(number, f"{config.REMINDER_MARKER}\n\n{message}{config.DISCLOSURE_FOOTER}")
 
 
-def sweep_issue(gh: GitHubClient, issue: dict[str, Any]) -> str:
+def sweep_issue(
+    gh: GitHubClient, issue: dict[str, Any], *, last_activity: str | None = None
+) -> str:
     """Apply the reminder/close cadence to a single waiting issue.
 
+    ``last_activity`` is the reporter's last activity when the caller already
+    knows it; otherwise the issue's comments are read to find it.
+
     Returns a short human-readable description of the action taken (for the
     job summary / tests).
     """
@@ -133,8 +223,9 @@ def sweep_issue(gh: GitHubClient, issue: dict[str, Any]) -> str:
     if is_exempt(labels):
         return f"#{number}: exempt, skipped"
 
-    comments = gh.list_comments(number)
-    idle = days_since(last_user_activity(issue, comments))
+    if last_activity is None:
+        last_activity = last_user_activity(issue, gh.list_comments(number))
+    idle = days_since(last_activity)
 
     if idle >= config.AUTO_CLOSE_DAYS:
         gh.create_comment(
@@ -159,13 +250,124 @@ def sweep_issue(gh: GitHubClient, issue: dict[str, Any]) -> str:
     return f"#{number}: nothing due ({idle:.1f}d idle)"
 
 
-def sweep(gh: GitHubClient) -> list[str]:
-    """Run the cadence over every open ``waiting-for-user`` issue."""
-    issues = gh.list_issues_with_label(config.LABEL_WAITING_FOR_USER, state="open")
-    summary(f"Sweep: {len(issues)} issue(s) in '{config.LABEL_WAITING_FOR_USER}'")
-    results = []
+_CHECKPOINT_SCHEMA = 1
+
+
+def _load_checkpoint(gh: GitHubClient) -> dict[str, dict[str, Any]]:
+    """``{number: {updated_at, last_activity}}`` from the last sweep, or ``{}``."""
+    raw = gh.get_raw_file(gh.repo, config.SWEEP_CHECKPOINT_PATH, ref=config.INDEX_BRANCH)
+    if not raw:
+        return {}
+    try:
+        data = json.loads(raw)
+    except ValueError as exc:
+        log(f"Sweep checkpoint is not valid JSON: {exc}")
+        return {}
+    if not isinstance(data, dict) or data.get("schema") != _CHECKPOINT_SCHEMA:
+        return {}
+    issues = data.get("issues")
+    if not isinstance(issues, dict):
+        return {}
+    return {key: value for key, value in issues.items() if isinstance(value, dict)}
+
+
+def _save_checkpoint(gh: GitHubClient, issues: dict[str, dict[str, Any]]) -> None:
+    blob = json.dumps(
+        {"schema": _CHECKPOINT_SCHEMA, "issues": issues}, separators=(",", ":"), sort_keys=True
+    )
+    try:
+        gh.commit_files(
+            config.INDEX_BRANCH,
+            {config.SWEEP_CHECKPOINT_PATH: blob},
+            f"Update sweep checkpoint ({len(issues)} issues)",
+        )
+    except Exception as exc:  # noqa: BLE001 — the next sweep just reads more comments
+        log(f"Could not save the sweep checkpoint: {exc}")
+
+
+def _last_activity(
+    gh: GitHubClient, issues: list[dict[str, Any]], mirror: Mirror | None = None
+) -> tuple[dict[int, str | None], dict[str, dict[str, Any]] | None]:
+    """Each issue's last reporter activity, reading comments only where needed.
+
+    An issue whose ``updated_at`` matches the checkpoint cannot have a new
+    comment, so its checkpointed activity stands. The rest are read from the
+    local ``mirror`` when there is one; otherwise their latest comments are
+    read in batches, and one whose fetched tail is all bot comments, with
+    older comments left out, is omitted so :func:`sweep_issue` reads it whole.
+
+    Returns the activity per issue number and the checkpoint to store
+    (``None`` when it has not changed).
+    """
+    checkpoint = _load_checkpoint(gh) if config.SWEEP_CHECKPOINT else {}
+    known: dict[int, str | None] = {}
+    todo: dict[int, dict[str, Any]] = {}
     for issue in issues:
-        result = sweep_issue(gh, issue)
-        results.append(result)
+        if is_exempt(issue_labels(issue)):
+            continue
+        number = int(issue["number"])
+        entry = checkpoint.get(str(number)) or {}
+        if entry.get("last_activity") and entry.get("updated_at") == issue.get("updated_at"):
+            known[number] = entry["last_activity"]
+        else:
+            todo[number] = issue
+    metrics.count("sweep checkpoint hits", len(known))
+
+    if mirror is not None:
+        for number, issue in todo.items():
+            known[number] = last_user_activity(issue, mirror.comments(number))
+        todo = {}
+    for number, found in (gh.get_recent_comments(list(todo)) if todo else {}).items():
+        comments = found["comments"]
+        if found["total"] > len(comments) and all(_is_bot_comment(c) for c in comments):
+            continue
+        known[number] = last_user_activity(todo[number], comments)
+
+    updated = {
+        str(issue["number"]): {
+            "updated_at": issue.get("updated_at"),
+            "last_activity": known[int(issue["number"])],
+        }
+        for issue in issues
+        if known.get(int(issue["number"]))
+    }
+    return known, updated if config.SWEEP_CHECKPOINT and updated != checkpoint else None
+
+
+def sweep(
+    gh: GitHubClient, *, store: GitHubClient | None = None, mirror: Mirror | None = None
+) -> list[str]:
+    """Run the cadence over every open ``waiting-for-user`` issue.
+
+    Due reminders and closes are applied ``SWEEP_WORKERS`` issues at a time;
+    the summary lists them in issue order regardless. ``store`` is the client
+    that may write the index branch; without one the checkpoint is only read.
+    ``mirror``, when current, answers the comment reads locally.
+    """
+    with metrics.span("sweep list"):
+        issues = gh.list_labelled_issues(config.LABEL_WAITING_FOR_USER)
+        bulk = issues is not None
+        if issues is None:
+            issues = gh.list_issues_with_label(config.LABEL_WAITING_FOR_USER, state="open")
+    summary(f"Sweep: {len(issues)} issue(s) in '{config.LABEL_WAITING_FOR_USER}'")
+
+    activity: dict[int, str | None] = {}
+    checkpoint: dict[str, dict[str, Any]] | None = None
+    if bulk:
+        with metrics.span("sweep activity"):
+            activity, checkpoint = _last_activity(gh, issues, mirror)
+
+    def run(issue: dict[str, Any]) -> str:
+        with metrics.span("sweep issue"):
+            return sweep_issue(gh, issue, last_activity=activity.get(int(issue["number"])))
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, config.SWEEP_WORKERS), thread_name_prefix="sweep"
+    ) as pool:
+        results = list(pool.map(run, issues))
+    for result in results:
         summary(f"- {result}")
+
+    if checkpoint is not None and store is not None:
+        _save_checkpoint(store, checkpoint)
     return results
@@ -0,0 +1,174 @@
+"""Where a run spends its time and budget: timing spans and resource counters.
+
+Every subcommand run collects, process-wide:
+
+* **spans** — :func:`span` around each pipeline stage, index build and sweep
+  step, aggregated by name (calls, total and slowest seconds);
+* **HTTP** — calls and bytes received per endpoint (:func:`http`,
+  :func:`downloaded`), with ids and issue numbers folded out of the path so
+  the table stays short;
+* **counters** — embedding inputs and tokens, chat calls and tokens, cache hits
+  (:func:`count`).
+
+:func:`flush` renders them as tables in the job summary and, when
+``TRIAGE_METRICS_FILE`` is set, writes the same numbers as JSON for the
+workflow to upload as an artifact — so a latency or model-spend regression
+shows up per run instead of on the bill. Recording is thread-safe (stages run
+concurrently, see :mod:`ma_triage.stages`) and never raises into the caller.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlparse
+
+# `gh` counts its own requests here, so it is imported as a module (the names
+# are looked up at call time) to keep the circular import harmless.
+from . import config, gh
+
+_lock = threading.Lock()
+_spans: dict[str, list[float]] = {}  # name -> [calls, total seconds, max seconds]
+_http: dict[str, list[int]] = {}  # endpoint -> [calls, bytes]
+_counters: dict[str, float] = {}
+
+# Path segments that identify one object rather than a kind of request.
+_ID = re.compile(r"^(?:\d+|[0-9a-f]{7,64})$", re.I)
+_MAX_SEGMENTS = 6
+
+
+def reset() -> None:
+    with _lock:
+        _spans.clear()
+        _http.clear()
+        _counters.clear()
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the enclosed block under ``name`` (exceptions are timed too)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            entry = _spans.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] = max(entry[2], elapsed)
+
+
+def count(name: str, n: float = 1) -> None:
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def endpoint(method: str, url: str) -> str:
+    """``METHOD host/path`` with object ids folded into ``{id}``.
+
+    Only GitHub API paths are kept: anywhere else (attachments, model
+    endpoints) the path names a file or a deployment, so the host is enough.
+    """
+    parsed = urlparse(url)
+    host = parsed.hostname or "?"
+    if host != "api.github.com":
+        return f"{method.upper()} {host}"
+    segments = [s for s in parsed.path.split("/") if s]
+    folded = ["{id}" if _ID.match(s) else s for s in segments[:_MAX_SEGMENTS]]
+    if len(segments) > _MAX_SEGMENTS:
+        folded.append("…")
+    return f"{method.upper()} {host}/{'/'.join(folded)}"
+
+
+def http(method: str, url: str, nbytes: int = 0) -> None:
+    """Count one HTTP request and the body bytes already received for it."""
+    key = endpoint(method, url)
+    with _lock:
+        entry = _http.setdefault(key, [0, 0])
+        entry[0] += 1
+        entry[1] += nbytes
+
+
+def downloaded(method: str, url: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Pass streamed ``chunks`` through, adding their size to ``url``'s endpoint."""
+    key = endpoint(method, url)
+    for chunk in chunks:
+        with _lock:
+            _http.setdefault(key, [0, 0])[1] += len(chunk)
+        yield chunk
+
+
+def usage(prefix: str, body: Any) -> None:
+    """Add an OpenAI-shaped ``usage`` block's token counts to ``prefix`` counters."""
+    block = body.get("usage") if isinstance(body, dict) else None
+    if not isinstance(block, dict):
+        return
+    for field in ("prompt_tokens", "completion_tokens", "total_tokens"):
+        value = block.get(field)
+        if isinstance(value, (int, float)):
+            count(f"{prefix} {field.replace('_', ' ')}", value)
+
+
+def snapshot() -> dict[str, Any]:
+    """The collected numbers as plain JSON-serialisable data."""
+    with _lock:
+        return {
+            "spans": {
+                name: {"calls": int(c), "seconds": round(t, 3), "max_seconds": round(m, 3)}
+                for name, (c, t, m) in sorted(_spans.items())
+            },
+            "http": {
+                key: {"calls": c, "bytes": b} for key, (c, b) in sorted(_http.items())
+            },
+            "counters": dict(sorted(_counters.items())),
+        }
+
+
+def render(data: dict[str, Any]) -> str:
+    """Markdown tables for the job summary (empty when nothing was recorded)."""
+    lines: list[str] = []
+    if data["spans"]:
+        lines += ["| span | calls | total | slowest |", "|---|---:|---:|---:|"]
+        lines += [
+            f"| {name} | {s['calls']} | {s['seconds']:.2f}s | {s['max_seconds']:.2f}s |"
+            for name, s in data["spans"].items()
+        ]
+        lines.append("")
+    if data["http"]:
+        total_calls = sum(h["calls"] for h in data["http"].values())
+        total_bytes = sum(h["bytes"] for h in data["http"].values())
+        lines += ["| endpoint | calls | bytes |", "|---|---:|---:|"]
+        lines += [
+            f"| `{key}` | {h['calls']} | {h['bytes']:,} |"
+            for key, h in data["http"].items()
+        ]
+        lines += [f"| **total** | **{total_calls}** | **{total_bytes:,}** |", ""]
+    if data["counters"]:
+        lines += ["| counter | value |", "|---|---:|"]
+        lines += [f"| {name} | {value:g} |" for name, value in data["counters"].items()]
+        lines.append("")
+    return "\n".join(lines)
+
+
+def flush(command: str) -> None:
+    """Report the run's metrics to the job summary and the metrics file."""
+    data = snapshot()
+    table = render(data)
+    if table:
+        gh.summary(f"\n### Run metrics ({command})\n\n{table}")
+    if not config.METRICS_FILE:
+        return
+    try:
+        Path(config.METRICS_FILE).write_text(
+            json.dumps({"command": command, **data}, indent=2, sort_keys=True),
+            encoding="utf-8",
+        )
+    except OSError as exc:
+        gh.log(f"Could not write metrics file: {exc}")
@@ -0,0 +1,306 @@
+"""Local SQLite mirror of the repository's issues, discussions and comments.
+
+The nightly index build lists every recent issue and discussion, and the daily
+sweep reads the comments of every waiting issue — the same records, fetched in
+full, every run. The mirror keeps them in one SQLite file, persisted between
+runs by ``actions/cache`` (``TRIAGE_MIRROR_PATH``), and :meth:`Mirror.sync`
+brings it up to date with only what changed since the last sync:
+
+* **issues** — listed oldest-updated first from the sync cursor, so a sync cut
+  short by ``MIRROR_SYNC_MAX`` resumes where it stopped on the next run;
+* **discussions** — newest-updated first, down to the cursor (GraphQL has no
+  ``since``; discussions are few enough that a cap is never the issue);
+* **comments** — the repo-wide comment listing from the cursor, oldest first.
+
+Labels, state and each post's author travel with it; the bot's own state is in
+its sticky comment, so it is mirrored with the comments. Each synced post is
+also (re)indexed in the file's :mod:`~ma_triage.fts` table, which is what lets a
+per-event run find related posts without GitHub's search endpoint (an SQLite
+built without FTS5 gets the mirror without that table). What the mirror cannot
+see is a deletion: a deleted comment stays until the file is rebuilt, which is
+as simple as deleting it (or letting the cache expire). A schema change does
+that automatically.
+
+Like :class:`~ma_triage.cache.DiskCache`, the mirror is an optimisation: a file
+that cannot be opened is logged and replaced with an empty one, and callers fall
+back to the API when it is disabled.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any
+
+from . import config, fts, metrics
+from .gh import GitHubClient, log
+from .providers import detect_reported_provider_labels
+
+SCHEMA = 2
+
+_DDL = """
+CREATE TABLE IF NOT EXISTS meta(key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS posts(
+    kind TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    title TEXT,
+    body TEXT,
+    url TEXT,
+    state TEXT,
+    labels TEXT,
+    author TEXT,
+    category TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    PRIMARY KEY(kind, number)
+);
+CREATE INDEX IF NOT EXISTS posts_updated ON posts(kind, updated_at);
+CREATE TABLE IF NOT EXISTS comments(
+    id INTEGER PRIMARY KEY,
+    number INTEGER NOT NULL,
+    body TEXT,
+    author TEXT,
+    author_type TEXT,
+    association TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS comments_number ON comments(number, created_at);
+"""
+
+
+def _connect(path: Path) -> tuple[sqlite3.Connection, bool]:
+    """The open file, and whether it has the lexical index (needs FTS5)."""
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(_DDL)
+    try:
+        conn.executescript(fts.DDL)
+        lexical = True
+    except sqlite3.OperationalError as exc:  # an SQLite built without FTS5
+        log(f"Mirror opened without its lexical index: {exc}")
+        lexical = False
+    row = conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+    if row is None:
+        conn.execute("INSERT INTO meta VALUES ('schema', ?)", (str(SCHEMA),))
+        conn.commit()
+    elif row["value"] != str(SCHEMA):
+        raise sqlite3.DatabaseError(f"schema {row['value']}, expected {SCHEMA}")
+    return conn, lexical
+
+
+def _lexical_post(
+    kind: str, post: dict[str, Any], url: str | None, state: str | None
+) -> dict[str, Any]:
+    title = post.get("title") or ""
+    body = post.get("body") or ""
+    return {
+        "kind": kind,
+        "number": int(post["number"]),
+        "title": title,
+        "body": body,
+        "url": url or "",
+        "state": state,
+        "providers": sorted(detect_reported_provider_labels(title, body)),
+    }
+
+
+class Mirror:
+    """One SQLite file of posts and comments, synced incrementally."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self.conn, lexical = _connect(self.path)
+        except sqlite3.DatabaseError as exc:
+            log(f"Mirror unreadable ({exc}); rebuilding from scratch")
+            self.path.unlink(missing_ok=True)
+            self.conn, lexical = _connect(self.path)
+        self.lexical = fts.LexicalIndex(self.conn, create=False) if lexical else None
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> Mirror:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------ #
+    # Sync
+    # ------------------------------------------------------------------ #
+    def _cursor(self, name: str) -> str | None:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (name,)).fetchone()
+        return row["value"] if row else None
+
+    def _advance(self, name: str, stamps: list[str | None]) -> None:
+        latest = max((s for s in stamps if s), default=None)
+        if latest and latest > (self._cursor(name) or ""):
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (name, latest))
+
+    def sync(self, gh: GitHubClient) -> bool:
+        """Fetch what changed since the last sync.
+
+        Returns whether the mirror is now current. A listing that hit
+        ``MIRROR_SYNC_MAX`` may have more behind it: what was fetched is kept
+        and the next sync continues from there, but until then callers should
+        not trust the mirror to be complete.
+        """
+        cap = config.MIRROR_SYNC_MAX
+        with metrics.span("mirror sync"):
+            issues = gh.list_recent_issues(
+                limit=cap, since=self._cursor("issues_since"), oldest_first=True
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO posts VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                [
+                    (
+                        "issue",
+                        int(i["number"]),
+                        i.get("title") or "",
+                        i.get("body") or "",
+                        i.get("html_url") or "",
+                        i.get("state") or "",
+                        json.dumps(sorted(
+                            lbl["name"] for lbl in i.get("labels") or [] if isinstance(lbl, dict)
+                        )),
+                        (i.get("user") or {}).get("login") or "",
+                        "",
+                        i.get("created_at"),
+                        i.get("updated_at"),
+                    )
+                    for i in issues
+                ],
+            )
+            self._advance("issues_since", [i.get("updated_at") for i in issues])
+            if self.lexical is not None:
+                self.lexical.add(
+                    [
+                        _lexical_post("issue", i, i.get("html_url"), i.get("state"))
+                        for i in issues
+                    ]
+                )
+
+            discussions = gh.list_discussions(limit=cap, since=self._cursor("discussions_since"))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO posts VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                [
+                    (
+                        "discussion",
+                        int(d["number"]),
+                        d.get("title") or "",
+                        d.get("body") or "",
+                        d.get("url") or "",
+                        "closed" if d.get("closed") else "open",
+                        "[]",
+                        (d.get("author") or {}).get("login") or "",
+                        (d.get("category") or {}).get("name") or "",
+                        d.get("createdAt"),
+                        d.get("updatedAt"),
+                    )
+                    for d in discussions
+                ],
+            )
+            self._advance("discussions_since", [d.get("updatedAt") for d in discussions])
+            if self.lexical is not None:
+                for d in discussions:
+                    category = ((d.get("category") or {}).get("name") or "").lower()
+                    if category in config.DISCUSSION_EXCLUDE_CATEGORIES:
+                        self.lexical.discard("discussion", int(d["number"]))
+                    else:
+                        state = "closed" if d.get("closed") else "open"
+                        post = _lexical_post("discussion", d, d.get("url"), state)
+                        self.lexical.add([post])
+
+            comments = gh.list_repo_comments(since=self._cursor("comments_since"), limit=cap)
+            rows = []
+            for c in comments:
+                tail = str(c.get("issue_url") or "").rsplit("/", 1)[-1]
+                if not tail.isdigit() or c.get("id") is None:
+                    continue
+                user = c.get("user") or {}
+                rows.append(
+                    (
+                        int(c["id"]),
+                        int(tail),
+                        c.get("body") or "",
+                        user.get("login") or "",
+                        user.get("type") or "",
+                        c.get("author_association") or "",
+                        c.get("created_at"),
+                        c.get("updated_at"),
+                    )
+                )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO comments VALUES (?,?,?,?,?,?,?,?)", rows
+            )
+            self._advance("comments_since", [c.get("updated_at") for c in comments])
+            self.conn.commit()
+        metrics.count("mirror issues synced", len(issues))
+        metrics.count("mirror discussions synced", len(discussions))
+        metrics.count("mirror comments synced", len(rows))
+        return max(len(issues), len(discussions), len(comments)) < cap
+
+    # ------------------------------------------------------------------ #
+    # Queries (REST/GraphQL-shaped, so callers need not know the source)
+    # ------------------------------------------------------------------ #
+    def issues(self, *, limit: int) -> list[dict[str, Any]]:
+        """Issues newest-updated first, shaped like the REST listing."""
+        rows = self.conn.execute(
+            "SELECT * FROM posts WHERE kind = 'issue' ORDER BY updated_at DESC LIMIT ?",
+            (limit,),
+        )
+        return [
+            {
+                "number": r["number"],
+                "title": r["title"],
+                "body": r["body"],
+                "html_url": r["url"],
+                "state": r["state"],
+                "labels": [{"name": name} for name in json.loads(r["labels"] or "[]")],
+                "user": {"login": r["author"]},
+                "created_at": r["created_at"],
+                "updated_at": r["updated_at"],
+            }
+            for r in rows
+        ]
+
+    def discussions(self, *, limit: int) -> list[dict[str, Any]]:
+        """Discussions newest-updated first, shaped like the GraphQL listing."""
+        rows = self.conn.execute(
+            "SELECT * FROM posts WHERE kind = 'discussion' ORDER BY updated_at DESC LIMIT ?",
+            (limit,),
+        )
+        return [
+            {
+                "number": r["number"],
+                "title": r["title"],
+                "body": r["body"],
+                "url": r["url"],
+                "closed": r["state"] == "closed",
+                "category": {"name": r["category"]},
+                "createdAt": r["created_at"],
+                "updatedAt": r["updated_at"],
+            }
+            for r in rows
+        ]
+
+    def comments(self, number: int) -> list[dict[str, Any]]:
+        """An issue's comments, oldest first, shaped like the REST listing."""
+        rows = self.conn.execute(
+            "SELECT * FROM comments WHERE number = ? ORDER BY created_at, id", (number,)
+        )
+        return [
+            {
+                "id": r["id"],
+                "body": r["body"],
+                "user": {"login": r["author"], "type": r["author_type"]},
+                "author_association": r["association"],
+                "created_at": r["created_at"],
+                "updated_at": r["updated_at"],
+            }
+            for r in rows
+        ]
@@ -223,6 +223,14 @@ class RagResult:
     # rendered copy from "here are related reports" to an explicit consolidation
     # ask. Carried on the result so the renderer does not need the category.
     duplicates_only: bool = False
+    # The verdict came from the judge cache rather than a judge call; and, for a
+    # fresh verdict while the cache is enabled, the record the nightly index
+    # build harvests from the sticky state (see judge_cache.py).
+    judge_cached: bool = False
+    judge_entry: dict[str, Any] | None = None
+    # Judge-gate features and decision, recorded for training (judge_gate.py).
+    judge_gate: dict[str, Any] | None = None
+    judge_skipped: bool = False
 
     @property
     def has_docs_output(self) -> bool:
@@ -270,6 +278,11 @@ class TriageResult:
     # RAG layer output (Phase 2). ``None`` whenever the RAG layer is disabled or
     # failed, which keeps the rendered comment byte-identical to Phase 1.
     rag: RagResult | None = None
+    # Stage input fingerprints and outputs, recorded in the sticky state so the
+    # next re-triage can skip unchanged stages (see reuse.py).
+    stages: dict[str, Any] = field(default_factory=dict)
+    # Seconds each pipeline stage took (see stages.py); not persisted.
+    stage_timings: dict[str, float] = field(default_factory=dict)
 
     @property
     def is_actionable(self) -> bool:
@@ -9,7 +9,9 @@ Pipeline (≤ 1 embedding + ≤ 1 judge chat per post):
 
 1. embed the post once,
 2. hybrid-retrieve doc chunks (dense + BM25 + RRF; skipped without a vector),
-3. ask the judge whether the docs answer it,
+3. ask the judge whether the docs answer it (or reuse its verdict on a
+   near-identical question, see :mod:`ma_triage.judge_cache`; or skip it when
+   the learned gate predicts LOW, see :mod:`ma_triage.judge_gate`),
 4. route to a confidence tier (HIGH / MEDIUM / LOW),
 5. find related past posts (dense, or search fallback),
 6. demote the tier if the answer matches a downvoted (suppressed) fingerprint.
@@ -18,9 +20,10 @@ Pipeline (≤ 1 embedding + ≤ 1 judge chat per post):
 from __future__ import annotations
 
 import hashlib
+from typing import Any
 from urllib.parse import urlparse
 
-from . import ai, config, embeddings, similar
+from . import ai, config, embeddings, fts, judge_cache, judge_gate, metrics, similar
 from .gh import GitHubClient, log
 from .models import DocAnswer, DocChunk, DocHit, ProviderDoc, RagResult
 from .retrieval import cosine, retrieve_docs
@@ -74,6 +77,19 @@ def _best_dense(query_vec: list[float] | None, doc_hits: list[DocHit]) -> float:
     return max(cosine(query_vec, hit.chunk.embedding) for hit in doc_hits)
 
 
+def _provider_paths(provider_docs: list[ProviderDoc]) -> set[str]:
+    return {
+        urlparse(doc.url).path.strip("/")
+        for doc in provider_docs
+        if urlparse(doc.url).path.strip("/")
+    }
+
+
+def _under(chunk: DocChunk, paths: set[str]) -> bool:
+    path = chunk.path.strip("/")
+    return any(path == p or path.startswith(p + "/") for p in paths)
+
+
 def _promote_provider_docs(
     query_vec: list[float],
     chunks: list[DocChunk],
@@ -81,22 +97,10 @@ def _promote_provider_docs(
     provider_docs: list[ProviderDoc],
 ) -> list[DocHit]:
     """Ensure authoritative provider pages reach the judge/model evidence."""
-    preferred_paths = {
-        urlparse(doc.url).path.strip("/")
-        for doc in provider_docs
-        if urlparse(doc.url).path.strip("/")
-    }
+    preferred_paths = _provider_paths(provider_docs)
     if not preferred_paths:
         return hits
-    preferred = [
-        chunk
-        for chunk in chunks
-        if any(
-            chunk.path.strip("/") == path
-            or chunk.path.strip("/").startswith(path + "/")
-            for path in preferred_paths
-        )
-    ]
+    preferred = [chunk for chunk in chunks if _under(chunk, preferred_paths)]
     preferred.sort(
         key=lambda chunk: cosine(query_vec, chunk.embedding),
         reverse=True,
@@ -110,6 +114,44 @@ def _promote_provider_docs(
     return promoted[: config.DOCS_TOP_K]
 
 
+def _gate(
+    gh: GitHubClient,
+    number: int,
+    query_vec: list[float],
+    query_text: str,
+    doc_hits: list[DocHit],
+    stats: dict[str, float],
+    provider_docs: list[ProviderDoc],
+) -> dict[str, Any]:
+    """Judge-gate record for this run: its features, and the decision if gated.
+
+    Features are recorded even with the gate off, so it can be trained before
+    it is enabled.
+    """
+    paths = _provider_paths(provider_docs)
+    feats = judge_gate.features(
+        query_vec,
+        query_text,
+        doc_hits,
+        stats,
+        provider_match=any(_under(hit.chunk, paths) for hit in doc_hits),
+    )
+    # Dense features are cosines in the embedding model's space: a gate
+    # trained on one model's scores says nothing about another's.
+    record: dict[str, Any] = {"f": feats, "m": config.EMBED_MODEL}
+    gate = judge_gate.load(gh) if config.JUDGE_GATE_ENABLED else None
+    if gate is None:
+        return record
+    record["p"] = round(gate.probability(feats), 4)
+    if gate.should_skip(feats):
+        if judge_gate.explore(number):
+            record["explore"] = True
+        else:
+            record["skip"] = True
+            log(f"Judge gate: skipping the judge (p={record['p']} < {gate.threshold:.3f})")
+    return record
+
+
 def answer(
     gh: GitHubClient,
     *,
@@ -121,19 +163,28 @@ def answer(
     provider_labels: set[str] | None = None,
     provider_docs: list[ProviderDoc] | None = None,
     duplicates_only: bool = False,
+    degraded: list[str] | None = None,
 ) -> RagResult | None:
     """Run the RAG pipeline for one post. ``None`` when disabled or on failure.
 
     With ``duplicates_only`` the docs judge is skipped entirely (saving the chat
     call) and only likely-duplicate related posts are kept — used for categories
     where a docs answer is never appropriate but a duplicate still is.
+
+    A failed step degrades the result rather than failing it; when given,
+    ``degraded`` collects which steps fell back, so a caller can tell a fallback
+    from a genuine "nothing relevant" before keeping the result for reuse.
     """
+    degraded = degraded if degraded is not None else []
     if not (config.AI_ENABLED and config.RAG_ENABLED):
         return None
     pinned = similar.find_pinned(gh, provider_labels)
     try:
         query_text = f"{title}\n\n{body}".strip()
-        query_vec = embeddings.embed_text(query_text, token=token)
+        with metrics.span("rag embed"):
+            query_vec = embeddings.embed_text(query_text, token=token)
+        if query_vec is None:
+            degraded.append("embedding")
 
         # A docs answer needs the query vector. Without one `retrieve_docs`
         # ranks on its BM25 leg alone, and the judge would then be paid to
@@ -142,19 +193,43 @@ def answer(
         # and duplicate detection both stay useful while the embeddings
         # provider is unavailable.
         doc_hits: list[DocHit] = []
+        retrieval_stats: dict[str, float] = {}
         if query_vec is not None:
-            chunks = embeddings.load_docs_chunks(gh)
-            doc_hits = retrieve_docs(query_vec, query_text, chunks)
-            doc_hits = _promote_provider_docs(
-                query_vec,
-                chunks,
-                doc_hits,
-                provider_docs or [],
-            )
+            with metrics.span("rag retrieve"):
+                chunks = embeddings.load_docs_chunks(gh)
+                doc_hits = retrieve_docs(
+                    query_vec, query_text, chunks, stats=retrieval_stats
+                )
+                doc_hits = _promote_provider_docs(
+                    query_vec,
+                    chunks,
+                    doc_hits,
+                    provider_docs or [],
+                )
 
         judge: DocAnswer | None = None
+        judge_cached = False
+        judge_entry = None
+        gate_record = None
+        judge_skipped = False
         if doc_hits and not duplicates_only:
-            judge = ai.judge_answer(title, body, doc_hits, token=token)
+            # doc_hits is only non-empty when there is a query vector.
+            if config.JUDGE_CACHE_ENABLED:
+                judge = judge_cache.lookup(query_vec, doc_hits, judge_cache.load(gh))
+                judge_cached = judge is not None
+            if judge is None:
+                gate_record = _gate(
+                    gh, number, query_vec, query_text, doc_hits, retrieval_stats,
+                    provider_docs or [],
+                )
+                judge_skipped = bool(gate_record.get("skip"))
+            if judge is None and not judge_skipped:
+                with metrics.span("rag judge"):
+                    judge = ai.judge_answer(title, body, doc_hits, token=token)
+                if judge is None:
+                    degraded.append("judge")
+                elif config.JUDGE_CACHE_ENABLED:
+                    judge_entry = judge_cache.entry(query_vec, doc_hits, judge)
 
         # Decide the confidence tier.
         if duplicates_only:
@@ -162,6 +237,9 @@ def answer(
             # which would otherwise fire purely on retrieval strength.
             doc_hits = []
             tier = "low"
+        elif judge_skipped:
+            # The gate stands in for a LOW verdict, not for a failed call.
+            tier = "low"
         elif judge is not None:
             tier = tier_for(judge.confidence) if judge.answers_question else "low"
         elif doc_hits and _best_dense(query_vec, doc_hits) >= config.DOCS_MIN_DENSE:
@@ -189,18 +267,26 @@ def answer(
 
         # Related posts are independent of the docs tier (dupes may post even
         # when the docs answer is LOW).
-        posts = embeddings.load_posts(gh) if query_vec else []
-        related = similar.find_related(
-            gh,
-            query_vec=query_vec,
-            title=title,
-            body=body,
-            posts=posts,
-            text_posts=embeddings.load_posts_text(gh) if not posts else None,
-            exclude_number=number,
-            exclude_kind=kind,
-            provider_labels=provider_labels,
-        )
+        with metrics.span("rag related"):
+            posts = embeddings.load_posts(gh) if query_vec else []
+            text_posts = embeddings.load_posts_text(gh) if not posts else None
+            lexical = None if posts or text_posts else fts.from_mirror()
+            try:
+                related = similar.find_related(
+                    gh,
+                    query_vec=query_vec,
+                    title=title,
+                    body=body,
+                    posts=posts,
+                    text_posts=text_posts,
+                    lexical=lexical,
+                    exclude_number=number,
+                    exclude_kind=kind,
+                    provider_labels=provider_labels,
+                )
+            finally:
+                if lexical is not None:
+                    lexical.close()
         if duplicates_only:
             # Only likely duplicates justify commenting on these categories, so
             # apply the same bar the comment uses to render a match expanded.
@@ -226,9 +312,14 @@ def answer(
             judge_confidence=judge.confidence if judge else None,
             judge_answered=judge.answers_question if judge else None,
             duplicates_only=duplicates_only,
+            judge_cached=judge_cached,
+            judge_entry=judge_entry,
+            judge_gate=gate_record,
+            judge_skipped=judge_skipped,
         )
         return result if result.has_output else None
     except Exception as exc:  # noqa: BLE001 — never let RAG break triage
         log(f"RAG layer skipped: {exc}")
+        degraded.append("error")
         result = RagResult(pinned_posts=pinned)
         return result if result.has_output else None
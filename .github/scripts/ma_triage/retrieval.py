@@ -245,26 +245,51 @@ def retrieve_docs(
     chunks: list[DocChunk],
     *,
     k: int | None = None,
+    stats: dict[str, float] | None = None,
 ) -> list[DocHit]:
-    """Hybrid retrieval → the top-``k`` :class:`DocHit` for a query."""
+    """Hybrid retrieval → the top-``k`` :class:`DocHit` for a query.
+
+    When given, ``stats`` receives the score of the best and second-best
+    candidate on each leg (``bm25_top``/``bm25_second``,
+    ``rrf_top``/``rrf_second``) and whether both legs ranked the same chunk
+    first (``agree``) — how decisive the retrieval was, which the judge gate
+    (:mod:`ma_triage.judge_gate`) learns from.
+    """
     if not chunks:
         return []
     top_k = config.DOCS_TOP_K if k is None else k
 
     dense_rank = rank_by_cosine(query_vec or [], [c.embedding for c in chunks])
     docs_tokens = [tokenize(f"{c.label} {c.text}") for c in chunks]
-    lexical_rank = rank_by_bm25(tokenize(query_text), docs_tokens)
+    lexical_scores = bm25_scores(tokenize(query_text), docs_tokens)
+    lexical_rank = [
+        i
+        for i in sorted(range(len(chunks)), key=lambda i: lexical_scores[i], reverse=True)
+        if lexical_scores[i] > 0.0
+    ]
 
     fused = rrf([dense_rank, lexical_rank])
     if not fused:
         return []
     ordered = sorted(fused.items(), key=lambda pair: pair[1], reverse=True)
+    if stats is not None:
+        lexical = [lexical_scores[i] for i in lexical_rank[:2]] + [0.0, 0.0]
+        stats.update(
+            bm25_top=lexical[0],
+            bm25_second=lexical[1],
+            rrf_top=ordered[0][1],
+            rrf_second=ordered[1][1] if len(ordered) > 1 else 0.0,
+            agree=float(
+                bool(dense_rank and lexical_rank) and dense_rank[0] == lexical_rank[0]
+            ),
+        )
 
     # Cap chunks per page. Several sections of one page tend to rank together,
     # which spends the budget re-describing a page the judge has already seen
     # instead of offering it another candidate. Measured over 78 questions whose
     # answering doc page is known, this lifts recall@6 from 64% to 71% and takes
-    # the distinct pages shown from 4.3 to 6.
+    # the distinct pages shown from 4.3 to 6 (`python -m ma_triage bench-retrieval`
+    # re-measures it; see retrieval_bench.py).
     per_page = max(1, config.DOCS_MAX_PER_PAGE)
     seen: dict[str, int] = {}
     hits: list[DocHit] = []
@@ -0,0 +1,317 @@
+"""Retrieval quality and latency, measured on a labelled evaluation set.
+
+The numbers quoted in :func:`retrieval.retrieve_docs` and
+:func:`similar.related_from_lexical` come from two kinds of labelled query:
+
+* **docs** — a question and the doc page(s) that answer it;
+* **duplicates** — an issue and the earlier post(s) it duplicates.
+
+``python -m ma_triage bench-retrieval <eval.json> [k]`` runs every engine in
+:data:`DOC_ENGINES` and :data:`DUP_ENGINES` over the live indexes and reports,
+per engine: recall@k (a relevant item in the top ``k``), MRR, p50/p95 query
+latency and the peak memory of one pass over the set. Query embeddings are
+fetched once, before anything is timed, so dense latency is ranking alone.
+A new engine is one more entry in a registry; a speedup to an existing one
+ships with a table showing it did not cost recall.
+
+The evaluation file is JSON::
+
+    {
+      "docs": [{"query": "...", "pages": ["music-providers/spotify"]}],
+      "duplicates": [
+        {"kind": "issue", "number": 812, "title": "...", "body": "...",
+         "duplicates": [{"kind": "issue", "number": 640}]}
+      ]
+    }
+
+``python -m ma_triage mine-eval <out.json>`` builds one from the last
+``EVAL_MINE_DAYS`` of comments: docs questions whose judge verdict (the
+``rag`` record every RAG run leaves in the App's sticky) answered at
+``ANSWER_HI`` or above, labelled with the pages it cited, and issues a
+maintainer marked ``Duplicate of #N``. Judge labels are silver, not gold —
+good for comparing engines against each other, not for absolute claims.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+from . import comment, config
+from .gh import GitHubClient, log
+from .lifecycle import _MAINTAINER_ASSOCIATIONS
+from .models import DocChunk
+from .retrieval import (
+    rank_by_bm25,
+    rank_by_cosine,
+    retrieve_docs,
+    rrf,
+    tokenize,
+)
+from .similar import related_from_index, related_from_lexical
+
+# "Duplicate of #123" is how GitHub itself marks a duplicate from a comment.
+_DUPLICATE_OF = re.compile(r"^\s*duplicate of #(\d+)\b", re.I | re.M)
+
+
+class EvalFormatError(ValueError):
+    """An evaluation file that does not follow the documented layout."""
+
+
+@dataclass
+class Case:
+    """One labelled query: its text, vector and the ids that count as a hit."""
+
+    text: str
+    relevant: set[str]
+    vec: list[float] | None = None
+    # The query's own post, which duplicate engines must not return.
+    exclude: tuple[str, int] = ("", 0)
+
+
+# An engine ranks the corpus for one case: ids, best first.
+Engine = Callable[[Case, list[Any]], list[str]]
+
+
+def _dedupe(ids: list[str]) -> list[str]:
+    seen: set[str] = set()
+    return [i for i in ids if not (i in seen or seen.add(i))]
+
+
+def _post_id(kind: Any, number: Any) -> str:
+    return f"{kind or 'issue'}#{int(number)}"
+
+
+# --------------------------------------------------------------------------- #
+# Engines
+# --------------------------------------------------------------------------- #
+def _docs_dense(case: Case, chunks: list[DocChunk]) -> list[str]:
+    order = rank_by_cosine(case.vec or [], [c.embedding for c in chunks])
+    return _dedupe([chunks[i].path.strip("/") for i in order])
+
+
+def _docs_bm25(case: Case, chunks: list[DocChunk]) -> list[str]:
+    order = rank_by_bm25(tokenize(case.text), [tokenize(f"{c.label} {c.text}") for c in chunks])
+    return _dedupe([chunks[i].path.strip("/") for i in order])
+
+
+def _docs_rrf(case: Case, chunks: list[DocChunk]) -> list[str]:
+    """The production path: hybrid fusion with the per-page cap."""
+    hits = retrieve_docs(case.vec, case.text, chunks, k=len(chunks))
+    return _dedupe([hit.chunk.path.strip("/") for hit in hits])
+
+
+DOC_ENGINES: dict[str, Engine] = {
+    "dense": _docs_dense,
+    "bm25": _docs_bm25,
+    "rrf": _docs_rrf,
+}
+
+
+def _candidates(case: Case, posts: list[dict]) -> list[dict]:
+    return [p for p in posts if (p.get("kind", "issue"), int(p.get("number", 0))) != case.exclude]
+
+
+def _dups_dense(case: Case, posts: list[dict]) -> list[str]:
+    kind, number = case.exclude
+    found = related_from_index(
+        case.vec, posts, exclude_number=number, exclude_kind=kind, k=len(posts), min_score=-1.0
+    )
+    return [_post_id(r.kind, r.number) for r in found]
+
+
+def _dups_bm25(case: Case, posts: list[dict]) -> list[str]:
+    candidates = _candidates(case, posts)
+    docs = [tokenize(f"{p.get('title', '')} {p.get('excerpt', '')}") for p in candidates]
+    order = rank_by_bm25(tokenize(case.text), docs)
+    return [_post_id(candidates[i].get("kind"), candidates[i].get("number")) for i in order]
+
+
+def _dups_bm25f(case: Case, posts: list[dict]) -> list[str]:
+    kind, number = case.exclude
+    title, _, body = case.text.partition("\n\n")
+    found = related_from_lexical(
+        title, body, posts, exclude_number=number, exclude_kind=kind, k=len(posts)
+    )
+    return [_post_id(r.kind, r.number) for r in found]
+
+
+def _dups_rrf(case: Case, posts: list[dict]) -> list[str]:
+    """Dense and BM25F fused, as a candidate for the duplicate path."""
+    dense, lexical = _dups_dense(case, posts), _dups_bm25f(case, posts)
+    ids = _dedupe(dense + lexical)
+    position = {post_id: i for i, post_id in enumerate(ids)}
+    fused = rrf([[position[p] for p in dense], [position[p] for p in lexical]])
+    return [ids[i] for i, _ in sorted(fused.items(), key=lambda pair: pair[1], reverse=True)]
+
+
+DUP_ENGINES: dict[str, Engine] = {
+    "dense": _dups_dense,
+    "bm25": _dups_bm25,
+    "bm25f": _dups_bm25f,
+    "rrf": _dups_rrf,
+}
+
+
+# --------------------------------------------------------------------------- #
+# Measurement
+# --------------------------------------------------------------------------- #
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def evaluate(engine: Engine, cases: list[Case], corpus: list[Any], *, k: int) -> dict[str, Any]:
+    """recall@k, MRR, p50/p95 latency (ms) and peak memory (KiB) of ``engine``."""
+    hits = 0
+    reciprocal = 0.0
+    latencies: list[float] = []
+    for case in cases:
+        start = time.perf_counter()
+        ranked = engine(case, corpus)
+        latencies.append((time.perf_counter() - start) * 1000)
+        first = next((i for i, item in enumerate(ranked) if item in case.relevant), None)
+        if first is not None:
+            hits += first < k
+            reciprocal += 1.0 / (first + 1)
+
+    # A second pass under tracemalloc: tracing slows allocation, so it would
+    # distort the latencies above.
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for case in cases:
+        engine(case, corpus)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    if not was_tracing:
+        tracemalloc.stop()
+
+    n = len(cases)
+    return {
+        "n": n,
+        f"recall@{k}": round(hits / n, 3) if n else None,
+        "mrr": round(reciprocal / n, 3) if n else None,
+        "p50_ms": round(_percentile(latencies, 0.50), 2),
+        "p95_ms": round(_percentile(latencies, 0.95), 2),
+        "peak_kib": max(0, peak) // 1024,
+    }
+
+
+def run(
+    engines: dict[str, Engine], cases: list[Case], corpus: list[Any], *, k: int
+) -> dict[str, dict[str, Any]]:
+    return {name: evaluate(engine, cases, corpus, k=k) for name, engine in engines.items()}
+
+
+def render(title: str, results: dict[str, dict[str, Any]], *, k: int) -> str:
+    """Markdown table of :func:`run` results."""
+    lines = [
+        f"### {title}\n",
+        f"| engine | n | recall@{k} | MRR | p50 | p95 | peak memory |",
+        "|---|---:|---:|---:|---:|---:|---:|",
+    ]
+    for name, r in results.items():
+        recall = "-" if r[f"recall@{k}"] is None else f"{r[f'recall@{k}']:.1%}"
+        mrr = "-" if r["mrr"] is None else f"{r['mrr']:.3f}"
+        lines.append(
+            f"| {name} | {r['n']} | {recall} | {mrr} | {r['p50_ms']:.1f}ms"
+            f" | {r['p95_ms']:.1f}ms | {r['peak_kib']:,} KiB |"
+        )
+    return "\n".join(lines)
+
+
+# --------------------------------------------------------------------------- #
+# Evaluation file
+# --------------------------------------------------------------------------- #
+def load_eval(path: str | Path) -> tuple[list[Case], list[Case]]:
+    """``(docs cases, duplicate cases)`` from an evaluation file (no vectors yet)."""
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        raise EvalFormatError(f"{path}: {exc}") from exc
+    if not isinstance(data, dict):
+        raise EvalFormatError(f"{path}: expected an object with docs/duplicates")
+    try:
+        docs = [
+            Case(text=str(c["query"]), relevant={str(p).strip("/") for p in c["pages"]})
+            for c in data.get("docs") or []
+        ]
+        dups = [
+            Case(
+                text=f"{c.get('title', '')}\n\n{c.get('body', '')}",
+                relevant={_post_id(d.get("kind"), d["number"]) for d in c["duplicates"]},
+                exclude=(str(c.get("kind") or "issue"), int(c["number"])),
+            )
+            for c in data.get("duplicates") or []
+        ]
+    except (KeyError, TypeError, ValueError, AttributeError) as exc:
+        raise EvalFormatError(f"{path}: malformed case: {exc!r}") from exc
+    return docs, dups
+
+
+def _judged_pages(state: dict[str, Any]) -> list[str]:
+    """Doc pages a sticky's judge verdict cited at ``ANSWER_HI`` or above."""
+    rag = state.get("rag")
+    if not isinstance(rag, dict):
+        return []
+    if not rag.get("judge_answered") or float(rag.get("judge_conf") or 0.0) < config.ANSWER_HI:
+        return []
+    return [str(section).split("#", 1)[0] for section in rag.get("cited") or []]
+
+
+def mine(
+    gh: GitHubClient, *, limit: int = 5000
+) -> dict[str, list[dict[str, Any]]]:
+    """An evaluation set from the repository's own history (see module doc)."""
+    since = datetime.now(timezone.utc) - timedelta(days=config.EVAL_MINE_DAYS)
+    comments = gh.list_repo_comments(since=since.isoformat(), limit=limit)
+    if len(comments) >= limit:
+        log(f"Comment listing hit its limit of {limit}; the newest comments are not mined")
+    questions: dict[int, list[str]] = {}
+    duplicates: dict[int, set[int]] = {}
+    for c in comments:
+        number = comment.issue_number(c)
+        if number is None:
+            continue
+        if comment.is_app_sticky(c):
+            pages = _judged_pages(comment.parse_state(c.get("body")))
+            if pages:
+                questions[number] = pages
+        elif c.get("author_association") in _MAINTAINER_ASSOCIATIONS:
+            for match in _DUPLICATE_OF.finditer(c.get("body") or ""):
+                if int(match.group(1)) != number:
+                    duplicates.setdefault(number, set()).add(int(match.group(1)))
+
+    out: dict[str, list[dict[str, Any]]] = {"docs": [], "duplicates": []}
+    for number in sorted(questions.keys() | duplicates.keys()):
+        try:
+            issue = gh.get_issue(number)
+        except Exception as exc:  # noqa: BLE001 — a deleted issue just drops out of the set
+            log(f"Skipping #{number}: {exc}")
+            continue
+        title, body = str(issue.get("title") or ""), str(issue.get("body") or "")
+        if number in questions:
+            out["docs"].append(
+                {"number": number, "query": f"{title}\n\n{body}".strip(),
+                 "pages": sorted(set(questions[number]))}
+            )
+        if number in duplicates:
+            out["duplicates"].append(
+                {"kind": "issue", "number": number, "title": title, "body": body,
+                 "duplicates": [{"kind": "issue", "number": n} for n in sorted(duplicates[number])]}
+            )
+    return out
+
+
+def attach_vectors(cases: list[Case], vectors: list[list[float] | None]) -> None:
+    for case, vec in zip(cases, vectors):
+        case.vec = vec
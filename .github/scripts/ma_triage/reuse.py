@@ -0,0 +1,237 @@
+"""Input fingerprints that let a re-triage reuse the previous run's model output.
+
+Every edit to an issue re-runs triage, but most edits (a typo fix, a reworded
+sentence, a ticked checkbox) change nothing the model-backed stages depend on.
+The sticky comment's state block therefore records, per stage, a digest of the
+stage's *structured* inputs, the output it produced, and a sketch of the issue
+text that output was computed on:
+
+* ``rag`` — embedding + docs judge. Keyed on the reported providers and their
+  docs, the index branch commit, and the embedding / answer models.
+* ``ai`` — server-code fetches + the Tier-1 assessment. Keyed on the parsed
+  diagnostics and attachment URLs, the candidate labels, the RAG output it was
+  shown, and the model.
+
+A stage is reused when its key is unchanged *and* the text is near the text it
+ran on. A reused output keeps its original sketch, so a run of small edits is
+measured against the text the output actually saw and reruns once the edits add
+up. Nearness is measured on a set of hashed tokens of the title and body,
+not on the raw text: fixing one misspelt word changes about two entries, while
+anything the deterministic passes extract from the text (providers, version,
+install method) is in the exact keys anyway, so a meaningful edit still reruns.
+
+The record holds model output and other posts' titles. It is JSON inside an
+HTML comment written only by the bot, escaped by :func:`comment._render_state`,
+and read back only from the bot's own sticky — never echoed unsanitized.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+from dataclasses import asdict
+from typing import Any
+
+from . import config
+from .gh import GitHubClient, log
+from .models import AIResult, DocAnswer, DocChunk, DocHit, RagResult, RelatedPost
+from .retrieval import tokenize
+
+# Bumped whenever a change to a stage makes earlier outputs incomparable.
+_SCHEMA = 2
+# A body with more distinct tokens than this (a pasted log, usually) is compared
+# exactly instead: its sketch would not fit comfortably in the comment.
+_SKETCH_MAX_TOKENS = 2048
+# Keep reused related-post excerpts as long as the assessment ever reads them.
+_EXCERPT_CHARS = 700
+
+
+# --------------------------------------------------------------------------- #
+# Fingerprints
+# --------------------------------------------------------------------------- #
+def digest(*parts: Any) -> str:
+    """Short stable hash of JSON-serialisable ``parts``."""
+    blob = json.dumps([_SCHEMA, *parts], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def text_sketch(title: str, body: str) -> dict[str, Any]:
+    """Sketch of the issue text: its distinct tokens, hashed to 16 bits each."""
+    tokens = set(tokenize(f"{title}\n{body}"))
+    if len(tokens) > _SKETCH_MAX_TOKENS:
+        return {"sha": digest(title, body)}
+    hashed = sorted(
+        {int.from_bytes(hashlib.blake2b(t.encode(), digest_size=2).digest(), "big") for t in tokens}
+    )
+    packed = b"".join(value.to_bytes(2, "big") for value in hashed)
+    return {"tokens": base64.b64encode(packed).decode("ascii")}
+
+
+def _unpack(sketch: dict[str, Any]) -> set[int] | None:
+    try:
+        raw = base64.b64decode(str(sketch["tokens"]), validate=True)
+    except (KeyError, ValueError):
+        return None
+    return {int.from_bytes(raw[i : i + 2], "big") for i in range(0, len(raw) - 1, 2)}
+
+
+def text_distance(a: dict[str, Any], b: dict[str, Any]) -> int | None:
+    """Tokens added plus tokens removed between two sketches.
+
+    ``0`` or ``None`` (incomparable) for hashed-whole sketches, which only ever
+    match exactly.
+    """
+    if "sha" in a or "sha" in b:
+        return 0 if a.get("sha") and a.get("sha") == b.get("sha") else None
+    left, right = _unpack(a), _unpack(b)
+    if left is None or right is None:
+        return None
+    return len(left ^ right)
+
+
+class Previous:
+    """The stage records of the last run, read against this run's text."""
+
+    def __init__(self, state: dict[str, Any] | None, sketch: dict[str, Any]) -> None:
+        self.sketch = sketch
+        self._stages: dict[str, Any] = {}
+        recorded = (state or {}).get("stages")
+        if not config.REUSE_STAGES or not isinstance(recorded, dict):
+            return
+        if recorded.get("schema") != _SCHEMA:
+            return
+        self._stages = recorded
+
+    def recorded(self, stage: str) -> bool:
+        """Whether ``stage`` has a record that a matching key could reuse."""
+        return isinstance(self._stages.get(stage), dict)
+
+    def get(self, stage: str, key: str | None) -> tuple[bool, Any]:
+        """``(hit, output)`` for ``stage`` when it last ran on the same ``key``.
+
+        A hit also needs this run's text near the text the output was computed
+        on, which for a reused output is the text of the run that produced it.
+        """
+        entry = self._stages.get(stage)
+        if key is None or not isinstance(entry, dict) or entry.get("key") != key:
+            return False, None
+        text = entry.get("text")
+        distance = text_distance(text, self.sketch) if isinstance(text, dict) else None
+        if distance is None or distance > config.REUSE_MAX_CHANGED_TOKENS:
+            log(f"Issue text changed ({distance} tokens) since {stage} ran; re-running it")
+            return False, None
+        return True, entry.get("out")
+
+    def carry(self, stages: dict[str, Any], stage: str) -> None:
+        """Copy ``stage``'s record into ``stages`` unchanged, original sketch included."""
+        entry = self._stages.get(stage)
+        if isinstance(entry, dict):
+            stages[stage] = dict(entry)
+
+
+def record() -> dict[str, Any]:
+    """A fresh stage record for this run (filled in with :func:`put`)."""
+    return {"schema": _SCHEMA}
+
+
+def put(
+    stages: dict[str, Any], stage: str, key: str | None, out: Any, text: dict[str, Any]
+) -> None:
+    """Record ``out``, computed on the issue text sketched as ``text``."""
+    if key is not None:
+        stages[stage] = {"key": key, "out": out, "text": text}
+
+
+def index_commit(gh: GitHubClient) -> str | None:
+    """Commit of the index branch, or ``None`` when it cannot be read.
+
+    ``""`` for an absent branch is a valid input (no indexes); ``None`` means
+    the inputs are unknown and nothing keyed on them may be reused.
+    """
+    try:
+        return gh.get_ref_sha(config.INDEX_BRANCH) or ""
+    except Exception as exc:  # noqa: BLE001 — reuse is an optimisation only
+        log(f"Index branch unreadable; not reusing RAG output: {exc}")
+        return None
+
+
+# --------------------------------------------------------------------------- #
+# Stage outputs
+# --------------------------------------------------------------------------- #
+def _post_out(post: RelatedPost) -> dict[str, Any]:
+    out = asdict(post)
+    out["excerpt"] = post.excerpt[:_EXCERPT_CHARS]
+    return out
+
+
+def dump_rag(rag: RagResult | None) -> dict[str, Any] | None:
+    """JSON form of a RAG result; doc chunks are kept by id only."""
+    if rag is None:
+        return None
+    return {
+        "tier": rag.tier,
+        "answer": asdict(rag.doc_answer) if rag.doc_answer is not None else None,
+        "cited": [chunk.id for chunk in rag.cited_chunks],
+        "hits": [[hit.chunk.id, hit.score] for hit in rag.doc_hits],
+        "pinned": [_post_out(post) for post in rag.pinned_posts],
+        "related": [_post_out(post) for post in rag.related_posts],
+        "suppressed": rag.suppressed,
+        "judge_conf": rag.judge_confidence,
+        "judge_answered": rag.judge_answered,
+        "dup": rag.duplicates_only,
+        "judge_cached": rag.judge_cached,
+        "gate": rag.judge_gate,
+        "judge_skipped": rag.judge_skipped,
+    }
+
+
+def load_rag(
+    out: dict[str, Any] | None,
+    *,
+    chunks: list[DocChunk],
+    pinned: list[RelatedPost],
+) -> RagResult | None:
+    """Rebuild a RAG result from :func:`dump_rag` output.
+
+    ``chunks`` is the current docs index and ``pinned`` this run's pinned
+    notices, which are cheap to look up and change independently of the text.
+    Raises :class:`ValueError` when the record is malformed or cites a chunk
+    the index no longer has.
+    """
+    if out is None:
+        result = RagResult(pinned_posts=pinned)
+        return result if result.has_output else None
+    try:
+        by_id = {chunk.id: chunk for chunk in chunks}
+        answer = out["answer"]
+        result = RagResult(
+            tier=str(out["tier"]),
+            doc_answer=DocAnswer(**answer) if answer is not None else None,
+            cited_chunks=[by_id[cid] for cid in out["cited"]],
+            doc_hits=[DocHit(chunk=by_id[cid], score=float(score)) for cid, score in out["hits"]],
+            pinned_posts=pinned,
+            related_posts=[RelatedPost(**post) for post in out["related"]],
+            suppressed=bool(out["suppressed"]),
+            judge_confidence=out["judge_conf"],
+            judge_answered=out["judge_answered"],
+            duplicates_only=bool(out["dup"]),
+            judge_cached=bool(out.get("judge_cached")),
+            judge_gate=out.get("gate"),
+            judge_skipped=bool(out.get("judge_skipped")),
+        )
+    except (KeyError, TypeError, ValueError) as exc:
+        raise ValueError(f"unusable RAG record: {exc!r}") from exc
+    return result if result.has_output else None
+
+
+def dump_ai(result: AIResult) -> dict[str, Any]:
+    return asdict(result)
+
+
+def load_ai(out: Any) -> AIResult:
+    """Rebuild an assessment; :class:`ValueError` when the record is malformed."""
+    try:
+        return AIResult(**out)
+    except TypeError as exc:
+        raise ValueError(f"unusable assessment record: {exc}") from exc
@@ -0,0 +1,315 @@
+"""Synthetic load for the index build and query paths, at sizes not yet live.
+
+The posts index is capped (``TRIAGE_INDEX_MAX_ISSUES`` +
+``TRIAGE_INDEX_MAX_DISCUSSIONS``, 3000 today), so production never shows how
+``build_posts_index``, ``trim_by_kind``, ``_dumps``, ``load_posts`` and the
+related-post queries behave at ten or a hundred times that. ``python -m
+ma_triage bench-scale [n ...]`` generates that corpus and measures it:
+
+* **posts** — titles and bodies drawn from a Zipf-distributed vocabulary, a
+  shared layer of support-speak plus one vocabulary per topic, a skewed
+  provider mix (a third name none) and about one discussion per five issues;
+* **doc chunks** — one per ten posts, from the same topic vocabularies;
+* **vectors** — a deterministic bag-of-tokens embedder answering the
+  embeddings endpoint in-process, so posts on one topic cluster the way real
+  ones do and the build exercises its real HTTP/JSON path with no network;
+* **storage** — an in-memory index branch (:class:`MemoryGH`).
+
+Per size it reports build, trim, serialise and load time, the serialised
+size, dense, lexical and FTS5 query latency (p50/p95) and the process's peak
+RSS.
+Sizes run smallest first, so the RSS column is a curve rather than one
+high-water mark. The caps are lifted for the run — measuring past them is the
+point.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import random
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+import requests
+
+from . import config, embeddings
+from .fts import LexicalIndex
+from .models import DocChunk
+from .retrieval import retrieve_docs
+from .similar import related_from_index, related_from_lexical
+
+try:
+    import resource
+except ImportError:  # not on Windows; RSS is then reported as unknown
+    resource = None  # type: ignore[assignment]
+
+PROVIDERS = (
+    "spotify", "sonos", "plex", "jellyfin", "airplay", "chromecast", "youtube_music",
+    "tidal", "squeezelite", "subsonic", "deezer", "qobuz", "snapcast", "dlna",
+)
+TOPICS = 40
+QUERIES = 25
+_SYLLABLES = ("ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "pa", "do", "gu")
+
+
+class MemoryGH:
+    """The slice of :class:`GitHubClient` the index code uses, held in memory."""
+
+    def __init__(self, repo: str = "bench/scale") -> None:
+        self.repo = repo
+        self.dry_run = False
+        self.files: dict[str, str] = {}
+
+    def get_raw_file(self, repo: str, path: str, ref: str = "main") -> str | None:
+        return self.files.get(path)
+
+    def commit_files(
+        self,
+        branch: str,
+        files: dict[str, str],
+        message: str,
+        *,
+        repo: str | None = None,
+        base: str | None = None,
+    ) -> dict[str, Any]:
+        self.files.update(files)
+        return {"sha": hashlib.sha1(message.encode()).hexdigest()}
+
+
+# --------------------------------------------------------------------------- #
+# Generator
+# --------------------------------------------------------------------------- #
+def _zipf_weights(n: int, s: float = 1.1) -> list[float]:
+    return [1.0 / (rank**s) for rank in range(1, n + 1)]
+
+
+class Corpus:
+    """Deterministic synthetic text: shared words plus per-topic words."""
+
+    def __init__(self, seed: int = 0) -> None:
+        self.rng = random.Random(seed)
+        self.common = self._words(400)
+        self.topics = [self._words(60) for _ in range(TOPICS)]
+        self.common_weights = _zipf_weights(len(self.common))
+        self.topic_weights = _zipf_weights(60)
+        self.provider_weights = _zipf_weights(len(PROVIDERS), 0.9)
+
+    def _words(self, n: int) -> list[str]:
+        out: set[str] = set()
+        while len(out) < n:
+            out.add("".join(self.rng.choices(_SYLLABLES, k=self.rng.randint(2, 4))))
+        return sorted(out)
+
+    def text(self, topic: int, length: int) -> str:
+        n_topic = max(1, int(length * 0.4))
+        words = self.rng.choices(self.topics[topic], self.topic_weights, k=n_topic)
+        words += self.rng.choices(self.common, self.common_weights, k=length - n_topic)
+        self.rng.shuffle(words)
+        return " ".join(words)
+
+    def _length(self, median: int) -> int:
+        return max(3, int(self.rng.lognormvariate(math.log(median), 0.6)))
+
+    def posts(self, n: int) -> list[dict[str, Any]]:
+        """``n`` posts, newest first, as ``build_posts_index`` takes them."""
+        out = []
+        for number in range(n, 0, -1):
+            topic = self.rng.randrange(TOPICS)
+            kind = "discussion" if self.rng.random() < 1 / 6 else "issue"
+            providers = (
+                []
+                if self.rng.random() < 1 / 3
+                else [self.rng.choices(PROVIDERS, self.provider_weights)[0]]
+            )
+            title = " ".join(providers + [self.text(topic, self._length(7))])
+            out.append(
+                {
+                    "kind": kind,
+                    "number": number,
+                    "title": title,
+                    "body": self.text(topic, self._length(120)),
+                    "url": f"https://github.com/bench/scale/{kind}s/{number}",
+                    "state": self.rng.choice(("open", "closed")),
+                    "updated_at": f"2026-01-01T00:00:{number % 60:02d}Z",
+                    "providers": providers,
+                }
+            )
+        return out
+
+    def chunks(self, n: int, dim: int) -> list[DocChunk]:
+        out = []
+        for i in range(n):
+            topic = i % TOPICS
+            text = self.text(topic, self._length(150))
+            path = f"topic-{topic}/page-{i // TOPICS % 5}"
+            out.append(
+                DocChunk(
+                    id=f"{path}#s{i}",
+                    path=path,
+                    url=f"https://docs.example/{path}#s{i}",
+                    title=f"Topic {topic}",
+                    heading=f"Section {i}",
+                    text=text,
+                    breadcrumbs=[f"Topic {topic}", f"Section {i}"],
+                    sha=hashlib.sha256(text.encode()).hexdigest(),
+                    embedding=local_vector(text, dim),
+                )
+            )
+        return out
+
+    def query(self) -> str:
+        return self.text(self.rng.randrange(TOPICS), self._length(40))
+
+
+def local_vector(text: str, dim: int) -> list[float]:
+    """Deterministic bag-of-tokens embedding: shared words, nearby vectors."""
+    vec = [0.0] * dim
+    for token in text.lower().split():
+        digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+        vec[int.from_bytes(digest[:4], "little") % dim] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+    return [x / norm for x in vec]
+
+
+@contextmanager
+def local_embedder(dim: int) -> Iterator[None]:
+    """Answer the embeddings endpoint in-process with :func:`local_vector`.
+
+    Only that endpoint: any other request raises, so a path that would reach the
+    network during a bench fails loudly instead of timing someone's API.
+    """
+    original = requests.Session.request
+
+    def request(session: requests.Session, method: str, url: str, **kwargs: Any) -> Any:
+        if url != config.EMBED_ENDPOINT:
+            raise requests.ConnectionError(f"bench-scale is offline: {method} {url}")
+        inputs = (kwargs.get("json") or {}).get("input") or []
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.headers["Content-Type"] = "application/json"
+        resp._content = json.dumps(
+            {
+                "data": [
+                    {"index": i, "embedding": local_vector(text, dim)}
+                    for i, text in enumerate(inputs)
+                ]
+            }
+        ).encode()
+        return resp
+
+    requests.Session.request = request  # type: ignore[method-assign]
+    try:
+        yield
+    finally:
+        requests.Session.request = original  # type: ignore[method-assign]
+
+
+@contextmanager
+def lifted_caps(n: int) -> Iterator[None]:
+    saved = config.INDEX_MAX_ISSUES, config.INDEX_MAX_DISCUSSIONS
+    config.INDEX_MAX_ISSUES = config.INDEX_MAX_DISCUSSIONS = n
+    try:
+        yield
+    finally:
+        config.INDEX_MAX_ISSUES, config.INDEX_MAX_DISCUSSIONS = saved
+
+
+# --------------------------------------------------------------------------- #
+# Measurement
+# --------------------------------------------------------------------------- #
+def peak_rss_mib() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _timed(fn: Any, *args: Any, **kwargs: Any) -> tuple[Any, float]:
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _quantiles(ms: list[float]) -> tuple[float, float]:
+    ordered = sorted(ms)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]  # noqa: E731
+    return round(pick(0.5), 2), round(pick(0.95), 2)
+
+
+def dim() -> int:
+    """Vector width for the run: the configured one, so the index loads back."""
+    return config.EMBED_DIM if config.EMBED_DIM > 0 else 512
+
+
+def measure(n: int, *, seed: int = 0, queries: int | None = None) -> dict[str, Any]:
+    """One point on the curve: ``n`` posts and ``n // 10`` doc chunks."""
+    width = dim()
+    corpus = Corpus(seed)
+    posts = corpus.posts(n)
+    chunks = corpus.chunks(max(1, n // 10), width)
+    gh = MemoryGH()
+    with lifted_caps(n), local_embedder(width):
+        _, trim_s = _timed(embeddings.trim_by_kind, posts)
+        (index, _), build_s = _timed(embeddings.build_posts_index, gh, posts, token="local")
+    raw, dumps_s = _timed(embeddings._dumps, index)
+    embeddings.save_index(gh, config.POSTS_INDEX_PATH, index, message="bench")
+    loaded, load_s = _timed(embeddings.load_posts, gh)
+    fts, fts_build_s = _timed(LexicalIndex.from_posts, loaded)
+
+    dense_ms, lexical_ms, fts_ms, docs_ms = [], [], [], []
+    for _ in range(QUERIES if queries is None else queries):
+        text = corpus.query()
+        vec = local_vector(text, width)
+        _, s = _timed(related_from_index, vec, loaded, exclude_number=0)
+        dense_ms.append(s * 1000)
+        _, s = _timed(related_from_lexical, text, "", loaded, exclude_number=0)
+        lexical_ms.append(s * 1000)
+        _, s = _timed(fts.search, text, "", exclude_number=0, k=config.RELATED_POSTS)
+        fts_ms.append(s * 1000)
+        _, s = _timed(retrieve_docs, vec, text, chunks)
+        docs_ms.append(s * 1000)
+    fts.close()
+
+    return {
+        "posts": n,
+        "chunks": len(chunks),
+        "loaded": len(loaded),
+        "trim_s": round(trim_s, 3),
+        "build_s": round(build_s, 3),
+        "dumps_s": round(dumps_s, 3),
+        "bytes": len(raw.encode()),
+        "load_s": round(load_s, 3),
+        "dense_ms": _quantiles(dense_ms),
+        "lexical_ms": _quantiles(lexical_ms),
+        "fts_build_s": round(fts_build_s, 3),
+        "fts_ms": _quantiles(fts_ms),
+        "docs_ms": _quantiles(docs_ms),
+        "peak_rss_mib": peak_rss_mib(),
+    }
+
+
+def render(rows: list[dict[str, Any]]) -> str:
+    """Markdown table of :func:`measure` rows (latencies as p50 / p95)."""
+    lines = [
+        "| posts | chunks | build | trim | serialise | size | load"
+        " | dense query | lexical query | FTS build | FTS query | docs query | peak RSS |",
+        "|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    for r in rows:
+        rss = "?" if r["peak_rss_mib"] is None else f"{r['peak_rss_mib']:,.0f} MiB"
+        lines.append(
+            f"| {r['posts']:,} | {r['chunks']:,} | {r['build_s']:.2f}s"
+            f" | {r['trim_s'] * 1000:.1f}ms | {r['dumps_s']:.2f}s"
+            f" | {r['bytes'] / 1e6:,.1f} MB | {r['load_s']:.2f}s"
+            f" | {r['dense_ms'][0]:.1f} / {r['dense_ms'][1]:.1f}ms"
+            f" | {r['lexical_ms'][0]:.1f} / {r['lexical_ms'][1]:.1f}ms"
+            f" | {r['fts_build_s']:.2f}s | {r['fts_ms'][0]:.1f} / {r['fts_ms'][1]:.1f}ms"
+            f" | {r['docs_ms'][0]:.1f} / {r['docs_ms'][1]:.1f}ms | {rss} |"
+        )
+    return "\n".join(lines)
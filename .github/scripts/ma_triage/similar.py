@@ -8,8 +8,10 @@ duplicate. Two paths:
   free, catches rewordings),
 * **lexical** — BM25F over the title and excerpt the same index stores, for when
   the query embedding is unavailable but the index text is still readable,
+* **local full-text** — FTS5/bm25 over the mirror's posts (:mod:`ma_triage.fts`),
+  when there is no readable index but a mirror is on disk,
 * **last resort** — GitHub's own issue search over the report's title keywords,
-  when there is no readable index at all.
+  when there is neither.
 
 The incoming post's own number is always excluded, and results are de-duplicated
 and thresholded so the comment only ever shows genuinely-relevant links.
@@ -18,6 +20,7 @@ and thresholded so the comment only ever shows genuinely-relevant links.
 from __future__ import annotations
 
 import re
+from typing import TYPE_CHECKING
 
 from . import config
 from .gh import GitHubClient, log
@@ -25,6 +28,9 @@ from .models import RelatedPost
 from .providers import detect_provider_labels_from_text
 from .retrieval import bm25f_scores, cosine, decode_vec, tokenize
 
+if TYPE_CHECKING:
+    from .fts import LexicalIndex
+
 _RE_WORD = re.compile(r"[A-Za-z0-9]+")
 
 
@@ -125,6 +131,9 @@ def related_from_lexical(
     it at 1.10 lifts precision on that top hit from 21% to 42%. That is enough
     for a collapsed suggestion and not enough to assert a duplicate, which is
     why these never render expanded and why no constant is exposed.
+
+    :mod:`ma_triage.retrieval_bench` reproduces the recall figures against the
+    current index.
     """
     top_k = config.RELATED_POSTS if k is None else k
     if not posts:
@@ -237,14 +246,16 @@ def find_related(
     exclude_number: int,
     body: str = "",
     text_posts: list[dict] | None = None,
+    lexical: LexicalIndex | None = None,
     exclude_kind: str = "issue",
     provider_labels: set[str] | None = None,
 ) -> list[RelatedPost]:
     """Related posts, in descending order of what the available inputs support.
 
     Dense cosine when there is a query vector and vectors to compare it to,
-    BM25F over the index text when there is not, and GitHub's issue search only
-    when there is no readable index at all.
+    BM25F over the index text when there is not, the mirror's FTS5 index when
+    there is no readable index at all, and GitHub's issue search only when
+    there is not even that.
 
     The choice is made once for the whole request, not per record: a partially
     vectorless index (what a build during a provider outage produces) still
@@ -274,6 +285,17 @@ def find_related(
             exclude_kind=exclude_kind,
             provider_labels=provider_labels,
         )
+    if lexical is not None:
+        # No index, but a local full-text one: scoped by provider in the query
+        # itself, and no search rate limit to spend.
+        return lexical.search(
+            title,
+            body,
+            exclude_number=exclude_number,
+            exclude_kind=exclude_kind,
+            provider_keys=_provider_keys(provider_labels),
+            k=config.RELATED_POSTS,
+        )
     # Below here the only candidate source is GitHub's issue search, which
     # cannot be scoped to a provider. A report that names one would therefore
     # get back exactly the cross-provider matches `related_from_index` filters
@@ -0,0 +1,141 @@
+"""Run the triage pipeline's stages concurrently, in dependency order.
+
+Most of a triage run is waiting on the network: the attachment download, a
+manifest per reported provider, the latest release, the docs index and the
+judge, the server-code fetches. Many of those do not depend on each other — the
+docs answer needs the provider docs but not the diagnostics, the code evidence
+needs the diagnostics but not the docs answer — so :func:`execute` runs each
+:class:`Stage` on a thread pool as soon as the stages it comes ``after`` have
+finished. Per-issue latency is then bounded by the critical path, not the sum.
+
+Stages write disjoint outputs; whatever combines them (sorting findings,
+merging labels) runs after :func:`execute` returns, so the result does not
+depend on which thread finished first. A stage that raises stops anything not
+yet started and the exception propagates as it would from a sequential run —
+stages that must not break triage catch their own errors, exactly as before.
+
+``workers <= 1`` runs every stage inline, in the order given.
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any
+
+from . import metrics
+from .gh import log
+
+
+@dataclass
+class Stage:
+    """A named step; ``run`` is given the outputs of the stages it runs after."""
+
+    name: str
+    run: Callable[[dict[str, Any]], Any]
+    after: tuple[str, ...] = ()
+
+
+@dataclass
+class Timings:
+    """When each stage ran, in seconds since the run started."""
+
+    spans: dict[str, tuple[float, float]] = field(default_factory=dict)
+    wall: float = 0.0
+
+    def durations(self) -> dict[str, float]:
+        return {name: end - start for name, (start, end) in self.spans.items()}
+
+    def critical_path(self, stages: Iterable[Stage]) -> tuple[list[str], float]:
+        """The chain of dependent stages with the longest total duration."""
+        durations = self.durations()
+        best: dict[str, tuple[float, list[str]]] = {}
+        for stage in stages:  # topological: every `after` was seen first
+            if stage.name not in durations:
+                continue
+            prior = max(
+                (best[dep] for dep in stage.after if dep in best),
+                key=lambda pair: pair[0],
+                default=(0.0, []),
+            )
+            best[stage.name] = (prior[0] + durations[stage.name], [*prior[1], stage.name])
+        if not best:
+            return [], 0.0
+        total, path = max(best.values(), key=lambda pair: pair[0])
+        return path, total
+
+    def describe(self, stages: Iterable[Stage]) -> str:
+        """One line: each stage's duration (in pipeline order), wall, critical path."""
+        stages = list(stages)
+        durations = self.durations()
+        path, total = self.critical_path(stages)
+        timed = " · ".join(
+            f"{stage.name} {durations[stage.name]:.2f}s"
+            for stage in stages
+            if stage.name in durations
+        )
+        return (
+            f"{timed} (wall {self.wall:.2f}s; critical path "
+            f"{' → '.join(path) or '-'} {total:.2f}s)"
+        )
+
+
+def execute(stages: list[Stage], *, workers: int) -> tuple[dict[str, Any], Timings]:
+    """Run ``stages`` (listed in dependency order); ``(outputs, timings)``."""
+    names = [stage.name for stage in stages]
+    if len(set(names)) != len(names):
+        raise ValueError(f"duplicate stage names: {names}")
+    seen: set[str] = set()
+    for stage in stages:
+        missing = [dep for dep in stage.after if dep not in seen]
+        if missing:
+            raise ValueError(f"stage {stage.name} runs after unknown or later {missing}")
+        seen.add(stage.name)
+
+    timings = Timings()
+    outputs: dict[str, Any] = {}
+    origin = time.perf_counter()
+
+    def timed(stage: Stage, inputs: dict[str, Any]) -> Any:
+        start = time.perf_counter() - origin
+        try:
+            with metrics.span(f"stage {stage.name}"):
+                return stage.run(inputs)
+        finally:
+            timings.spans[stage.name] = (start, time.perf_counter() - origin)
+
+    if workers <= 1:
+        for stage in stages:
+            outputs[stage.name] = timed(stage, {d: outputs[d] for d in stage.after})
+        timings.wall = time.perf_counter() - origin
+        return outputs, timings
+
+    pending = list(stages)
+    running: dict[Future[Any], Stage] = {}
+    failures: dict[str, BaseException] = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stage") as pool:
+        while pending or running:
+            if not failures:
+                for stage in [s for s in pending if all(d in outputs for d in s.after)]:
+                    pending.remove(stage)
+                    inputs = {d: outputs[d] for d in stage.after}
+                    running[pool.submit(timed, stage, inputs)] = stage
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                exc = future.exception()
+                if exc is None:
+                    outputs[stage.name] = future.result()
+                else:
+                    failures[stage.name] = exc
+    timings.wall = time.perf_counter() - origin
+    if failures:
+        # The first failing stage in pipeline order, as a sequential run would.
+        first = next(name for name in names if name in failures)
+        log(f"Stage {first} failed; {len(pending)} stage(s) not started")
+        raise failures[first]
+    return outputs, timings
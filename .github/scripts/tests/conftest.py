@@ -17,6 +17,8 @@ sys.path.insert(0, str(SCRIPTS_DIR))
 
 FIXTURES = pathlib.Path(__file__).resolve().parent / "fixtures"
 
+from ma_triage.gh import HEAD, RefConflict  # noqa: E402
+
 # Force deterministic flag state for tests regardless of the environment.
 os.environ.setdefault("TRIAGE_DRY_RUN", "false")
 os.environ.setdefault("TRIAGE_AI_ENABLED", "false")
@@ -52,7 +54,13 @@ class FakeGH:
         self._labels = set(labels or [])
         self._manifests = manifests or {}
         self._comments: list[dict] = []
+        # Labels on each issue as a fresh read sees them (see set_labels).
+        self._issue_labels: dict[int, set[str]] = {}
         self._index_files: dict[str, str] = dict(index_files or {})
+        # Index-branch head and each commit's files, for compare-and-swap
+        # commits and reads pinned to a commit. No commit yet: no head.
+        self._head: str | None = None
+        self._commits: dict[str, dict[str, str]] = {}
         self._raw_files: dict[str, str] = dict(raw_files or {})
         self._tree = list(tree or [])
         self._issues = list(issues or [])
@@ -72,6 +80,8 @@ class FakeGH:
 
     def get_raw_file(self, repo, path, ref="main"):
         self.raw_reads.append(path)
+        if ref in self._commits:
+            return self._commits[ref].get(path)
         if path in self._index_files:
             return self._index_files[path]
         if path in self._raw_files:
@@ -82,10 +92,12 @@ class FakeGH:
         return None
 
     def get_tree(self, repo, ref="main", *, recursive=True):
+        if ref in self._commits:
+            return [{"path": path, "type": "blob"} for path in sorted(self._commits[ref])]
         return list(self._tree)
 
     def get_ref_sha(self, branch, *, repo=None):
-        return None
+        return self._head
 
     def list_labels(self):
         return set(self._labels)
@@ -97,14 +109,29 @@ class FakeGH:
     def list_comments(self, number):
         return list(self._comments)
 
+    def list_repo_comments(self, *, since=None, limit=1000):
+        return [c for c in self._comments
+                if not since or (c.get("updated_at") or "") >= since][:limit]
+
     def get_issue(self, number):
         return {"number": number, "labels": [], "user": {"login": "reporter"}}
 
-    def list_recent_issues(self, *, state="all", limit=500):
-        return list(self._issues)[:limit]
+    def get_issue_snapshot(self, number):
+        return {"issue": self.get_issue(number), "comments": self.list_comments(number),
+                "labels": self.list_labels()}
+
+    def list_issue_labels(self, number):
+        return set(self._issue_labels.get(number, ()))
 
-    def list_discussions(self, *, limit=500):
-        return list(self._discussions)[:limit]
+    def list_recent_issues(self, *, state="all", limit=500, since=None, oldest_first=False):
+        issues = [i for i in self._issues if not since or (i.get("updated_at") or "") >= since]
+        if oldest_first:
+            issues.sort(key=lambda i: i.get("updated_at") or "")
+        return issues[:limit]
+
+    def list_discussions(self, *, limit=500, since=None):
+        return [d for d in self._discussions
+                if not since or (d.get("updatedAt") or "") >= since][:limit]
 
     def list_pinned_discussions(self):
         return list(self._pinned_discussions)
@@ -119,6 +146,10 @@ class FakeGH:
     def remove_label(self, number, label):
         self.calls.append(("remove_label", number, label))
 
+    def set_labels(self, number, labels):
+        self.calls.append(("set_labels", number, tuple(labels)))
+        self._issue_labels[number] = set(labels)
+
     def create_comment(self, number, body):
         self.calls.append(("create_comment", number, body))
         self._comments.append({"id": len(self._comments) + 1, "body": body,
@@ -142,12 +173,27 @@ class FakeGH:
     def list_issues_with_label(self, label, state="open"):
         return []
 
-    def commit_files(self, branch, files, message, *, repo=None):
+    def list_labelled_issues(self, label):
+        return None  # as if GraphQL were unavailable: the sweep lists over REST
+
+    def get_recent_comments(self, numbers, *, last=50, batch=25):
+        return {n: {"comments": list(self._comments), "total": len(self._comments)}
+                for n in numbers}
+
+    def commit_files(self, branch, files, message, *, repo=None, base=HEAD):
         self.calls.append(("commit_files", branch, tuple(sorted(files)), message))
         if self.dry_run:
             return None
-        self._index_files.update(files)
-        return "deadbeef"
+        if base != HEAD and base != self._head:
+            raise RefConflict(f"{branch} moved past {base}")
+        for path, content in files.items():
+            if content is None:
+                self._index_files.pop(path, None)
+            else:
+                self._index_files[path] = content
+        self._head = f"c{len(self._commits) + 1}"
+        self._commits[self._head] = dict(self._index_files)
+        return self._head
 
 
 @pytest.fixture
@@ -248,3 +248,56 @@ def test_chat_uses_http_when_no_cli_token_is_present(monkeypatch):
         lambda *a, **k: _Resp({"choices": [{"message": {"content": '{"ok": 1}'}}]}),
     )
     assert ai._chat(_payload(), token="t", what="X") == {"ok": 1}
+
+
+# --- response cache ----------------------------------------------------------- #
+def test_chat_cache_is_off_without_a_directory(monkeypatch):
+    monkeypatch.setattr(config, "AI_CACHE_DIR", "")
+    monkeypatch.setattr(config, "AI_CLI_TOKEN", "")
+    calls = []
+
+    def post(*a, **k):
+        calls.append(1)
+        return _Resp({"choices": [{"message": {"content": '{"ok": 1}'}}]})
+
+    monkeypatch.setattr(ai.requests, "post", post)
+    ai._chat(_payload(), token="t", what="X")
+    ai._chat(_payload(), token="t", what="X")
+    assert len(calls) == 2
+
+
+def test_chat_cache_replays_an_identical_request(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "AI_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "AI_CLI_TOKEN", "")
+    calls = []
+
+    def post(*a, **k):
+        calls.append(1)
+        return _Resp({"choices": [{"message": {"content": '{"ok": 1}'}}]})
+
+    monkeypatch.setattr(ai.requests, "post", post)
+    assert ai._chat(_payload(), token="t", what="X") == {"ok": 1}
+    # Line endings and trailing whitespace do not change the request.
+    respaced = _payload()
+    respaced["messages"][1]["content"] += "  \r\n"
+    assert ai._chat(respaced, token="t", what="X") == {"ok": 1}
+    assert len(calls) == 1
+
+    changed = _payload()
+    changed["model"] = "other"
+    ai._chat(changed, token="t", what="X")
+    assert len(calls) == 2
+    # The backend is part of the key: the CLI is a different model source.
+    http_key = ai._cache_key(_payload())
+    monkeypatch.setattr(config, "AI_CLI_TOKEN", "tok")
+    assert ai._cache_key(_payload()) != http_key
+
+
+def test_chat_cache_never_stores_a_failure(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "AI_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "AI_CLI_TOKEN", "tok")
+    replies = iter([None, '{"ok": 2}'])
+    monkeypatch.setattr(ai.copilot, "run", lambda *a, **k: next(replies))
+    assert ai._chat(_payload(), token="t", what="X") is None
+    assert ai._chat(_payload(), token="t", what="X") == {"ok": 2}
+    assert ai._chat(_payload(), token="t", what="X") == {"ok": 2}
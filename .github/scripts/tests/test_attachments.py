@@ -1,3 +1,5 @@
+import pytest
+
 from ma_triage import attachments
 
 
@@ -194,3 +196,281 @@ def test_download_log_windowed_ignores_non_206_tail(monkeypatch):
     out = attachments.download_log_windowed(url, head_bytes=4096, tail_bytes=8)
     assert out == "H" * 4096
     assert "truncated" not in out
+
+
+# --------------------------------------------------------------------------- #
+# Compressed attachments
+# --------------------------------------------------------------------------- #
+def _gz(data: bytes) -> bytes:
+    import gzip
+
+    return gzip.compress(data)
+
+
+def _zip(members: dict[str, bytes]) -> bytes:
+    import io
+    import zipfile
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buf.getvalue()
+
+
+def _split(data: bytes, size: int = 1000) -> list[bytes]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+def test_find_compressed_attachments():
+    body = (
+        "[a](https://github.com/user-attachments/files/1/server.log.gz) "
+        "[b](https://github.com/user-attachments/files/2/logs.zip) "
+        "[c](https://github.com/user-attachments/files/3/"
+        "music-assistant-diagnostics-2024.json.gz)"
+    )
+    logs = attachments.find_log_urls(body)
+    assert [u.rsplit("/", 1)[-1] for u in logs] == ["server.log.gz", "logs.zip"]
+    assert attachments.find_diagnostics_url(body).endswith("2024.json.gz")
+
+
+def test_download_capped_decodes_gzip(monkeypatch):
+    payload = b'{"schema_version": 1}' * 50
+    monkeypatch.setattr(
+        attachments.requests, "get", lambda *a, **k: _FakeResp(_split(_gz(payload)))
+    )
+    url = "https://github.com/user-attachments/files/1/diagnostics.json.gz"
+    assert attachments.download_capped(url) == payload
+
+
+def test_download_capped_enforces_decoded_cap(monkeypatch):
+    payload = bytes(range(256)) * 400  # ~100 KB, barely compressible
+    monkeypatch.setattr(
+        attachments.requests, "get", lambda *a, **k: _FakeResp(_split(_gz(payload)))
+    )
+    url = "https://github.com/user-attachments/files/1/diagnostics.json.gz"
+    assert attachments.download_capped(url, max_decompressed=50_000) is None
+
+
+def test_download_capped_rejects_compression_bomb(monkeypatch):
+    bomb = _gz(b"\0" * (20 * 1024 * 1024))  # ~20 KB on the wire
+    monkeypatch.setattr(
+        attachments.requests, "get", lambda *a, **k: _FakeResp(_split(bomb))
+    )
+    url = "https://github.com/user-attachments/files/1/diagnostics.json.gz"
+    assert attachments.download_capped(url) is None
+
+
+def test_download_capped_rejects_corrupt_archive(monkeypatch):
+    monkeypatch.setattr(
+        attachments.requests, "get", lambda *a, **k: _FakeResp([b"not gzip at all"])
+    )
+    url = "https://github.com/user-attachments/files/1/server.log.gz"
+    assert attachments.download_capped(url) is None
+
+
+def test_download_capped_zst_without_decoder(monkeypatch):
+    monkeypatch.setattr(attachments, "_open_zstd", lambda fileobj: None)
+    monkeypatch.setattr(
+        attachments.requests, "get", lambda *a, **k: _FakeResp([b"\x28\xb5\x2f\xfd"])
+    )
+    url = "https://github.com/user-attachments/files/1/server.log.zst"
+    assert attachments.download_capped(url) is None
+
+
+def test_download_log_windowed_gzip_is_fully_decoded(monkeypatch):
+    log_text = "".join(f"2024-05-01 line {i}\n" for i in range(5000)).encode()
+    monkeypatch.setattr(
+        attachments.requests, "get", lambda *a, **k: _FakeResp(_split(_gz(log_text)))
+    )
+    url = "https://github.com/user-attachments/files/1/server.log.gz"
+    assert attachments.download_log_windowed(url) == log_text.decode()
+
+
+def test_download_log_windowed_zip_prefers_log_member(monkeypatch):
+    archive = _zip({"readme.md": b"x" * 5000, "home-assistant.log": b"the log\n"})
+    monkeypatch.setattr(
+        attachments.requests, "get", lambda *a, **k: _FakeResp(_split(archive))
+    )
+    url = "https://github.com/user-attachments/files/1/logs.zip"
+    assert attachments.download_log_windowed(url) == "the log\n"
+
+
+def test_compressed_log_keeps_head_and_rolling_tail(monkeypatch):
+    log_text = b"HEAD\n" + b"".join(b"middle %d\n" % i for i in range(20000)) + b"LAST\n"
+    monkeypatch.setattr(
+        attachments.requests, "get", lambda *a, **k: _FakeResp(_split(_gz(log_text)))
+    )
+    url = "https://github.com/user-attachments/files/1/server.log.gz"
+    out = attachments._download_compressed_log(
+        url, "gz", head_bytes=1000, tail_bytes=100
+    )
+    head, tail = out.split("... [log truncated by triage bot] ...")
+    assert head.startswith("HEAD\n")
+    assert tail.strip().endswith("LAST")
+    assert len(tail.strip()) <= 100
+
+
+def test_compressed_log_decodes_no_more_than_the_budget(monkeypatch):
+    log_text = b"".join(b"line %d\n" % i for i in range(200000))
+    monkeypatch.setattr(
+        attachments.requests, "get", lambda *a, **k: _FakeResp(_split(_gz(log_text)))
+    )
+    pulled = []
+    decode = attachments._decoded_chunks
+
+    def counting(*args, **kwargs):
+        for block in decode(*args, **kwargs):
+            pulled.append(len(block))
+            yield block
+
+    monkeypatch.setattr(attachments, "_decoded_chunks", counting)
+    url = "https://github.com/user-attachments/files/1/server.log.gz"
+    out = attachments._download_compressed_log(
+        url, "gz", max_decoded=100_000, tail_bytes=1000
+    )
+    assert sum(pulled) < 100_000 + 64 * 1024  # at most one block past the budget
+    assert out.startswith("line 0\n")
+    assert out.endswith("... [log truncated by triage bot] ...\n\n")
+    assert len(out) < 100_000 + 100
+
+
+def test_compressed_log_bomb_stops_but_keeps_output(monkeypatch):
+    bomb = _gz(b"log line\n" * (4 * 1024 * 1024))
+    monkeypatch.setattr(
+        attachments.requests, "get", lambda *a, **k: _FakeResp(_split(bomb))
+    )
+    url = "https://github.com/user-attachments/files/1/server.log.gz"
+    out = attachments._download_compressed_log(url, "gz", head_bytes=1000)
+    assert out.startswith("log line\n")
+    assert "truncated by triage bot" in out
+
+
+# --------------------------------------------------------------------------- #
+# Range sampling of oversized logs
+# --------------------------------------------------------------------------- #
+class _RangeServer:
+    """Serves ``content`` like an S3 object: whole body, or 206 byte ranges."""
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self.ranges: list[str] = []
+
+    def get(self, *a, **k):
+        spec = k.get("headers", {}).get("Range")
+        if spec is None:
+            return _FakeResp([self.content[i : i + 4096] for i in range(0, len(self.content), 4096)])
+        self.ranges.append(spec)
+        first, last = spec.removeprefix("bytes=").split("-")
+        size = len(self.content)
+        if not first:
+            lo, hi = size - int(last), size - 1
+        else:
+            lo, hi = int(first), min(int(last), size - 1)
+        resp = _RangeResp(self.content[lo : hi + 1])
+        resp.headers = {"Content-Range": f"bytes {lo}-{hi}/{size}"}
+        return resp
+
+
+def _quiet_lines(count: int, start: int = 0) -> bytes:
+    return b"".join(b"2024-05-01 INFO quiet line %06d\n" % i for i in range(start, start + count))
+
+
+def test_sampling_fetches_small_middle_whole(monkeypatch):
+    content = _quiet_lines(2000)
+    server = _RangeServer(content)
+    monkeypatch.setattr(attachments.requests, "get", server.get)
+    url = "https://github.com/user-attachments/files/1/server.log"
+    out = attachments.download_log_windowed(url, head_bytes=4096, tail_bytes=4096)
+    assert out == content.decode()
+
+
+def test_sampling_zooms_in_on_middle_traceback(monkeypatch):
+    burst = b"2024-05-01 ERROR (MainThread) [music_assistant] Unexpected error\n" * 150
+    traceback = (
+        b"Traceback (most recent call last):\n"
+        + b"".join(
+            b'  File "/app/music_assistant/x%d.py", line %d, in f\n    g()\n' % (i, i)
+            for i in range(300)
+        )
+        + b"KeyError: 'media_item'\n"
+    )
+    # The traceback is longer than one window and starts at the log's centre,
+    # where the middle probe lands.
+    content = _quiet_lines(29800) + burst + traceback + _quiet_lines(30000, start=30000)
+    server = _RangeServer(content)
+    monkeypatch.setattr(attachments.requests, "get", server.get)
+    monkeypatch.setattr(attachments.config, "LOG_SAMPLING", True)
+    url = "https://github.com/user-attachments/files/1/server.log"
+
+    head, tail = 64 * 1024, 64 * 1024
+    runs = attachments._sample_middle(
+        url, start=head, end=len(content) - tail, budget=48 * 1024, window=4096, probes=5
+    )
+    sampled = b"".join(data for _, data in runs)
+    assert len(sampled) <= 48 * 1024
+    assert b"Traceback (most recent call last)" in sampled
+    assert b"KeyError: 'media_item'" in sampled
+
+
+def test_sampling_quiet_log_costs_only_probes(monkeypatch):
+    content = _quiet_lines(60000)
+    server = _RangeServer(content)
+    monkeypatch.setattr(attachments.requests, "get", server.get)
+    url = "https://github.com/user-attachments/files/1/server.log"
+    runs = attachments._sample_middle(
+        url, start=4096, end=len(content) - 4096, budget=64 * 1024, window=4096, probes=5
+    )
+    assert len(server.ranges) == 5
+    assert len(runs) == 5
+
+
+def test_sampling_disabled_keeps_head_and_tail(monkeypatch):
+    content = _quiet_lines(60000)
+    server = _RangeServer(content)
+    monkeypatch.setattr(attachments.requests, "get", server.get)
+    monkeypatch.setattr(attachments.config, "LOG_SAMPLING", False)
+    url = "https://github.com/user-attachments/files/1/server.log"
+    out = attachments.download_log_windowed(url, head_bytes=4096, tail_bytes=4096)
+    assert server.ranges == ["bytes=-4096"]
+    assert out.count("truncated by triage bot") == 1
+
+
+def test_stream_capped_raises_past_cap(monkeypatch):
+    monkeypatch.setattr(
+        attachments.requests, "get", lambda *a, **k: _FakeResp([b"x" * 1024] * 10)
+    )
+    url = "https://github.com/user-attachments/files/1/a.json"
+    stream = attachments.stream_capped(url, max_bytes=4096)
+    received = []
+    with pytest.raises(attachments.DownloadFailed):
+        for chunk in stream:
+            received.append(chunk)
+    assert len(received) == 4
+
+
+def test_probe_combines_etag_and_total_size_from_a_ranged_get(monkeypatch):
+    url = "https://github.com/user-attachments/files/1/a.json"
+    seen = []
+
+    def fake_get(url, **kwargs):
+        seen.append(kwargs["headers"].get("Range"))
+        resp = _RangeResp(b"{")
+        resp.headers = {"ETag": '"abc"', "Content-Range": "bytes 0-0/12"}
+        return resp
+
+    monkeypatch.setattr(attachments.requests, "head", lambda *a, **k: pytest.fail("HEAD sent"))
+    monkeypatch.setattr(attachments.requests, "get", fake_get)
+    assert attachments.probe(url) == '"abc"|12'
+    assert seen == ["bytes=0-0"]
+
+    # A server that ignores the range reports the size as Content-Length.
+    whole = _RangeResp(b"x" * 12, status_code=200)
+    whole.headers = {"Content-Length": "12"}
+    monkeypatch.setattr(attachments.requests, "get", lambda *a, **k: whole)
+    assert attachments.probe(url) == "|12"
+    monkeypatch.setattr(attachments.requests, "get", lambda *a, **k: _RangeResp(b"", 403))
+    assert attachments.probe(url) is None
+    monkeypatch.setattr(attachments.requests, "get", lambda *a, **k: _RangeResp(b""))
+    assert attachments.probe(url) is None
+    assert attachments.probe("https://evil.example.com/a.json") is None
@@ -0,0 +1,55 @@
+import os
+import time
+
+from ma_triage.cache import DiskCache
+
+
+def _cache(tmp_path, **kw):
+    kw = {"ttl_seconds": 3600, "max_bytes": 1_000_000, **kw}
+    return DiskCache(tmp_path / "cache", **kw)
+
+
+def test_round_trip_and_counters(tmp_path):
+    cache = _cache(tmp_path)
+    assert cache.get("k") is None
+    cache.put("k", {"a": [1, 2]})
+    assert cache.get("k") == {"a": [1, 2]}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_disabled_cache_is_a_no_op(tmp_path):
+    cache = DiskCache("", ttl_seconds=60, max_bytes=10)
+    cache.put("k", 1)
+    assert not cache.enabled
+    assert cache.get("k") is None
+
+
+def test_expired_entry_is_a_miss_and_removed(tmp_path):
+    cache = _cache(tmp_path, ttl_seconds=60)
+    cache.put("k", 1)
+    path = cache._path("k")
+    entry = path.read_text().replace('"stored_at":', '"stored_at":1,"_":')
+    path.write_text(entry)
+    assert cache.get("k") is None
+    assert not path.exists()
+
+
+def test_size_bound_evicts_least_recently_used(tmp_path):
+    cache = _cache(tmp_path, max_bytes=10_000)
+    for key in ("old", "used", "new"):
+        cache.put(key, "x" * 3000)
+    now = time.time()
+    os.utime(cache._path("old"), (now - 300, now - 300))
+    os.utime(cache._path("used"), (now - 200, now - 200))
+    cache.get("used")  # touch: now the most recently used
+    cache.put("newest", "x" * 3000)
+    assert cache.get("old") is None
+    assert cache.get("used") == "x" * 3000
+    assert cache.get("newest") == "x" * 3000
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("k", 1)
+    cache._path("k").write_text("{not json")
+    assert cache.get("k") is None
@@ -0,0 +1,150 @@
+"""Tests for HTTP record/replay and the offline bench command."""
+
+import json
+
+import pytest
+import requests
+
+from ma_triage import __main__ as main
+from ma_triage import cassette, config, lifecycle
+from ma_triage.gh import GRAPHQL_URL, RAW_ROOT, GitHubClient
+
+ISSUES_URL = "https://api.github.com/repos/x/y/issues"
+NO_WAITING_ISSUES = {"data": {"repository": {"issues": {
+    "pageInfo": {"hasNextPage": False}, "nodes": []}}}}
+
+
+def _sweep_answers(answers):
+    answers[GRAPHQL_URL] = _response(200, NO_WAITING_ISSUES)
+    answers[f"{RAW_ROOT}/x/y/{config.INDEX_BRANCH}/{config.SWEEP_CHECKPOINT_PATH}"] = _response(
+        404, b"", "text/plain"
+    )
+
+
+def _response(status, body, content_type="application/json"):
+    resp = requests.Response()
+    resp.status_code = status
+    resp.headers["Content-Type"] = content_type
+    resp.headers["Authorization-Echo"] = "dropped"
+    resp._content = body if isinstance(body, bytes) else json.dumps(body).encode()
+    resp.url = "https://example"
+    return resp
+
+
+@pytest.fixture
+def network(monkeypatch):
+    """A fake transport under `requests`, answering from a dict by URL."""
+    answers = {}
+    seen = []
+
+    def request(session, method, url, **kwargs):
+        seen.append((method, url, kwargs.get("params")))
+        return answers[url]
+
+    monkeypatch.setattr(requests.Session, "request", request)
+    return answers, seen
+
+
+def test_record_then_replay_serves_the_same_bytes_offline(network, tmp_path):
+    answers, seen = network
+    answers[ISSUES_URL] = _response(200, [{"number": 1}])
+    answers["https://files.example/log.txt"] = _response(200, b"line\n" * 100, "text/plain")
+    path = tmp_path / "run.json"
+
+    with cassette.recording(path, command="sweep"):
+        gh = GitHubClient("secret-token", repo="x/y")
+        assert gh._rest("GET", "/repos/x/y/issues", params={"state": "open"}) == [{"number": 1}]
+        with requests.get("https://files.example/log.txt", stream=True) as resp:
+            streamed = b"".join(resp.iter_content(64))
+    assert streamed == b"line\n" * 100
+    assert "secret-token" not in path.read_text()
+    assert "Authorization-Echo" not in path.read_text()
+
+    tape = cassette.Cassette.load(path)
+    assert len(tape.interactions) == 2
+    answers.clear()  # nothing may reach the transport now
+    with cassette.replaying(tape, latency=0) as player:
+        gh = GitHubClient("t", repo="x/y")
+        assert gh._rest("GET", "/repos/x/y/issues", params={"state": "open"}) == [{"number": 1}]
+        with requests.get("https://files.example/log.txt", stream=True) as resp:
+            assert b"".join(resp.iter_content(64)) == streamed
+    assert player.served == 2 and player.misses == []
+    assert len(seen) == 2  # only the recorded calls
+
+
+def test_replay_tells_requests_apart_by_params_and_body(network, tmp_path):
+    answers, _ = network
+    path = tmp_path / "run.json"
+    with cassette.recording(path, command="triage"):
+        answers["https://m.example/embed"] = _response(200, {"n": 1})
+        requests.post("https://m.example/embed", json={"input": ["a"]})
+        answers["https://m.example/embed"] = _response(200, {"n": 2})
+        requests.post("https://m.example/embed", json={"input": ["b"]})
+
+    with cassette.replaying(cassette.Cassette.load(path), latency=0) as player:
+        assert requests.post("https://m.example/embed", json={"input": ["b"]}).json() == {"n": 2}
+        assert requests.post("https://m.example/embed", json={"input": ["a"]}).json() == {"n": 1}
+        with pytest.raises(requests.ConnectionError):
+            requests.post("https://m.example/embed", json={"input": ["c"]})
+    assert len(player.misses) == 1
+
+
+def test_replay_repeats_the_last_answer_once_exhausted(tmp_path):
+    tape = cassette.Cassette(command="sweep")
+    tape.add("GET https://a.example/x", _response(200, {"n": 1}), b'{"n": 1}', 0.0)
+    with cassette.replaying(tape, latency=0):
+        assert requests.get("https://a.example/x").json() == {"n": 1}
+        assert requests.get("https://a.example/x").json() == {"n": 1}
+
+
+def test_replay_sleeps_the_recorded_latency(monkeypatch):
+    slept = []
+    monkeypatch.setattr(cassette.time, "sleep", slept.append)
+    tape = cassette.Cassette(command="sweep")
+    tape.add("GET https://a.example/x", _response(200, {}), b"{}", 0.4)
+    with cassette.replaying(tape, latency=0.5):
+        requests.get("https://a.example/x")
+    assert slept == [pytest.approx(0.2)]
+
+
+def test_load_rejects_foreign_files(tmp_path):
+    path = tmp_path / "x.json"
+    path.write_text('{"schema": 99}')
+    with pytest.raises(cassette.CassetteError):
+        cassette.Cassette.load(path)
+
+
+def test_main_records_a_cassette_when_asked(network, tmp_path, monkeypatch):
+    answers, _ = network
+    _sweep_answers(answers)
+    path = tmp_path / "sweep.json"
+    monkeypatch.setattr(config, "RECORD_CASSETTE", str(path))
+    monkeypatch.setenv("GITHUB_TOKEN", "t")
+    monkeypatch.setenv("REPOSITORY", "x/y")
+    monkeypatch.setattr(main, "cmd_sweep", lambda gh: len(lifecycle.sweep(gh)))
+    assert main.main(["sweep"]) == 0
+    tape = cassette.Cassette.load(path)
+    assert tape.command == "sweep" and tape.repo == "x/y"
+    assert tape.interactions and tape.interactions[0]["key"].startswith(f"POST {GRAPHQL_URL} ")
+
+
+def test_bench_replays_each_cassette(network, tmp_path, monkeypatch, capsys):
+    answers, seen = network
+    _sweep_answers(answers)
+    monkeypatch.setenv("REPOSITORY", "x/y")
+    with cassette.recording(tmp_path / "sweep.json", command="sweep"):
+        lifecycle.sweep(GitHubClient("t", repo="x/y"))
+    (tmp_path / "broken.json").write_text("{")
+    calls = len(seen)
+
+    monkeypatch.setattr(config, "REPLAY_LATENCY", 0.0)
+    assert main.main(["bench", str(tmp_path), "2"]) == 0
+    assert len(seen) == calls  # offline
+    out = capsys.readouterr().err
+    row = next(line for line in out.splitlines() if line.startswith("| sweep.json"))
+    assert row.startswith("| sweep.json | sweep | 2 |") and row.endswith("| 0 |")
+    assert "broken.json: unreadable cassette" in out
+
+
+def test_bench_without_cassettes_is_a_usage_error(tmp_path):
+    assert main.main(["bench", str(tmp_path)]) == 2
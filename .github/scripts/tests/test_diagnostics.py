@@ -50,3 +50,73 @@ def test_injection_values_preserved_as_data(injection_raw):
     # The parser keeps raw strings; escaping happens only at render time.
     assert "@maintainer" in diag.providers[0].last_error
     assert diag.system.safe_mode is True
+
+
+def test_chunked_parse_matches_whole(sample_raw):
+    chunks = [sample_raw[i : i + 7] for i in range(0, len(sample_raw), 7)]
+    assert parse_diagnostics(chunks) == parse_diagnostics(sample_raw)
+
+
+def test_unused_sections_are_skipped_not_built(sample_raw):
+    import json
+
+    data = json.loads(sample_raw)
+    data["redaction_notice"] = {"deep": [[[["x"]]]], "n": list(range(1000))}
+    data["system"]["counts"] = {"tracks": 12}
+    diag = parse_diagnostics(json.dumps(data).encode())
+    assert diag.system.version == "2.8.0"
+    assert diag.has_log_tail is True
+
+
+@pytest.mark.parametrize(
+    "extra", ['{"a" 1 2 ,, [}] }', "[1, 2,]", '{"a": 1]', "[tru]", '{"a": 01}']
+)
+def test_invalid_json_in_an_unread_section_is_rejected(sample_raw, extra):
+    text = sample_raw.decode().rstrip()
+    assert text.endswith("}")
+    with pytest.raises(InvalidDiagnostics):
+        parse_diagnostics(f'{text[:-1]}, "zz_extra": {extra}}}'.encode())
+
+
+def test_string_limit_enforced(monkeypatch):
+    monkeypatch.setattr(diagnostics.config, "MAX_JSON_STRING_CHARS", 100)
+    payload = '{"schema_version":1,"system":{},"skipped":"' + "x" * 500 + '"}'
+    with pytest.raises(InvalidDiagnostics):
+        parse_diagnostics(payload.encode())
+
+
+def test_key_limit_enforced(monkeypatch):
+    monkeypatch.setattr(diagnostics.config, "MAX_JSON_KEYS", 50)
+    many = ",".join(f'"k{i}":1' for i in range(100))
+    payload = '{"schema_version":1,"system":{},"skipped":{' + many + "}}"
+    with pytest.raises(InvalidDiagnostics):
+        parse_diagnostics(payload.encode())
+
+
+def test_trailing_data_rejected():
+    with pytest.raises(InvalidDiagnostics):
+        parse_diagnostics(b'{"schema_version":1,"system":{}} {}')
+
+
+def test_stream_stops_at_first_violation():
+    pulled = []
+
+    def chunks():
+        yield b'{"schema_version":1,"system":{},"a":' + b"[" * 100
+        for i in range(1000):
+            pulled.append(i)
+            yield b"]" * 1000
+
+    with pytest.raises(InvalidDiagnostics):
+        parse_diagnostics(chunks())
+    assert len(pulled) <= 1
+
+
+def test_dump_load_round_trip(sample_raw):
+    diag = parse_diagnostics(sample_raw)
+    assert diagnostics.load_diagnostics(diagnostics.dump_diagnostics(diag)) == diag
+
+
+def test_load_rejects_bad_shape():
+    with pytest.raises(InvalidDiagnostics):
+        diagnostics.load_diagnostics({"schema_version": 1})
@@ -283,6 +283,7 @@ def test_cmd_discussion_sanitizes_related_title(discussions_on, monkeypatch):
 # cmd_discussion_append
 # --------------------------------------------------------------------------- #
 def test_cmd_discussion_append(ai_on, monkeypatch):
+    monkeypatch.setattr(config, "APPEND_QUEUE", False)
     monkeypatch.setenv("DISCUSSION_NUMBER", "7")
     monkeypatch.setattr(config, "DISCUSSIONS_ENABLED", True)
     gh = FakeGH(discussion=_disc())
@@ -388,3 +388,121 @@ def test_dim_matches_accepts_any_real_width_when_none_is_requested(monkeypatch):
     # 0 means no vectors were stored, so there is nothing to rank against.
     assert not embeddings.dim_matches({"dim": 0})
     assert not embeddings.dim_matches({})
+
+
+def _racing(gh, post):
+    """Make another writer's append land just before ``gh``'s next commit."""
+    commit = gh.commit_files
+    pending = [post]
+
+    def commit_after_rival(branch, files, message, **kwargs):
+        if pending:
+            pending.pop()
+            rival = embeddings.upsert_posts(
+                embeddings.load_index(gh, config.POSTS_INDEX_PATH),
+                [embeddings._post_record(post, None)],
+            )
+            commit(branch, {config.POSTS_INDEX_PATH: embeddings._dumps(rival)}, "rival")
+        return commit(branch, files, message, **kwargs)
+
+    return commit_after_rival
+
+
+def test_save_post_reapplies_its_record_when_an_append_lands_first(ai_on, monkeypatch):
+    gh = FakeGH()
+    embeddings.save_index(gh, config.POSTS_INDEX_PATH, embeddings.upsert_posts(
+        None, [embeddings._post_record({"number": 1, "title": "old"}, None)]), message="seed")
+    monkeypatch.setattr(gh, "commit_files", _racing(gh, {"number": 2, "title": "rival"}))
+    monkeypatch.setattr(embeddings.time, "sleep", lambda s: None)
+    embedded = []
+    monkeypatch.setattr(embeddings, "embed_text",
+                        lambda text, token: embedded.append(text) or fake_embedding(text))
+
+    index, ok = embeddings.save_post(gh, {"number": 3, "title": "mine"}, token="t",
+                                     message="append")
+
+    assert ok and len(embedded) == 1  # re-applied, not re-embedded
+    stored = json.loads(gh._index_files[config.POSTS_INDEX_PATH])
+    assert [p["number"] for p in stored["posts"]] == [3, 2, 1] == [
+        p["number"] for p in index["posts"]]
+
+
+def test_save_index_gives_up_after_the_attempt_budget(monkeypatch):
+    from ma_triage.gh import RefConflict
+
+    gh = FakeGH()
+    tries = []
+
+    def conflict(*args, **kwargs):
+        tries.append(kwargs["base"])
+        raise RefConflict("moved")
+
+    monkeypatch.setattr(gh, "commit_files", conflict)
+    monkeypatch.setattr(config, "INDEX_COMMIT_ATTEMPTS", 3)
+    monkeypatch.setattr(embeddings.time, "sleep", lambda s: None)
+    with pytest.raises(RefConflict):
+        embeddings.save_index(gh, config.DOCS_INDEX_PATH, {"schema": 1}, message="m")
+    assert tries == ["HEAD"] * 3  # no rebase: simply retried on the new head
+
+
+def test_merge_appended_keeps_appends_but_not_posts_the_build_dropped():
+    def idx(*numbers):
+        return {"posts": [{"kind": "issue", "number": n, "title": str(n)} for n in numbers]}
+
+    merged = embeddings.merge_appended(
+        built=idx(3, 1),      # the build dropped #2
+        fresh=idx(4, 2, 1),   # #4 was appended while it ran
+        previous=idx(2, 1),   # what the build started from
+    )
+    assert [p["number"] for p in merged["posts"]] == [4, 3, 1]
+
+
+def test_shadow_model_points_the_client_at_the_shadow_server(monkeypatch):
+    monkeypatch.setattr(config, "SHADOW_EMBED_MODEL", "next-model")
+    monkeypatch.setattr(config, "SHADOW_EMBED_ENDPOINT", "http://127.0.0.1:11436/v1/embeddings")
+    sent = []
+    monkeypatch.setattr(
+        embeddings.requests, "post",
+        lambda url, **k: sent.append((url, k["json"]["model"], k["timeout"]))
+        or _Resp(_emb_payload([[1.0, 0.0]])),
+    )
+    live = (config.EMBED_MODEL, config.EMBED_ENDPOINT)
+    with embeddings.shadow_model():
+        embeddings.embed_texts(["a"], token="x")
+    assert sent == [("http://127.0.0.1:11436/v1/embeddings", "next-model",
+                     config.SHADOW_EMBED_TIMEOUT)]
+    assert (config.EMBED_MODEL, config.EMBED_ENDPOINT) == live
+
+
+def test_upsert_into_an_index_of_another_model_drops_the_vector():
+    # An append whose server started before a cutover to another model.
+    previous = {"model": "next-model", "posts": [
+        {"kind": "issue", "number": 1, "sha": "s1", "embedding": encode_vec(fake_embedding("a"))}]}
+    record = {"kind": "issue", "number": 2, "sha": "s2", "embedding": encode_vec([1.0, 0.0])}
+    index = embeddings.upsert_posts(previous, [record])
+    assert index["model"] == "next-model" and index["vectors"] == 1
+    assert "embedding" not in index["posts"][0]
+
+
+def test_commit_files_never_forces_the_ref(monkeypatch):
+    import requests
+
+    from ma_triage.gh import GitHubClient, RefConflict
+
+    client = GitHubClient("tok", repo="o/r", dry_run=False)
+    sent = []
+
+    def rest(method, path, **kwargs):
+        sent.append((method, path, kwargs.get("json")))
+        if method == "PATCH":
+            resp = requests.Response()
+            resp.status_code = 422
+            raise requests.HTTPError("422", response=resp)
+        return {"sha": "new", "tree": {"sha": "tree"}}
+
+    monkeypatch.setattr(client, "_rest", rest)
+    with pytest.raises(RefConflict):
+        client.commit_files("triage-index", {"a.json": "{}"}, "m", base="old")
+    assert sent[-1] == ("PATCH", "/repos/o/r/git/refs/heads/triage-index",
+                        {"sha": "new", "force": False})
+    assert ("GET", "/repos/o/r/git/commits/old", None) in sent  # built on `base`
@@ -0,0 +1,69 @@
+"""Tests for the index JSON codec (orjson when present, stdlib otherwise)."""
+
+import json
+
+import pytest
+
+from ma_triage import embeddings, fastjson
+
+TRICKY = [
+    {"b": 1, "a": {"z": [1, 2], "e": None, "é": "naïve ’quote’ 😀", " ": "\x7f\x00\n"}},
+    {"floats": [0.1, 1 / 3, -0.0, 100.0, 123456789.123, 1e-4, 9.99e15]},
+    {"exponent": [1e-5, 2.5e-7, 1e16, 1.7976931348623157e308]},
+    {"ints": [2**63 - 1, -(2**63), 2**64 - 1, 2**64, -(2**70)]},
+    {"special": [float("nan"), float("inf")]},
+    {"lone": "\ud800"},
+    {1: "int key", 2: "sorted"},
+    ["a", ("t", "u"), True, False, None],
+]
+
+
+def _stdlib(obj):
+    return json.dumps(obj, separators=(",", ":"), sort_keys=True)
+
+
+@pytest.mark.parametrize("obj", TRICKY)
+def test_dumps_is_byte_identical_to_stdlib(obj):
+    assert fastjson.dumps_sorted(obj) == _stdlib(obj)
+
+
+@pytest.mark.parametrize("obj", TRICKY)
+def test_dumps_without_orjson_is_the_stdlib(obj, monkeypatch):
+    monkeypatch.setattr(fastjson, "orjson", None)
+    assert fastjson.dumps_sorted(obj) == _stdlib(obj)
+
+
+def test_types_json_rejects_are_still_rejected():
+    class Thing:
+        pass
+
+    with pytest.raises(TypeError):
+        fastjson.dumps_sorted({"x": Thing()})
+
+
+@pytest.mark.parametrize(
+    "raw", ['{"a":[1,2.5,"é"]}', '{"n": NaN}', '{"s": "\\ud800"}', '{"big": 123456789012345678901234567890}']
+)
+def test_loads_matches_stdlib(raw):
+    assert json.dumps(fastjson.loads(raw)) == json.dumps(json.loads(raw))
+
+
+def test_loads_raises_the_stdlib_error(monkeypatch):
+    with pytest.raises(json.JSONDecodeError):
+        fastjson.loads("{not json")
+    monkeypatch.setattr(fastjson, "orjson", None)
+    with pytest.raises(json.JSONDecodeError):
+        fastjson.loads("{not json")
+
+
+def test_orjson_path_is_taken_when_installed():
+    pytest.importorskip("orjson")
+    assert fastjson.orjson is not None
+    assert fastjson._same_as_stdlib({"a": [1, 0.5, "x", None, True]})
+    assert not fastjson._same_as_stdlib({"a": 1e-5})
+
+
+def test_index_round_trips_through_the_codec(fake_gh):
+    index = {"schema": 2, "posts": [{"title": "Café ’n’ 😀", "number": 3}]}
+    embeddings.save_index(fake_gh, "posts.json", index, message="m")
+    assert embeddings.load_index(fake_gh, "posts.json") == index
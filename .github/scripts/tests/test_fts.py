@@ -0,0 +1,89 @@
+"""Tests for the FTS5 lexical index and its place in the related-post chain."""
+
+from ma_triage import config, fts, similar
+from ma_triage.mirror import Mirror
+
+
+def _post(number, title, body, kind="issue", providers=None):
+    return {"kind": kind, "number": number, "title": title, "body": body,
+            "url": f"https://x/{number}", "state": "open", "providers": providers or []}
+
+
+def test_search_ranks_on_shared_wording_with_title_weighted():
+    index = fts.LexicalIndex.from_posts([
+        _post(1, "spotify login loop", "sonos players stop after a while"),
+        _post(2, "sonos players stop", "playback stops"),
+        _post(3, "tidal quality", "lossless missing"),
+    ])
+    hits = index.search("sonos players stop", "", exclude_number=99, k=5)
+    assert [h.number for h in hits] == [2, 1]
+    assert hits[0].source == "lexical" and hits[0].score == 0.0
+
+
+def test_search_scopes_by_provider_and_excludes_self():
+    index = fts.LexicalIndex.from_posts([
+        _post(1, "playback stops", "stops", providers=["Chromecast"]),
+        _post(2, "playback stops", "stops", providers=["Deezer"]),
+        _post(3, "playback stops", "stops", providers=["Deezer"]),
+    ])
+    hits = index.search("playback stops", "", exclude_number=3,
+                        provider_keys={"deezer"}, k=5)
+    assert [h.number for h in hits] == [2]
+
+
+def test_report_text_is_never_read_as_query_syntax():
+    index = fts.LexicalIndex.from_posts([_post(1, "grouping fails", "NEAR the end")])
+    assert fts.match_query('grouping" OR title:*', "NEAR(a b)") == (
+        '"grouping" OR "or" OR "title" OR "near" OR "a" OR "b"'
+    )
+    assert [h.number for h in index.search('grouping" fails*', "", exclude_number=0, k=3)] == [1]
+    assert index.search("", "!!!", exclude_number=0, k=3) == []
+
+
+def test_reindexing_a_post_replaces_it():
+    index = fts.LexicalIndex.from_posts([_post(1, "old words", "")])
+    index.add([_post(1, "new words", "")])
+    assert index.search("old", "", exclude_number=0, k=3) == []
+    assert [h.title for h in index.search("new", "", exclude_number=0, k=3)] == ["new words"]
+
+
+def test_mirror_sync_feeds_the_index_read_only(fake_gh, tmp_path, monkeypatch):
+    fake_gh._issues = [{"number": 5, "title": "Sonos grouping fails", "body": "sonos",
+                        "html_url": "https://x/5", "state": "open", "labels": [],
+                        "user": {"login": "r"}, "updated_at": "2026-01-01"}]
+    path = tmp_path / "m.sqlite"
+    with Mirror(path) as local:
+        local.sync(fake_gh)
+    monkeypatch.setattr(config, "MIRROR_PATH", str(path))
+    index = fts.from_mirror()
+    try:
+        hits = index.search("grouping", "", exclude_number=0,
+                            provider_keys={"sonos"}, k=3)
+    finally:
+        index.close()
+    assert [h.number for h in hits] == [5]
+
+
+def test_from_mirror_is_none_without_a_usable_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "MIRROR_PATH", "")
+    assert fts.from_mirror() is None
+    monkeypatch.setattr(config, "MIRROR_PATH", str(tmp_path / "missing.sqlite"))
+    assert fts.from_mirror() is None
+    (tmp_path / "junk.sqlite").write_bytes(b"junk" * 100)
+    monkeypatch.setattr(config, "MIRROR_PATH", str(tmp_path / "junk.sqlite"))
+    assert fts.from_mirror() is None
+
+
+def test_find_related_uses_the_local_index_instead_of_search(fake_gh):
+    fake_gh._search_items = [
+        {"number": 42, "title": "from search", "html_url": "u42", "state": "open"}
+    ]
+    index = fts.LexicalIndex.from_posts(
+        [_post(8, "sonos grouping", "grouping fails", providers=["sonos"])]
+    )
+    hits = similar.find_related(
+        fake_gh, query_vec=None, title="sonos grouping", body="grouping fails",
+        posts=[], text_posts=None, lexical=index, exclude_number=99,
+        provider_labels={"sonos"},
+    )
+    assert [h.number for h in hits] == [8]  # scoped by provider, and not 42
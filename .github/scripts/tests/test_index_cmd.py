@@ -2,7 +2,7 @@
 
 import json
 
-from conftest import FakeGH
+from conftest import FakeGH, fake_embedding
 from ma_triage import __main__ as main
 from ma_triage import config, embeddings
 from ma_triage.models import DocChunk
@@ -118,6 +118,7 @@ def test_cmd_index_annotates_the_failure(ai_on, monkeypatch, capsys):
 
 def test_cmd_index_append_annotates_but_does_not_fail_triage(ai_on, monkeypatch, capsys):
     """A provider outage must not mark every incoming issue's workflow red."""
+    monkeypatch.setattr(config, "APPEND_QUEUE", False)
     monkeypatch.setenv("ISSUE_NUMBER", "123")
     _no_embeddings(monkeypatch)
     gh = FakeGH()
@@ -137,6 +138,7 @@ def test_cmd_index_append_annotates_but_does_not_fail_triage(ai_on, monkeypatch,
 
 
 def test_cmd_index_append(ai_on, monkeypatch):
+    monkeypatch.setattr(config, "APPEND_QUEUE", False)
     monkeypatch.setenv("ISSUE_NUMBER", "123")
     monkeypatch.setenv("ISSUE_TITLE", "sonos grouping bug")
     monkeypatch.setenv("ISSUE_BODY", "players won't group")
@@ -167,6 +169,95 @@ def test_cmd_index_append_skips_pull_requests(ai_on, monkeypatch):
     assert config.POSTS_INDEX_PATH not in gh._index_files
 
 
+def _append(gh, monkeypatch, number, title):
+    monkeypatch.setenv("ISSUE_NUMBER", str(number))
+    monkeypatch.setattr(
+        gh, "get_issue",
+        lambda n: {"number": n, "title": title, "body": "b", "html_url": f"u{n}",
+                   "state": "open"},
+        raising=False,
+    )
+    assert main.cmd_index_append(gh, "t") == 0
+
+
+def test_appends_queue_and_coalesce_in_one_batch_and_commit(ai_on, monkeypatch):
+    gh = FakeGH()
+    batches = []
+    embed = embeddings.embed_texts
+    monkeypatch.setattr(embeddings, "embed_texts",
+                        lambda texts, *, token: batches.append(texts) or embed(texts, token=token))
+    for number in (1, 2, 3):
+        _append(gh, monkeypatch, number, f"burst {number}")
+    assert batches == [] and config.POSTS_INDEX_PATH not in gh._index_files
+    assert sorted(gh._index_files) == [f"pending/issue-{n}.json" for n in (1, 2, 3)]
+
+    commits = _commit_count(gh, config.POSTS_INDEX_PATH)
+    assert main.cmd_index_coalesce(gh, "t") == 0
+    assert len(batches) == 1 and len(batches[0]) == 3
+    assert _commit_count(gh, config.POSTS_INDEX_PATH) == commits + 1
+    assert list(gh._index_files) == [config.POSTS_INDEX_PATH]  # queue emptied
+    stored = json.loads(gh._index_files[config.POSTS_INDEX_PATH])
+    assert [p["number"] for p in stored["posts"]] == [3, 2, 1] and stored["vectors"] == 3
+
+    assert main.cmd_index_coalesce(gh, "t") == 0  # nothing queued: no commit
+    assert _commit_count(gh, config.POSTS_INDEX_PATH) == commits + 1
+
+
+def test_coalesce_keeps_posts_queued_while_it_ran(ai_on, monkeypatch):
+    gh = FakeGH()
+    _append(gh, monkeypatch, 1, "first")
+    embed = embeddings.embed_texts
+
+    def embed_while_another_post_is_queued(texts, *, token):
+        if "pending/issue-2.json" not in gh._index_files:
+            _append(gh, monkeypatch, 2, "second")
+        return embed(texts, token=token)
+
+    monkeypatch.setattr(embeddings, "embed_texts", embed_while_another_post_is_queued)
+    monkeypatch.setattr(embeddings.time, "sleep", lambda s: None)
+    main.cmd_index_coalesce(gh, "t")
+    stored = json.loads(gh._index_files[config.POSTS_INDEX_PATH])
+    assert [p["number"] for p in stored["posts"]] == [1]
+    assert "pending/issue-2.json" in gh._index_files  # left for the next run
+
+
+def test_coalesce_annotates_an_outage_but_folds_the_text(ai_on, monkeypatch, capsys):
+    gh = FakeGH()
+    _append(gh, monkeypatch, 5, "t")
+    _no_embeddings(monkeypatch)
+    assert main.cmd_index_coalesce(gh, "t") == 0
+    assert "::error::" in capsys.readouterr().err
+    stored = json.loads(gh._index_files[config.POSTS_INDEX_PATH])
+    assert [p["number"] for p in stored["posts"]] == [5] and stored["vectors"] == 0
+
+
+def test_coalesce_counts_missing_vectors_in_the_index_it_committed(ai_on, monkeypatch):
+    gh = FakeGH()
+    _append(gh, monkeypatch, 5, "t")
+    queued = json.loads(gh._index_files["pending/issue-5.json"])
+
+    def outage_while_the_build_embeds_the_post(texts, *, token):
+        # The nightly build commits the same post with a vector meanwhile.
+        built = embeddings.upsert_posts(
+            None, [embeddings._post_record(queued, fake_embedding(texts[0]))])
+        embeddings.save_index(gh, config.POSTS_INDEX_PATH, built, message="build")
+        return [None for _ in texts]
+
+    monkeypatch.setattr(embeddings, "embed_texts", outage_while_the_build_embeds_the_post)
+    monkeypatch.setattr(embeddings.time, "sleep", lambda s: None)
+    # Rebased onto the build's commit, the folded post keeps the build's vector.
+    assert embeddings.coalesce_pending(gh, token="t") == (1, 0)
+    assert json.loads(gh._index_files[config.POSTS_INDEX_PATH])["vectors"] == 1
+
+
+def test_nightly_build_flushes_the_queue(ai_on, monkeypatch):
+    gh = FakeGH(issues=[{"number": 1, "title": "bug", "body": "b", "html_url": "u1",
+                         "state": "open", "updated_at": "2024-01-01"}])
+    _append(gh, monkeypatch, 1, "bug")
+    assert main.cmd_index(gh, "t", "posts") == 0
+    assert not any(path.startswith("pending/") for path in gh._index_files)
+
+
 def test_collect_posts_excludes_translation_discussions():
     gh = FakeGH(
         issues=[{"number": 1, "title": "bug", "body": "b", "html_url": "u1",
@@ -203,3 +294,109 @@ def test_cmd_index_posts_does_not_recommit_an_unchanged_outage_index(
     assert _commit_count(gh, config.POSTS_INDEX_PATH) == 1
     assert main.cmd_index(gh, "t", "posts") == 1
     assert _commit_count(gh, config.POSTS_INDEX_PATH) == 1
+
+
+# --- time-budgeted builds --------------------------------------------------- #
+def _slow_embedder(monkeypatch, seconds_per_batch):
+    """Each embedding batch advances a fake clock; returns the batches seen."""
+    clock, batches = [0.0], []
+    embed = embeddings.embed_texts
+
+    def slow(texts, *, token):
+        clock[0] += seconds_per_batch
+        batches.append(list(texts))
+        return embed(texts, token=token)
+
+    monkeypatch.setattr(embeddings.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(embeddings, "embed_texts", slow)
+    return batches
+
+
+def test_budgeted_posts_backfill_commits_a_checkpoint_and_resumes(ai_on, monkeypatch, capsys):
+    monkeypatch.setattr(config, "EMBED_BATCH", 1)
+    monkeypatch.setattr(config, "INDEX_BUILD_BUDGET", 2.0)
+    batches = _slow_embedder(monkeypatch, 1.0)
+    gh = FakeGH(issues=[{"number": n, "title": f"issue {n}", "body": "b", "html_url": f"u{n}",
+                         "state": "open", "updated_at": f"2024-01-0{n}"} for n in (1, 2, 3)])
+
+    assert main.cmd_index(gh, "t", "posts") == 0
+    stored = json.loads(gh._index_files[config.POSTS_INDEX_PATH])
+    assert [p["number"] for p in stored["posts"]] == [3, 2, 1]
+    assert stored["vectors"] == 2 and stored["deferred"] == 1
+    assert "1 posts deferred to the next run" in capsys.readouterr().err
+
+    batches.clear()
+    assert main.cmd_index(gh, "t", "posts") == 0
+    assert batches == [["issue 1\n\nb"]]  # only what the checkpoint lacks
+    stored = json.loads(gh._index_files[config.POSTS_INDEX_PATH])
+    assert stored["vectors"] == 3 and stored["deferred"] == 0
+
+
+def test_budget_spent_before_any_batch_fails_without_committing(ai_on, monkeypatch, capsys):
+    monkeypatch.setattr(embeddings.docs, "build_chunks", lambda gh: [_chunk("a#x", "t")])
+    monkeypatch.setattr(config, "INDEX_BUILD_BUDGET", 1.0)
+    _slow_embedder(monkeypatch, 1.0)
+    ticks = iter(range(0, 1000, 5))  # the budget is spent between any two reads
+    monkeypatch.setattr(embeddings.time, "monotonic", lambda: float(next(ticks)))
+    gh = FakeGH()
+    prev = {"schema": 2, "model": config.EMBED_MODEL, "chunks": [
+        embeddings._chunk_to_dict(_chunk("a#x", "t"))]}
+    gh._index_files[config.DOCS_INDEX_PATH] = json.dumps(prev)
+
+    assert main.cmd_index(gh, "t", "docs") == 1
+    assert _commit_count(gh, config.DOCS_INDEX_PATH) == 0
+    assert "no progress" in capsys.readouterr().err
+
+
+def test_new_post_written_without_embedding_is_not_progress(ai_on, monkeypatch, capsys):
+    issue = {"number": 1, "title": "bug", "body": "b", "html_url": "u1",
+             "state": "open", "updated_at": "2024-01-01"}
+    gh = FakeGH(issues=[issue])
+    assert main.cmd_index(gh, "t", "posts") == 0
+    capsys.readouterr()
+
+    gh._issues.append({**issue, "number": 2, "html_url": "u2", "updated_at": "2024-01-02"})
+    monkeypatch.setattr(config, "INDEX_BUILD_BUDGET", 1.0)
+    batches = _slow_embedder(monkeypatch, 1.0)
+    ticks = iter(range(0, 1000, 5))  # the budget is spent before the first batch
+    monkeypatch.setattr(embeddings.time, "monotonic", lambda: float(next(ticks)))
+
+    # The new post's record changes the index, but nothing was embedded.
+    assert main.cmd_index(gh, "t", "posts") == 1
+    assert batches == []
+    err = capsys.readouterr().err
+    assert "no progress" in err and "vectors are committed" not in err
+
+
+# --- embedding-model migration ---------------------------------------------- #
+def test_shadow_index_fills_while_live_serves_then_cuts_over(ai_on, monkeypatch):
+    monkeypatch.setattr(embeddings.docs, "build_chunks",
+                        lambda gh: [_chunk("a#x", "alpha"), _chunk("b#y", "beta")])
+    gh = FakeGH(issues=[{"number": 1, "title": "bug", "body": "b", "html_url": "u1",
+                         "state": "open", "updated_at": "2024-01-01"}])
+    assert main.cmd_index(gh, "t", "all") == 0  # live indexes, current model
+    live_model = config.EMBED_MODEL
+
+    models = []
+    monkeypatch.setattr(embeddings, "embed_texts", lambda texts, *, token: models.append(
+        config.EMBED_MODEL) or [ai_on(t) for t in texts])
+    monkeypatch.setattr(config, "SHADOW_EMBED_MODEL", "next-model")
+    monkeypatch.setattr(config, "SHADOW_EMBED_ENDPOINT", "http://127.0.0.1:11436/v1/embeddings")
+    shadow_docs = config.SHADOW_PREFIX + config.DOCS_INDEX_PATH
+    shadow_posts = config.SHADOW_PREFIX + config.POSTS_INDEX_PATH
+
+    # A docs-only run fills the shadow docs index but never cuts over alone.
+    assert main.cmd_index(gh, "t", "docs") == 0
+    assert models == ["next-model"]  # the live docs were current; only the shadow embeds
+    assert json.loads(gh._index_files[shadow_docs])["model"] == "next-model"
+    assert json.loads(gh._index_files[config.DOCS_INDEX_PATH])["model"] == live_model
+    assert len(embeddings.load_docs_chunks(gh)) == 2  # still serving
+
+    assert main.cmd_index(gh, "t", "all") == 0
+    assert models == ["next-model"] * 2  # docs resumed from the shadow checkpoint
+    assert shadow_docs not in gh._index_files and shadow_posts not in gh._index_files
+    cutover = [c for c in gh.calls if c[0] == "commit_files" and shadow_docs in c[2]][-1]
+    assert config.DOCS_INDEX_PATH in cutover[2] and config.POSTS_INDEX_PATH in cutover[2]
+    monkeypatch.setattr(config, "EMBED_MODEL", "next-model")
+    assert len(embeddings.load_docs_chunks(gh)) == 2
+    assert [p["number"] for p in embeddings.load_posts(gh)] == [1]
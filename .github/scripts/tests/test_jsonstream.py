@@ -0,0 +1,93 @@
+import pytest
+
+from ma_triage.jsonstream import JSONStreamError, StreamReader
+
+
+def _reader(text, **limits):
+    limits = {"max_depth": 10, "max_keys": 100, "max_string": 100, **limits}
+    # One-character chunks exercise every buffer boundary.
+    return StreamReader(list(text), **limits)
+
+
+def test_walk_keys_and_items():
+    reader = _reader('{"a": [1, {"b": true}, "x"], "c": null}')
+    assert reader.start_object()
+    seen = {}
+    for key in reader.keys():
+        if key == "a":
+            assert reader.start_array()
+            values = []
+            for _ in reader.items():
+                values.append(reader.read_value())
+            seen[key] = values
+        else:
+            seen[key] = reader.read_value()
+    reader.finish()
+    assert seen == {"a": [1, {"b": True}, "x"], "c": None}
+
+
+def test_skip_value_reports_truthiness():
+    reader = _reader('[[], [0], {}, {"k": "}"}, "", 0, 2.5]')
+    assert reader.start_array()
+    truth = []
+    for _ in reader.items():
+        truth.append(reader.skip_value())
+    assert truth == [False, True, False, True, False, False, True]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '{"a": 1,}',
+        '{"a" 1}',
+        '{"a": 1} x',
+        "[1 2]",
+        '{"a": tru}',
+    ],
+)
+def test_malformed_walked_input_rejected(text):
+    reader = _reader(text)
+    with pytest.raises(JSONStreamError):
+        if reader.start_object():
+            for _ in reader.keys():
+                reader.read_value()
+        else:
+            assert reader.start_array()
+            for _ in reader.items():
+                reader.read_value()
+        reader.finish()
+
+
+@pytest.mark.parametrize(
+    "text", ['{"a" 1}', '{"a": 1,}', "[1 2]", "[}", '{"a": [1}]', '{"a": nul}', "[1,,2]", "{1: 2}"]
+)
+def test_malformed_skipped_input_rejected(text):
+    with pytest.raises(JSONStreamError):
+        _reader(text).skip_value()
+
+
+def test_depth_limit_applies_to_skipped_values():
+    reader = _reader("[" * 20 + "]" * 20, max_depth=5)
+    with pytest.raises(JSONStreamError):
+        reader.skip_value()
+
+
+def test_key_limit_counts_skipped_keys():
+    reader = _reader('{"a": {"b": 1, "c": 2, "d": 3}}', max_keys=3)
+    assert reader.start_object()
+    with pytest.raises(JSONStreamError):
+        for _ in reader.keys():
+            reader.skip_value()
+
+
+def test_string_limit_and_invalid_utf8():
+    with pytest.raises(JSONStreamError):
+        _reader('"' + "x" * 101 + '"').read_value()
+    with pytest.raises(JSONStreamError):
+        StreamReader([b'"\xff"'], max_depth=5, max_keys=5, max_string=5).read_value()
+
+
+def test_multibyte_characters_split_across_chunks():
+    raw = '{"t": "é🎵"}'.encode()
+    reader = StreamReader([raw[i : i + 1] for i in range(len(raw))], max_depth=5, max_keys=5, max_string=5)
+    assert reader.read_value() == {"t": "é🎵"}
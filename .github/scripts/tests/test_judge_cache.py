@@ -0,0 +1,136 @@
+"""Tests for the semantic docs-judge cache (lookup + nightly harvest)."""
+
+from conftest import FakeGH, fake_embedding
+from ma_triage import comment, config, embeddings, judge_cache
+from ma_triage.models import DocAnswer, DocChunk, DocHit
+
+BOT = "ma-triage[bot]"
+
+
+def _chunk(cid, text):
+    return DocChunk(
+        id=cid, path=cid.split("#")[0], url=f"https://x/{cid}", title="T",
+        heading=cid, text=text, breadcrumbs=["T", cid], sha=text,
+    )
+
+
+CHUNKS = [_chunk("faq/net#mdns", "enable multicast"), _chunk("faq/net#ports", "open ports")]
+ANSWER = DocAnswer(True, 0.9, "Enable multicast on your network.", ["faq/net#mdns"])
+QUESTION = "sonos speakers not discovered mdns multicast"
+
+
+def _hits(chunks=CHUNKS):
+    return [DocHit(chunk=c, score=0.8) for c in chunks]
+
+
+def _sticky(number, state, *, login=BOT, kind="Bot", updated="2026-10-01T00:00:00Z"):
+    return {
+        "id": number * 10,
+        "issue_url": f"https://api.github.com/repos/x/y/issues/{number}",
+        "updated_at": updated,
+        "user": {"login": login, "type": kind},
+        "body": f"{config.STICKY_MARKER}\nhello\n{comment._render_state(state)}",
+    }
+
+
+def _verdict_state():
+    entry = judge_cache.entry(fake_embedding(QUESTION), _hits(), ANSWER)
+    return {"v": 1, "rag": {"judge_conf": 0.9}, "judge": entry}
+
+
+# --------------------------------------------------------------------------- #
+# lookup
+# --------------------------------------------------------------------------- #
+def test_lookup_reuses_verdict_for_near_identical_question():
+    entries = [judge_cache.entry(fake_embedding(QUESTION), _hits(), ANSWER)]
+    found = judge_cache.lookup(fake_embedding(QUESTION), _hits(), entries)
+    assert found == ANSWER
+
+
+def test_lookup_misses_on_a_different_question():
+    entries = [judge_cache.entry(fake_embedding(QUESTION), _hits(), ANSWER)]
+    other = fake_embedding("spotify login fails with premium account")
+    assert judge_cache.lookup(other, _hits(), entries) is None
+
+
+def test_lookup_misses_when_a_cited_section_changed():
+    entries = [judge_cache.entry(fake_embedding(QUESTION), _hits(), ANSWER)]
+    changed = [_chunk("faq/net#mdns", "rewritten section"), CHUNKS[1]]
+    assert judge_cache.lookup(fake_embedding(QUESTION), _hits(changed), entries) is None
+
+
+def test_lookup_misses_when_retrieval_differs():
+    entries = [judge_cache.entry(fake_embedding(QUESTION), _hits(), ANSWER)]
+    others = [CHUNKS[0]] + [_chunk(f"faq/x#{i}", f"text {i}") for i in range(3)]
+    assert judge_cache.lookup(fake_embedding(QUESTION), _hits(others), entries) is None
+
+
+def test_lookup_skips_malformed_entries():
+    entries = [{"vec": "not base64"}, {"answer": {}}]
+    assert judge_cache.lookup(fake_embedding(QUESTION), _hits(), entries) is None
+
+
+# --------------------------------------------------------------------------- #
+# harvest
+# --------------------------------------------------------------------------- #
+def test_harvest_collects_verdicts_from_bot_stickies(ai_on, monkeypatch):
+    monkeypatch.setattr(config, "BOT_LOGIN", BOT)
+    gh = FakeGH()
+    gh._comments = [
+        _sticky(7, _verdict_state()),
+        _sticky(8, {"v": 1, "rag": {"judge_cached": True, "judge_conf": 0.9}}),
+    ]
+    index, changed, stats = judge_cache.harvest(gh, CHUNKS)
+    assert changed is True
+    assert [e["number"] for e in index["entries"]] == [7]
+    assert stats == {"lookups": 2, "hits": 1, "added": 1}
+    assert index["harvested_at"] == "2026-10-01T00:00:00Z"
+
+    embeddings.save_index(gh, config.JUDGE_CACHE_PATH, index, message="j")
+    entries = judge_cache.load(gh)
+    assert judge_cache.lookup(fake_embedding(QUESTION), _hits(), entries) == ANSWER
+
+    # Nothing updated since: same cache, no commit needed.
+    _, changed, _ = judge_cache.harvest(gh, CHUNKS)
+    assert changed is False
+
+
+def test_harvest_ignores_stickies_not_written_by_the_bot(ai_on, monkeypatch):
+    monkeypatch.setattr(config, "BOT_LOGIN", BOT)
+    gh = FakeGH()
+    gh._comments = [
+        _sticky(7, _verdict_state(), login="mallory", kind="User"),
+        _sticky(8, _verdict_state(), login="other-app[bot]"),
+    ]
+    index, _, stats = judge_cache.harvest(gh, CHUNKS)
+    assert index["entries"] == [] and stats["added"] == 0
+
+
+def test_harvest_needs_the_bot_login(ai_on, monkeypatch):
+    monkeypatch.setattr(config, "BOT_LOGIN", "")
+    gh = FakeGH()
+    gh._comments = [_sticky(7, _verdict_state())]
+    index, _, _ = judge_cache.harvest(gh, CHUNKS)
+    assert index["entries"] == []
+
+
+def test_harvest_drops_verdicts_citing_changed_sections(ai_on, monkeypatch):
+    monkeypatch.setattr(config, "BOT_LOGIN", BOT)
+    gh = FakeGH()
+    gh._comments = [_sticky(7, _verdict_state())]
+    index, _, _ = judge_cache.harvest(gh, CHUNKS)
+    embeddings.save_index(gh, config.JUDGE_CACHE_PATH, index, message="j")
+
+    edited = [_chunk("faq/net#mdns", "multicast, rewritten"), CHUNKS[1]]
+    index, changed, _ = judge_cache.harvest(gh, edited)
+    assert changed is True and index["entries"] == []
+
+
+def test_load_ignores_cache_built_for_another_model(ai_on, monkeypatch):
+    monkeypatch.setattr(config, "BOT_LOGIN", BOT)
+    gh = FakeGH()
+    gh._comments = [_sticky(7, _verdict_state())]
+    index, _, _ = judge_cache.harvest(gh, CHUNKS)
+    index["answer_model"] = "some/other-model"
+    embeddings.save_index(gh, config.JUDGE_CACHE_PATH, index, message="j")
+    assert judge_cache.load(gh) == []
@@ -0,0 +1,172 @@
+"""Tests for the learned docs-judge gate (features, training, gating)."""
+
+import random
+
+from conftest import FakeGH, fake_embedding
+from ma_triage import __main__ as main
+from ma_triage import comment, config, embeddings, judge_gate, rag
+from ma_triage.models import DocAnswer, DocChunk, DocHit
+
+BOT = "ma-triage[bot]"
+
+
+def _chunk(cid, text):
+    return DocChunk(
+        id=cid, path=cid.split("#")[0], url=f"https://x/{cid}", title="T",
+        heading=cid, text=text, breadcrumbs=["T", cid], sha=text,
+        embedding=fake_embedding(text),
+    )
+
+
+def _feats(strength):
+    """Features of a run whose retrieval was about ``strength`` decisive."""
+    return {
+        "dense_top": strength,
+        "dense_margin": strength / 3,
+        "bm25_top": 2 * strength,
+        "bm25_lead": strength,
+        "rrf_margin": strength,
+        "agree": float(strength > 0.5),
+        "provider_match": 0.0,
+        "query_len": 3.0,
+    }
+
+
+def _data(n=300, seed=1):
+    """Runs where the judge answers exactly when retrieval was decisive."""
+    rng = random.Random(seed)
+    out = []
+    for number in range(1, n + 1):
+        strength = rng.random()
+        out.append((number, _feats(strength), strength > 0.4))
+    return out
+
+
+def _sticky(number, rag_state, *, login=BOT):
+    state = {"v": 1, "rag": rag_state}
+    return {
+        "issue_url": f"https://api.github.com/repos/x/y/issues/{number}",
+        "updated_at": "2026-10-01T00:00:00Z",
+        "user": {"login": login, "type": "Bot"},
+        "body": f"{config.STICKY_MARKER}\n{comment._render_state(state)}",
+    }
+
+
+def test_features_are_named_and_rounded():
+    chunks = [_chunk("a#x", "sonos multicast"), _chunk("b#y", "spotify login")]
+    hits = [DocHit(chunk=c, score=0.03) for c in chunks]
+    feats = judge_gate.features(
+        fake_embedding("sonos multicast"), "sonos multicast", hits,
+        {"bm25_top": 2.0, "bm25_second": 0.5, "rrf_top": 0.033, "rrf_second": 0.016},
+        provider_match=True,
+    )
+    assert tuple(feats) == judge_gate.FEATURES
+    assert feats["dense_top"] == 1.0 and feats["bm25_lead"] == 0.75
+    assert feats["provider_match"] == 1.0
+
+
+def test_choose_threshold_meets_precision():
+    probs = [0.05, 0.1, 0.2, 0.3, 0.6, 0.9]
+    useful = [False, False, False, True, True, True]
+    threshold = judge_gate.choose_threshold(probs, useful, 0.95)
+    assert 0.2 < threshold < 0.3
+    # Nothing qualifies -> never skip.
+    assert judge_gate.choose_threshold([0.1, 0.2], [True, True], 0.95) == 0.0
+
+
+def test_train_ships_a_gate_that_skips_weak_retrieval():
+    model, report = judge_gate.train(_data())
+    assert model is not None, report
+    held_out = report["held_out"]
+    assert held_out["precision"] >= config.JUDGE_GATE_MIN_PRECISION
+    assert held_out["recall"] > 0.5
+    gate = judge_gate.Gate(model)
+    assert gate.should_skip(_feats(0.05)) is True
+    assert gate.should_skip(_feats(0.95)) is False
+
+
+def test_train_refuses_too_little_data():
+    model, report = judge_gate.train(_data(n=20))
+    assert model is None and "fewer than" in report["reason"]
+
+
+def test_samples_read_only_app_stickies(monkeypatch):
+    monkeypatch.setattr(config, "BOT_LOGIN", BOT)
+    gh = FakeGH()
+    m = config.EMBED_MODEL
+    labelled = {"judge_conf": 0.9, "judge_answered": True, "gate": {"f": _feats(0.9), "m": m}}
+    gh._comments = [
+        _sticky(1, labelled),
+        _sticky(2, {**labelled, "judge_conf": 0.1,
+                    "gate": {"f": _feats(0.1), "m": m, "explore": True}}),
+        _sticky(3, {"judge_conf": None, "gate": {"f": _feats(0.1), "m": m, "skip": True}}),
+        _sticky(4, labelled, login="mallory"),
+        # Recorded under another embedding model (before a cutover): not comparable.
+        _sticky(5, {**labelled, "gate": {"f": _feats(0.9), "m": "old-model"}}),
+    ]
+    data, live = judge_gate.samples(gh)
+    assert [(n, useful) for n, _, useful in data] == [(1, True), (2, False)]
+    assert live == {"skipped": 1, "explored": 1, "explored_low": 1}
+
+
+def _gh_with_docs_and_gate(gate_model):
+    gh = FakeGH()
+    chunks = [_chunk("faq/net#mdns", "sonos multicast"), _chunk("faq/b#p", "billing")]
+    idx, _ = embeddings.build_docs_index(gh, token="t", chunks=chunks)
+    embeddings.save_index(gh, config.DOCS_INDEX_PATH, idx, message="d")
+    embeddings.save_index(gh, config.JUDGE_GATE_PATH, gate_model, message="g")
+    return gh
+
+
+def _always_skip():
+    zeros = dict.fromkeys(judge_gate.FEATURES, 0.0)
+    return {
+        "schema": 1, "answer_model": config.ANSWER_MODEL, "model": config.EMBED_MODEL,
+        "features": list(judge_gate.FEATURES), "weights": zeros, "mean": zeros,
+        "scale": dict.fromkeys(judge_gate.FEATURES, 1.0), "bias": -5.0, "threshold": 0.5,
+    }
+
+
+def test_answer_skips_the_judge_when_gated(ai_on, monkeypatch):
+    monkeypatch.setattr(config, "JUDGE_GATE_ENABLED", True)
+    gh = _gh_with_docs_and_gate(_always_skip())
+    calls = []
+    monkeypatch.setattr(
+        rag.ai, "judge_answer",
+        lambda t, b, hits, *, token: calls.append(t) or DocAnswer(True, 0.9, "x", []),
+    )
+    res = rag.answer(gh, title="sonos multicast", body="", number=7, token="t")
+    assert calls == []
+    assert res is None  # LOW and nothing related: no RAG output at all
+
+    # An exploration issue is judged anyway, and says so in its record.
+    res = rag.answer(gh, title="sonos multicast", body="", number=10, token="t")
+    assert calls == ["sonos multicast"]
+    assert res.judge_gate["explore"] is True and not res.judge_skipped
+
+
+def test_answer_records_features_with_the_gate_off(ai_on, monkeypatch):
+    gh = _gh_with_docs_and_gate(_always_skip())
+    monkeypatch.setattr(
+        rag.ai, "judge_answer",
+        lambda t, b, hits, *, token: DocAnswer(True, 0.9, "x", [hits[0].chunk.id]),
+    )
+    res = rag.answer(gh, title="sonos multicast", body="", number=7, token="t")
+    assert set(res.judge_gate) == {"f", "m"} and not res.judge_skipped
+    assert res.judge_gate["m"] == config.EMBED_MODEL
+
+
+def test_cmd_train_gate_ships_only_a_validated_model(monkeypatch):
+    monkeypatch.setattr(config, "BOT_LOGIN", BOT)
+    gh = FakeGH()
+    live = {"skipped": 0, "explored": 0, "explored_low": 0}
+    monkeypatch.setattr(judge_gate, "samples", lambda gh: (_data(n=20), live))
+    assert main.cmd_train_gate(gh) == 0
+    assert config.JUDGE_GATE_PATH not in gh._index_files
+
+    monkeypatch.setattr(judge_gate, "samples", lambda gh: (_data(), live))
+    assert main.cmd_train_gate(gh) == 0
+    assert judge_gate.load(gh) is not None
+    # A cutover to another embedding model retires the gate until retrained.
+    monkeypatch.setattr(config, "EMBED_MODEL", "next-model")
+    assert judge_gate.load(gh) is None
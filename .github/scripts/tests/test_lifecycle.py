@@ -1,5 +1,8 @@
+import json
 from datetime import datetime, timedelta, timezone
 
+import pytest
+
 from ma_triage import config, lifecycle
 
 
@@ -18,23 +21,40 @@ def _issue(number=1, labels=(), reporter="reporter", created_days_ago=0):
 
 def test_reporter_comment_marks_needs_attention(fake_gh):
     issue = _issue(labels=[config.LABEL_WAITING_FOR_USER, config.LABEL_REMINDED_1])
+    fake_gh._issue_labels[1] = lifecycle.issue_labels(issue) | {"bug"}
     lifecycle.on_comment(fake_gh, issue, actor_login="reporter",
                          author_association="NONE")
-    removed = {c[2] for c in fake_gh.calls if c[0] == "remove_label"}
-    added = {lbl for c in fake_gh.calls if c[0] == "add_labels" for lbl in c[2]}
-    assert config.LABEL_WAITING_FOR_USER in removed
-    assert config.LABEL_REMINDED_1 in removed
-    assert config.LABEL_NEEDS_ATTENTION in added
+    assert fake_gh.calls == [("set_labels", 1, ("bug", config.LABEL_NEEDS_ATTENTION))]
 
 
 def test_maintainer_comment_marks_waiting(fake_gh):
     issue = _issue(labels=[config.LABEL_NEEDS_ATTENTION])
+    fake_gh._issue_labels[1] = lifecycle.issue_labels(issue)
     lifecycle.on_comment(fake_gh, issue, actor_login="maintainer",
                          author_association="MEMBER")
-    removed = {c[2] for c in fake_gh.calls if c[0] == "remove_label"}
-    added = {lbl for c in fake_gh.calls if c[0] == "add_labels" for lbl in c[2]}
-    assert config.LABEL_NEEDS_ATTENTION in removed
-    assert config.LABEL_WAITING_FOR_USER in added
+    assert fake_gh.calls == [("set_labels", 1, (config.LABEL_WAITING_FOR_USER,))]
+
+
+def test_apply_labels_uses_the_narrowest_write(fake_gh):
+    current = {"bug", config.LABEL_NEEDS_ATTENTION}
+    lifecycle.apply_labels(fake_gh, 1, current, add=["bug", "sonos"])
+    lifecycle.apply_labels(fake_gh, 1, current, remove=[config.LABEL_NEEDS_ATTENTION, "absent"])
+    lifecycle.apply_labels(fake_gh, 1, current, add=["bug"], remove=["absent"])
+    assert fake_gh.calls == [
+        ("add_labels", 1, ("sonos",)),
+        ("remove_label", 1, config.LABEL_NEEDS_ATTENTION),
+    ]
+
+
+def test_apply_labels_replace_keeps_concurrent_human_changes(fake_gh):
+    # Read earlier: bug + needs-attention. Since then a human added "sonos"
+    # and took "bug" off; the replace changes only what it names.
+    fake_gh._issue_labels[1] = {config.LABEL_NEEDS_ATTENTION, "sonos"}
+    lifecycle.apply_labels(
+        fake_gh, 1, {"bug", config.LABEL_NEEDS_ATTENTION},
+        add=[config.LABEL_WAITING_FOR_USER], remove=[config.LABEL_NEEDS_ATTENTION],
+    )
+    assert fake_gh.calls == [("set_labels", 1, ("sonos", config.LABEL_WAITING_FOR_USER))]
 
 
 def test_hold_label_pauses(fake_gh):
@@ -81,3 +101,142 @@ def test_sweep_nothing_due(fake_gh):
     issue = _issue(created_days_ago=1, labels=[config.LABEL_WAITING_FOR_USER])
     msg = lifecycle.sweep_issue(fake_gh, issue)
     assert "nothing due" in msg
+
+
+def _waiting(number, *, days_ago, updated="u1", labels=()):
+    issue = _issue(number, labels=[config.LABEL_WAITING_FOR_USER, *labels],
+                   created_days_ago=days_ago)
+    issue["updated_at"] = updated
+    return issue
+
+
+def test_sweep_reads_comments_only_for_issues_updated_since_the_checkpoint(
+    fake_gh, monkeypatch
+):
+    listed = [_waiting(1, days_ago=4), _waiting(2, days_ago=1), _waiting(3, days_ago=30, labels=["bug"])]
+    fetched = []
+    monkeypatch.setattr(fake_gh, "list_labelled_issues", lambda label: listed)
+    monkeypatch.setattr(fake_gh, "get_recent_comments",
+                        lambda numbers: fetched.append(numbers) or {n: {"comments": [], "total": 0}
+                                                                    for n in numbers})
+    monkeypatch.setattr(fake_gh, "list_comments", lambda number: pytest.fail("read over REST"))
+
+    results = lifecycle.sweep(fake_gh, store=fake_gh)
+    assert fetched == [[1, 2]]  # the exempt issue is never read
+    assert [r.split(":")[1].split("(")[0].strip() for r in results] == [
+        "sent gentle reminder", "nothing due", "exempt, skipped"]
+    saved = json.loads(fake_gh._index_files[config.SWEEP_CHECKPOINT_PATH])
+    assert sorted(saved["issues"]) == ["1", "2"]
+
+    # Nothing moved: no comment reads and no checkpoint commit.
+    fetched.clear()
+    commits = sum(c[0] == "commit_files" for c in fake_gh.calls)
+    lifecycle.sweep(fake_gh, store=fake_gh)
+    assert fetched == []
+    assert sum(c[0] == "commit_files" for c in fake_gh.calls) == commits
+
+    # The reminder bumped #1's updatedAt; only #1 is read again.
+    listed[0]["updated_at"] = "u2"
+    lifecycle.sweep(fake_gh, store=fake_gh)
+    assert fetched == [[1]]
+
+
+def test_sweep_reads_the_whole_thread_when_the_tail_is_all_bot(fake_gh, monkeypatch):
+    monkeypatch.setattr(fake_gh, "list_labelled_issues", lambda label: [_waiting(1, days_ago=20)])
+    bot = {"body": config.REMINDER_MARKER, "created_at": _iso(0), "user": {"type": "Bot"}}
+    monkeypatch.setattr(fake_gh, "get_recent_comments",
+                        lambda numbers: {1: {"comments": [bot], "total": 60}})
+    monkeypatch.setattr(fake_gh, "list_comments",
+                        lambda number: [{"body": "fixed?", "created_at": _iso(1), "user": {}}, bot])
+    assert "nothing due" in lifecycle.sweep(fake_gh)[0]
+
+
+def test_labelled_issues_and_recent_comments_are_rest_shaped(monkeypatch):
+    from ma_triage.gh import GitHubClient
+
+    client = GitHubClient("tok", repo="o/r")
+    pages = [
+        {"data": {"repository": {"issues": {
+            "pageInfo": {"hasNextPage": True, "endCursor": "c1"},
+            "nodes": [{"number": 1, "title": "a", "createdAt": "t0", "updatedAt": "t1",
+                       "author": {"__typename": "User", "login": "r"},
+                       "labels": {"nodes": [{"name": "waiting-for-user"}]}}]}}}},
+        {"data": {"repository": {"issues": {"pageInfo": {"hasNextPage": False}, "nodes": []}}}},
+    ]
+    sent = []
+
+    def graphql(query, variables=None, *, features=None):
+        sent.append((query, variables))
+        if "issues(" in query:
+            return pages[len(sent) - 1]
+        return {"data": {"repository": {"i1": {"comments": {"totalCount": 3, "nodes": [
+            {"databaseId": 9, "body": "hi", "createdAt": "t2",
+             "author": {"__typename": "Bot", "login": "app"}}]}}, "i2": None}}}
+
+    monkeypatch.setattr(client, "graphql", graphql)
+    issues = client.list_labelled_issues("waiting-for-user")
+    assert issues == [{"number": 1, "title": "a", "created_at": "t0", "updated_at": "t1",
+                       "user": {"login": "r", "type": "User"},
+                       "labels": [{"name": "waiting-for-user"}]}]
+    assert sent[1][1]["c"] == "c1"
+    found = client.get_recent_comments([1, 2])
+    assert list(found) == [1] and found[1]["total"] == 3
+    assert found[1]["comments"][0]["user"] == {"login": "app[bot]", "type": "Bot"}
+
+
+def _snapshot_payload(*, comments_more=False, labels_more=False):
+    return {"data": {"repository": {
+        "labels": {"pageInfo": {"hasNextPage": labels_more},
+                   "nodes": [{"name": "bug"}, {"name": config.LABEL_NEEDS_ATTENTION}]},
+        "issue": {
+            "number": 5, "title": "t", "body": "b", "state": "OPEN",
+            "createdAt": "2026-01-01T00:00:00Z",
+            "author": {"__typename": "User", "login": "reporter"},
+            "labels": {"nodes": [{"name": "bug"}]},
+            "comments": {"pageInfo": {"hasNextPage": comments_more}, "nodes": [
+                {"databaseId": 11, "id": "IC_1", "body": config.STICKY_MARKER,
+                 "createdAt": "2026-01-02T00:00:00Z", "authorAssociation": "NONE",
+                 "author": {"__typename": "Bot", "login": "ma-triage"}},
+                {"databaseId": 12, "id": "IC_2", "body": "still broken",
+                 "createdAt": "2026-01-03T00:00:00Z", "authorAssociation": "NONE",
+                 "author": {"__typename": "User", "login": "reporter"}},
+            ]},
+        },
+    }}}
+
+
+def test_issue_snapshot_is_rest_shaped(monkeypatch):
+    from ma_triage import comment
+    from ma_triage.gh import GitHubClient
+
+    client = GitHubClient("tok")
+    monkeypatch.setattr(client, "graphql", lambda q, v=None, *, features=None: _snapshot_payload())
+    monkeypatch.setattr(config, "BOT_LOGIN", "ma-triage[bot]")
+    snap = lifecycle.snapshot(client, 5)
+    assert snap.labels == {"bug"} and snap.issue["user"]["login"] == "reporter"
+    assert snap.repo_labels == {"bug", config.LABEL_NEEDS_ATTENTION}
+    # GraphQL's bare App login gets REST's suffix back, so ownership checks hold.
+    assert comment._owned_sticky(snap.comments)["id"] == 11
+    assert comment.is_app_sticky(snap.comments[0])
+    assert snap.last_user_activity == "2026-01-03T00:00:00Z"
+
+
+def test_issue_snapshot_lists_over_rest_past_one_page(monkeypatch):
+    from ma_triage.gh import GitHubClient
+
+    client = GitHubClient("tok")
+    monkeypatch.setattr(client, "graphql", lambda q, v=None, *, features=None:
+                        _snapshot_payload(comments_more=True, labels_more=True))
+    monkeypatch.setattr(client, "list_comments", lambda number: [{"id": 1, "body": "all"}])
+    monkeypatch.setattr(client, "list_labels", lambda: {"every", "label"})
+    found = client.get_issue_snapshot(5)
+    assert found["comments"] == [{"id": 1, "body": "all"}]
+    assert found["labels"] == {"every", "label"}
+
+
+def test_snapshot_falls_back_to_rest(fake_gh, monkeypatch):
+    monkeypatch.setattr(fake_gh, "get_issue_snapshot", lambda number: None)
+    fake_gh._comments = [{"id": 1, "body": "hi"}]
+    snap = lifecycle.snapshot(fake_gh, 5)
+    assert snap.issue["number"] == 5 and snap.comments == [{"id": 1, "body": "hi"}]
+    assert snap.repo_labels is None  # left to the caller that needs it
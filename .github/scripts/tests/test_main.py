@@ -1,3 +1,10 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
 from ma_triage import __main__ as main
 from ma_triage import config
 from ma_triage.models import AIResult, RagResult
@@ -11,8 +18,8 @@ MAIN_BODY_FULL = (
 
 
 def test_build_result_actionable(sample_raw, fake_gh, monkeypatch):
-    monkeypatch.setattr(main, "find_diagnostics_url", lambda body: "http://x")
-    monkeypatch.setattr(main, "download_capped", lambda url: sample_raw)
+    monkeypatch.setattr(main.attachments, "find_diagnostics_url", lambda body: "http://x")
+    monkeypatch.setattr(main.attachments, "stream_capped", lambda url: iter([sample_raw]))
     result = main.build_result(fake_gh, "snapcast timeout", "body", token="t")
     assert result.is_actionable
     assert result.findings
@@ -20,11 +27,31 @@ def test_build_result_actionable(sample_raw, fake_gh, monkeypatch):
     assert "SantiagoSotoC" in result.maintainers_to_ping
 
 
+def test_build_result_is_the_same_concurrent_or_sequential(
+    sample_raw, fake_gh, monkeypatch
+):
+    monkeypatch.setattr(main.attachments, "find_diagnostics_url", lambda body: "http://x")
+    monkeypatch.setattr(main.attachments, "stream_capped", lambda url: iter([sample_raw]))
+    results = []
+    for workers in (1, 4):
+        monkeypatch.setattr(config, "STAGE_WORKERS", workers)
+        result = main.build_result(
+            fake_gh, "snapcast and sonos timeout", MAIN_BODY_FULL, token="t"
+        )
+        results.append(result)
+    sequential, concurrent = results
+    assert concurrent.findings == sequential.findings
+    assert concurrent.labels_to_add == sequential.labels_to_add
+    assert concurrent.provider_docs == sequential.provider_docs
+    assert concurrent.maintainers_to_ping == sequential.maintainers_to_ping
+    assert set(concurrent.stage_timings) >= {"diagnostics", "analyze", "rag", "assess"}
+
+
 def test_build_result_uses_reported_provider_not_diagnostics_census(
     sample_raw, fake_gh, monkeypatch
 ):
-    monkeypatch.setattr(main, "find_diagnostics_url", lambda body: "http://x")
-    monkeypatch.setattr(main, "download_capped", lambda url: sample_raw)
+    monkeypatch.setattr(main.attachments, "find_diagnostics_url", lambda body: "http://x")
+    monkeypatch.setattr(main.attachments, "stream_capped", lambda url: iter([sample_raw]))
     body = (
         "### What happened?\n\nFunkwhale via Subsonic returns 404; Sonos is fine.\n\n"
         "### How to reproduce\n\nOpen a Subsonic album.\n\n"
@@ -52,8 +79,8 @@ def test_build_result_assesses_after_retrieving_rag_and_code(
     sample_raw, fake_gh, monkeypatch
 ):
     monkeypatch.setattr(config, "AI_ENABLED", True)
-    monkeypatch.setattr(main, "find_diagnostics_url", lambda body: "http://x")
-    monkeypatch.setattr(main, "download_capped", lambda url: sample_raw)
+    monkeypatch.setattr(main.attachments, "find_diagnostics_url", lambda body: "http://x")
+    monkeypatch.setattr(main.attachments, "stream_capped", lambda url: iter([sample_raw]))
     rag_result = RagResult(tier="low")
     monkeypatch.setattr(main.rag, "answer", lambda *args, **kwargs: rag_result)
     monkeypatch.setattr(
@@ -87,23 +114,28 @@ def test_build_result_assesses_after_retrieving_rag_and_code(
 
 
 def test_build_result_no_diagnostics(fake_gh, monkeypatch):
-    monkeypatch.setattr(main, "find_diagnostics_url", lambda body: None)
+    monkeypatch.setattr(main.attachments, "find_diagnostics_url", lambda body: None)
     result = main.build_result(fake_gh, "title", "body", token="t")
     assert not result.is_actionable
     assert not result.has_diagnostics
 
 
+def _failed_download(url):
+    raise main.attachments.DownloadFailed(url)
+    yield  # pragma: no cover — makes this a generator like stream_capped
+
+
 def test_build_result_invalid_download(fake_gh, monkeypatch):
-    monkeypatch.setattr(main, "find_diagnostics_url", lambda body: "http://x")
-    monkeypatch.setattr(main, "download_capped", lambda url: None)
+    monkeypatch.setattr(main.attachments, "find_diagnostics_url", lambda body: "http://x")
+    monkeypatch.setattr(main.attachments, "stream_capped", _failed_download)
     result = main.build_result(fake_gh, "title", "body", token="t")
     assert result.diagnostics_invalid is True
     assert not result.is_actionable
 
 
 def test_resolve_labels_filters_to_existing(sample_raw, fake_gh, monkeypatch):
-    monkeypatch.setattr(main, "find_diagnostics_url", lambda body: "http://x")
-    monkeypatch.setattr(main, "download_capped", lambda url: sample_raw)
+    monkeypatch.setattr(main.attachments, "find_diagnostics_url", lambda body: "http://x")
+    monkeypatch.setattr(main.attachments, "stream_capped", lambda url: iter([sample_raw]))
     result = main.build_result(
         fake_gh, "title", MAIN_BODY_FULL, token="t", labels=["triage"]
     )
@@ -126,8 +158,8 @@ def test_valid_diagnostics_but_missing_section_waits_for_user(
 ):
     # Valid diagnostics attached, but the required "What happened?" is empty:
     # the reporter still owes us info, so state = waiting-for-user (not attention).
-    monkeypatch.setattr(main, "find_diagnostics_url", lambda body: "http://x")
-    monkeypatch.setattr(main, "download_capped", lambda url: sample_raw)
+    monkeypatch.setattr(main.attachments, "find_diagnostics_url", lambda body: "http://x")
+    monkeypatch.setattr(main.attachments, "stream_capped", lambda url: iter([sample_raw]))
     body = (
         "### What happened?\n\n_No response_\n\n"
         "### How to reproduce\n\nStart it\n\n"
@@ -189,13 +221,13 @@ def test_build_result_frontend_complete_is_silent(fake_gh):
 
 
 def test_build_result_log_fallback(fake_gh, sample_log, monkeypatch):
-    monkeypatch.setattr(main, "find_diagnostics_url", lambda body: None)
+    monkeypatch.setattr(main.attachments, "find_diagnostics_url", lambda body: None)
     monkeypatch.setattr(
-        main, "find_log_urls",
+        main.attachments, "find_log_urls",
         lambda body: ["https://github.com/user-attachments/files/1/server.log"],
     )
     monkeypatch.setattr(
-        main, "download_log_windowed", lambda url, **k: sample_log.decode()
+        main.attachments, "download_log_windowed", lambda url, **k: sample_log.decode()
     )
     body = (
         "### What happened?\n\nCrashes\n\n### How to reproduce\n\nStart it\n\n"
@@ -212,8 +244,8 @@ def test_build_result_log_fallback(fake_gh, sample_log, monkeypatch):
 
 
 def test_build_result_provider_labels_from_text(fake_gh, monkeypatch):
-    monkeypatch.setattr(main, "find_diagnostics_url", lambda body: None)
-    monkeypatch.setattr(main, "find_log_urls", lambda body: [])
+    monkeypatch.setattr(main.attachments, "find_diagnostics_url", lambda body: None)
+    monkeypatch.setattr(main.attachments, "find_log_urls", lambda body: [])
     body = (
         "### What happened?\n\nSpotify playback keeps stopping\n\n"
         "### How to reproduce\n\nPlay any track\n\n"
@@ -226,8 +258,8 @@ def test_build_result_provider_labels_from_text(fake_gh, monkeypatch):
 
 
 def test_build_result_unsupported_install_flagged(fake_gh, monkeypatch):
-    monkeypatch.setattr(main, "find_diagnostics_url", lambda body: None)
-    monkeypatch.setattr(main, "find_log_urls", lambda body: [])
+    monkeypatch.setattr(main.attachments, "find_diagnostics_url", lambda body: None)
+    monkeypatch.setattr(main.attachments, "find_log_urls", lambda body: [])
     body = (
         "### What happened?\n\nBroken\n\n### How to reproduce\n\nRun\n\n"
         "### Music Assistant version\n\n2.9.5\n\n"
@@ -254,11 +286,15 @@ def test_apply_triage_state_labels_mutually_exclusive(fake_gh):
     # Existing issue already needs-attention; this pass -> waiting-for-user.
     issue = {"number": 42, "labels": [{"name": "needs-attention"}, {"name": "sonos"}]}
     result = TriageResult(form_kind="main", missing_sections=["What happened?"])
+    # A human adds a label between the issue read and the write.
+    fake_gh._issue_labels[42] = {"needs-attention", "sonos", "spotify"}
     main.apply_triage(fake_gh, 42, issue, result)
-    added = [c for c in fake_gh.calls if c[0] == "add_labels"]
-    assert any("waiting-for-user" in c[2] for c in added)
-    # the opposite state label is removed rather than left to contradict
-    assert ("remove_label", 42, "needs-attention") in fake_gh.calls
+    # One replace: waiting-for-user on, the contradicting needs-attention off,
+    # and the label added mid-run kept.
+    writes = [c for c in fake_gh.calls if c[0] in {"add_labels", "remove_label", "set_labels"}]
+    assert writes == [
+        ("set_labels", 42, ("sonos", "spotify", "triage/needs-diagnostics", "waiting-for-user"))
+    ]
 
 
 def test_apply_triage_keeps_state_when_unchanged(fake_gh):
@@ -268,3 +304,199 @@ def test_apply_triage_keeps_state_when_unchanged(fake_gh):
     result = TriageResult(form_kind="main", missing_sections=["What happened?"])
     main.apply_triage(fake_gh, 43, issue, result)
     assert not any(c[0] == "remove_label" for c in fake_gh.calls)
+
+
+def test_unchanged_attachment_reuses_cached_parse(
+    sample_raw, fake_gh, monkeypatch, tmp_path
+):
+    monkeypatch.setattr(config, "ATTACHMENT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(main.attachments, "find_diagnostics_url", lambda body: "http://x")
+    monkeypatch.setattr(main.attachments, "probe", lambda url: '"etag-1"|100')
+    monkeypatch.setattr(main.attachments, "stream_capped", lambda url: iter([sample_raw]))
+    first = main.build_result(fake_gh, "title", MAIN_BODY_FULL, token="t")
+
+    def no_download(url):
+        raise AssertionError("attachment downloaded again")
+
+    monkeypatch.setattr(main.attachments, "stream_capped", no_download)
+    second = main.build_result(fake_gh, "title", MAIN_BODY_FULL, token="t")
+    assert second.diagnostics == first.diagnostics
+    assert second.has_diagnostics
+
+    # A changed validator means changed bytes: download and parse again.
+    monkeypatch.setattr(main.attachments, "probe", lambda url: '"etag-2"|100')
+    monkeypatch.setattr(main.attachments, "stream_capped", lambda url: iter([b"{not json"]))
+    third = main.build_result(fake_gh, "title", MAIN_BODY_FULL, token="t")
+    assert third.diagnostics_invalid
+
+
+def test_download_failure_is_not_cached(sample_raw, fake_gh, monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "ATTACHMENT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(main.attachments, "find_diagnostics_url", lambda body: "http://x")
+    monkeypatch.setattr(main.attachments, "probe", lambda url: '"etag"|100')
+    monkeypatch.setattr(main.attachments, "stream_capped", _failed_download)
+    assert main.build_result(fake_gh, "t", MAIN_BODY_FULL, token="t").diagnostics_invalid
+    monkeypatch.setattr(main.attachments, "stream_capped", lambda url: iter([sample_raw]))
+    assert main.build_result(fake_gh, "t", MAIN_BODY_FULL, token="t").has_diagnostics
+
+
+def _count_model_stages(monkeypatch, calls, rag_result):
+    def answer(*args, **kwargs):
+        calls.append("rag")
+        return rag_result
+
+    def assess(*args, **kwargs):
+        calls.append("assess")
+        return AIResult(
+            summary="Snapcast stream drops",
+            likely_root_cause="Timeout",
+            category="bug",
+            confidence=0.8,
+        )
+
+    def build(*args, **kwargs):
+        calls.append("code")
+        return ""
+
+    monkeypatch.setattr(main.rag, "answer", answer)
+    monkeypatch.setattr(main.ai, "assess", assess)
+    monkeypatch.setattr(main.code_context, "build", build)
+
+
+def _triage(monkeypatch, gh, title, body, *, event="issues"):
+    monkeypatch.setenv("ISSUE_NUMBER", "7")
+    monkeypatch.setenv("ISSUE_TITLE", title)
+    monkeypatch.setenv("ISSUE_BODY", body)
+    monkeypatch.setenv("GITHUB_EVENT_NAME", event)
+    assert main.cmd_triage(gh, "t") == 0
+
+
+def test_retriage_after_typo_fix_makes_no_model_calls(
+    sample_raw, fake_gh, monkeypatch
+):
+    from ma_triage.models import RelatedPost
+
+    monkeypatch.setattr(config, "AI_ENABLED", True)
+    monkeypatch.setattr(main.attachments, "find_diagnostics_url", lambda body: "http://x")
+    monkeypatch.setattr(main.attachments, "stream_capped", lambda url: iter([sample_raw]))
+    related = RelatedPost(kind="issue", number=3, title="Snapcast drops",
+                          url="https://x/3", score=0.9)
+    calls: list[str] = []
+    _count_model_stages(monkeypatch, calls, RagResult(related_posts=[related]))
+
+    _triage(monkeypatch, fake_gh, "snapcast timeout", MAIN_BODY_FULL)
+    assert sorted(calls) == ["assess", "code", "rag"]
+    first = fake_gh.calls[-1][2]
+
+    calls.clear()
+    typo = MAIN_BODY_FULL.replace("crashes", "crashs")
+    _triage(monkeypatch, fake_gh, "snapcast timeout", typo)
+    assert calls == []
+    # The reused outputs render the same comment.
+    assert fake_gh.calls[-1][0] == "update_comment"
+    assert fake_gh.calls[-1][2].split(config.STATE_BEGIN)[0] == first.split(
+        config.STATE_BEGIN
+    )[0]
+
+    # A manual re-triage always recomputes.
+    _triage(monkeypatch, fake_gh, "snapcast timeout", typo, event="workflow_dispatch")
+    assert sorted(calls) == ["assess", "code", "rag"]
+
+
+def test_retriage_reruns_stages_whose_inputs_changed(
+    sample_raw, fake_gh, monkeypatch
+):
+    monkeypatch.setattr(config, "AI_ENABLED", True)
+    monkeypatch.setattr(main.attachments, "find_diagnostics_url", lambda body: "http://x")
+    monkeypatch.setattr(main.attachments, "stream_capped", lambda url: iter([sample_raw]))
+    calls: list[str] = []
+    _count_model_stages(monkeypatch, calls, None)
+    _triage(monkeypatch, fake_gh, "snapcast timeout", MAIN_BODY_FULL)
+
+    # A different reported version is a structured input of the assessment only.
+    calls.clear()
+    _triage(monkeypatch, fake_gh, "snapcast timeout", MAIN_BODY_FULL.replace("2.9.5", "2.9.6"))
+    assert sorted(calls) == ["assess", "code"]
+
+    # A newly named provider changes what the RAG layer is asked.
+    calls.clear()
+    _triage(monkeypatch, fake_gh, "snapcast and sonos timeout", MAIN_BODY_FULL)
+    assert sorted(calls) == ["assess", "code", "rag"]
+
+
+def test_triage_reads_the_issue_once(fake_gh, monkeypatch):
+    snapshot = fake_gh.get_issue_snapshot(7)
+    reads: list[str] = []
+    for name in ("get_issue", "list_comments", "list_labels"):
+        monkeypatch.setattr(fake_gh, name, lambda *a, _n=name: reads.append(_n))
+    monkeypatch.setattr(fake_gh, "get_issue_snapshot",
+                        lambda number: reads.append("snapshot") or snapshot)
+    monkeypatch.setattr(main.attachments, "find_diagnostics_url", lambda body: None)
+    _triage(monkeypatch, fake_gh, "title", MAIN_BODY_FULL)
+    assert reads == ["snapshot"]
+    assert any(call[0] == "create_comment" for call in fake_gh.calls)
+
+
+def test_degraded_rag_output_is_not_recorded(sample_raw, fake_gh, monkeypatch):
+    monkeypatch.setattr(config, "AI_ENABLED", True)
+    monkeypatch.setattr(main.attachments, "find_diagnostics_url", lambda body: None)
+
+    def answer(*args, degraded, **kwargs):
+        degraded.append("embedding")
+        return None
+
+    monkeypatch.setattr(main.rag, "answer", answer)
+    result = main.build_result(fake_gh, "title", MAIN_BODY_FULL, token="t")
+    assert "rag" not in result.stages
+
+
+# The import budget of the per-event commands: `respond` runs for every issue
+# comment and `sweep` on a schedule, and neither should load the triage
+# pipeline (models, retrieval, attachments) to do its small job.
+_LIGHT_COMMAND_MODULES = {
+    "ma_triage",
+    "ma_triage.__main__",
+    "ma_triage.config",
+    "ma_triage.gh",
+    "ma_triage.lifecycle",
+    "ma_triage.metrics",
+}
+_LIGHT_COMMAND_SCRIPT = """
+import json, os, sys
+os.environ.update(ISSUE_NUMBER="1", COMMENT_AUTHOR_LOGIN="reporter", GITHUB_TOKEN="t")
+for name in ("TRIAGE_RECORD_CASSETTE", "TRIAGE_METRICS_FILE", "TRIAGE_MIRROR_PATH", "INDEX_TOKEN"):
+    os.environ.pop(name, None)
+
+class Stub:
+    def __init__(self, *args, **kwargs):
+        pass
+    def get_issue(self, number):
+        return {"number": number, "labels": [], "user": {"login": "reporter"}}
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: []
+
+from ma_triage import __main__ as main
+main.GitHubClient = Stub
+assert main.main(["respond"]) == 0
+assert main.main(["sweep"]) == 0
+print(json.dumps(sorted(m for m in sys.modules if m.startswith("ma_triage"))))
+"""
+
+
+def test_light_commands_do_not_import_the_pipeline():
+    out = subprocess.run(
+        [sys.executable, "-c", _LIGHT_COMMAND_SCRIPT],
+        cwd=Path(main.__file__).resolve().parents[1],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert set(json.loads(out.splitlines()[-1])) == _LIGHT_COMMAND_MODULES
+
+
+def test_lazy_modules_stay_reachable_from_main():
+    from ma_triage import rag
+
+    assert main.rag is rag
+    with pytest.raises(AttributeError):
+        main.not_a_module
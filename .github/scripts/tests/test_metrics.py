@@ -0,0 +1,76 @@
+"""Tests for run metrics (spans, HTTP/model counters, summary + JSON output)."""
+
+import json
+
+import pytest
+from ma_triage import __main__ as main
+from ma_triage import config, metrics
+
+
+@pytest.fixture(autouse=True)
+def _fresh():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_endpoint_folds_ids_and_drops_non_api_paths():
+    assert (
+        metrics.endpoint("get", "https://api.github.com/repos/o/r/issues/123/comments?page=2")
+        == "GET api.github.com/repos/o/r/issues/{id}/comments"
+    )
+    assert (
+        metrics.endpoint("GET", "https://api.github.com/repos/o/r/git/commits/3d8e0e2abc")
+        == "GET api.github.com/repos/o/r/git/commits/{id}"
+    )
+    assert (
+        metrics.endpoint("GET", "https://github.com/user-attachments/files/1/diag.json")
+        == "GET github.com"
+    )
+
+
+def test_spans_counters_and_bytes_aggregate():
+    for _ in range(2):
+        with metrics.span("rag embed"):
+            pass
+    with pytest.raises(ValueError), metrics.span("boom"):
+        raise ValueError
+    metrics.http("GET", "https://api.github.com/repos/o/r/labels", 10)
+    chunks = list(metrics.downloaded("GET", "https://github.com/f", [b"ab", b"cde"]))
+    metrics.usage("chat", {"usage": {"prompt_tokens": 120, "completion_tokens": 30}})
+    metrics.count("chat calls")
+
+    data = metrics.snapshot()
+    assert chunks == [b"ab", b"cde"]
+    assert data["spans"]["rag embed"]["calls"] == 2
+    assert data["spans"]["boom"]["calls"] == 1
+    assert data["http"]["GET api.github.com/repos/o/r/labels"] == {"calls": 1, "bytes": 10}
+    assert data["http"]["GET github.com"]["bytes"] == 5
+    assert data["counters"] == {
+        "chat calls": 1,
+        "chat completion tokens": 30,
+        "chat prompt tokens": 120,
+    }
+    table = metrics.render(data)
+    assert "| rag embed | 2 |" in table and "| **total** | **1** | **15** |" in table
+
+
+def test_render_is_empty_without_data():
+    assert metrics.render(metrics.snapshot()) == ""
+
+
+def test_main_flushes_metrics_file_and_summary(tmp_path, monkeypatch):
+    out = tmp_path / "metrics.json"
+    step_summary = tmp_path / "summary.md"
+    monkeypatch.setattr(config, "METRICS_FILE", str(out))
+    monkeypatch.setenv("GITHUB_STEP_SUMMARY", str(step_summary))
+    monkeypatch.setenv("GITHUB_TOKEN", "t")
+    monkeypatch.setattr(
+        main, "cmd_sweep", lambda gh: metrics.count("sweep marker") or 0
+    )
+
+    assert main.main(["sweep"]) == 0
+    data = json.loads(out.read_text())
+    assert data["command"] == "sweep"
+    assert data["counters"] == {"sweep marker": 1}
+    assert "Run metrics (sweep)" in step_summary.read_text()
@@ -0,0 +1,114 @@
+"""Tests for the local SQLite mirror and its incremental sync."""
+
+import pytest
+
+from conftest import FakeGH
+from ma_triage import __main__ as main
+from ma_triage import config, fts, lifecycle
+from ma_triage.mirror import Mirror
+
+
+def _issue(number, updated, labels=()):
+    return {"number": number, "title": f"issue {number}", "body": "b",
+            "html_url": f"https://x/issues/{number}", "state": "open",
+            "labels": [{"name": n} for n in labels], "user": {"login": "r"},
+            "created_at": "2026-01-01T00:00:00Z", "updated_at": updated}
+
+
+def _comment(cid, number, updated, login="r", kind="User"):
+    return {"id": cid, "issue_url": f"https://api.github.com/repos/x/y/issues/{number}",
+            "body": f"c{cid}", "user": {"login": login, "type": kind},
+            "author_association": "NONE", "created_at": updated, "updated_at": updated}
+
+
+@pytest.fixture
+def gh():
+    gh = FakeGH(
+        issues=[_issue(1, "2026-01-02"), _issue(2, "2026-01-05", ["waiting-for-user"])],
+        discussions=[{"number": 9, "title": "d", "body": "db", "url": "https://x/d/9",
+                      "closed": False, "category": {"name": "Q&A"},
+                      "createdAt": "2026-01-01", "updatedAt": "2026-01-03"}],
+    )
+    gh._comments = [_comment(10, 2, "2026-01-04T00:00:00Z"),
+                    _comment(11, 2, "2026-01-05T00:00:00Z", "bot", "Bot")]
+    return gh
+
+
+def test_sync_mirrors_posts_and_comments_in_api_shape(gh, tmp_path):
+    with Mirror(tmp_path / "m.sqlite") as local:
+        assert local.sync(gh) is True
+        assert [i["number"] for i in local.issues(limit=10)] == [2, 1]
+        assert local.issues(limit=10)[0]["labels"] == [{"name": "waiting-for-user"}]
+        assert local.discussions(limit=10)[0]["category"] == {"name": "Q&A"}
+        assert [c["id"] for c in local.comments(2)] == [10, 11]
+        assert local.comments(2)[1]["user"] == {"login": "bot", "type": "Bot"}
+
+
+def test_sync_fetches_only_what_changed(gh, tmp_path, monkeypatch):
+    path = tmp_path / "m.sqlite"
+    with Mirror(path) as local:
+        local.sync(gh)
+    seen = []
+    original = gh.list_recent_issues
+    monkeypatch.setattr(gh, "list_recent_issues",
+                        lambda **kw: seen.append(kw["since"]) or original(**kw))
+    gh._issues.append(_issue(1, "2026-01-07"))  # issue 1 edited since
+    with Mirror(path) as local:  # reopened: the cursor persisted
+        local.sync(gh)
+        assert seen == ["2026-01-05"]
+        assert [i["updated_at"] for i in local.issues(limit=10)] == ["2026-01-07", "2026-01-05"]
+
+
+def test_capped_sync_is_not_current_and_resumes(gh, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "MIRROR_SYNC_MAX", 2)
+    gh._issues.append(_issue(3, "2026-01-06"))
+    gh._discussions, gh._comments = [], []
+    with Mirror(tmp_path / "m.sqlite") as local:
+        assert local.sync(gh) is False
+        assert [i["number"] for i in local.issues(limit=10)] == [2, 1]  # oldest first
+        local.sync(gh)  # `since` is inclusive: #2 again, then #3
+        assert [i["number"] for i in local.issues(limit=10)] == [3, 2, 1]
+
+
+def test_unreadable_file_is_rebuilt(tmp_path):
+    path = tmp_path / "m.sqlite"
+    path.write_bytes(b"not a database" * 100)
+    with Mirror(path) as local:
+        assert local.issues(limit=10) == []
+
+
+def test_sqlite_without_fts5_opens_the_mirror_without_its_lexical_index(
+    gh, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(fts, "DDL", "CREATE VIRTUAL TABLE posts_fts USING no_such_module(a);")
+    with Mirror(tmp_path / "m.sqlite") as local:
+        assert local.lexical is None
+        assert local.sync(gh) is True
+        assert [i["number"] for i in local.issues(limit=10)] == [2, 1]
+        assert [d["number"] for d in local.discussions(limit=10)] == [9]
+
+
+def test_index_build_reads_posts_from_a_current_mirror(gh, tmp_path, monkeypatch):
+    expected = main._collect_posts(gh)
+    monkeypatch.setattr(config, "MIRROR_PATH", str(tmp_path / "m.sqlite"))
+    local = main._synced_mirror(gh)
+    monkeypatch.setattr(gh, "list_recent_issues", lambda **kw: pytest.fail("listed over the API"))
+    assert main._collect_posts(gh, local) == expected
+
+
+def test_mirror_that_cannot_be_opened_falls_back_to_the_api(gh, tmp_path, monkeypatch):
+    (tmp_path / "file").write_text("")
+    monkeypatch.setattr(config, "MIRROR_PATH", str(tmp_path / "file" / "m.sqlite"))
+    assert main._synced_mirror(gh) is None
+    assert main.cmd_sweep(gh) == 0
+
+
+def test_sweep_reads_comments_from_the_mirror(gh, tmp_path, monkeypatch):
+    waiting = _issue(2, "2026-01-05T00:00:00Z", ["waiting-for-user"])
+    monkeypatch.setattr(gh, "list_labelled_issues", lambda label: [waiting])
+    monkeypatch.setattr(gh, "get_recent_comments", lambda numbers: pytest.fail("read over the API"))
+    monkeypatch.setattr(config, "MIRROR_PATH", str(tmp_path / "m.sqlite"))
+    local = main._synced_mirror(gh)
+    results = lifecycle.sweep(gh, mirror=local)
+    # The last reporter comment (#10) is the activity, not the bot's (#11).
+    assert results and "auto-closed" in results[0]
@@ -80,8 +80,12 @@ def test_answer_ranks_the_index_text_when_embedding_fails(ai_on, monkeypatch):
     """
     monkeypatch.setattr(embeddings, "embed_text", lambda text, *, token: None)
     gh = _gh_with_indexes()
-    result = rag.answer(gh, title="sonos mdns", body="", number=1, token="t")
+    degraded = []
+    result = rag.answer(
+        gh, title="sonos mdns", body="", number=1, token="t", degraded=degraded
+    )
     assert result is not None
+    assert degraded == ["embedding"]
     assert [post.number for post in result.related_posts] == [50]
     assert result.related_posts[0].source == "lexical"
     # BM25 is unbounded and corpus-relative, so it must not reach the field
@@ -277,8 +281,8 @@ def test_build_result_wires_rag_when_enabled(ai_on, monkeypatch):
     from ma_triage import __main__ as main
 
     gh = _gh_with_indexes()
-    monkeypatch.setattr(main, "find_diagnostics_url", lambda body: None)
-    monkeypatch.setattr(main, "find_log_urls", lambda body: [])
+    monkeypatch.setattr(main.attachments, "find_diagnostics_url", lambda body: None)
+    monkeypatch.setattr(main.attachments, "find_log_urls", lambda body: [])
     monkeypatch.setattr(
         rag.ai, "judge_answer",
         lambda t, b, hits, *, token: DocAnswer(True, 0.9, "a", [hits[0].chunk.id]),
@@ -298,7 +302,32 @@ def test_build_result_wires_rag_when_enabled(ai_on, monkeypatch):
 def test_build_result_no_rag_when_disabled(fake_gh, monkeypatch):
     from ma_triage import __main__ as main
 
-    monkeypatch.setattr(main, "find_diagnostics_url", lambda body: None)
-    monkeypatch.setattr(main, "find_log_urls", lambda body: [])
+    monkeypatch.setattr(main.attachments, "find_diagnostics_url", lambda body: None)
+    monkeypatch.setattr(main.attachments, "find_log_urls", lambda body: [])
     res = main.build_result(fake_gh, "t", "b", token="t", labels=["triage"])
     assert res.rag is None
+
+
+def test_answer_reuses_cached_judge_verdict(ai_on, monkeypatch):
+    gh = _gh_with_indexes()
+    monkeypatch.setattr(config, "JUDGE_CACHE_ENABLED", True)
+    calls = []
+
+    def judge(title, body, hits, *, token):
+        calls.append(title)
+        return DocAnswer(True, 0.92, "Enable multicast.", [hits[0].chunk.id])
+
+    monkeypatch.setattr(rag.ai, "judge_answer", judge)
+    first = rag.answer(gh, title="sonos mdns", body="multicast", number=99, token="t")
+    assert first.judge_cached is False and first.judge_entry is not None
+    assert len(calls) == 1
+
+    index = {
+        "schema": 1, "model": config.EMBED_MODEL, "answer_model": config.ANSWER_MODEL,
+        "dim": config.EMBED_DIM, "entries": [first.judge_entry],
+    }
+    embeddings.save_index(gh, config.JUDGE_CACHE_PATH, index, message="j")
+    again = rag.answer(gh, title="sonos mdns", body="multicast", number=100, token="t")
+    assert len(calls) == 1  # verdict reused, no second judge call
+    assert again.judge_cached is True and again.judge_entry is None
+    assert again.tier == first.tier == "high"
@@ -67,6 +67,18 @@ def test_retrieve_docs_hybrid(monkeypatch):
     assert len(hits) == 2
 
 
+def test_retrieve_docs_reports_score_stats():
+    chunks = [
+        _chunk("a", "sonos speaker grouping", [1.0, 0.0, 0.0]),
+        _chunk("b", "spotify premium login", [0.0, 1.0, 0.0]),
+    ]
+    stats = {}
+    retrieval.retrieve_docs([0.9, 0.1, 0.0], "sonos grouping issue", chunks, stats=stats)
+    assert stats["bm25_top"] > 0 and stats["bm25_second"] == 0.0
+    assert stats["rrf_top"] > stats["rrf_second"] > 0
+    assert stats["agree"] == 1.0
+
+
 def _page_chunk(cid, path, text, embedding):
     return DocChunk(
         id=cid, path=path, url=f"https://x/{cid}", title=path, heading=cid,
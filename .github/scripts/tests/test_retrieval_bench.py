@@ -0,0 +1,149 @@
+"""Tests for the retrieval benchmark (metrics, engines, eval file, mining)."""
+
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from conftest import FakeGH, fake_embedding
+from ma_triage import __main__ as main
+from ma_triage import comment, config, embeddings, retrieval_bench
+from ma_triage.models import DocChunk
+from ma_triage.retrieval import encode_vec
+from ma_triage.retrieval_bench import Case
+
+BOT = "ma-triage[bot]"
+
+
+def _chunk(path, text):
+    return DocChunk(
+        id=f"{path}#s", path=path, url=f"https://x/{path}", title=path, heading="s",
+        text=text, breadcrumbs=[path], sha=text, embedding=fake_embedding(text),
+    )
+
+
+CHUNKS = [
+    _chunk("players/sonos", "sonos speakers discovery multicast network"),
+    _chunk("providers/spotify", "spotify premium login oauth token"),
+    _chunk("install/docker", "docker compose host network install"),
+]
+POSTS = [
+    {"kind": "issue", "number": n, "title": t, "excerpt": t, "embedding": encode_vec(fake_embedding(t))}
+    for n, t in [(1, "spotify login fails"), (2, "sonos not discovered"), (3, "docker install error")]
+]
+
+
+def _case(text, relevant, **kw):
+    return Case(text=text, relevant=set(relevant), vec=fake_embedding(text), **kw)
+
+
+def test_evaluate_reports_recall_mrr_latency_and_memory():
+    cases = [
+        _case("sonos speakers not discovered", ["players/sonos"]),
+        _case("spotify login broken", ["providers/spotify"]),
+        _case("unrelated words only", ["install/docker"]),
+    ]
+    result = retrieval_bench.evaluate(retrieval_bench._docs_bm25, cases, CHUNKS, k=1)
+    assert result["n"] == 3
+    assert result["recall@1"] == pytest.approx(2 / 3, abs=1e-3)
+    assert result["mrr"] == pytest.approx(2 / 3, abs=1e-3)
+    assert result["p95_ms"] >= result["p50_ms"] >= 0
+    assert result["peak_kib"] >= 0
+
+
+@pytest.mark.parametrize("name", sorted(retrieval_bench.DOC_ENGINES))
+def test_every_docs_engine_finds_an_obvious_page(name):
+    case = _case("sonos speakers discovery multicast", ["players/sonos"])
+    assert retrieval_bench.DOC_ENGINES[name](case, CHUNKS)[0] == "players/sonos"
+
+
+@pytest.mark.parametrize("name", sorted(retrieval_bench.DUP_ENGINES))
+def test_every_duplicate_engine_excludes_the_query_itself(name):
+    case = _case("sonos not discovered\n\nsonos not discovered", ["issue#2"], exclude=("issue", 2))
+    ranked = retrieval_bench.DUP_ENGINES[name](case, POSTS)
+    assert "issue#2" not in ranked
+
+
+def test_run_and_render_cover_each_engine():
+    cases = [_case("spotify login fails\n\n", ["issue#1"], exclude=("issue", 9))]
+    results = retrieval_bench.run(retrieval_bench.DUP_ENGINES, cases, POSTS, k=3)
+    assert set(results) == {"dense", "bm25", "bm25f", "rrf"}
+    assert all(r["recall@3"] == 1.0 for r in results.values())
+    table = retrieval_bench.render("Duplicates", results, k=3)
+    assert "| bm25f | 1 | 100.0% | 1.000 |" in table
+
+
+def test_load_eval_reads_the_documented_layout(tmp_path):
+    path = tmp_path / "eval.json"
+    path.write_text(json.dumps({
+        "docs": [{"query": "q", "pages": ["/players/sonos/"]}],
+        "duplicates": [{"number": 5, "title": "t", "body": "b",
+                        "duplicates": [{"kind": "discussion", "number": 4}]}],
+    }))
+    docs, dups = retrieval_bench.load_eval(path)
+    assert docs[0].relevant == {"players/sonos"}
+    assert dups[0].relevant == {"discussion#4"} and dups[0].exclude == ("issue", 5)
+    assert dups[0].text == "t\n\nb"
+
+
+def test_load_eval_rejects_malformed_cases(tmp_path):
+    path = tmp_path / "eval.json"
+    path.write_text(json.dumps({"docs": [{"query": "q"}]}))
+    with pytest.raises(retrieval_bench.EvalFormatError):
+        retrieval_bench.load_eval(path)
+
+
+def _sticky(number, state, updated):
+    return {"issue_url": f"https://api.github.com/repos/x/y/issues/{number}",
+            "user": {"login": BOT, "type": "Bot"}, "updated_at": updated,
+            "body": f"{config.STICKY_MARKER}\n{comment._render_state(state)}"}
+
+
+def test_mine_collects_judged_questions_and_marked_duplicates(monkeypatch):
+    monkeypatch.setattr(config, "BOT_LOGIN", BOT)
+    now = datetime.now(timezone.utc).isoformat()
+    # The `rag` record every RAG run writes, judge cache or not.
+    state = {"v": 1, "rag": {"tier": "high", "judge_answered": True, "judge_conf": 0.9,
+                             "cited": ["players/sonos#mdns", "players/sonos#ports"]}}
+    gh = FakeGH()
+    gh._comments = [
+        _sticky(7, state, now),
+        _sticky(5, {"v": 1, "rag": {**state["rag"], "judge_conf": 0.2}}, now),
+        # Older than the mining window: never listed.
+        _sticky(4, state, "2000-01-01T00:00:00Z"),
+        {"issue_url": "https://api.github.com/repos/x/y/issues/9", "updated_at": now,
+         "author_association": "MEMBER", "user": {"login": "m"}, "body": "Duplicate of #3"},
+        # Neither a maintainer nor the App: ignored.
+        {"issue_url": "https://api.github.com/repos/x/y/issues/8", "updated_at": now,
+         "author_association": "NONE", "user": {"login": "r"}, "body": "Duplicate of #3"},
+    ]
+    data = retrieval_bench.mine(gh)
+    assert [(d["number"], d["pages"]) for d in data["docs"]] == [(7, ["players/sonos"])]
+    assert [(d["number"], d["duplicates"]) for d in data["duplicates"]] == [
+        (9, [{"kind": "issue", "number": 3}])
+    ]
+
+
+def test_mine_eval_fails_clearly_without_judged_questions(monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(config, "BOT_LOGIN", BOT)
+    out = tmp_path / "eval.json"
+    assert main.cmd_mine_eval(FakeGH(), str(out)) == 1
+    assert json.loads(out.read_text()) == {"docs": [], "duplicates": []}
+    assert "no judged docs questions" in capsys.readouterr().err
+
+
+def test_bench_retrieval_command_reports_both_sets(monkeypatch, tmp_path, capsys):
+    path = tmp_path / "eval.json"
+    path.write_text(json.dumps({
+        "docs": [{"query": "sonos discovery", "pages": ["players/sonos"]}],
+        "duplicates": [{"number": 9, "title": "spotify login", "body": "",
+                        "duplicates": [{"number": 1}]}],
+    }))
+    monkeypatch.setattr(embeddings, "embed_texts",
+                        lambda texts, token: [fake_embedding(t) for t in texts])
+    monkeypatch.setattr(embeddings, "load_docs_chunks", lambda gh: CHUNKS)
+    monkeypatch.setattr(embeddings, "load_posts", lambda gh: POSTS)
+    assert main.cmd_bench_retrieval(FakeGH(), "t", str(path), k=3) == 0
+    out = capsys.readouterr().err
+    assert "### Docs (3 chunks)" in out and "### Duplicates (3 posts)" in out
+    assert "| rrf | 1 | 100.0% |" in out
@@ -0,0 +1,128 @@
+"""Tests for re-triage stage reuse (text sketches, keys, output round-trips)."""
+
+import json
+
+import pytest
+from ma_triage import comment, config, reuse
+from ma_triage.models import (
+    AIResult,
+    DocAnswer,
+    DocChunk,
+    DocHit,
+    RagResult,
+    RelatedPost,
+)
+
+BODY = (
+    "### What happened?\n\nWhen I play a song from Spotify on my Sonos speaker "
+    "the playback stops after about ten seconds and the queue is cleared.\n\n"
+    "### Music Assistant version\n\n2.5.0"
+)
+
+
+def _chunk(cid):
+    return DocChunk(id=cid, path="faq", url=f"https://x/{cid}", title="T",
+                    heading=cid, text="mdns multicast", breadcrumbs=["T"])
+
+
+def test_typo_fix_is_near_and_rewrite_is_not():
+    sketch = reuse.text_sketch("Playback stops", BODY)
+    typo = reuse.text_sketch("Playback stops", BODY.replace("speaker", "speeker"))
+    rewrite = reuse.text_sketch("Radio fails", "Stations never start at all.")
+    assert reuse.text_distance(sketch, sketch) == 0
+    assert reuse.text_distance(sketch, typo) <= config.REUSE_MAX_CHANGED_TOKENS
+    assert reuse.text_distance(sketch, rewrite) > config.REUSE_MAX_CHANGED_TOKENS
+
+
+def test_oversized_text_only_matches_exactly(monkeypatch):
+    monkeypatch.setattr(reuse, "_SKETCH_MAX_TOKENS", 3)
+    sketch = reuse.text_sketch("t", BODY)
+    assert "sha" in sketch
+    assert reuse.text_distance(sketch, reuse.text_sketch("t", BODY)) == 0
+    assert reuse.text_distance(sketch, reuse.text_sketch("t", BODY + "x")) is None
+
+
+def test_previous_requires_near_text_and_same_key():
+    sketch = reuse.text_sketch("t", BODY)
+    stages = reuse.record()
+    reuse.put(stages, "ai", "k1", {"x": 1}, sketch)
+    # Round-trip through the rendered state block, as a real re-run would.
+    rendered = comment._render_state({"stages": stages})
+    state = comment.parse_state(rendered)
+
+    near = reuse.Previous(state, reuse.text_sketch("t", BODY.replace("ten", "tenn")))
+    assert near.get("ai", "k1") == (True, {"x": 1})
+    assert near.get("ai", "k2") == (False, None)
+    assert near.get("ai", None) == (False, None)
+    far = reuse.Previous(state, reuse.text_sketch("other", "entirely different words"))
+    assert far.get("ai", "k1") == (False, None)
+
+
+def test_reuse_stops_once_small_edits_add_up(monkeypatch):
+    monkeypatch.setattr(config, "REUSE_MAX_CHANGED_TOKENS", 4)
+    words = BODY.split()
+    stages = reuse.record()
+    reuse.put(stages, "ai", "k", {"x": 1}, reuse.text_sketch("t", BODY))
+    hits = []
+    for i in range(len(words)):
+        # One more word replaced per run: each run is a single-word edit away
+        # from the last, but the drift from the original text keeps growing.
+        body = " ".join([f"edit{j}" for j in range(i + 1)] + words[i + 1 :])
+        state = comment.parse_state(comment._render_state({"stages": stages}))
+        previous = reuse.Previous(state, reuse.text_sketch("t", body))
+        hit, _ = previous.get("ai", "k")
+        hits.append(hit)
+        stages = reuse.record()
+        if hit:
+            previous.carry(stages, "ai")
+        else:
+            break
+    # A replaced word is two changed tokens: two edits fit within 4, the third does not.
+    assert hits == [True, True, False]
+
+
+def test_previous_ignored_when_disabled(monkeypatch):
+    sketch = reuse.text_sketch("t", BODY)
+    stages = reuse.record()
+    reuse.put(stages, "ai", "k", 1, sketch)
+    monkeypatch.setattr(config, "REUSE_STAGES", False)
+    assert reuse.Previous({"stages": stages}, sketch).get("ai", "k") == (False, None)
+
+
+def test_digest_is_order_sensitive_and_stable():
+    assert reuse.digest("a", [1, 2]) == reuse.digest("a", [1, 2])
+    assert reuse.digest("a", [1, 2]) != reuse.digest("a", [2, 1])
+
+
+def test_rag_round_trip_rehydrates_chunks():
+    chunk = _chunk("faq#mdns")
+    related = RelatedPost(kind="issue", number=5, title="t", url="u", score=0.8,
+                          excerpt="e" * 2000)
+    rag_result = RagResult(
+        tier="high",
+        doc_answer=DocAnswer(answers_question=True, confidence=0.9, answer="a",
+                             cited_sections=["faq#mdns"]),
+        cited_chunks=[chunk],
+        doc_hits=[DocHit(chunk=chunk, score=0.5)],
+        related_posts=[related],
+        judge_confidence=0.9,
+        judge_answered=True,
+    )
+    out = json.loads(json.dumps(reuse.dump_rag(rag_result)))
+    restored = reuse.load_rag(out, chunks=[chunk], pinned=[])
+    assert restored.doc_answer == rag_result.doc_answer
+    assert restored.cited_chunks == [chunk]
+    assert restored.doc_hits[0].score == 0.5
+    assert restored.related_posts[0].number == 5
+    assert len(restored.related_posts[0].excerpt) < 2000
+
+    with pytest.raises(ValueError):
+        reuse.load_rag(out, chunks=[], pinned=[])  # chunk gone from the index
+
+
+def test_ai_round_trip():
+    result = AIResult(summary="s", likely_root_cause="r", category="bug",
+                      confidence=0.5, evidence=["e"])
+    assert reuse.load_ai(json.loads(json.dumps(reuse.dump_ai(result)))) == result
+    with pytest.raises(ValueError):
+        reuse.load_ai({"summary": "s"})
@@ -0,0 +1,53 @@
+"""Tests for the synthetic scale benchmark."""
+
+import pytest
+import requests
+
+from ma_triage import __main__ as main
+from ma_triage import config, retrieval, scale_bench
+
+
+def test_corpus_is_deterministic_and_mixed():
+    a, b = scale_bench.Corpus(7).posts(300), scale_bench.Corpus(7).posts(300)
+    assert a == b
+    assert [p["number"] for p in a[:3]] == [300, 299, 298]  # newest first
+    kinds = {p["kind"] for p in a}
+    assert kinds == {"issue", "discussion"}
+    with_provider = sum(bool(p["providers"]) for p in a)
+    assert 150 < with_provider < 250
+    assert {p["providers"][0] for p in a if p["providers"]} <= set(scale_bench.PROVIDERS)
+
+
+def test_local_vectors_cluster_by_topic():
+    corpus = scale_bench.Corpus(1)
+    same = [scale_bench.local_vector(corpus.text(3, 80), 64) for _ in range(2)]
+    other = scale_bench.local_vector(corpus.text(9, 80), 64)
+    assert retrieval.cosine(*same) > retrieval.cosine(same[0], other)
+
+
+def test_local_embedder_answers_only_the_embeddings_endpoint():
+    with scale_bench.local_embedder(8):
+        resp = requests.post(config.EMBED_ENDPOINT, json={"input": ["a b", "c"]})
+        assert [len(d["embedding"]) for d in resp.json()["data"]] == [8, 8]
+        with pytest.raises(requests.ConnectionError):
+            requests.get("https://api.github.com/repos/x/y")
+
+
+def test_measure_lifts_the_caps_for_the_run_only(monkeypatch):
+    monkeypatch.setattr(config, "INDEX_MAX_ISSUES", 10)
+    monkeypatch.setattr(config, "INDEX_MAX_DISCUSSIONS", 10)
+    monkeypatch.setattr(config, "EMBED_DIM", 16)
+    row = scale_bench.measure(60, queries=3)
+    assert row["posts"] == row["loaded"] == 60
+    assert row["chunks"] == 6 and row["bytes"] > 0
+    assert row["dense_ms"][1] >= row["dense_ms"][0]
+    assert (config.INDEX_MAX_ISSUES, config.INDEX_MAX_DISCUSSIONS) == (10, 10)
+
+
+def test_bench_scale_command_renders_a_row_per_size(monkeypatch, capsys):
+    monkeypatch.setattr(config, "EMBED_DIM", 16)
+    monkeypatch.setattr(scale_bench, "QUERIES", 2)
+    assert main.main(["bench-scale", "40", "20"]) == 0
+    out = capsys.readouterr().err
+    rows = [line for line in out.splitlines() if line.startswith("| 20 |") or line.startswith("| 40 |")]
+    assert [row.split(" | ")[0] for row in rows] == ["| 20", "| 40"]
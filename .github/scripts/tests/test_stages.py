@@ -0,0 +1,68 @@
+"""Tests for the concurrent stage executor."""
+
+import threading
+import time
+
+import pytest
+from ma_triage.stages import Stage, execute
+
+
+def test_independent_stages_overlap_and_dependents_see_outputs():
+    started = threading.Barrier(2, timeout=5)
+
+    def slow(value):
+        def run(_):
+            started.wait()  # both must be running at once, or this times out
+            time.sleep(0.05)
+            return value
+        return run
+
+    stages = [
+        Stage("a", slow(1)),
+        Stage("b", slow(2)),
+        Stage("sum", lambda done: done["a"] + done["b"], ("a", "b")),
+    ]
+    outputs, timings = execute(stages, workers=4)
+    assert outputs == {"a": 1, "b": 2, "sum": 3}
+    assert timings.wall < sum(timings.durations().values())
+    path, total = timings.critical_path(stages)
+    assert path[-1] == "sum" and path[0] in ("a", "b")
+    assert total <= timings.wall + 0.01
+
+
+def test_sequential_mode_runs_in_order():
+    order = []
+    stages = [Stage(name, lambda _, n=name: order.append(n)) for name in "xyz"]
+    execute(stages, workers=1)
+    assert order == ["x", "y", "z"]
+
+
+def test_failure_propagates_and_skips_dependents():
+    ran = []
+
+    def boom(_):
+        raise RuntimeError("boom")
+
+    stages = [
+        Stage("ok", lambda _: ran.append("ok")),
+        Stage("bad", boom),
+        Stage("after", lambda _: ran.append("after"), ("bad",)),
+    ]
+    with pytest.raises(RuntimeError, match="boom"):
+        execute(stages, workers=4)
+    assert "after" not in ran
+
+
+def test_rejects_unknown_or_out_of_order_dependencies():
+    with pytest.raises(ValueError):
+        execute([Stage("a", lambda _: 1, ("b",)), Stage("b", lambda _: 2)], workers=2)
+    with pytest.raises(ValueError):
+        execute([Stage("a", lambda _: 1), Stage("a", lambda _: 2)], workers=2)
+
+
+def test_describe_lists_stages_in_pipeline_order():
+    stages = [Stage("first", lambda _: None), Stage("second", lambda _: None)]
+    _, timings = execute(stages, workers=2)
+    line = timings.describe(stages)
+    assert line.index("first") < line.index("second")
+    assert "critical path" in line